@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+from networkx.readwrite import json_graph
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from cnf_parser import CnfFallback, CnfParser  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+
+
+def parse_only(tstp):
+    """parse_only
+
+    抽象構文木を作成せずに、手書きのパーサーでトークン分割と構文解析だけを行う(larkに任せる入力は読み飛ばす)
+    """
+    cnf_parser = CnfParser(tstp)
+    while cnf_parser.kinds[cnf_parser.pos] != "EOF":
+        start = cnf_parser.pos
+        try:
+            cnf_parser.parse_cnf_annotated()
+        except CnfFallback:
+            cnf_parser.pos = cnf_parser.find_input_end(start)
+
+
+def measure(name, function, size, repeat):
+    """measure
+
+    functionをrepeat回実行し、最小の実行時間とMB/sを表示する
+    """
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed.append(time.perf_counter() - start)
+    print(f"{name}: {min(elapsed):.3f} s, {size / 1e6 / min(elapsed):.2f} MB/s")
+    return result
+
+
+def main():
+    """main
+
+    tstpファイルについて、larkで構文解析してconvert_cst2astで変換する場合と、
+    cnfの入力を手書きのパーサーで解析するconvert_tstp2astの場合の速度(MB/s)を比較する
+    2つの抽象構文木が同じであることも確認する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tstp_paths", nargs="+")
+    parser.add_argument("--grammar", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "tstp_EBNF.lark"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    parse_tstp = ParseTstp(args.grammar)
+    # パーサーの作成時間は含めない
+    parse_tstp.parse_tstp("")
+    for tstp_path in args.tstp_paths:
+        with open(tstp_path) as f:
+            tstp = f.read()
+        size = len(tstp.encode())
+        print(f"{tstp_path}: {size / 1e6:.2f} MB")
+        expected = measure("  lark + convert_cst2ast", lambda: parse_tstp.convert_cst2ast(
+            parse_tstp.parse_tstp(tstp)), size, args.repeat)
+        ast_handler = measure("  convert_tstp2ast", lambda: parse_tstp.convert_tstp2ast(tstp), size, args.repeat)
+        measure("  tokenize + parse only", lambda: parse_only(tstp), size, args.repeat)
+        assert (json_graph.node_link_data(ast_handler.get_graph()) ==
+                json_graph.node_link_data(expected.get_graph()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+from collections import Counter
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from columnar_export import ColumnarExporter, formula_depths, inference_rule_histogram, symbol_frequencies  # nopep8
+from handler import NetworkxHandler  # nopep8
+from symbol_index import FUNCTOR_TOKEN_TYPES  # nopep8
+
+
+def aggregate_json(ast_paths, deduction_tree_paths):
+    """aggregate_json
+
+    jsonファイルを読み込み、Pythonのループで推論規則の数と記号の出現回数を集計する
+    """
+    rules = Counter()
+    functors = Counter()
+    for ast_path, deduction_tree_path in zip(ast_paths, deduction_tree_paths):
+        with open(deduction_tree_path) as f:
+            rules.update(node.get("inference_rule") for node in json.load(f)["nodes"])
+        with open(ast_path) as f:
+            functors.update(node["label"] for node in json.load(f)["nodes"]
+                            if node.get("token_type") in FUNCTOR_TOKEN_TYPES)
+    return rules, functors
+
+
+def main():
+    """main
+
+    同じ抽象構文木と証明のグラフをcopies回書き出し、jsonのループと列指向の表の集計の時間を比較する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ast_path")
+    parser.add_argument("deduction_tree_path")
+    parser.add_argument("--copies", type=int, default=10)
+    args = parser.parse_args()
+    ast_paths = [args.ast_path] * args.copies
+    deduction_tree_paths = [args.deduction_tree_path] * args.copies
+
+    start = time.perf_counter()
+    rules, functors = aggregate_json(ast_paths, deduction_tree_paths)
+    print(f"json loop: {time.perf_counter() - start:.2f} s")
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        ast = NetworkxHandler()
+        ast.load_json(args.ast_path)
+        deduction_tree = NetworkxHandler()
+        deduction_tree.load_json(args.deduction_tree_path)
+        start = time.perf_counter()
+        with ColumnarExporter(dir_path, file_format="npz") as exporter:
+            for copy in range(args.copies):
+                exporter.add_ast(str(copy), ast)
+                exporter.add_deduction_tree(str(copy), deduction_tree)
+        size = sum(os.path.getsize(os.path.join(dir_path, name)) for name in os.listdir(dir_path))
+        print(f"export (once): {time.perf_counter() - start:.2f} s, {size / 2 ** 20:.1f} MB")
+        start = time.perf_counter()
+        histogram = inference_rule_histogram(dir_path)
+        frequencies = symbol_frequencies(dir_path)
+        depths = formula_depths(dir_path)
+        print(f"columnar aggregates: {time.perf_counter() - start:.2f} s "
+              f"({len(depths)} formulas, max depth {depths.max()})")
+    assert histogram == dict(rules)
+    assert frequencies == dict(functors)
+
+
+if __name__ == "__main__":
+    main()
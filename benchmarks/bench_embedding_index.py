@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, "machine_learning"))
+from embedding_index import EmbeddingIndex  # nopep8
+
+
+def main():
+    """main
+
+    クラスタ構造を持つ人工的な埋め込みで、全件検索とLSHによる近似検索の1クエリあたりの時間と再現率を計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--axioms", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tables", type=int, default=32)
+    parser.add_argument("--bits", type=int, default=12)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((args.axioms // 500 + 1, args.dim)).astype(np.float32)
+    embeddings = (centers[rng.integers(0, len(centers), args.axioms)]
+                  + 0.5 * rng.standard_normal((args.axioms, args.dim)).astype(np.float32))
+    queries = (embeddings[rng.integers(0, args.axioms, args.queries)]
+               + 0.2 * rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+    index = EmbeddingIndex(embeddings)
+
+    start = time.perf_counter()
+    exact = np.stack([index.search(query, args.k)[1][0] for query in queries])
+    exact_time = (time.perf_counter() - start) / args.queries
+    start = time.perf_counter()
+    index.build_lsh(args.tables, args.bits)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    approximate = np.stack([index.search(query, args.k, approximate=True)[1][0] for query in queries])
+    approximate_time = (time.perf_counter() - start) / args.queries
+    recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(exact, approximate)])
+    print(f"axioms: {args.axioms}, exact: {exact_time * 1000:.2f} ms/query, "
+          f"lsh: {approximate_time * 1000:.2f} ms/query (build {build_time:.1f} s), "
+          f"recall@{args.k}: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
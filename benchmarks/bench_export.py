@@ -0,0 +1,91 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, "machine_learning"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from export import check_export, export_model  # nopep8
+from graph_dataset import FormulaGraphDataset  # nopep8
+from model import CNN, GCN, LSTM, NN, RNN  # nopep8
+
+
+def measure(function, inputs, repeat):
+    """measure
+
+    inputsを1つずつfunctionに与えたときの待ち時間を計測する
+    """
+    latencies = []
+    with torch.inference_mode():
+        for _ in range(repeat):
+            for data in inputs:
+                start = time.perf_counter()
+                function(data)
+                latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+
+def import_time(module):
+    """import_time
+
+    新しいプロセスでmoduleをimportするのにかかる時間を計測する
+    """
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             os.pardir, "machine_learning"))
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def report(name, eager, exported):
+    print(f"{name}: eager p50 {np.percentile(eager, 50) * 1000:.3f} ms, "
+          f"exported p50 {np.percentile(exported, 50) * 1000:.3f} ms, "
+          f"speedup {np.percentile(eager, 50) / np.percentile(exported, 50):.2f}x")
+
+
+def main():
+    """main
+
+    各モデルをTorchScriptに変換し、1つの論理式あたりのCPUでの推論の待ち時間を変換前と比較する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-root", help="FormulaGraphDatasetのディレクトリ(GCNの計測に使用)")
+    parser.add_argument("--formulas", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(10, 200, args.formulas)
+    token_inputs = [torch.randint(2, 1000, (1, length)) for length in lengths]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.pt")
+        for model in [NN(1000, 64, 64, 2), CNN(1000, 64, 64, 3, 2),
+                      RNN(1000, 64, 64, 2), LSTM(1000, 64, 64, 2)]:
+            model.eval()
+            exported = export_model(model, path, token_inputs[0])
+            check_export(model, exported, token_inputs[:20])
+            report(type(model).__name__, measure(model, token_inputs, args.repeat),
+                   measure(exported, token_inputs, args.repeat))
+
+        if args.dataset_root:
+            from torch_geometric.loader import DataLoader
+            dataset = FormulaGraphDataset(args.dataset_root)
+            graph_inputs = list(DataLoader(dataset[:args.formulas], batch_size=1))
+            model = GCN(dataset.num_features, 2, 64, 2).eval()
+            exported = export_model(model, path)
+            check_export(model, exported, graph_inputs[:20])
+            report("GCN", measure(model, graph_inputs, args.repeat),
+                   measure(lambda data: exported(data.x, data.edge_index, data.batch, 1),
+                           graph_inputs, args.repeat))
+
+    print(f"import learning: {import_time('learning'):.2f} s, "
+          f"import runtime: {import_time('runtime'):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
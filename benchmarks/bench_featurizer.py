@@ -0,0 +1,45 @@
+import argparse
+import glob
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, "machine_learning"))
+from featurizer import Featurizer, Vocabulary  # nopep8
+
+
+def main():
+    """main
+
+    正規化された論理式のコーパスに対するFeaturizerの処理速度(formulas/s)を計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("json_dir", help="save_normalized_formulaの出力ディレクトリ")
+    parser.add_argument("--vocabulary", help="語彙のjsonファイル、省略時はコーパスから作成")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    json_paths = sorted(glob.glob(os.path.join(args.json_dir, "**", "*.json"),
+                                  recursive=True))
+    if args.vocabulary:
+        vocabulary = Vocabulary.load(args.vocabulary)
+    else:
+        vocabulary = Vocabulary.build(json_paths)
+    featurizer = Featurizer(vocabulary)
+    print(f"formulas: {len(json_paths)}, vocabulary: {len(vocabulary)}")
+    for processes in args.processes:
+        start = time.perf_counter()
+        if processes == 1:
+            tokens, offsets, walks = featurizer.transform(json_paths)
+        else:
+            tokens, offsets, walks = featurizer.transform_parallel(
+                json_paths, processes, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"processes: {processes}, time: {elapsed:.3f}s, "
+              f"formulas/s: {len(json_paths) / elapsed:.0f}, "
+              f"tokens: {len(tokens)}, walk nnz: {walks.nnz}")
+
+
+if __name__ == "__main__":
+    main()
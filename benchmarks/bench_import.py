@@ -0,0 +1,50 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+TSTP = "cnf(c1,plain,~p(X)|q(f(X),a),inference(resolution,[],[c0]))."
+
+STATEMENTS = {
+    "import handler": "import handler",
+    "import parse_tstp": "import parse_tstp",
+    "import normalize": "import normalize",
+    "import + first parse (standalone)":
+        "from parse_tstp import ParseTstp\n"
+        f"ParseTstp('tstp_EBNF.lark').parse_tstp({TSTP!r})",
+    "import + first parse (lark earley)":
+        "from lark import Lark\n"
+        "Lark(open('tstp_EBNF.lark', encoding='utf-8').read(), start='tptp_root')"
+        f".parse({TSTP!r})",
+}
+
+
+def run(statement):
+    """run
+
+    新しいpythonプロセスでstatementを実行するのにかかる時間(秒)を返す
+    """
+    code = ("import time\nstart = time.perf_counter()\n" + statement +
+            "\nprint(time.perf_counter() - start)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """main
+
+    モジュールのimportと最初の構文解析にかかる時間を、新しいプロセスで繰り返し計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for name, statement in STATEMENTS.items():
+        times = [run(statement) for _ in range(args.repeat)]
+        print(f"{name}: median {statistics.median(times) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+import torch
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, "machine_learning"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from graph_dataset import GraphBatchBuilder  # nopep8
+from featurizer import Vocabulary  # nopep8
+from inference_server import GraphEncoder, InferenceServer  # nopep8
+from model import GCN  # nopep8
+
+
+def run_clients(server, graphs, n_clients, n_requests):
+    """run_clients
+
+    n_clients個のスレッドからそれぞれn_requests個のリクエストを逐次的に送り、各リクエストの待ち時間を計測する
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def client(client_id):
+        local = []
+        for i in range(n_requests):
+            graph = graphs[(client_id * n_requests + i) % len(graphs)]
+            start = time.perf_counter()
+            server.score(graph)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    """main
+
+    GCNの推論サーバーに並行してリクエストを送り、待ち時間のp50/p99とスループットを計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("json_dir", help="save_normalized_formulaの出力ディレクトリ")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-batch-sizes", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--max-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    json_paths = sorted(glob.glob(os.path.join(args.json_dir, "**", "*.json"), recursive=True))
+    graphs = []
+    for path in json_paths[:1000]:
+        with open(path) as f:
+            graphs.append(json.load(f))
+    label_vocabulary = Vocabulary.build(json_paths[:1000])
+    token_types = sorted({node.get("token_type") for graph in graphs for node in graph["nodes"]})
+    builder = GraphBatchBuilder(label_vocabulary, Vocabulary(token_types), frozen=True)
+    model = GCN(builder.n_features, 2, 64, 2).eval()
+    torch.set_num_threads(1)
+    for max_batch_size in args.max_batch_sizes:
+        server = InferenceServer(model, GraphEncoder(builder), max_batch_size, args.max_latency)
+        latencies, elapsed = run_clients(server, graphs, args.clients, args.requests)
+        server.close()
+        print(f"max_batch_size: {max_batch_size}, "
+              f"p50: {np.percentile(latencies, 50) * 1000:.2f} ms, "
+              f"p99: {np.percentile(latencies, 99) * 1000:.2f} ms, "
+              f"throughput: {len(latencies) / elapsed:.0f} formulas/s")
+
+
+if __name__ == "__main__":
+    main()
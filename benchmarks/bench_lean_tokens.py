@@ -0,0 +1,59 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# 新しいプロセスで実行し、構文解析の時間と構文解析で増えた最大RSSを表示する
+CODE = """
+import resource, sys, time
+sys.setrecursionlimit(100000)
+from parse_tstp import ParseTstp, get_parser
+keep_positions, pause_gc, path = sys.argv[1] == "positions", sys.argv[2] == "pause_gc", sys.argv[3]
+with open(path) as f:
+    tstp = f.read()
+parse_tstp = ParseTstp("tstp_EBNF.lark", keep_positions)
+parse = parse_tstp.parse_tstp if pause_gc else get_parser("tstp_EBNF.lark", keep_positions).parse
+parse("")
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+parse(tstp)
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base)
+"""
+
+
+def run(mode, gc_mode, tstp_path):
+    """run
+
+    新しいpythonプロセスで構文解析し、時間(秒)と増えた最大RSS(KB)を返す
+    """
+    output = subprocess.run([sys.executable, "-c", CODE, mode, gc_mode, os.path.abspath(tstp_path)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed, rss = output.stdout.split()
+    return float(elapsed), int(rss)
+
+
+def main():
+    """main
+
+    トークンに位置情報を記録する場合(positions)と記録しない場合(lean)で、
+    スタンドアロンパーサーの構文解析の時間と最大RSSを比較する
+    pause_gcはParseTstp.parse_tstpのように構文解析中にGCを止めた場合
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tstp_path")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"{args.tstp_path}: {os.path.getsize(args.tstp_path) / 1e6:.2f} MB")
+    for gc_mode in ["gc", "pause_gc"]:
+        for mode in ["positions", "lean"]:
+            results = [run(mode, gc_mode, args.tstp_path) for _ in range(args.repeat)]
+            elapsed = min(result[0] for result in results)
+            rss = min(result[1] for result in results)
+            print(f"{mode} ({gc_mode}): {elapsed:.2f} s, peak RSS +{rss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+import torch
+from sklearn.metrics import r2_score
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, "machine_learning"))
+from metrics import MetricAccumulator  # nopep8
+
+
+def per_batch_metrics(batches, criterion):
+    """per_batch_metrics
+
+    変更前の方法(ミニバッチごとのloss.item()とr2_score)で1エポック分の指標を計算する
+    """
+    total_loss = 0
+    r2 = 0
+    for output, y in batches:
+        loss = criterion(output, y)
+        total_loss += loss.item()
+        r2 += r2_score(y_true=y.tolist(), y_pred=output.tolist())
+    return total_loss / len(batches), r2 / len(batches)
+
+
+def accumulated_metrics(batches, criterion):
+    """accumulated_metrics
+
+    MetricAccumulatorで1エポック分の指標を計算する
+    """
+    metrics = MetricAccumulator()
+    for output, y in batches:
+        loss = criterion(output, y)
+        metrics.update(output, y, loss)
+    values = metrics.compute()
+    return values["loss"], values["r2"]
+
+
+def main():
+    """main
+
+    CPU上で1エポックあたりの指標計算のオーバーヘッドを変更前後で比較する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    criterion = torch.nn.MSELoss()
+    batches = []
+    for _ in range(args.batches):
+        y = torch.randn(args.batch_size, 1)
+        batches.append((y + 0.5 * torch.randn(args.batch_size, 1), y))
+    for name, function in [("per-batch item()/r2_score", per_batch_metrics),
+                           ("MetricAccumulator", accumulated_metrics)]:
+        elapsed = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            loss, r2 = function(batches, criterion)
+            elapsed.append(time.perf_counter() - start)
+        print(f"{name}: {min(elapsed) * 1000:.1f} ms/epoch, loss: {loss:.6f}, r2: {r2:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# 新しいプロセスで読み込み、読み込みの時間と読み込みで増えた最大RSSを表示する
+CODE = """
+import resource, sys, time
+from handler import NetworkxHandler
+from node_link_reader import iter_node_link
+mode, path = sys.argv[1], sys.argv[2]
+nx_handler = NetworkxHandler()
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if mode == "json_load":
+    nx_handler.load_json(path, stream=False)
+else:
+    nx_handler.init_node_link(iter_node_link(path, fast=mode == "orjson"))
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base)
+"""
+
+
+def run(mode, json_path):
+    """run
+
+    新しいpythonプロセスで読み込み、時間(秒)と増えた最大RSS(KB)を返す
+    """
+    output = subprocess.run([sys.executable, "-c", CODE, mode, os.path.abspath(json_path)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed, rss = output.stdout.split()
+    return float(elapsed), int(rss)
+
+
+def main():
+    """main
+
+    抽象構文木のjsonを、json.loadとnode_link_graphで読み込む場合(json_load)、
+    node_link_reader.pyでストリームで読む場合(stream)、orjsonで読む場合(orjson)で、
+    NetworkxHandlerの読み込みの時間と最大RSSを比較する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("json_path")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["json_load", "stream", "orjson"])
+    args = parser.parse_args()
+    print(f"{args.json_path}: {os.path.getsize(args.json_path) / 1e6:.1f} MB")
+    for mode in args.modes:
+        results = [run(mode, args.json_path) for _ in range(args.repeat)]
+        elapsed = min(result[0] for result in results)
+        rss = min(result[1] for result in results)
+        print(f"{mode}: {elapsed:.2f} s, peak RSS +{rss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
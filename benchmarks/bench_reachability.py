@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from handler import NetworkxHandler  # nopep8
+from reachability import ReachabilityIndex  # nopep8
+
+
+def create_deep_proof(steps, seed=0):
+    """create_deep_proof
+
+    各ステップが直前のステップと、それより前のランダムなステップから導出される深い証明のグラフを作成する
+    """
+    rng = random.Random(seed)
+    nx_handler = NetworkxHandler()
+    for i in range(steps):
+        node = nx_handler.add_node(f"f{i}", inference_rule="resolution" if i else None)
+        if i > 0:
+            nx_handler.add_edge(i - 1, node)
+        if i > 1:
+            nx_handler.add_edge(rng.randrange(i - 1), node)
+    return nx_handler
+
+
+def main():
+    """main
+
+    部分証明を、ノードごとにget_ascendantsで求める場合と、ReachabilityIndexで求める場合で比較する
+    索引のメモリと、ランダムなノードの組に対するis_used_to_deriveの時間も計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("deduction_tree_path", nargs="?", help="証明のグラフのjson、省略時は深い証明を作成する")
+    parser.add_argument("--steps", type=int, default=3000)
+    parser.add_argument("--targets", type=int, help="部分証明を求めるノードの数、省略時は全てのノード")
+    parser.add_argument("--queries", type=int, default=100000, help="is_used_to_deriveを呼ぶ回数")
+    parser.add_argument("--skip-baseline", action="store_true", help="get_ascendantsでの計測を省略する")
+    args = parser.parse_args()
+    sys.setrecursionlimit(max(100000, 2 * args.steps))
+    if args.deduction_tree_path:
+        nx_handler = NetworkxHandler()
+        nx_handler.load_json(args.deduction_tree_path)
+    else:
+        nx_handler = create_deep_proof(args.steps)
+    nodes = nx_handler.get_all_nodes()
+    rng = random.Random(1)
+    targets = nodes if args.targets is None else rng.sample(nodes, min(args.targets, len(nodes)))
+    print(f"{len(nodes)} nodes, {len(targets)} targets")
+
+    if not args.skip_baseline:
+        start = time.perf_counter()
+        expected = [nx_handler.get_ascendants(node) for node in targets]
+        print(f"get_ascendants: {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    index = ReachabilityIndex(nx_handler)
+    print(f"ReachabilityIndex build: {time.perf_counter() - start:.2f} s")
+    # tracemallocは遅いので、メモリは作り直した索引で計測する
+    tracemalloc.start()
+    ReachabilityIndex(nx_handler)
+    print(f"ReachabilityIndex memory: peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MB")
+    tracemalloc.stop()
+    start = time.perf_counter()
+    sub_proofs = [index.get_sub_proof(node) for node in targets]
+    print(f"ReachabilityIndex get_sub_proof: {time.perf_counter() - start:.2f} s")
+    if not args.skip_baseline:
+        assert all(set(sub_proof) == ascendants for sub_proof, ascendants in zip(sub_proofs, expected))
+    print(f"average sub-proof size: {sum(map(len, sub_proofs)) / len(sub_proofs):.0f}")
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+    start = time.perf_counter()
+    n_used = sum(index.is_used_to_derive(premise, conclusion) for premise, conclusion in pairs)
+    elapsed = time.perf_counter() - start
+    print(f"is_used_to_derive: {elapsed / len(pairs) * 1e6:.1f} us/query ({n_used} of {len(pairs)} used)")
+
+
+if __name__ == "__main__":
+    main()
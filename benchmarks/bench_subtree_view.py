@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from handler import NetworkxHandler  # nopep8
+from normalize import FofTree  # nopep8
+
+
+def copy_formula(fof_tree, formula_root):
+    """copy_formula
+
+    論理式の部分木をノードごとに新しいNetworkxHandlerにコピーする(ビューを使わない場合)
+    """
+    nx_handler = NetworkxHandler()
+    stack = [(formula_root, None)]
+    while stack:
+        node, parent = stack.pop()
+        new_node = nx_handler.add_node(fof_tree.nx.get_label(node), **fof_tree.nx.get_attr(node))
+        if parent is not None:
+            nx_handler.add_edge(parent, new_node)
+        stack.extend((child, new_node) for child in reversed(fof_tree.nx.get_children(node)))
+    return nx_handler
+
+
+def count_tokens(tree, root):
+    """count_tokens
+
+    読むだけの解析の例として、部分木のトークンのノード数を数える
+    """
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += "token_type" in tree.get_attr(node)
+        stack.extend(tree.get_children(node))
+    return count
+
+
+def measure(name, function):
+    """measure
+
+    functionの実行時間とtracemallocで計測したピークメモリを表示する
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}: {elapsed:.3f} s, peak {peak / 1e6:.2f} MB")
+
+
+def main():
+    """main
+
+    抽象構文木の全ての論理式のトークン数を、部分木をコピーしてから数える場合と、SubtreeViewで数える場合で比較する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ast_path")
+    args = parser.parse_args()
+    fof_tree = FofTree(args.ast_path)
+    names = [fof_tree.nx.get_label(node) for node in fof_tree.nx.get_all_nodes()
+             if fof_tree.nx.get_attr(node).get("token_type") == "NAME"]
+    roots = [root for root in map(fof_tree.get_formula_root, names) if root is not None]
+    print(f"{args.ast_path}: {len(roots)} formulas")
+
+    def with_copy():
+        for root in roots:
+            nx_handler = copy_formula(fof_tree, root)
+            count_tokens(nx_handler, 0)
+
+    def with_view():
+        for root in roots:
+            count_tokens(fof_tree.nx.get_subtree(root), root)
+
+    measure("copy", with_copy)
+    measure("view", with_view)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+from itertools import accumulate
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from symbol_index import SymbolIndex  # nopep8
+
+
+def create_formulas(files, formulas_per_file, functors, seed=0):
+    """create_formulas
+
+    関数記号の出現頻度がZipf分布に従う、ファイルごとの論理式の記号を作成する
+    """
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(functors)))
+    for file_index in range(files):
+        formulas = []
+        for formula_index in range(formulas_per_file):
+            symbols = {f"functor:f{functor}" for functor in rng.choices(range(functors), cum_weights=cum_weights, k=6)}
+            symbols.add(f"name:f{formula_index}")
+            symbols.add("rule:" + rng.choice(["resolution", "superposition", "cnf_transformation"]))
+            formulas.append((f"f{formula_index}", symbols))
+        yield f"proof{file_index}.p", formulas
+
+
+def measure(function, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    """main
+
+    合成したコーパスで索引の作成時間、大きさ、検索時間を計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--formulas-per-file", type=int, default=100)
+    parser.add_argument("--functors", type=int, default=10000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = os.path.join(tmp_dir, "symbols.sqlite")
+        start = time.perf_counter()
+        with SymbolIndex(index_path) as symbol_index:
+            for path, formulas in create_formulas(args.files, args.formulas_per_file, args.functors):
+                symbol_index.add_file(path, formulas)
+            symbol_index.compact()
+        print(f"{args.files * args.formulas_per_file} formulas, build: {time.perf_counter() - start:.1f} s, "
+              f"size: {os.path.getsize(index_path) / 2 ** 20:.1f} MB")
+        with SymbolIndex(index_path) as symbol_index:
+            for name, expression in [
+                    ("rare functor", "functor:f9000"),
+                    ("mid functor", "functor:f100"),
+                    ("frequent functor", "functor:f0"),
+                    ("rare AND frequent", ("and", "functor:f9000", "functor:f0")),
+                    ("rare OR rare", ("or", "functor:f9000", "functor:f9001")),
+                    ("formula name AND rule", ("and", "name:f5", "rule:resolution"))]:
+                milliseconds, result = measure(lambda: symbol_index.query(expression))
+                print(f"{name:24} {len(result):>9} hits {milliseconds:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
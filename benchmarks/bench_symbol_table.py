@@ -0,0 +1,67 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from networkx.readwrite import json_graph
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from normalize import Converter  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+
+
+def measure(name, function):
+    """measure
+
+    functionの実行時間と、tracemallocで計測した実行後に残っているメモリ量と最大メモリ量を表示する
+    実行時間はtracemallocを止めた状態で別に計測する
+    """
+    gc.collect()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}: {elapsed:.2f} s, retained {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB")
+    return result
+
+
+def main():
+    """main
+
+    大きな証明について、抽象構文木の作成、jsonからの読み込み、正規化の時間とメモリ量を計測する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tstp_path")
+    parser.add_argument("--grammar", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "tstp_EBNF.lark"))
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    parse_tstp = ParseTstp(args.grammar)
+    with open(args.tstp_path) as f:
+        cst_root = parse_tstp.parse_tstp(f.read())
+    ast_handler = measure("convert_cst2ast", lambda: parse_tstp.convert_cst2ast(cst_root))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ast_path = os.path.join(tmp_dir, "ast.json")
+        deduction_tree_path = os.path.join(tmp_dir, "deduction_tree.json")
+        with open(ast_path, "w") as f:
+            json.dump(json_graph.node_link_data(ast_handler.get_graph()), f)
+        del ast_handler
+        graph = parse_tstp.create_deduction_tree_graph_on_networkx(ast_path)
+        with open(deduction_tree_path, "w") as f:
+            json.dump(json_graph.node_link_data(graph), f)
+        converter = measure("load ast json", lambda: Converter(ast_path, deduction_tree_path))
+    formula_roots = [converter.fof_tree.get_formula_root(converter.deduction_tree.nx.get_label(node))
+                     for node in converter.deduction_tree.collect_cnf_nodes()]
+    measure(f"normalize {len(formula_roots)} formulas",
+            lambda: [converter.normalize_formula(formula_root) for formula_root in formula_roots])
+
+
+if __name__ == "__main__":
+    main()
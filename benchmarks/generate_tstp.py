@@ -0,0 +1,198 @@
+import argparse
+import random
+
+DIALECTS = ["cnf", "fof", "tff", "thf"]
+INFERENCE_RULES = ["resolution", "superposition", "subsumption_resolution", "forward_demodulation"]
+
+
+class ProofGenerator:
+    """ProofGenerator
+
+    Vampireの出力に似た合成的な証明(tstp)をseedから再現可能に生成するクラス
+    公理の後に、cnf_transformationで公理から導出した節と、それらから推論規則で導出した節が続く
+
+    Attributes:
+        depth (int): 項の入れ子の最大の深さ
+        width (int): 節のリテラル数と関数の引数の数の最大値
+        dialect (str): 論理式の形式(cnf, fof, tff, thf)
+        random (random.Random): 乱数生成器
+    """
+
+    def __init__(self, depth=3, width=3, dialect="cnf", seed=0):
+        assert dialect in DIALECTS
+        self.depth = depth
+        self.width = width
+        self.dialect = dialect
+        self.random = random.Random(seed)
+        self.functions = {f"f{i}": i % width + 1 for i in range(width + 1)}
+        self.predicates = {f"p{i}": i % width + 1 for i in range(width + 1)}
+        self.constants = ["a", "b", "c"]
+
+    def generate_term(self, depth, variables):
+        """generate_term
+
+        項を生成する関数
+
+        Args:
+            depth (int): 残りの入れ子の深さ
+            variables (set): 使用した変数を追加するset
+
+        Returns:
+            (str): 項
+        """
+        if depth == 0 or self.random.random() < 0.3:
+            if self.random.random() < 0.5:
+                variable = f"X{self.random.randrange(self.width)}"
+                variables.add(variable)
+                return variable
+            return self.random.choice(self.constants)
+        functor = self.random.choice(list(self.functions))
+        arguments = [self.generate_term(depth - 1, variables) for _ in range(self.functions[functor])]
+        return self.apply(functor, arguments)
+
+    def apply(self, functor, arguments):
+        """apply
+
+        関数記号や述語記号を引数に適用した項を、形式に合わせて作成する関数
+        """
+        if self.dialect == "thf":
+            return "(" + " @ ".join([functor] + arguments) + ")"
+        return functor + "(" + ",".join(arguments) + ")"
+
+    def generate_literal(self, variables):
+        """generate_literal
+
+        リテラル(原子論理式、その否定、等式、不等式)を生成する関数
+        """
+        if self.random.random() < 0.2:
+            left = self.generate_term(self.depth - 1, variables)
+            right = self.generate_term(self.depth - 1, variables)
+            if self.dialect == "thf":
+                return f"({left} {self.random.choice(['=', '!='])} {right})"
+            return f"{left} {self.random.choice(['=', '!='])} {right}"
+        predicate = self.random.choice(list(self.predicates))
+        atom = self.apply(predicate, [self.generate_term(self.depth - 1, variables)
+                                      for _ in range(self.predicates[predicate])])
+        if self.random.random() < 0.5:
+            return "~ " + atom
+        return atom
+
+    def generate_clause(self):
+        """generate_clause
+
+        節を生成する関数、cnf以外の形式では変数を全称量化する
+        """
+        variables = set()
+        literals = [self.generate_literal(variables) for _ in range(self.random.randint(1, self.width))]
+        return self.quantify(" | ".join(literals), variables)
+
+    def generate_axiom(self):
+        """generate_axiom
+
+        公理を生成する関数、cnf以外の形式では含意と連言を使う
+        """
+        if self.dialect == "cnf":
+            return self.generate_clause()
+        variables = set()
+        premise = " & ".join(self.generate_literal(variables) for _ in range(self.random.randint(1, self.width)))
+        conclusion = self.generate_literal(variables)
+        return self.quantify(f"({premise}) => {conclusion}", variables)
+
+    def quantify(self, formula, variables):
+        """quantify
+
+        論理式の変数を形式に合わせて全称量化する関数
+        """
+        if self.dialect == "cnf":
+            return formula
+        if not variables:
+            return f"({formula})"
+        if self.dialect == "fof":
+            variable_list = ",".join(sorted(variables))
+        else:
+            variable_list = ",".join(f"{variable}:$i" for variable in sorted(variables))
+        return f"![{variable_list}] : ({formula})"
+
+    def generate_type_declarations(self):
+        """generate_type_declarations
+
+        tff, thfの場合に記号の型宣言を生成する関数
+        """
+        declarations = []
+        symbols = [(constant, 0, "$i") for constant in self.constants]
+        symbols += [(functor, arity, "$i") for functor, arity in self.functions.items()]
+        symbols += [(predicate, arity, "$o") for predicate, arity in self.predicates.items()]
+        for symbol, arity, result_type in symbols:
+            if arity == 0:
+                symbol_type = result_type
+            elif self.dialect == "tff":
+                argument_types = " * ".join(["$i"] * arity)
+                symbol_type = f"({argument_types}) > {result_type}" if arity > 1 else f"$i > {result_type}"
+            else:
+                symbol_type = " > ".join(["$i"] * arity + [result_type])
+            declarations.append(f"{self.dialect}({symbol}_type,type,{symbol}: {symbol_type}).")
+        return declarations
+
+    def generate_proof(self, steps):
+        """generate_proof
+
+        証明を生成する関数
+
+        Args:
+            steps (int): 公理を含めた論理式の数
+
+        Returns:
+            (str): tstp形式の証明
+        """
+        lines = []
+        if self.dialect in ("tff", "thf"):
+            lines += self.generate_type_declarations()
+        n_axioms = max(1, steps // 10)
+        for i in range(min(n_axioms, steps)):
+            lines.append(f"{self.dialect}(f{i},axiom,{self.generate_axiom()},file('synthetic.p',ax{i})).")
+        for i in range(n_axioms, steps):
+            if i < 2 * n_axioms:
+                # 公理を節に変換する
+                rule, premises = "cnf_transformation", [f"f{i - n_axioms}"]
+            else:
+                rule = self.random.choice(INFERENCE_RULES)
+                premises = [f"f{self.random.randrange(n_axioms, i)}" for _ in range(self.random.randint(1, 2))]
+            premise_list = ",".join(premises)
+            lines.append(f"{self.dialect}(f{i},plain,{self.generate_clause()},"
+                         f"inference({rule},[status(thm)],[{premise_list}])).")
+        return "\n".join(lines) + "\n"
+
+
+def generate_proof(steps, depth=3, width=3, dialect="cnf", seed=0):
+    """generate_proof
+
+    合成的な証明を生成する関数
+
+    Args:
+        steps (int): 公理を含めた論理式の数
+        depth (int): 項の入れ子の最大の深さ
+        width (int): 節のリテラル数と関数の引数の数の最大値
+        dialect (str): 論理式の形式(cnf, fof, tff, thf)
+        seed (int): 乱数のseed
+
+    Returns:
+        (str): tstp形式の証明
+    """
+    return ProofGenerator(depth, width, dialect, seed).generate_proof(steps)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_path")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--dialect", choices=DIALECTS, default="cnf")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output_path, "w") as f:
+        f.write(generate_proof(args.steps, args.depth, args.width, args.dialect, args.seed))
+
+
+if __name__ == "__main__":
+    main()
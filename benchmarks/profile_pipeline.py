@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from networkx.readwrite import json_graph
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from instrumentation import INSTRUMENTATION  # nopep8
+from normalize import Converter  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+
+
+def run_pipeline(parse_tstp, tstp_path, output_dir):
+    """run_pipeline
+
+    tstpファイルを抽象構文木のjson、証明のグラフのjson、正規化した論理式のjsonに変換する
+    """
+    ast_path = os.path.join(output_dir, "ast.json")
+    deduction_tree_path = os.path.join(output_dir, "deduction_tree.json")
+    parse_tstp.convert_tstp2json(tstp_path, ast_path)
+    graph = parse_tstp.create_deduction_tree_graph_on_networkx(ast_path)
+    with INSTRUMENTATION.span("dump_json"):
+        with open(deduction_tree_path, "w") as f:
+            json.dump(json_graph.node_link_data(graph), f)
+    formula_dir = os.path.join(output_dir, "formulas")
+    os.makedirs(formula_dir, exist_ok=True)
+    Converter(ast_path, deduction_tree_path).save_normalized_formula(formula_dir)
+
+
+def main():
+    """main
+
+    tstpファイルごとに構文解析から正規化までを計測し、段階ごとの集計表を表示してChromeトレースを保存する
+    保存したトレースはchrome://tracingやhttps://ui.perfetto.devで開ける
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tstp_paths", nargs="+")
+    parser.add_argument("--grammar", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "tstp_EBNF.lark"))
+    parser.add_argument("--trace", default="trace.json", help="Chromeトレースを保存するjsonのパス")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemallocでピークメモリも計測する")
+    parser.add_argument("--by-file", action="store_true", help="ファイルごとに集計する")
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    parse_tstp = ParseTstp(args.grammar)
+    INSTRUMENTATION.enable(args.trace_memory)
+    for tstp_path in args.tstp_paths:
+        INSTRUMENTATION.set_file(tstp_path)
+        with tempfile.TemporaryDirectory() as output_dir, INSTRUMENTATION.span("file", path=tstp_path):
+            run_pipeline(parse_tstp, tstp_path, output_dir)
+    INSTRUMENTATION.disable()
+    print(INSTRUMENTATION.format_summary(args.by_file))
+    INSTRUMENTATION.save_chrome_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import sys
+import time
+from networkx.readwrite import json_graph
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from parse_tstp import ParseTstp  # nopep8
+
+
+def main():
+    """main
+
+    tstpファイルごとに、木の抽象構文木とTermDagのノード数とjsonの大きさを比較する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tstp_paths", nargs="+", help="Vampireなどが出力したtstpファイル")
+    parser.add_argument("--grammar", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "tstp_EBNF.lark"))
+    args = parser.parse_args()
+
+    parse_tstp = ParseTstp(args.grammar)
+    total_tree_nodes, total_dag_nodes, total_tree_bytes, total_dag_bytes = 0, 0, 0, 0
+    print("file\ttree_nodes\tdag_nodes\tratio\tshared_nodes\ttree_json\tdag_json\ttree_sec\tdag_sec")
+    for tstp_path in args.tstp_paths:
+        with open(tstp_path) as f:
+            cst_root = parse_tstp.parse_tstp(f.read())
+        start = time.perf_counter()
+        ast_handler = parse_tstp.convert_cst2ast(cst_root)
+        tree_bytes = len(json.dumps(json_graph.node_link_data(ast_handler.get_graph())))
+        tree_time = time.perf_counter() - start
+        start = time.perf_counter()
+        dag = parse_tstp.convert_cst2dag(cst_root)
+        dag_bytes = len(json.dumps(dag.to_json()))
+        dag_time = time.perf_counter() - start
+        stats = dag.get_compression_stats()
+        print(f"{os.path.basename(tstp_path)}\t{stats['tree_nodes']}\t{stats['dag_nodes']}\t"
+              f"{stats['ratio']:.2f}\t{stats['shared_nodes']}\t{tree_bytes}\t{dag_bytes}\t"
+              f"{tree_time:.3f}\t{dag_time:.3f}")
+        total_tree_nodes += stats["tree_nodes"]
+        total_dag_nodes += stats["dag_nodes"]
+        total_tree_bytes += tree_bytes
+        total_dag_bytes += dag_bytes
+    print(f"total: nodes {total_tree_nodes} -> {total_dag_nodes} "
+          f"({total_tree_nodes / total_dag_nodes:.2f}x), "
+          f"json {total_tree_bytes} -> {total_dag_bytes} bytes "
+          f"({total_tree_bytes / total_dag_bytes:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
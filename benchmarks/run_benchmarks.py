@@ -0,0 +1,166 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from networkx.readwrite import json_graph
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from generate_tstp import generate_proof  # nopep8
+from normalize import Converter  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+GRAMMAR_PATH = os.path.join(BENCHMARK_DIR, os.pardir, "tstp_EBNF.lark")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# ケース名をkey、generate_proofの引数をvalueとした辞書
+CASES = {
+    "cnf": {"steps": 300, "depth": 3, "width": 3, "dialect": "cnf", "seed": 0},
+    "cnf_deep": {"steps": 100, "depth": 6, "width": 4, "dialect": "cnf", "seed": 0},
+    "fof": {"steps": 300, "depth": 3, "width": 3, "dialect": "fof", "seed": 0},
+    "tff": {"steps": 300, "depth": 3, "width": 3, "dialect": "tff", "seed": 0},
+    "thf": {"steps": 300, "depth": 3, "width": 3, "dialect": "thf", "seed": 0},
+}
+
+
+def measure(function, repeat):
+    """measure
+
+    functionをrepeat回実行し、最小の実行時間(秒)と最後の戻り値を返す
+    GCが走るかどうかはそれまでの割り当てで変わり、計測がばらつくため、実行中はGCを止める
+    """
+    elapsed = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = function()
+            elapsed.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(elapsed), result
+
+
+def run_case(params, repeat):
+    """run_case
+
+    合成的な証明を生成し、各段階の実行時間を計測する関数
+
+    Args:
+        params (dict): generate_proofの引数
+        repeat (int): 各段階を繰り返す回数
+
+    Returns:
+        (dict): 証明の大きさと各段階の実行時間(秒)
+    """
+    tstp = generate_proof(**params)
+    parse_tstp = ParseTstp(GRAMMAR_PATH)
+    # パーサーの作成時間は含めない
+    parse_tstp.parse_tstp("")
+    stages = dict()
+    stages["parse_tstp"], cst_root = measure(lambda: parse_tstp.parse_tstp(tstp), repeat)
+    stages["convert_cst2ast"], ast_handler = measure(lambda: parse_tstp.convert_cst2ast(cst_root), repeat)
+    stages["convert_tstp2ast"], _ = measure(lambda: parse_tstp.convert_tstp2ast(tstp), repeat)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ast_path = os.path.join(tmp_dir, "ast.json")
+        deduction_tree_path = os.path.join(tmp_dir, "deduction_tree.json")
+        with open(ast_path, "w") as f:
+            json.dump(json_graph.node_link_data(ast_handler.get_graph()), f)
+        stages["create_deduction_tree_graph_on_networkx"], graph = measure(
+            lambda: parse_tstp.create_deduction_tree_graph_on_networkx(ast_path), repeat)
+        with open(deduction_tree_path, "w") as f:
+            json.dump(json_graph.node_link_data(graph), f)
+        converter = Converter(ast_path, deduction_tree_path)
+    formula_roots = [converter.fof_tree.get_formula_root(converter.deduction_tree.nx.get_label(node))
+                     for node in converter.deduction_tree.collect_cnf_nodes()]
+    stages["normalize_formula"], _ = measure(
+        lambda: [converter.normalize_formula(formula_root) for formula_root in formula_roots], repeat)
+    return {
+        "params": params,
+        "bytes": len(tstp.encode()),
+        "ast_nodes": len(ast_handler.get_all_nodes()),
+        "formulas": len(formula_roots),
+        "stages": stages,
+    }
+
+
+def compare(results, baseline, threshold):
+    """compare
+
+    計測結果をベースラインと比較し、実行時間の比を表示する関数
+    ベースラインにないケースや段階は比較しない
+
+    Args:
+        results (dict): 計測結果
+        baseline (dict): ベースラインの計測結果
+        threshold (float): 実行時間がベースラインの(1 + threshold)倍を超えたら性能低下とみなす
+
+    Returns:
+        regressions (list): 性能低下した(ケース名, 段階名, ベースラインの時間, 今回の時間)のリスト
+    """
+    regressions = []
+    for case, result in results["cases"].items():
+        baseline_stages = baseline["cases"].get(case, {}).get("stages", {})
+        for stage, elapsed in result["stages"].items():
+            if stage not in baseline_stages:
+                continue
+            ratio = elapsed / baseline_stages[stage]
+            mark = ""
+            if ratio > 1 + threshold:
+                regressions.append((case, stage, baseline_stages[stage], elapsed))
+                mark = "  REGRESSION"
+            print(f"{case:10s} {stage:40s} {baseline_stages[stage]:8.3f} s -> {elapsed:8.3f} s"
+                  f"  x{ratio:.2f}{mark}")
+    return regressions
+
+
+def main():
+    """main
+
+    合成的な証明で構文解析から正規化までの各段階を計測し、結果をjsonで保存してベースラインと比較する
+    性能低下があれば終了コード1で終了する
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="計測結果を保存するjsonのパス")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    # 同じマシンでもプロセスごとに実行時間が1.5倍程度ばらつくことがあるため、閾値は大きめにする
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true", help="計測結果をベースラインとして保存する")
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "cases": dict(),
+    }
+    for case in args.cases:
+        result = run_case(CASES[case], args.repeat)
+        results["cases"][case] = result
+        stages = ", ".join(f"{stage} {elapsed:.3f} s" for stage, elapsed in result["stages"].items())
+        print(f"{case}: {result['bytes'] / 1e3:.0f} kB, {stages}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions (threshold {args.threshold:.0%})")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
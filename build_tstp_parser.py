@@ -0,0 +1,40 @@
+import argparse
+import io
+import os
+from lark import Lark
+from lark.tools.standalone import gen_standalone
+from parse_tstp import grammar_digest
+
+GRAMMAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tstp_EBNF.lark")
+PARSER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tstp_parser.py")
+
+# tstp_EBNF.lark はLALR(1)で衝突なく構築でき、Earleyと同じ構文木になることを確認している
+# 文法を変更した場合は、このスクリプトでtstp_parser.pyを生成し直す
+#   python build_tstp_parser.py
+
+
+def build_tstp_parser(grammar_path=GRAMMAR_PATH, parser_path=PARSER_PATH):
+    """build_tstp_parser
+
+    文法ファイルからLALR(1)のスタンドアロンパーサー(larkに依存しないpythonモジュール)を生成する関数
+    生成したモジュールには文法ファイルのsha256をGRAMMAR_SHA256として書き込む
+
+    Args:
+        grammar_path (str): 文法ファイルのパス
+        parser_path (str): 生成するモジュールのパス
+    """
+    with open(grammar_path, encoding="utf-8") as grammar:
+        parser = Lark(grammar.read(), start="tptp_root", parser="lalr", maybe_placeholders=True)
+    out = io.StringIO()
+    gen_standalone(parser, out=out, compress=True)
+    with open(parser_path, "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+        f.write(f'\nGRAMMAR_SHA256 = "{grammar_digest(grammar_path)}"\n')
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--grammar", default=GRAMMAR_PATH)
+    arg_parser.add_argument("--out", default=PARSER_PATH)
+    args = arg_parser.parse_args()
+    build_tstp_parser(args.grammar, args.out)
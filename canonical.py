@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+from handler import NetworkxHandler
+from normalize import AND_ID, OR_ID
+
+# 正規化した論理式(Converter.normalize_formulaの出力)の標準形とハッシュ
+# 変数名とリテラルの順序だけが異なる論理式を同じ標準形にし、コーパス全体の重複を1回の走査で検出する
+# 1. 変数を区別しない形(変数を?にした文字列)で、可換な&と|の子を並べ替える
+# 2. 並べ替えた順にたどり、変数を最初に現れた順にV0, V1, ...へ改名する
+# 3. 改名後の文字列で可換な子を並べ替え直し、標準形の文字列にする
+# 標準形が同じ論理式は変数の改名と並べ替えで一致するため、異なる論理式を重複とみなすことはない
+# ただし対称な変数の組(p(X) | p(Y) | q(X,Y)など)では、同じ論理式でも標準形が異なる場合がある
+# coordinate_nodeが追加したcoordinateノードは、同じラベルのノードを結ぶだけでラベルから決まるため、標準形には含めない
+COMMUTATIVE_IDS = {AND_ID, OR_ID}
+
+
+def encode_label(label):
+    """encode_label
+
+    ラベルを長さ付きの文字列にする関数、ラベルに括弧やカンマが含まれていても標準形があいまいにならない
+    """
+    return f"{len(label)}:{label}"
+
+
+class Canonicalizer:
+    """Canonicalizer
+
+    正規化した論理式のグラフの標準形を作成するクラス
+
+    Attributes:
+        nx_handler (NetworkxHandler or SubtreeView): 正規化した論理式のグラフ
+        shapes (dict): ノードIDをkey、変数を区別しない形の文字列をvalueとした辞書
+        variable2name (dict): 元の変数名をkey、改名後の変数名をvalueとした辞書
+    """
+
+    def __init__(self, nx_handler):
+        self.nx_handler = nx_handler
+        self.shapes = dict()
+        self.variable2name = dict()
+
+    def get_children(self, node):
+        """get_children
+
+        coordinateノードを除いた子を取得する関数
+        """
+        return [child for child in self.nx_handler.get_children(node)
+                if self.nx_handler.get_attr(child).get("token_type") != "coordinate"]
+
+    def is_variable(self, node):
+        return self.nx_handler.get_attr(node).get("token_type") == "VARIABLE"
+
+    def encode_node(self, node, label, children_keys):
+        """encode_node
+
+        ノードのトークンの種類、ラベル、子の文字列から、部分木の文字列を作成する関数
+        可換なノードの子は並べ替える
+        """
+        if self.nx_handler.get_label_id(node) in COMMUTATIVE_IDS:
+            children_keys = sorted(children_keys)
+        token_type = self.nx_handler.get_attr(node).get("token_type", "")
+        return f"{token_type}/{encode_label(label)}({','.join(children_keys)})"
+
+    def shape(self, node):
+        """shape
+
+        変数を区別しない部分木の文字列を作成する関数
+        """
+        label = "?" if self.is_variable(node) else self.nx_handler.get_label(node)
+        key = self.encode_node(node, label, [self.shape(child) for child in self.get_children(node)])
+        self.shapes[node] = key
+        return key
+
+    def rename_variables(self, node):
+        """rename_variables
+
+        shapeで並べ替えた順に部分木をたどり、変数を最初に現れた順に改名する関数
+        """
+        if self.is_variable(node):
+            label = self.nx_handler.get_label(node)
+            if label not in self.variable2name:
+                self.variable2name[label] = f"V{len(self.variable2name)}"
+        children = self.get_children(node)
+        if self.nx_handler.get_label_id(node) in COMMUTATIVE_IDS:
+            # sortedは安定なので、同じ形の子は元の順序のまま
+            children = sorted(children, key=self.shapes.__getitem__)
+        for child in children:
+            self.rename_variables(child)
+
+    def canonical(self, node):
+        """canonical
+
+        改名した変数で部分木の標準形の文字列を作成する関数
+        """
+        label = self.nx_handler.get_label(node)
+        if self.is_variable(node):
+            label = self.variable2name[label]
+        return self.encode_node(node, label, [self.canonical(child) for child in self.get_children(node)])
+
+    def canonical_form(self):
+        """canonical_form
+
+        論理式全体の標準形の文字列を作成する関数
+
+        Returns:
+            (str): 標準形の文字列
+        """
+        roots = [root for root in self.nx_handler.get_orphans()
+                 if self.nx_handler.get_attr(root).get("token_type") != "coordinate"]
+        assert len(roots) == 1
+        self.shape(roots[0])
+        self.rename_variables(roots[0])
+        return self.canonical(roots[0])
+
+
+def canonical_form(nx_handler):
+    """canonical_form
+
+    正規化した論理式のグラフの標準形の文字列を作成する関数
+
+    Args:
+        nx_handler (NetworkxHandler or SubtreeView): 正規化した論理式のグラフ
+
+    Returns:
+        (str): 標準形の文字列
+    """
+    return Canonicalizer(nx_handler).canonical_form()
+
+
+def canonical_hash(nx_handler):
+    """canonical_hash
+
+    正規化した論理式のグラフの標準形のsha256を計算する関数
+    Pythonのhash()と異なり、プロセスやマシンによらず同じ値になる
+
+    Args:
+        nx_handler (NetworkxHandler or SubtreeView): 正規化した論理式のグラフ
+
+    Returns:
+        (str): sha256の16進数の文字列
+    """
+    return hashlib.sha256(canonical_form(nx_handler).encode()).hexdigest()
+
+
+def hash_formula_file(path):
+    """hash_formula_file
+
+    save_normalized_formulaで保存した論理式のjsonファイルの標準形のハッシュを計算する関数
+
+    Args:
+        path (str): 正規化した論理式のjsonファイルのパス
+
+    Returns:
+        (str): sha256の16進数の文字列
+    """
+    nx_handler = NetworkxHandler()
+    nx_handler.load_json(path)
+    return canonical_hash(nx_handler)
+
+
+class Deduplicator:
+    """Deduplicator
+
+    標準形のハッシュで論理式の重複を検出するクラス
+    ハッシュと最初に現れた論理式のkeyだけを保持するため、コーパス全体を1回走査するだけで重複を検出できる
+
+    Attributes:
+        hash2key (dict): ハッシュをkey、そのハッシュで最初に現れた論理式のkey(パスなど)をvalueとした辞書
+    """
+
+    def __init__(self):
+        self.hash2key = dict()
+
+    def __len__(self):
+        return len(self.hash2key)
+
+    def add(self, key, formula_hash):
+        """add
+
+        論理式のハッシュを登録する関数
+
+        Args:
+            key (hashable): 論理式を識別する値(パスなど)
+            formula_hash (str): canonical_hashで計算したハッシュ
+
+        Returns:
+            (str): 重複していれば最初に現れた論理式のkey、そうでなければNone
+        """
+        first_key = self.hash2key.setdefault(formula_hash, key)
+        return None if first_key == key else first_key
+
+
+def deduplicate(json_paths, deduplicator=None):
+    """deduplicate
+
+    正規化した論理式のjsonファイルを順に読み、重複を検出する関数
+
+    Args:
+        json_paths (iterable): 正規化した論理式のjsonファイルのパスのイテレータ
+        deduplicator (Deduplicator): 以前の走査の結果を引き継ぐ場合に渡す
+
+    Returns:
+        (iterator): (パス, ハッシュ, 重複していれば最初に現れたパス、そうでなければNone)のイテレータ
+    """
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    for json_path in json_paths:
+        formula_hash = hash_formula_file(json_path)
+        yield json_path, formula_hash, deduplicator.add(json_path, formula_hash)
+
+
+def save_formula_hashes(formula_dir, path):
+    """save_formula_hashes
+
+    ディレクトリ内の正規化した論理式のjsonファイルの標準形のハッシュを、{論理式名: ハッシュ}としてjsonファイルに保存する関数
+
+    Args:
+        formula_dir (str): save_normalized_formulaで保存したディレクトリのパス
+        path (str): 保存するjsonファイルのパス
+    """
+    name2hash = dict()
+    for file_name in sorted(os.listdir(formula_dir)):
+        if file_name.endswith(".json"):
+            name2hash[file_name[:-len(".json")]] = hash_formula_file(os.path.join(formula_dir, file_name))
+    with open(path, "w") as f:
+        json.dump(name2hash, f, indent=4)
+
+
+def deduplicate_hashes(hash_paths, deduplicator=None):
+    """deduplicate_hashes
+
+    save_formula_hashesで保存したjsonファイル(tptpparserのcanonicalの出力)を順に読み、コーパス全体の重複を検出する関数
+    論理式のjsonファイルを読み直さないため、ハッシュを計算済みのコーパスでは速い
+
+    Args:
+        hash_paths (iterable): save_formula_hashesで保存したjsonファイルのパスのイテレータ
+        deduplicator (Deduplicator): 以前の走査の結果を引き継ぐ場合に渡す
+
+    Returns:
+        (iterator): (jsonファイルのパス, 論理式名, ハッシュ, 重複していれば最初に現れた(パス, 論理式名)、そうでなければNone)のイテレータ
+    """
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    for hash_path in hash_paths:
+        with open(hash_path) as f:
+            name2hash = json.load(f)
+        for name, formula_hash in name2hash.items():
+            yield hash_path, name, formula_hash, deduplicator.add((hash_path, name), formula_hash)
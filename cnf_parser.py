@@ -0,0 +1,434 @@
+import re
+from handler import NetworkxHandler
+
+# cnf_annotatedだけを対象にした手書きのトークナイザーと再帰下降パーサー
+# 文法ファイル(tstp_EBNF.lark)の次の部分だけを解析し、具象構文木を作らずに直接抽象構文木を作成する
+#   cnf_annotated : CNF "(" NAME "," FORMULA_ROLE "," cnf_formula annotations ")" "."
+#   cnf_formula   : disjunction | "(" disjunction ")"
+#   disjunction   : literal | disjunction VLINE literal
+#   literal       : fof_atomic_formula | UNARY_CONNECTIVE fof_atomic_formula | fof_infix_unary
+#   annotations   : "," source optional_info | null
+# 作成する抽象構文木(ラベル、token_type、ノードIDの順番)はconvert_cst2astと同じにする
+# formula_data($cnfなど)やcnf以外の入力、構文エラーはlarkに任せる
+
+# トークンの種類はlarkの終端記号名に合わせる、記号は文字列そのものを種類とする(PUNCT)
+# コメントは文法ファイルのCOMMENT_LINEとCOMMENT_BLOCKをlarkが正規表現にしたものと同じにする
+TOKEN_PATTERN = re.compile("|".join([
+    r"(?P<SKIP>[ \t\f\r\n]+|%[^\n]*|/\*\([^*]*\*\**[^/*]\)*[^*]*\*\**/)",
+    r"(?P<REAL>[+-]?(?:0|[1-9][0-9]*)(?:(?:\.[0-9]+)?[Ee][+-]?[0-9]+|\.[0-9]+))",
+    r"(?P<RATIONAL>[+-]?(?:0|[1-9][0-9]*)/[1-9][0-9]*)",
+    r"(?P<INTEGER>[+-]?(?:0|[1-9][0-9]*))",
+    r"(?P<LOWER_WORD>[a-z][a-zA-Z0-9_]*)",
+    r"(?P<UPPER_WORD>[A-Z][a-zA-Z0-9_]*)",
+    r"(?P<SINGLE_QUOTED>'(?:[\x20-\x26\x28-\x5b\x5d-\x7e]|\\['\\])+')",
+    r"(?P<DISTINCT_OBJECT>\"(?:[\x20-\x21\x23-\x5b\x5d-\x7e]|\\[\"\\])*\")",
+    r"(?P<DOLLAR_DOLLAR_WORD>\$\$[a-z][a-zA-Z0-9_]*)",
+    r"(?P<DOLLAR_WORD>\$[a-z][a-zA-Z0-9_]*)",
+    r"(?P<PUNCT>\[\]|!=|[()\[\],.|~=:])",
+    r"(?P<ERROR>.)",
+]), re.DOTALL)
+
+# 関数記号になるトークンの種類と、抽象構文木でのtoken_type
+FUNCTOR_TYPES = {
+    "LOWER_WORD": "FUNCTOR",
+    "SINGLE_QUOTED": "FUNCTOR",
+    "DOLLAR_WORD": "DEFINED_FUNCTOR",
+    "DOLLAR_DOLLAR_WORD": "SYSTEM_FUNCTOR",
+}
+# そのまま葉になるトークンの種類(抽象構文木でのtoken_typeも同じ)
+LEAF_TYPES = {"INTEGER", "REAL", "RATIONAL", "DISTINCT_OBJECT"}
+NAME_TYPES = {"LOWER_WORD", "SINGLE_QUOTED", "INTEGER"}
+ATOMIC_WORD_TYPES = {"LOWER_WORD", "SINGLE_QUOTED"}
+
+
+class CnfFallback(Exception):
+    """CnfFallback
+
+    手書きのパーサーで扱えない入力であることを表す例外
+    CnfParserの中でだけ使い、この例外を受け取った入力はlarkで解析する
+    """
+
+
+def tokenize(tstp):
+    """tokenize
+
+    tstpの文字列をトークンに分割する関数
+    空白とコメントは読み飛ばし、どのトークンにも当てはまらない文字はERRORとする
+
+    Args:
+        tstp (str): tstpファイルを読み込んだ文字列
+
+    Returns:
+        kinds (list): トークンの種類のリスト、最後はEOF
+        values (list): トークンの文字列のリスト
+        starts (list): トークンの開始位置のリスト
+        ends (list): トークンの終了位置のリスト
+    """
+    kinds, values, starts, ends = [], [], [], []
+    for match in TOKEN_PATTERN.finditer(tstp):
+        kind = match.lastgroup
+        if kind == "SKIP":
+            continue
+        value = match.group()
+        kinds.append(value if kind == "PUNCT" else kind)
+        values.append(value)
+        starts.append(match.start())
+        ends.append(match.end())
+    kinds.append("EOF")
+    values.append("")
+    starts.append(len(tstp))
+    ends.append(len(tstp))
+    return kinds, values, starts, ends
+
+
+def add_tree(ast_handler, tree, ast_parent_id):
+    """add_tree
+
+    CnfParserで作成した(ラベル, token_type, 子のリスト)の木を行きがけ順に抽象構文木に追加する関数
+
+    Args:
+        ast_handler (NetworkxHandler): 抽象構文木のグラフを管理するインスタンス
+        tree (tuple): (ラベル, token_type, 子のリスト)、token_typeがNoneならトークンでないノード
+        ast_parent_id (int): 抽象構文木の親ノードID
+    """
+    label, token_type, children = tree
+    if token_type is None:
+        ast_id = ast_handler.add_node(label)
+    else:
+        ast_id = ast_handler.add_node(label, token_type=token_type)
+    ast_handler.add_edge(ast_parent_id, ast_id)
+    for child in children:
+        add_tree(ast_handler, child, ast_id)
+
+
+class CnfParser:
+    """CnfParser
+
+    cnf_annotatedを手書きの再帰下降パーサーで解析し、抽象構文木を作成するクラス
+    それ以外の入力は連続する範囲ごとにfallbackに渡して解析させる
+
+    Attributes:
+        tstp (str): tstpファイルを読み込んだ文字列
+        kinds, values, starts, ends (list): tokenizeの結果
+        pos (int): 次に読むトークンの位置
+        line_offset, line_count (int): get_sourceで改行を数え終えた位置とそこまでの改行の数
+    """
+
+    def __init__(self, tstp):
+        self.tstp = tstp
+        self.kinds, self.values, self.starts, self.ends = tokenize(tstp)
+        self.pos = 0
+        self.line_offset = 0
+        self.line_count = 0
+
+    def parse(self, fallback, ast_handler=None):
+        """parse
+
+        tstpの文字列全体を解析し、抽象構文木を作成する関数
+
+        Args:
+            fallback (function): fallback(tstp, ast_parent_id, ast_handler)の形で呼び出す関数
+                手書きのパーサーで扱えない入力の文字列を解析し、ast_parent_idの子として抽象構文木に追加する
+            ast_handler (NetworkxHandler): 抽象構文木のグラフを管理するインスタンス
+
+        Returns:
+            ast_handler (NetworkxHandler): 抽象構文木作成後のインスタンス
+        """
+        if ast_handler is None:
+            ast_handler = NetworkxHandler()
+        root = ast_handler.add_node("tptp_root")
+        # larkに任せる入力が連続する範囲の最初のトークンの位置
+        fallback_start = None
+        while self.kinds[self.pos] != "EOF":
+            start = self.pos
+            try:
+                tree = self.parse_cnf_annotated()
+            except CnfFallback:
+                self.pos = self.find_input_end(start)
+                if fallback_start is None:
+                    fallback_start = start
+                continue
+            if fallback_start is not None:
+                fallback(self.get_source(fallback_start, start), root, ast_handler)
+                fallback_start = None
+            add_tree(ast_handler, tree, root)
+        if fallback_start is not None:
+            fallback(self.get_source(fallback_start, self.pos), root, ast_handler)
+        return ast_handler
+
+    def find_input_end(self, start):
+        """find_input_end
+
+        入力(annotated_formulaやinclude)の終わりの"."の次のトークンの位置を取得する関数
+        "."は数やクォートの中を除けば入力の終わりにしか現れない
+
+        Args:
+            start (int): 入力の最初のトークンの位置
+
+        Returns:
+            (int): 次の入力の最初のトークンの位置
+        """
+        pos = start
+        while self.kinds[pos] != "." and self.kinds[pos] != "EOF":
+            pos += 1
+        if self.kinds[pos] == ".":
+            pos += 1
+        return pos
+
+    def get_source(self, start, stop):
+        """get_source
+
+        トークンの範囲[start, stop)に対応する文字列を取得する関数
+        larkのエラーの行番号と列番号が元の文字列と一致するように、前に改行と空白を付ける
+
+        Args:
+            start (int): 最初のトークンの位置
+            stop (int): 最後のトークンの次の位置
+
+        Returns:
+            (str): 範囲の文字列
+        """
+        offset = self.starts[start]
+        # 範囲は前から順に取得するため、前回の続きから改行を数える
+        self.line_count += self.tstp.count("\n", self.line_offset, offset)
+        self.line_offset = offset
+        column = offset - (self.tstp.rfind("\n", 0, offset) + 1)
+        return "\n" * self.line_count + " " * column + self.tstp[offset:self.ends[stop - 1]]
+
+    def expect(self, kind):
+        """expect
+
+        次のトークンの種類がkindなら読み進めてその文字列を返し、そうでなければCnfFallbackを送出する関数
+
+        Args:
+            kind (str): トークンの種類
+
+        Returns:
+            (str): トークンの文字列
+        """
+        if self.kinds[self.pos] != kind:
+            raise CnfFallback
+        value = self.values[self.pos]
+        self.pos += 1
+        return value
+
+    def parse_cnf_annotated(self):
+        """parse_cnf_annotated
+
+        cnf_annotated : CNF "(" NAME "," FORMULA_ROLE "," cnf_formula annotations ")" "."
+
+        Returns:
+            (tuple): cnfの入力の木
+        """
+        if self.values[self.pos] != "cnf" or self.kinds[self.pos] != "LOWER_WORD":
+            raise CnfFallback
+        self.pos += 1
+        self.expect("(")
+        if self.kinds[self.pos] not in NAME_TYPES:
+            raise CnfFallback
+        name = (self.values[self.pos], "NAME", [])
+        self.pos += 1
+        self.expect(",")
+        role = (self.expect("LOWER_WORD"), "FORMULA_ROLE", [])
+        self.expect(",")
+        # cnf_formulaは親がformula_dataのときだけ残るため、ここではノードを作らない
+        if self.kinds[self.pos] == "(":
+            self.pos += 1
+            formula = self.parse_disjunction()
+            self.expect(")")
+        else:
+            formula = self.parse_disjunction()
+        annotations = self.parse_annotations()
+        self.expect(")")
+        self.expect(".")
+        return ("cnf", "CNF", [name, role, formula, annotations])
+
+    def parse_disjunction(self):
+        """parse_disjunction
+
+        disjunction : literal | disjunction VLINE literal
+        左結合なので、"|"のノードは左の子に"|"のノードを持つ
+
+        Returns:
+            (tuple): 節の木
+        """
+        left = self.parse_literal()
+        while self.kinds[self.pos] == "|":
+            vline = self.values[self.pos]
+            self.pos += 1
+            left = (vline, "VLINE", [left, self.parse_literal()])
+        return left
+
+    def parse_literal(self):
+        """parse_literal
+
+        literal : fof_atomic_formula | UNARY_CONNECTIVE fof_atomic_formula | fof_infix_unary
+
+        Returns:
+            (tuple): リテラルの木
+        """
+        if self.kinds[self.pos] == "~":
+            self.pos += 1
+            return ("~", "UNARY_CONNECTIVE", [self.parse_atomic_formula(False)])
+        return self.parse_atomic_formula(True)
+
+    def parse_atomic_formula(self, allow_inequality):
+        """parse_atomic_formula
+
+        fof_atomic_formula : fof_plain_atomic_formula | fof_defined_atomic_formula | fof_system_atomic_formula
+        allow_inequalityがTrueなら fof_infix_unary : fof_term INFIX_INEQUALITY fof_term も解析する
+
+        Args:
+            allow_inequality (bool): "!="を許すならTrue("~"の後では許さない)
+
+        Returns:
+            (tuple): 原子論理式の木
+        """
+        left, is_formula = self.parse_term()
+        kind = self.kinds[self.pos]
+        if kind == "=":
+            self.pos += 1
+            return ("=", "INFIX_EQUALITY", [left, self.parse_term()[0]])
+        if kind == "!=" and allow_inequality:
+            self.pos += 1
+            return ("!=", "INFIX_INEQUALITY", [left, self.parse_term()[0]])
+        # 変数や数は単独では論理式にならない
+        if not is_formula:
+            raise CnfFallback
+        return left
+
+    def parse_term(self):
+        """parse_term
+
+        fof_term : fof_function_term | VARIABLE
+
+        Returns:
+            (tuple): 項の木
+            (bool): 単独で論理式になる項(関数記号で始まる項)ならTrue
+        """
+        kind = self.kinds[self.pos]
+        value = self.values[self.pos]
+        if kind == "UPPER_WORD":
+            self.pos += 1
+            return (value, "VARIABLE", []), False
+        if kind in FUNCTOR_TYPES:
+            self.pos += 1
+            arguments = []
+            if self.kinds[self.pos] == "(":
+                arguments = self.parse_arguments()
+            return (value, FUNCTOR_TYPES[kind], arguments), True
+        if kind in LEAF_TYPES:
+            self.pos += 1
+            return (value, kind, []), False
+        raise CnfFallback
+
+    def parse_arguments(self):
+        """parse_arguments
+
+        "(" fof_arguments ")"
+
+        Returns:
+            (list): 引数の木のリスト
+        """
+        self.expect("(")
+        arguments = [self.parse_term()[0]]
+        while self.kinds[self.pos] == ",":
+            self.pos += 1
+            arguments.append(self.parse_term()[0])
+        self.expect(")")
+        return arguments
+
+    def parse_annotations(self):
+        """parse_annotations
+
+        annotations : "," source optional_info | null
+        optional_info : "," useful_info | null
+
+        Returns:
+            (tuple): annotationsの木
+        """
+        if self.kinds[self.pos] != ",":
+            return ("annotations", None, [])
+        self.pos += 1
+        children = self.parse_general_term()
+        if self.kinds[self.pos] == ",":
+            self.pos += 1
+            children.append(("optional_info", None, [self.parse_general_list()]))
+        else:
+            children.append(("optional_info", None, []))
+        return ("annotations", None, children)
+
+    def parse_general_term(self):
+        """parse_general_term
+
+        general_term : general_data | general_data ":" general_term | general_list
+        general_termとgeneral_dataはノードを作らないため、子になるノードのリストを返す
+
+        Returns:
+            (list): 木のリスト
+        """
+        kind = self.kinds[self.pos]
+        if kind == "[" or kind == "[]":
+            return [self.parse_general_list()]
+        general_data = self.parse_general_data()
+        if self.kinds[self.pos] == ":":
+            self.pos += 1
+            return [general_data] + self.parse_general_term()
+        return [general_data]
+
+    def parse_general_data(self):
+        """parse_general_data
+
+        general_data : ATOMIC_WORD | general_function | VARIABLE | number | DISTINCT_OBJECT | formula_data
+        formula_dataはlarkに任せる
+
+        Returns:
+            (tuple): 木
+        """
+        kind = self.kinds[self.pos]
+        value = self.values[self.pos]
+        if kind in ATOMIC_WORD_TYPES:
+            self.pos += 1
+            children = []
+            if self.kinds[self.pos] == "(":
+                self.pos += 1
+                children = self.parse_general_terms()
+                self.expect(")")
+            return (value, "ATOMIC_WORD", children)
+        if kind == "UPPER_WORD":
+            self.pos += 1
+            return (value, "VARIABLE", [])
+        if kind in LEAF_TYPES:
+            self.pos += 1
+            return (value, kind, [])
+        raise CnfFallback
+
+    def parse_general_list(self):
+        """parse_general_list
+
+        general_list : "[]" | "[" general_terms "]"
+
+        Returns:
+            (tuple): general_listの木
+        """
+        if self.kinds[self.pos] == "[]":
+            self.pos += 1
+            return ("general_list", None, [])
+        self.expect("[")
+        children = self.parse_general_terms()
+        self.expect("]")
+        return ("general_list", None, children)
+
+    def parse_general_terms(self):
+        """parse_general_terms
+
+        general_terms : general_term | general_term "," general_terms
+
+        Returns:
+            (list): 木のリスト
+        """
+        children = self.parse_general_term()
+        while self.kinds[self.pos] == ",":
+            self.pos += 1
+            children.extend(self.parse_general_term())
+        return children
@@ -0,0 +1,373 @@
+import glob
+import json
+import os
+import numpy as np
+from instrumentation import INSTRUMENTATION
+from symbol_index import FUNCTOR_TOKEN_TYPES
+
+# 抽象構文木と証明のグラフを、集計用の列指向の表として書き出すエクスポータと、その表に対するベクトル化した集計
+# 表はnumpyのnpzまたはParquet(pyarrowがインストールされている場合)で、row_group_size行ごとに1つの行グループとして書き込む
+# ラベル、トークンの種類、推論規則、ファイル名は辞書(dictionary.json)のIDで保存し(辞書符号化)、
+# 表には整数の列だけを持つため、集計はnumpyの配列演算(bincount, maximum.atなど)で行える
+# 表と列
+#   nodes: file_id, node, parent(根は-1), label, token_type(なければ-1), depth(根が0), formula(論理式の外は-1)
+#   edges: file_id, source, target
+#   formulas: formula, file_id, name(labelsのID)
+#   deduction_nodes: file_id, node, name(labelsのID), inference_rule(なければ-1)
+#   deduction_edges: file_id, source, target
+# 論理式は抽象構文木の根の子(fof, cnfなど)で、IDは全てのファイルを通した通し番号
+TABLES = {
+    "nodes": ["file_id", "node", "parent", "label", "token_type", "depth", "formula"],
+    "edges": ["file_id", "source", "target"],
+    "formulas": ["formula", "file_id", "name"],
+    "deduction_nodes": ["file_id", "node", "name", "inference_rule"],
+    "deduction_edges": ["file_id", "source", "target"],
+}
+DICTIONARIES = ["labels", "token_types", "inference_rules", "files"]
+DEFAULT_ROW_GROUP_SIZE = 1 << 20
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class Dictionary:
+    """Dictionary
+
+    文字列に0から順にIDを振る辞書(辞書符号化に使う)
+
+    Attributes:
+        values (list): IDごとの文字列
+        value2id (dict): 文字列をkey、IDをvalueとした辞書
+    """
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.value2id = {value: value_id for value_id, value in enumerate(self.values)}
+
+    def encode(self, value):
+        """encode
+
+        文字列のIDを取得する関数、Noneなら-1を返す
+        """
+        if value is None:
+            return -1
+        value_id = self.value2id.get(value)
+        if value_id is None:
+            value_id = self.value2id[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+
+class ColumnarExporter:
+    """ColumnarExporter
+
+    NetworkxHandlerの抽象構文木と証明のグラフを列指向の表に書き出すクラス
+    既に書き出したディレクトリに対して作成すると、辞書と論理式のIDを引き継いで追記する
+
+    Attributes:
+        dir_path (str): 書き出すディレクトリのパス
+        row_group_size (int): 1つの行グループのnodes(またはdeduction_nodes)の行数
+        file_format (str): "npz"または"parquet"
+        dictionaries (dict): DICTIONARIESの名前をkey、Dictionaryをvalueとした辞書
+        next_formula (int): 次の論理式のID
+        part (int): 次に書き込む行グループの番号
+        columns (dict): 表の名前をkey、{列の名前: まだ書き込んでいない値のリスト}をvalueとした辞書
+        writers (dict): Parquetの場合の、表の名前をkey、pyarrow.parquet.ParquetWriterをvalueとした辞書
+    """
+
+    def __init__(self, dir_path, row_group_size=DEFAULT_ROW_GROUP_SIZE, file_format=None):
+        if file_format is None:
+            file_format = "npz" if pyarrow is None else "parquet"
+        if file_format == "parquet" and pyarrow is None:
+            raise ImportError("pyarrow is required for the parquet format")
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self.row_group_size = row_group_size
+        self.file_format = file_format
+        dictionary_path = os.path.join(dir_path, "dictionary.json")
+        loaded_json = dict()
+        if os.path.exists(dictionary_path):
+            with open(dictionary_path) as f:
+                loaded_json = json.load(f)
+        self.dictionaries = {name: Dictionary(loaded_json.get(name, ())) for name in DICTIONARIES}
+        self.next_formula = loaded_json.get("next_formula", 0)
+        self.part = loaded_json.get("next_part", 0)
+        self.columns = {table: {column: [] for column in columns} for table, columns in TABLES.items()}
+        self.writers = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add_ast(self, file_name, nx_handler):
+        """add_ast
+
+        抽象構文木をnodes, edges, formulasの表に追加する関数
+        複数の親を持つノード(正規化した論理式のcoordinateノードなど)は最初にたどった親をparentにする
+
+        Args:
+            file_name (str): 抽象構文木を作成したファイルの名前
+            nx_handler (NetworkxHandler): 抽象構文木のハンドラ
+        """
+        labels = self.dictionaries["labels"]
+        token_types = self.dictionaries["token_types"]
+        file_id = self.dictionaries["files"].encode(file_name)
+        nodes = self.columns["nodes"]
+        edges = self.columns["edges"]
+        formulas = self.columns["formulas"]
+        assert len(nx_handler.get_orphans()) == 1
+        root = nx_handler.get_orphans().pop()
+        visited = {root}
+        stack = [(root, -1, 0, -1)]
+        while stack:
+            node, parent, depth, formula = stack.pop()
+            label_id = labels.encode(nx_handler.get_label(node))
+            if depth == 1:
+                formula = self.next_formula
+                self.next_formula += 1
+                formulas["formula"].append(formula)
+                formulas["file_id"].append(file_id)
+                formulas["name"].append(self.get_formula_name(nx_handler, node, label_id))
+            nodes["file_id"].append(file_id)
+            nodes["node"].append(node)
+            nodes["parent"].append(parent)
+            nodes["label"].append(label_id)
+            nodes["token_type"].append(token_types.encode(nx_handler.get_attr(node).get("token_type")))
+            nodes["depth"].append(depth)
+            nodes["formula"].append(formula)
+            children = nx_handler.get_children(node)
+            for child in reversed(children):
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, node, depth + 1, formula))
+            for child in children:
+                edges["file_id"].append(file_id)
+                edges["source"].append(node)
+                edges["target"].append(child)
+        if len(nodes["node"]) >= self.row_group_size:
+            self.flush()
+
+    def get_formula_name(self, nx_handler, formula_node, label_id):
+        """get_formula_name
+
+        論理式のノードの最初の子(論理式名)のラベルのIDを取得する関数、子がなければ論理式のノードのラベルのIDを返す
+        """
+        children = nx_handler.get_children(formula_node)
+        if not children:
+            return label_id
+        return self.dictionaries["labels"].encode(nx_handler.get_label(children[0]))
+
+    def add_deduction_tree(self, file_name, nx_handler):
+        """add_deduction_tree
+
+        証明のグラフをdeduction_nodes, deduction_edgesの表に追加する関数
+
+        Args:
+            file_name (str): 証明のグラフを作成したファイルの名前
+            nx_handler (NetworkxHandler): 証明のグラフのハンドラ
+        """
+        labels = self.dictionaries["labels"]
+        inference_rules = self.dictionaries["inference_rules"]
+        file_id = self.dictionaries["files"].encode(file_name)
+        nodes = self.columns["deduction_nodes"]
+        edges = self.columns["deduction_edges"]
+        for node in nx_handler.get_all_nodes():
+            nodes["file_id"].append(file_id)
+            nodes["node"].append(node)
+            nodes["name"].append(labels.encode(nx_handler.get_label(node)))
+            nodes["inference_rule"].append(inference_rules.encode(nx_handler.get_attr(node).get("inference_rule")))
+            for child in nx_handler.get_children(node):
+                edges["file_id"].append(file_id)
+                edges["source"].append(node)
+                edges["target"].append(child)
+        if len(nodes["node"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """flush
+
+        まだ書き込んでいない行を1つの行グループとして書き込み、辞書を保存する関数
+        """
+        if not any(columns["file_id"] for columns in self.columns.values()):
+            return
+        with INSTRUMENTATION.span("export_columns") as span:
+            for table, columns in self.columns.items():
+                arrays = {column: np.array(values, dtype=np.int32) for column, values in columns.items()}
+                if self.file_format == "npz":
+                    np.savez(os.path.join(self.dir_path, f"{table}-{self.part:05d}.npz"), **arrays)
+                else:
+                    if table not in self.writers:
+                        schema = pyarrow.schema([(column, pyarrow.int32()) for column in arrays])
+                        self.writers[table] = pyarrow.parquet.ParquetWriter(
+                            os.path.join(self.dir_path, f"{table}-{self.part:05d}.parquet"), schema)
+                    self.writers[table].write_table(pyarrow.table(arrays))
+                for values in columns.values():
+                    values.clear()
+            if span:
+                span.add(part=self.part)
+        if self.file_format == "npz":
+            self.part += 1
+        self.save_dictionary()
+
+    def save_dictionary(self):
+        """save_dictionary
+
+        辞書と、追記するときに引き継ぐ論理式のIDと行グループの番号を保存する関数
+        """
+        loaded_json = {name: dictionary.values for name, dictionary in self.dictionaries.items()}
+        # Parquetは1回の書き出しで1つのファイルに行グループを追記するため、次の書き出しは次の番号のファイルにする
+        loaded_json["next_part"] = self.part + (1 if self.writers else 0)
+        loaded_json["next_formula"] = self.next_formula
+        with open(os.path.join(self.dir_path, "dictionary.json"), "w") as f:
+            json.dump(loaded_json, f)
+
+    def close(self):
+        """close
+
+        まだ書き込んでいない行を書き込み、Parquetのファイルを閉じる関数
+        """
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = dict()
+
+
+def export_output_dirs(output_dir, dir_path, **options):
+    """export_output_dirs
+
+    tptpparserの出力ディレクトリの下の、入力ごとのast.jsonとdeduction_tree.jsonを書き出す関数
+    ファイルの名前は入力ごとの出力ディレクトリのoutput_dirからの相対パス
+
+    Args:
+        output_dir (str): tptpparserの出力ディレクトリ
+        dir_path (str): 書き出すディレクトリのパス
+        **options: ColumnarExporterの引数
+    """
+    from term_dag import load_ast
+    from handler import NetworkxHandler
+    with ColumnarExporter(dir_path, **options) as exporter:
+        for root, _, file_names in sorted(os.walk(output_dir)):
+            file_name = os.path.relpath(root, output_dir)
+            if "ast.json" in file_names:
+                ast = load_ast(os.path.join(root, "ast.json"))
+                if isinstance(ast, NetworkxHandler):
+                    exporter.add_ast(file_name, ast)
+                else:
+                    exporter.add_ast(file_name, ast.expand())
+            if "deduction_tree.json" in file_names:
+                deduction_tree = NetworkxHandler()
+                deduction_tree.load_json(os.path.join(root, "deduction_tree.json"))
+                exporter.add_deduction_tree(file_name, deduction_tree)
+
+
+def load_dictionary(dir_path):
+    """load_dictionary
+
+    書き出したディレクトリの辞書を読み込む関数
+
+    Returns:
+        (dict): DICTIONARIESの名前をkey、IDごとの文字列のリストをvalueとした辞書
+    """
+    with open(os.path.join(dir_path, "dictionary.json")) as f:
+        loaded_json = json.load(f)
+    return {name: loaded_json.get(name, []) for name in DICTIONARIES}
+
+
+def load_table(dir_path, table, columns=None):
+    """load_table
+
+    書き出した表の全ての行グループを読み込み、列ごとに連結する関数
+
+    Args:
+        dir_path (str): 書き出したディレクトリのパス
+        table (str): 表の名前(TABLESのいずれか)
+        columns (list): 読み込む列の名前のリスト、Noneなら全ての列
+
+    Returns:
+        (dict): 列の名前をkey、int32の配列をvalueとした辞書
+    """
+    if columns is None:
+        columns = TABLES[table]
+    parts = {column: [] for column in columns}
+    for path in sorted(glob.glob(os.path.join(dir_path, f"{table}-*.npz"))):
+        with np.load(path) as loaded:
+            for column in columns:
+                parts[column].append(loaded[column])
+    for path in sorted(glob.glob(os.path.join(dir_path, f"{table}-*.parquet"))):
+        loaded = pyarrow.parquet.read_table(path, columns=columns)
+        for column in columns:
+            parts[column].append(loaded.column(column).to_numpy())
+    return {column: np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int32)
+            for column, arrays in parts.items()}
+
+
+def inference_rule_histogram(dir_path):
+    """inference_rule_histogram
+
+    推論規則ごとの証明のグラフの論理式の数を集計する関数
+
+    Returns:
+        (dict): 推論規則(推論規則がない論理式はNone)をkey、論理式の数をvalueとした、数の降順の辞書
+    """
+    inference_rules = load_dictionary(dir_path)["inference_rules"]
+    rule_ids = load_table(dir_path, "deduction_nodes", ["inference_rule"])["inference_rule"]
+    # 推論規則がない論理式(-1)を0番目に数える
+    counts = np.bincount(rule_ids + 1, minlength=len(inference_rules) + 1)
+    histogram = {rule: int(count) for rule, count in zip([None] + inference_rules, counts) if count}
+    return dict(sorted(histogram.items(), key=lambda item: -item[1]))
+
+
+def symbol_frequencies(dir_path, token_types=FUNCTOR_TOKEN_TYPES, top=None):
+    """symbol_frequencies
+
+    抽象構文木に現れる記号の出現回数を集計する関数
+
+    Args:
+        dir_path (str): 書き出したディレクトリのパス
+        token_types (set): 集計するトークンの種類
+        top (int): 出現回数の多い順に返す数、Noneなら全て
+
+    Returns:
+        (dict): ラベルをkey、出現回数をvalueとした、回数の降順の辞書
+    """
+    dictionary = load_dictionary(dir_path)
+    nodes = load_table(dir_path, "nodes", ["label", "token_type"])
+    token_type_ids = [token_type_id for token_type_id, token_type in enumerate(dictionary["token_types"])
+                      if token_type in token_types]
+    counts = np.bincount(nodes["label"][np.isin(nodes["token_type"], token_type_ids)],
+                         minlength=len(dictionary["labels"]))
+    order = np.argsort(-counts, kind="stable")[:top]
+    return {dictionary["labels"][label_id]: int(counts[label_id]) for label_id in order if counts[label_id]}
+
+
+def formula_depths(dir_path):
+    """formula_depths
+
+    論理式ごとの深さ(論理式のノードからの最も深いノードまでの辺の数)を計算する関数
+
+    Returns:
+        (numpy.ndarray): 論理式のIDごとの深さの配列
+    """
+    nodes = load_table(dir_path, "nodes", ["depth", "formula"])
+    number_of_formulas = len(load_table(dir_path, "formulas", ["formula"])["formula"])
+    in_formula = nodes["formula"] >= 0
+    depths = np.zeros(number_of_formulas, dtype=np.int32)
+    # 論理式のノードの深さが1なので、1を引いて論理式のノードからの深さにする
+    np.maximum.at(depths, nodes["formula"][in_formula], nodes["depth"][in_formula] - 1)
+    return depths
+
+
+def depth_histogram(dir_path):
+    """depth_histogram
+
+    論理式の深さごとの論理式の数を集計する関数
+
+    Returns:
+        (numpy.ndarray): 深さごとの論理式の数の配列
+    """
+    return np.bincount(formula_depths(dir_path))
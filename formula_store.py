@@ -0,0 +1,416 @@
+import json
+import os
+import sqlite3
+import zlib
+from handler import NetworkxHandler
+from instrumentation import INSTRUMENTATION
+from node_link_reader import iter_loaded
+
+# パイプラインの出力(抽象構文木、証明のグラフ、正規化した論理式)を1つのsqliteのデータベースに保存するストア
+# 証明ごと、論理式ごとにjsonファイルを作るとファイル数が膨大になり、ランダムアクセスや集計が遅くなるため、
+# 問題(証明)の名前をkeyにして1つのファイルにまとめる
+# 抽象構文木と正規化した論理式はjson(node-link形式またはTermDag.to_jsonの形式)をzlibで圧縮して保存し、
+# 証明のグラフは論理式名、推論規則、エッジの行として保存するため、論理式名や推論規則で検索できる
+# 書き込みはbatch_size回の追加ごとに1つのトランザクションでコミットする
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS problems (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS asts (problem_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS formulas (
+    id INTEGER PRIMARY KEY, problem_id INTEGER NOT NULL, name TEXT NOT NULL, inference_rule TEXT
+);
+CREATE INDEX IF NOT EXISTS formulas_problem ON formulas (problem_id);
+CREATE INDEX IF NOT EXISTS formulas_name ON formulas (name);
+CREATE INDEX IF NOT EXISTS formulas_rule ON formulas (inference_rule);
+CREATE TABLE IF NOT EXISTS edges (problem_id INTEGER NOT NULL, source TEXT NOT NULL, target TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS edges_problem ON edges (problem_id);
+CREATE TABLE IF NOT EXISTS normalized_formulas (
+    problem_id INTEGER NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (problem_id, name)
+);
+CREATE INDEX IF NOT EXISTS normalized_formulas_name ON normalized_formulas (name);
+"""
+DEFAULT_BATCH_SIZE = 1000
+
+
+def compress_json(json_root):
+    """compress_json
+
+    jsonに変換できる辞書をzlibで圧縮したバイト列にする関数
+    """
+    return zlib.compress(json.dumps(json_root, separators=(",", ":")).encode())
+
+
+def decompress_json(data):
+    """decompress_json
+
+    compress_jsonで作成したバイト列を辞書に戻す関数
+    """
+    return json.loads(zlib.decompress(data))
+
+
+def compress_normalized_formulas(formulas):
+    """compress_normalized_formulas
+
+    正規化した論理式のグラフを、FormulaStore.add_outputで保存できる形式に圧縮する関数
+    ワーカープロセスで正規化した論理式を、ファイルに保存せずにデータベースに書き込むプロセスへ渡すために使う
+
+    Args:
+        formulas (iterable): Converter.iter_normalized_formulaの(論理式名, グラフ)のイテレータ
+
+    Returns:
+        (list): [(論理式名, 圧縮したグラフ), ...]
+    """
+    from networkx.readwrite import json_graph
+    compressed = []
+    for name, graph in formulas:
+        with INSTRUMENTATION.span("dump_json"):
+            compressed.append((name, compress_json(json_graph.node_link_data(graph))))
+    return compressed
+
+
+def read_output_dir(output_dir, read_formulas=True):
+    """read_output_dir
+
+    tptpparserの入力ごとの出力ディレクトリ(ast.json, deduction_tree.json, formulas/)を、FormulaStore.add_outputで
+    保存できる形式で読み込む関数
+    ワーカープロセスで読み込みと圧縮を行い、データベースへの書き込みだけを1つのプロセスで行うために使う
+    存在しないファイルは読み込まない
+
+    Args:
+        output_dir (str): 入力ごとの出力ディレクトリ
+        read_formulas (bool): Falseならformulas/を読み込まない(正規化した論理式をcompress_normalized_formulasで渡す場合)
+
+    Returns:
+        output (dict): {"ast": 圧縮した抽象構文木またはNone,
+                        "formulas": [(論理式名, 推論規則), ...] またはNone,
+                        "edges": [(前提の論理式名, 導出した論理式名), ...],
+                        "normalized_formulas": [(論理式名, 圧縮したグラフ), ...]}
+    """
+    output = {"ast": None, "formulas": None, "edges": [], "normalized_formulas": []}
+    ast_path = os.path.join(output_dir, "ast.json")
+    if os.path.exists(ast_path):
+        with open(ast_path) as f:
+            output["ast"] = compress_json(json.load(f))
+    deduction_tree_path = os.path.join(output_dir, "deduction_tree.json")
+    if os.path.exists(deduction_tree_path):
+        from networkx.readwrite import json_graph
+        with open(deduction_tree_path) as f:
+            output["formulas"], output["edges"] = deduction_tree_rows(json_graph.node_link_graph(json.load(f)))
+    formula_dir = os.path.join(output_dir, "formulas")
+    if read_formulas and os.path.isdir(formula_dir):
+        for file_name in sorted(os.listdir(formula_dir)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(formula_dir, file_name)) as f:
+                    output["normalized_formulas"].append((file_name[:-len(".json")], compress_json(json.load(f))))
+    return output
+
+
+def deduction_tree_rows(graph):
+    """deduction_tree_rows
+
+    証明のグラフを、論理式の行(論理式名, 推論規則)のリストとエッジの行(前提の論理式名, 導出した論理式名)のリストにする関数
+    """
+    labels = graph.nodes(data="label")
+    formulas = [(attr["label"], attr.get("inference_rule")) for _, attr in graph.nodes(data=True)]
+    edges = [(labels[source], labels[target]) for source, target in graph.edges()]
+    return formulas, edges
+
+
+def handler_from_json(loaded_json):
+    """handler_from_json
+
+    読み込み済みのjsonの辞書から抽象構文木を作成する関数
+    TermDag.to_jsonの形式ならTermDag、networkxのnode-link形式ならNetworkxHandlerを返す
+    """
+    if loaded_json.get("term_dag"):
+        from term_dag import TermDag
+        return TermDag.from_json(loaded_json)
+    nx_handler = NetworkxHandler()
+    nx_handler.init_node_link(iter_loaded(loaded_json))
+    return nx_handler
+
+
+class FormulaStore:
+    """FormulaStore
+
+    パイプラインの出力を保存するsqliteのストア
+
+    Attributes:
+        connection (sqlite3.Connection): ストアのデータベース
+        batch_size (int): コミットするまでの追加の回数
+        pending (int): 前回のコミットからの追加の回数
+        problem2id (dict): 問題名をkey、問題のIDをvalueとした辞書(キャッシュ)
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.pending = 0
+        self.problem2id = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """close
+
+        コミットしていない追加をコミットし、データベースを閉じる関数
+        """
+        self.commit()
+        self.connection.close()
+
+    def commit(self):
+        """commit
+
+        コミットしていない追加をコミットする関数
+        """
+        self.connection.commit()
+        self.pending = 0
+
+    def added(self):
+        """added
+
+        追加の回数を数え、batch_size回ごとにコミットする関数
+        """
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+
+    def get_problem_id(self, problem, create=False):
+        """get_problem_id
+
+        問題名から問題のIDを取得する関数
+
+        Args:
+            problem (str): 問題名
+            create (bool): Trueなら登録されていない問題を登録する
+
+        Returns:
+            (int): 問題のID、createがFalseで登録されていなければNone
+        """
+        problem_id = self.problem2id.get(problem)
+        if problem_id is not None:
+            return problem_id
+        if create:
+            self.connection.execute("INSERT OR IGNORE INTO problems (name) VALUES (?)", (problem,))
+        row = self.connection.execute("SELECT id FROM problems WHERE name = ?", (problem,)).fetchone()
+        if row is None:
+            return None
+        self.problem2id[problem] = row[0]
+        return row[0]
+
+    def get_problems(self):
+        """get_problems
+
+        登録されている問題名を取得する関数
+
+        Returns:
+            (list): 問題名の登録順のリスト
+        """
+        return [name for name, in self.connection.execute("SELECT name FROM problems ORDER BY id")]
+
+    def add_ast(self, problem, ast):
+        """add_ast
+
+        問題の抽象構文木を保存する関数、保存済みなら置き換える
+
+        Args:
+            problem (str): 問題名
+            ast (NetworkxHandler or TermDag or dict): 抽象構文木、またはそのjsonの辞書
+        """
+        if isinstance(ast, NetworkxHandler):
+            from networkx.readwrite import json_graph
+            ast = json_graph.node_link_data(ast.get_graph())
+        elif not isinstance(ast, dict):
+            ast = ast.to_json()
+        self.connection.execute("INSERT OR REPLACE INTO asts VALUES (?, ?)",
+                                (self.get_problem_id(problem, create=True), compress_json(ast)))
+        self.added()
+
+    def load_ast(self, problem):
+        """load_ast
+
+        問題の抽象構文木を読み込む関数
+
+        Args:
+            problem (str): 問題名
+
+        Returns:
+            (TermDag or NetworkxHandler): 抽象構文木
+        """
+        with INSTRUMENTATION.span("load_json") as span:
+            row = self.connection.execute("SELECT data FROM asts WHERE problem_id = ?",
+                                          (self.get_problem_id(problem),)).fetchone()
+            if row is None:
+                raise KeyError(problem)
+            ast = handler_from_json(decompress_json(row[0]))
+            if span:
+                span.add(nodes=len(ast.get_all_nodes()))
+        return ast
+
+    def add_deduction_tree(self, problem, graph):
+        """add_deduction_tree
+
+        問題の証明のグラフを、論理式名と推論規則、エッジの行として保存する関数、保存済みなら置き換える
+
+        Args:
+            problem (str): 問題名
+            graph (networkx.DiGraph): create_deduction_tree_graph_on_networkxで作成した証明のグラフ
+        """
+        self.insert_deduction_tree(self.get_problem_id(problem, create=True), *deduction_tree_rows(graph))
+        self.added()
+
+    def insert_deduction_tree(self, problem_id, formulas, edges):
+        """insert_deduction_tree
+
+        証明のグラフの行を、保存済みの行と置き換えて書き込む関数
+        """
+        self.connection.execute("DELETE FROM formulas WHERE problem_id = ?", (problem_id,))
+        self.connection.execute("DELETE FROM edges WHERE problem_id = ?", (problem_id,))
+        self.connection.executemany("INSERT INTO formulas (problem_id, name, inference_rule) VALUES (?, ?, ?)",
+                                    ((problem_id, name, inference_rule) for name, inference_rule in formulas))
+        self.connection.executemany("INSERT INTO edges VALUES (?, ?, ?)",
+                                    ((problem_id, source, target) for source, target in edges))
+
+    def load_deduction_tree(self, problem):
+        """load_deduction_tree
+
+        問題の証明のグラフを読み込む関数
+        ノードIDは保存したときのノードの順に0から振る
+
+        Args:
+            problem (str): 問題名
+
+        Returns:
+            (NetworkxHandler): 証明のグラフ
+        """
+        problem_id = self.get_problem_id(problem)
+        nx_handler = NetworkxHandler()
+        name2node = dict()
+        for name, inference_rule in self.connection.execute(
+                "SELECT name, inference_rule FROM formulas WHERE problem_id = ? ORDER BY id", (problem_id,)):
+            name2node[name] = nx_handler.add_node(name, inference_rule=inference_rule)
+        if not name2node:
+            raise KeyError(problem)
+        for source, target in self.connection.execute(
+                "SELECT source, target FROM edges WHERE problem_id = ? ORDER BY rowid", (problem_id,)):
+            nx_handler.add_edge(name2node[source], name2node[target])
+        return nx_handler
+
+    def add_normalized_formula(self, problem, name, graph):
+        """add_normalized_formula
+
+        正規化した論理式を保存する関数、保存済みなら置き換える
+
+        Args:
+            problem (str): 問題名
+            name (str): 論理式名
+            graph (networkx.DiGraph or dict): Converter.normalize_formulaで正規化した論理式のグラフ、またはそのjsonの辞書
+        """
+        if not isinstance(graph, dict):
+            from networkx.readwrite import json_graph
+            graph = json_graph.node_link_data(graph)
+        self.connection.execute("INSERT OR REPLACE INTO normalized_formulas VALUES (?, ?, ?)",
+                                (self.get_problem_id(problem, create=True), name, compress_json(graph)))
+        self.added()
+
+    def load_normalized_formula(self, problem, name):
+        """load_normalized_formula
+
+        正規化した論理式を読み込む関数
+
+        Args:
+            problem (str): 問題名
+            name (str): 論理式名
+
+        Returns:
+            (NetworkxHandler): 正規化した論理式のグラフ
+        """
+        row = self.connection.execute("SELECT data FROM normalized_formulas WHERE problem_id = ? AND name = ?",
+                                      (self.get_problem_id(problem), name)).fetchone()
+        if row is None:
+            raise KeyError((problem, name))
+        return handler_from_json(decompress_json(row[0]))
+
+    def get_normalized_formula_names(self, problem):
+        """get_normalized_formula_names
+
+        問題の正規化した論理式の論理式名を取得する関数
+
+        Returns:
+            (list): 論理式名の昇順のリスト
+        """
+        return [name for name, in self.connection.execute(
+            "SELECT name FROM normalized_formulas WHERE problem_id = ? ORDER BY name", (self.get_problem_id(problem),))]
+
+    def find_formulas(self, name=None, inference_rule=None, problem=None):
+        """find_formulas
+
+        証明のグラフの論理式を論理式名、推論規則、問題名で検索する関数、指定した条件を全て満たすものを返す
+
+        Args:
+            name (str): 論理式名
+            inference_rule (str): 推論規則
+            problem (str): 問題名
+
+        Returns:
+            (list): (問題名, 論理式名, 推論規則)のリスト
+        """
+        conditions = []
+        parameters = []
+        for column, value in [("formulas.name", name), ("formulas.inference_rule", inference_rule),
+                              ("problems.name", problem)]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return self.connection.execute(
+            "SELECT problems.name, formulas.name, formulas.inference_rule FROM formulas "
+            "JOIN problems ON problems.id = formulas.problem_id" + where + " ORDER BY formulas.id",
+            parameters).fetchall()
+
+    def count_inference_rules(self):
+        """count_inference_rules
+
+        推論規則ごとの論理式の数を集計する関数
+
+        Returns:
+            (dict): 推論規則をkey、論理式の数をvalueとした辞書
+        """
+        return dict(self.connection.execute(
+            "SELECT inference_rule, COUNT(*) FROM formulas GROUP BY inference_rule ORDER BY COUNT(*) DESC"))
+
+    def add_output(self, problem, output):
+        """add_output
+
+        read_output_dirで読み込んだ出力を1回の追加として保存する関数
+
+        Args:
+            problem (str): 問題名
+            output (dict): read_output_dirの戻り値
+        """
+        problem_id = self.get_problem_id(problem, create=True)
+        if output["ast"] is not None:
+            self.connection.execute("INSERT OR REPLACE INTO asts VALUES (?, ?)", (problem_id, output["ast"]))
+        if output["formulas"] is not None:
+            self.insert_deduction_tree(problem_id, output["formulas"], output["edges"])
+        self.connection.executemany("INSERT OR REPLACE INTO normalized_formulas VALUES (?, ?, ?)",
+                                    ((problem_id, name, data) for name, data in output["normalized_formulas"]))
+        self.added()
+
+    def import_output_dir(self, problem, output_dir):
+        """import_output_dir
+
+        tptpparserの入力ごとの出力ディレクトリ(ast.json, deduction_tree.json, formulas/)をストアに取り込む関数
+        存在しないファイルは取り込まない
+
+        Args:
+            problem (str): 問題名
+            output_dir (str): 入力ごとの出力ディレクトリ
+        """
+        self.add_output(problem, read_output_dir(output_dir))
@@ -1,9 +1,9 @@
 from collections import defaultdict
 import json
-import networkx as nx
-import graphviz
-from networkx.readwrite import json_graph
 from copy import copy
+from instrumentation import INSTRUMENTATION
+from node_link_reader import iter_node_link
+from symbol_table import SYMBOL_TABLE
 
 
 class GraphvizHandler:
@@ -26,6 +26,7 @@ class GraphvizHandler:
         Returns:
             G(graphviz.graphs.Digraph): ノードとエッジを追加したgraphvizのインスタンス
         """
+        import graphviz
         G = graphviz.Digraph()
         for node_id, attr in graph_nodes:
             G.node(str(node_id), attr["label"])
@@ -48,29 +49,117 @@ class NetworkxHandler:
     """NetworkxHandler
 
     networkxグラフを操作する関数をまとめたクラス
+    ラベルは記号表のIDで保持し、アトリビュートの文字列は記号表の文字列を共有する
+
+    Attributes:
+        symbol_table (SymbolTable): ラベルとトークンの種類の記号表、省略時はSYMBOL_TABLEを共有する
+        graph (networkx.classes.digraph.DiGraph): networkxグラフ
+            load_jsonで読み込んだ場合は、最初に参照したときにノードとエッジの辞書から作成する
+            作成するまでのノードとエッジの追加と削除は辞書だけに反映する
     """
 
-    def __init__(self):
-        self.graph = nx.DiGraph()
+    def __init__(self, symbol_table=None):
+        # networkxとgraphvizはimportに時間がかかるため、使うときにimportする
+        import networkx as nx
+        self._graph = nx.DiGraph()
         self.source2targets = defaultdict(list)
         self.target2sources = defaultdict(list)
-        self.node2label = dict()
-        self.label2nodes = defaultdict(list)
+        self.node2label = dict()  # ノードIDをkey、ラベルのIDをvalueとした辞書
+        self.label2nodes = defaultdict(list)  # ラベルのIDをkey、ノードIDのリストをvalueとした辞書
         self.node2attr = dict()
         self.next_node = 0
+        self.symbol_table = SYMBOL_TABLE if symbol_table is None else symbol_table
+
+    def canonicalize_attr(self, attr):
+        """canonicalize_attr
+
+        アトリビュートの文字列を記号表の文字列に置き換える関数
 
-    def load_json(self, path):
+        Args:
+            attr (dict): ノードのアトリビュート
+
+        Returns:
+            (dict): 置き換えたアトリビュート
+        """
+        return {key: self.symbol_table.canonical(value) if isinstance(value, str) else value
+                for key, value in attr.items()}
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = self.build_graph()
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+
+    def build_graph(self):
+        """build_graph
+
+        ノードとエッジの辞書からnetworkxグラフを作成する関数
+        ノードとエッジの順序はnode_link_graphで読み込んだ場合と同じになる
+
+        Returns:
+            graph (networkx.classes.digraph.DiGraph): networkxグラフ
+        """
+        import networkx as nx
+        graph = nx.DiGraph()
+        for node, label_id in self.node2label.items():
+            graph.add_node(node, **{"label": self.symbol_table.get_symbol(label_id), **self.node2attr[node]})
+        for node in self.node2label:
+            for target in self.source2targets.get(node, ()):
+                graph.add_edge(node, target)
+        return graph
+
+    def load_json(self, path, stream=True):
         """load_json
 
         networkxグラフのjsonファイルを読み込み、初期化する関数
+        streamがTrueならnode_link_reader.pyでnodesとlinksを要素ごとに読み、ノードとエッジの辞書を直接作成する
+        jsonの辞書全体とnetworkxグラフを作らないため、メモリの使用量が少ない
 
         Args:
             path (str): networkxグラフのjsonファイルのパス
+            stream (bool): Falseならjson.loadとnode_link_graphでnetworkxグラフを作成してから初期化する
+        """
+        with INSTRUMENTATION.span("load_json") as span:
+            if stream:
+                self.init_node_link(iter_node_link(path))
+            else:
+                from networkx.readwrite import json_graph
+                with open(path) as f:
+                    loaded_json = json.load(f)
+                self.init_graph(json_graph.node_link_graph(loaded_json))
+            if span:
+                span.add(nodes=len(self.node2label))
+
+    def init_node_link(self, events):
+        """init_node_link
+
+        node_link_reader.iter_node_linkのイベントから、selfのノードとエッジの辞書を初期化する関数
+        networkxグラフはgraphを参照したときに作成する
+        エッジのアトリビュートとグラフのアトリビュートは読み込まない
+
+        Args:
+            events (iterator): (key, 値)のイテレータ、keyがnodesならノード、linksまたはedgesならエッジの辞書
         """
-        with open(path) as f:
-            loaded_json = json.load(f)
-        graph = json_graph.node_link_graph(loaded_json)
-        self.init_graph(graph)
+        self._graph = None
+        for key, item in events:
+            if key == "nodes":
+                attr = dict(item)
+                node = attr.pop("id")
+                label_id = self.symbol_table.intern(attr.pop("label"))
+                self.node2label[node] = label_id
+                self.label2nodes[label_id].append(node)
+                self.node2attr[node] = self.canonicalize_attr(attr)
+            elif key in ("links", "edges"):
+                self.source2targets[item["source"]].append(item["target"])
+        self.next_node = max(self.node2label) + 1
+        # 親のリストはnode_link_graphで読み込んだ場合と同じく、ノードの順に並べる
+        for node in self.node2label:
+            for target in self.source2targets.get(node, ()):
+                self.target2sources[target].append(node)
 
     def init_graph(self, graph):
         """init_graph
@@ -88,9 +177,10 @@ class NetworkxHandler:
             self.target2sources[target].append(source)
 
         for node, attr in self.get_graph_nodes():
-            label = attr["label"]
-            self.node2label[node] = label
-            self.label2nodes[label].append(node)
+            attr.update(self.canonicalize_attr(attr))
+            label_id = self.symbol_table.intern(attr["label"])
+            self.node2label[node] = label_id
+            self.label2nodes[label_id].append(node)
             self.node2attr[node] = copy(attr)
             del self.node2attr[node]["label"]
 
@@ -113,6 +203,7 @@ class NetworkxHandler:
         """get_graph_edges
 
         networkxグラフのエッジを取得する関数(アトリビュートを含まない)
+        networkxグラフを作成していなければ作成するため、エッジだけが必要な場合はget_all_edgesを使う
 
         Returns:
             (networkx.classes.reportviews.OutEdgeView): エッジ情報のリスト
@@ -201,7 +292,7 @@ class NetworkxHandler:
         Returns:
             (set): 親ノードがないノードのset
         """
-        all_nodes = set(self.graph.nodes())
+        all_nodes = set(self.node2label)
         not_orphans = set(self.target2sources.keys())
         orphans = all_nodes.difference(not_orphans)
         return orphans
@@ -217,6 +308,20 @@ class NetworkxHandler:
         Returns:
             (str): ノードのラベル
         """
+        return self.symbol_table.get_symbol(self.node2label[node])
+
+    def get_label_id(self, node):
+        """get_label_id
+
+        ノードのラベルの記号表でのIDを取得する関数
+        ラベルの比較は文字列ではなくこのIDで行うと速い
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (int): ラベルのID
+        """
         return self.node2label[node]
 
     def set_label(self, node, label):
@@ -228,12 +333,15 @@ class NetworkxHandler:
             node (int): ノードID
             label (str): 設定するラベル
         """
-        previous_label = self.get_label(node)
-        self.node2label[node] = label
-        self.label2nodes[previous_label].remove(node)
-        self.label2nodes[label].append(node)
+        previous_label_id = self.get_label_id(node)
+        label_id = self.symbol_table.intern(label)
+        label = self.symbol_table.get_symbol(label_id)
+        self.node2label[node] = label_id
+        self.label2nodes[previous_label_id].remove(node)
+        self.label2nodes[label_id].append(node)
         self.node2attr[node]["label"] = label
-        self.graph.nodes[node]["label"] = label
+        if self._graph is not None:
+            self._graph.nodes[node]["label"] = label
 
     def get_nodes(self, label):
         """get_nodes
@@ -244,9 +352,13 @@ class NetworkxHandler:
             label (str): ラベル
 
         Returns:
-            (int): ノードID
+            (list): ノードIDのリスト、そのラベルのノードがなければ空のリスト
         """
-        return self.label2nodes[label]
+        # 問い合わせたラベルを記号表とlabel2nodesに登録しないよう、internせずに引く
+        label_id = self.symbol_table.get_id(label)
+        if label_id is None:
+            return []
+        return self.label2nodes.get(label_id, [])
 
     def get_attr(self, node):
         """get_attr
@@ -269,17 +381,18 @@ class NetworkxHandler:
         Returns:
             (list): ノードのリスト
         """
-        return [node for node, _ in self.get_graph_nodes()]
+        return list(self.node2label)
 
     def get_all_edges(self):
         """get_all_edges
 
         エッジのリストを取得する関数
+        networkxグラフを作成せずに隣接リストから取得し、順序はbuild_graphで作成したグラフのエッジと同じになる
 
         Returns:
-            (list): エッジのリスト
+            (list): (始点, 終点)のエッジのリスト
         """
-        return self.get_graph_edges()
+        return [(source, target) for source in self.node2label for target in self.source2targets.get(source, ())]
 
     def get_next_node(self):
         """get_next_node
@@ -299,7 +412,7 @@ class NetworkxHandler:
         Returns:
             (int): 最後のノードID
         """
-        return len(self.get_graph_nodes()) - 1
+        return len(self.node2label) - 1
 
     def get_graph(self):
         """get_graph
@@ -326,10 +439,13 @@ class NetworkxHandler:
         """
         new_node = self.get_next_node()
         self.next_node += 1
-        self.node2label[new_node] = label
-        self.label2nodes[label].append(new_node)
+        label_id = self.symbol_table.intern(label)
+        attr = self.canonicalize_attr(attr)
+        self.node2label[new_node] = label_id
+        self.label2nodes[label_id].append(new_node)
         self.node2attr[new_node] = attr
-        self.graph.add_node(new_node, label=label, **attr)
+        if self._graph is not None:
+            self._graph.add_node(new_node, label=self.symbol_table.get_symbol(label_id), **attr)
         return new_node
 
     def add_edge(self, source, target):
@@ -343,7 +459,8 @@ class NetworkxHandler:
         """
         self.source2targets[source].append(target)
         self.target2sources[target].append(source)
-        self.graph.add_edge(source, target)
+        if self._graph is not None:
+            self._graph.add_edge(source, target)
 
     def add_child(self, parent, label, attr=None):
         """add_child
@@ -366,8 +483,8 @@ class NetworkxHandler:
         Args:
             node (int): 削除するノードID
         """
-        label = self.get_label(node)
-        self.label2nodes[label].remove(node)
+        label_id = self.get_label_id(node)
+        self.label2nodes[label_id].remove(node)
         del self.node2label[node]
         if node in self.source2targets:
             del self.source2targets[node]
@@ -379,7 +496,8 @@ class NetworkxHandler:
         for target in self.target2sources:
             if node in self.target2sources[target]:
                 self.target2sources[target].remove(node)
-        self.graph.remove_node(node)
+        if self._graph is not None:
+            self._graph.remove_node(node)
 
     def remove_edge(self, source, target):
         """remove_edge
@@ -392,7 +510,21 @@ class NetworkxHandler:
         """
         self.source2targets[source].remove(target)
         self.target2sources[target].remove(source)
-        self.graph.remove_edge(source, target)
+        if self._graph is not None:
+            self._graph.remove_edge(source, target)
+
+    def get_subtree(self, node):
+        """get_subtree
+
+        nodeを根とする部分木を、コピーせずに参照するビューを取得する関数
+
+        Args:
+            node (int): 部分木の根のノードID
+
+        Returns:
+            (SubtreeView): 部分木のビュー
+        """
+        return SubtreeView(self, node)
 
     def show_tree_graph(self, path):
         """show_tree_graph
@@ -402,5 +534,217 @@ class NetworkxHandler:
         Args:
             path (str): グラフを保存するパス
         """
+        import networkx as nx
         agraph = nx.nx_agraph.to_agraph(self.graph)
         agraph.draw(path, prog="dot", format="png")
+
+
+class SubtreeView:
+    """SubtreeView
+
+    NetworkxHandlerやTermDagの部分木(あるノードとその子孫)を、コピーせずに参照するビュー
+    参照系の関数はNetworkxHandlerと同じ名前で、元のハンドラのリストや辞書をそのまま返す
+    TermDagの部分木をコピーした場合は、共有されたノードは共有されたまま1つのノードになる
+    ノードやエッジを追加、削除したときに初めて部分木を同じノードIDのNetworkxHandlerにコピーし(copy-on-write)、
+    以降はコピーを読み書きするため、元のハンドラは変更されない
+    コピーする前に元のハンドラを変更した場合、ビューにも反映される
+
+    Attributes:
+        base (NetworkxHandler or TermDag): 元のハンドラ
+        root (int): 部分木の根のノードID
+        copy (NetworkxHandler): 変更したときに作成した部分木のコピー、変更していなければNone
+    """
+
+    def __init__(self, base, root):
+        self.base = base
+        self.root = root
+        self.copy = None
+        self._nodes = None
+        self._node_set = None
+
+    @property
+    def symbol_table(self):
+        return self.base.symbol_table
+
+    def get_all_nodes(self):
+        """get_all_nodes
+
+        部分木のノードのリストを行きがけ順で取得する関数
+        最初に呼んだときに部分木をたどり、結果を保持する
+
+        Returns:
+            (list): ノードのリスト
+        """
+        if self.copy is not None:
+            return self.copy.get_all_nodes()
+        if self._nodes is None:
+            nodes = []
+            visited = set()
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                if node in visited:
+                    continue
+                visited.add(node)
+                nodes.append(node)
+                stack.extend(reversed(self.base.get_children(node)))
+            self._nodes = nodes
+            self._node_set = visited
+        return self._nodes
+
+    def contains(self, node):
+        """contains
+
+        ノードが部分木に含まれるかどうかを判定する関数
+        """
+        if self.copy is not None:
+            return node in self.copy.node2label
+        self.get_all_nodes()
+        return node in self._node_set
+
+    def get_children(self, node):
+        """get_children
+
+        ノードの子を取得する関数(元のハンドラのリストを返す)
+        """
+        if self.copy is not None:
+            return self.copy.get_children(node)
+        return self.base.get_children(node)
+
+    def get_parents(self, node):
+        """get_parents
+
+        部分木の中でのノードの親を取得する関数、根の親は部分木に含まれないため空のリストになる
+        """
+        if self.copy is not None:
+            return self.copy.get_parents(node)
+        if node == self.root:
+            return []
+        parents = self.base.get_parents(node)
+        if len(parents) == 1:
+            # 木では根以外のノードの親は部分木に含まれる
+            return parents
+        return [parent for parent in parents if self.contains(parent)]
+
+    def get_label(self, node):
+        """get_label
+
+        ノードのラベルを取得する関数
+        """
+        if self.copy is not None:
+            return self.copy.get_label(node)
+        return self.base.get_label(node)
+
+    def get_label_id(self, node):
+        """get_label_id
+
+        ノードのラベルの記号表でのIDを取得する関数
+        """
+        if self.copy is not None:
+            return self.copy.get_label_id(node)
+        return self.base.get_label_id(node)
+
+    def get_attr(self, node):
+        """get_attr
+
+        ノードのアトリビュートを取得する関数(元のハンドラの辞書を返す)
+        """
+        if self.copy is not None:
+            return self.copy.get_attr(node)
+        return self.base.get_attr(node)
+
+    def get_nodes(self, label):
+        """get_nodes
+
+        部分木の中で、ラベルからノードを取得する関数
+        """
+        if self.copy is not None:
+            return self.copy.get_nodes(label)
+        return [node for node in self.base.get_nodes(label) if self.contains(node)]
+
+    def get_orphans(self):
+        """get_orphans
+
+        親ノードがないノード(部分木の根)を取得する関数
+        """
+        if self.copy is not None:
+            return self.copy.get_orphans()
+        return {self.root}
+
+    def get_descendants(self, node):
+        """get_descendants
+
+        ノードの子孫全てを取得する関数
+        """
+        if self.copy is not None:
+            return self.copy.get_descendants(node)
+        return self.base.get_descendants(node)
+
+    def get_ascendants(self, node):
+        """get_ascendants
+
+        部分木の中でのノードの祖先全てを取得する関数
+        """
+        if self.copy is not None:
+            return self.copy.get_ascendants(node)
+        return {ascendant for ascendant in self.base.get_ascendants(node) if self.contains(ascendant)}
+
+    def to_handler(self):
+        """to_handler
+
+        部分木を同じノードIDのNetworkxHandlerにコピーする関数
+        コピーに追加するノードのIDは、部分木の最大のノードIDの次から振る
+
+        Returns:
+            nx_handler (NetworkxHandler): 部分木のコピー
+        """
+        if self.copy is not None:
+            return self.copy
+        nx_handler = NetworkxHandler(self.base.symbol_table)
+        nx_handler.graph = None
+        for node in self.get_all_nodes():
+            label_id = self.base.get_label_id(node)
+            nx_handler.node2label[node] = label_id
+            nx_handler.label2nodes[label_id].append(node)
+            nx_handler.node2attr[node] = copy(self.base.get_attr(node))
+            for child in self.base.get_children(node):
+                nx_handler.source2targets[node].append(child)
+                nx_handler.target2sources[child].append(node)
+        nx_handler.next_node = max(nx_handler.node2label) + 1
+        return nx_handler
+
+    def get_graph(self):
+        """get_graph
+
+        部分木のnetworkxグラフを取得する関数(コピーを作成する)
+        """
+        return self.to_handler().get_graph()
+
+    def copy_on_write(self):
+        """copy_on_write
+
+        まだコピーしていなければ部分木をコピーし、コピーを返す関数
+        """
+        if self.copy is None:
+            self.copy = self.to_handler()
+            self._nodes = None
+            self._node_set = None
+        return self.copy
+
+    def set_label(self, node, label):
+        self.copy_on_write().set_label(node, label)
+
+    def add_node(self, label, **attr):
+        return self.copy_on_write().add_node(label, **attr)
+
+    def add_edge(self, source, target):
+        self.copy_on_write().add_edge(source, target)
+
+    def add_child(self, parent, label, attr=None):
+        self.copy_on_write().add_child(parent, label, attr)
+
+    def remove_node(self, node):
+        self.copy_on_write().remove_node(node)
+
+    def remove_edge(self, source, target):
+        self.copy_on_write().remove_edge(source, target)
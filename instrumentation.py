@@ -0,0 +1,277 @@
+from collections import defaultdict
+import json
+import os
+import time
+import tracemalloc
+
+# 構文解析から正規化までの各段階の計測
+# 計測したい処理を with INSTRUMENTATION.span("段階名") as span: で囲み、
+# 計測が有効なときだけ経過時間(wall)、CPU時間、ノード数、tracemallocのピークメモリを記録する
+# 計測が無効なときspanは何も記録しないNULL_SPANを返すだけなので、オーバーヘッドはほぼない
+
+
+class NullSpan:
+    """NullSpan
+
+    計測が無効なときにspanが返す、何も記録しないspan
+    falseと評価されるため、ノード数など計算に時間のかかる値は if span: の中で記録する
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def add(self, **counters):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Span
+
+    1つの段階の計測区間
+
+    Attributes:
+        instrumentation (Instrumentation): 記録先
+        name (str): 段階名
+        args (dict): Chromeトレースに出力する任意の情報
+        counters (dict): ノード数などの数値、summaryで段階ごとに合計する
+    """
+
+    def __init__(self, instrumentation, name, args):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.args = args
+        self.counters = dict()
+        self.max_memory = 0
+
+    def __enter__(self):
+        instrumentation = self.instrumentation
+        if instrumentation.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            if instrumentation.stack:
+                parent = instrumentation.stack[-1]
+                parent.max_memory = max(parent.max_memory, peak)
+            tracemalloc.reset_peak()
+            self.start_memory, _ = tracemalloc.get_traced_memory()
+        instrumentation.stack.append(self)
+        self.start_cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        end_cpu = time.process_time()
+        instrumentation = self.instrumentation
+        instrumentation.stack.pop()
+        record = {
+            "name": self.name,
+            "file": instrumentation.current_file,
+            "start": self.start,
+            "wall": end - self.start,
+            "cpu": end_cpu - self.start_cpu,
+            "depth": len(instrumentation.stack),
+            "pid": os.getpid(),
+            "args": self.args,
+            "counters": self.counters,
+        }
+        if instrumentation.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.max_memory = max(self.max_memory, peak)
+            record["peak_memory"] = self.max_memory - self.start_memory
+            if instrumentation.stack:
+                parent = instrumentation.stack[-1]
+                parent.max_memory = max(parent.max_memory, self.max_memory)
+        instrumentation.records.append(record)
+        return False
+
+    def add(self, **counters):
+        """add
+
+        ノード数などの数値を記録する関数、同じ名前の数値は加算する
+        """
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+class Instrumentation:
+    """Instrumentation
+
+    各段階の計測区間(span)を記録し、段階ごとの集計表とChromeトレース(chrome://tracing, Perfetto)に出力するクラス
+
+    Attributes:
+        enabled (bool): Trueなら計測する
+        trace_memory (bool): Trueならtracemallocで各spanのピークメモリ(byte)を記録する
+        current_file (str): 計測中のファイル、各spanの記録に含める
+        records (list): 終了したspanの記録(dict)のリスト
+        stack (list): 計測中のspanのスタック
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.current_file = None
+        self.records = []
+        self.stack = []
+
+    def enable(self, trace_memory=False):
+        """enable
+
+        計測を開始する関数
+
+        Args:
+            trace_memory (bool): Trueならtracemallocでピークメモリも記録する(処理は数倍遅くなる)
+        """
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        """disable
+
+        計測を終了する関数、記録は残す
+        """
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+        self.trace_memory = False
+
+    def reset(self):
+        """reset
+
+        記録を消去する関数
+        """
+        self.records = []
+        self.stack = []
+
+    def span(self, name, **args):
+        """span
+
+        段階の計測区間を作成する関数、withで使う
+
+        Args:
+            name (str): 段階名
+            **args: Chromeトレースに出力する任意の情報
+
+        Returns:
+            (Span or NullSpan): 計測が無効ならNULL_SPAN
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def add_records(self, records):
+        """add_records
+
+        別のプロセスで記録したspanの記録を追加する関数
+
+        Args:
+            records (list): 別のプロセスのInstrumentationのrecords
+        """
+        self.records.extend(records)
+
+    def set_file(self, path):
+        """set_file
+
+        以降のspanの記録に含めるファイルを設定する関数
+        """
+        self.current_file = path
+
+    def summary(self, by_file=False):
+        """summary
+
+        段階ごとに回数、経過時間、CPU時間、数値の合計とピークメモリの最大値を集計する関数
+
+        Args:
+            by_file (bool): Trueなら(ファイル, 段階名)ごとに集計する
+
+        Returns:
+            rows (list): 最初に開始した順の、集計結果(dict)のリスト
+        """
+        rows = dict()
+        for record in sorted(self.records, key=lambda record: record["start"]):
+            key = (record["file"], record["name"]) if by_file else record["name"]
+            row = rows.get(key)
+            if row is None:
+                row = {"name": record["name"], "file": record["file"] if by_file else None,
+                       "count": 0, "wall": 0.0, "cpu": 0.0, "counters": defaultdict(int)}
+                rows[key] = row
+            row["count"] += 1
+            row["wall"] += record["wall"]
+            row["cpu"] += record["cpu"]
+            for counter, value in record["counters"].items():
+                row["counters"][counter] += value
+            if "peak_memory" in record:
+                row["peak_memory"] = max(row.get("peak_memory", 0), record["peak_memory"])
+        return list(rows.values())
+
+    def format_summary(self, by_file=False):
+        """format_summary
+
+        summaryの集計結果を表の文字列にする関数
+        入れ子のspanの時間は外側のspanの時間にも含まれるため、段階の時間の合計は全体の時間と一致しない
+        """
+        rows = self.summary(by_file)
+        name_width = max([len("stage")] + [len(row["name"]) for row in rows])
+        lines = []
+        header = (f"{'stage':{name_width}s} {'count':>7s} {'wall [s]':>10s} {'cpu [s]':>10s} {'peak [MB]':>10s}"
+                  "  counters")
+        current_file = None
+        for row in rows:
+            if by_file and (not lines or row["file"] != current_file):
+                current_file = row["file"]
+                lines += ["", f"{current_file}:", header]
+            elif not lines:
+                lines.append(header)
+            peak = f"{row['peak_memory'] / 1e6:10.2f}" if "peak_memory" in row else f"{'-':>10s}"
+            counters = ", ".join(f"{key}={value}" for key, value in row["counters"].items())
+            lines.append(f"{row['name']:{name_width}s} {row['count']:7d} {row['wall']:10.4f} {row['cpu']:10.4f} "
+                         f"{peak}  {counters}")
+        return "\n".join(lines).lstrip("\n")
+
+    def to_chrome_trace(self):
+        """to_chrome_trace
+
+        記録をChromeトレースのjson(Trace Event Format)の辞書にする関数
+        spanは完全イベント(ph: X)になり、時間の単位はマイクロ秒
+        開始時刻はperf_counterの値なので、同じマシンの別プロセスの記録を混ぜても時刻がそろう
+
+        Returns:
+            (dict): Chromeトレースのjsonの辞書
+        """
+        events = []
+        origin = min((record["start"] for record in self.records), default=0)
+        for record in self.records:
+            args = dict(record["args"], cpu=record["cpu"], **record["counters"])
+            if record["file"] is not None:
+                args["file"] = record["file"]
+            if "peak_memory" in record:
+                args["peak_memory"] = record["peak_memory"]
+            events.append({"name": record["name"], "cat": "tptpparser", "ph": "X",
+                           "ts": (record["start"] - origin) * 1e6, "dur": record["wall"] * 1e6,
+                           "pid": record["pid"], "tid": 0, "args": args})
+        events.sort(key=lambda event: (event["pid"], event["ts"]))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path):
+        """save_chrome_trace
+
+        記録をChromeトレースのjsonファイルに保存する関数
+
+        Args:
+            path (str): 保存するjsonファイルのパス
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+# プロセス全体で共有する計測器
+INSTRUMENTATION = Instrumentation()
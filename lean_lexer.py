@@ -0,0 +1,94 @@
+import tstp_parser
+
+# 位置情報を記録しないスタンドアロンパーサー(tstp_parser.py)の字句解析器
+# larkのTokenは行番号、列番号、終了位置などを持つが、convert_cst2astはtypeとvalueしか使わない
+# 大きな証明ではトークンごとの位置情報の計算とメモリが無駄になるため、typeとvalueだけのトークンを作る
+
+
+class LeanToken(str):
+    """LeanToken
+
+    typeとvalueだけを持つトークン
+    larkのパーサーが位置情報を参照したときのために、位置情報の属性はクラス変数のNoneにする
+
+    Attributes:
+        type (str): トークンの種類(終端記号名)
+        value (str): トークンの文字列
+    """
+    __slots__ = ("type", "value")
+    start_pos = line = column = end_line = end_column = end_pos = None
+
+    def __new__(cls, type_, value):
+        token = super().__new__(cls, value)
+        token.type = type_
+        token.value = value
+        return token
+
+    def __repr__(self):
+        return "LeanToken(%r, %r)" % (self.type, self.value)
+
+
+class LeanBasicLexer(tstp_parser.BasicLexer):
+    """LeanBasicLexer
+
+    行番号と列番号を数えず、LeanTokenを作るBasicLexer
+    """
+
+    def next_token(self, lex_state, parser_state=None):
+        line_ctr = lex_state.line_ctr
+        text = lex_state.text
+        while line_ctr.char_pos < text.end:
+            res = self.match(text, line_ctr.char_pos)
+            if not res:
+                # エラーはLeanParserが位置情報を記録するパーサーで解析し直して報告する
+                return super().next_token(lex_state, parser_state)
+            value, type_ = res
+            line_ctr.char_pos += len(value)
+            ignored = type_ in self.ignore_types
+            if ignored and type_ not in self.callback:
+                continue
+            token = LeanToken(type_, value)
+            if type_ in self.callback:
+                token = self.callback[type_](token)
+            if not ignored:
+                lex_state.last_token = token
+                return token
+        raise EOFError(self)
+
+
+class LeanContextualLexer(tstp_parser.ContextualLexer):
+    """LeanContextualLexer
+
+    構文解析の状態ごとの字句解析器にLeanBasicLexerを使うContextualLexer
+    """
+    BasicLexer = LeanBasicLexer
+
+
+class LeanParser:
+    """LeanParser
+
+    LeanContextualLexerを使うスタンドアロンパーサー
+    構文エラーのときは位置情報を記録するパーサーで解析し直し、行番号と列番号の付いたエラーを送出する
+
+    Attributes:
+        parser (Lark): LeanContextualLexerを使うスタンドアロンパーサー
+    """
+
+    def __init__(self):
+        self.parser = tstp_parser.Lark_StandAlone(_plugins={"ContextualLexer": LeanContextualLexer})
+
+    def parse(self, text):
+        """parse
+
+        文字列を構文解析する関数
+
+        Args:
+            text (str): 構文解析する文字列
+
+        Returns:
+            (Tree): 構文木
+        """
+        try:
+            return self.parser.parse(text)
+        except tstp_parser.UnexpectedInput:
+            return tstp_parser.Lark_StandAlone().parse(text)
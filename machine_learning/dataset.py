@@ -1,3 +1,5 @@
+import os
+import numpy as np
 import torch
 
 
@@ -11,3 +13,135 @@ class Dataset(torch.utils.data.Dataset):
 
     def __getitem__(self, idx):
         return self.data[idx], self.y[idx]
+
+
+def save_token_dataset(dir_path, tokens, offsets, y):
+    """save_token_dataset
+
+    トークン列のデータセットをMemmapDatasetで読み込める形式で保存する関数
+
+    Args:
+        dir_path (str): 保存するディレクトリのパス
+        tokens (numpy.ndarray): 全論理式のトークンIDを連結した配列
+        offsets (numpy.ndarray): 各論理式のトークン列の開始位置(長さは論理式数+1)
+        y (numpy.ndarray): 各論理式の目的変数
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    np.save(os.path.join(dir_path, "tokens.npy"), np.asarray(tokens, dtype=np.int64))
+    np.save(os.path.join(dir_path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(dir_path, "y.npy"), np.asarray(y, dtype=np.float32))
+
+
+class MemmapDataset(torch.utils.data.Dataset):
+    """MemmapDataset
+
+    save_token_datasetで保存したトークン列をメモリマップで読み込むデータセット
+    配列はワーカープロセスごとに開き直すため、num_workers > 0でも配列はコピーされず、
+    OSのページキャッシュが共有される
+
+    Attributes:
+        dir_path (str): save_token_datasetで保存したディレクトリのパス
+        lengths (numpy.ndarray): 各論理式のトークン列の長さ
+    """
+
+    def __init__(self, dir_path):
+        self.dir_path = dir_path
+        self.tokens = None
+        self.offsets = None
+        self.y = None
+        self.open()
+        self.lengths = np.diff(self.offsets)
+
+    def open(self):
+        """open
+
+        配列をメモリマップで開く関数
+        """
+        self.tokens = np.load(os.path.join(self.dir_path, "tokens.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(self.dir_path, "offsets.npy"), mmap_mode="r")
+        self.y = np.load(os.path.join(self.dir_path, "y.npy"), mmap_mode="r")
+
+    def __getstate__(self):
+        # ワーカープロセスにはメモリマップを渡さず、パスだけを渡す
+        state = self.__dict__.copy()
+        state["tokens"] = state["offsets"] = state["y"] = None
+        return state
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, idx):
+        if self.tokens is None:
+            self.open()
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return torch.from_numpy(np.array(self.tokens[start:end])), torch.tensor(self.y[idx]).reshape(1)
+
+
+class BucketBatchSampler(torch.utils.data.Sampler):
+    """BucketBatchSampler
+
+    系列長が近いデータを同じミニバッチにまとめるサンプラー
+    シャッフルしたインデックスをbucket_size個のバッチ分ずつ系列長でソートしてからバッチに分け、
+    バッチの順番をシャッフルする
+
+    Attributes:
+        lengths (numpy.ndarray): 各データの系列長
+        batch_size (int): バッチサイズ
+        bucket_size (int): 1つのバケットに含めるバッチ数
+        shuffle (bool): シャッフルするかどうか
+        drop_last (bool): バッチサイズに満たない最後のバッチを捨てるかどうか
+    """
+
+    def __init__(self, lengths, batch_size, bucket_size=100, shuffle=True, drop_last=False):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_size = bucket_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+
+    def __iter__(self):
+        if self.shuffle:
+            indices = torch.randperm(len(self.lengths)).numpy()
+        else:
+            indices = np.arange(len(self.lengths))
+        batches = []
+        n_bucket = self.batch_size * self.bucket_size
+        for start in range(0, len(indices), n_bucket):
+            bucket = indices[start:start + n_bucket]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            for batch_start in range(0, len(bucket), self.batch_size):
+                batch = bucket[batch_start:batch_start + self.batch_size]
+                if self.drop_last and len(batch) < self.batch_size:
+                    continue
+                batches.append(batch.tolist())
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches)).tolist()]
+        return iter(batches)
+
+    def __len__(self):
+        n_bucket = self.batch_size * self.bucket_size
+        n_full, rest = divmod(len(self.lengths), n_bucket)
+        # 最後のバケットだけ端数のバッチができる
+        if self.drop_last:
+            return n_full * self.bucket_size + rest // self.batch_size
+        return n_full * self.bucket_size + -(-rest // self.batch_size)
+
+
+def pad_collate(batch):
+    """pad_collate
+
+    ミニバッチ内の最長の系列長に合わせてトークン列をパディングする関数(DataLoaderのcollate_fn)
+
+    Args:
+        batch (list): (トークン列, 目的変数)のリスト
+
+    Returns:
+        X (torch.Tensor): (バッチサイズ, 最長の系列長)のトークンIDのテンソル、パディングは0
+        y (torch.Tensor): (バッチサイズ, 1)の目的変数のテンソル
+    """
+    sequences, y = zip(*batch)
+    lengths = torch.tensor([len(sequence) for sequence in sequences])
+    X = torch.zeros((len(sequences), int(lengths.max())), dtype=torch.long)
+    mask = torch.arange(X.shape[1]) < lengths.unsqueeze(1)
+    X[mask] = torch.cat(sequences)
+    return X, torch.stack(y)
@@ -1,3 +1,6 @@
+import os
+import threading
+import time
 import numpy as np
 import torch
 
@@ -6,22 +9,38 @@ class EarlyStopping:
     """EarlyStopping
 
     Early Stoppingを行うためのクラス
+    ベストモデルの重みはCPU上にコピーして保持し、ディスクへの保存はバックグラウンドのスレッドで行う
+    保存待ちの重みがある間に新しいベストモデルが見つかった場合は、新しい重みのみを保存する
 
     Attributes:
         patience (int): Early Stoppingを行うまでのエポック数
         verbose (bool): Early Stoppingの経過を表示するかどうか
         path (str): ベストモデルを保存するパス
         trace_func (function): Early Stoppingの経過を表示する関数
+        checkpoint_interval (float): ディスクへ保存する最短の間隔(秒)
+        best_state_dict (dict): ベストモデルの重み(CPU上のコピー)
+        error (Exception): 保存スレッドで発生した例外、flushまたはcloseで送出する
     """
 
-    def __init__(self, patience=10, verbose=False, path='checkpoint.pt', trace_func=print):
+    def __init__(self, patience=10, verbose=False, path='checkpoint.pt', trace_func=print,
+                 checkpoint_interval=0):
         self.patience = patience  # 設定ストップカウンタ
         self.verbose = verbose  # 表示の有無
         self.counter = 0  # 現在のカウンタ値
         self.best_score = None  # ベストスコア
         self.early_stop = False  # ストップフラグ
-        self.val_loss_min = np.Inf  # 前回のベストスコア記憶用
+        self.val_loss_min = np.inf  # 前回のベストスコア記憶用
         self.path = path  # ベストモデル格納path
+        self.trace_func = trace_func  # 経過を表示する関数
+        self.checkpoint_interval = checkpoint_interval  # 保存間隔(秒)
+        self.best_state_dict = None  # ベストモデルの重み
+        self.pending_state_dict = None  # 保存待ちの重み
+        self.is_writing = False  # 保存中かどうか
+        self.is_closed = False  # 保存スレッドの終了フラグ
+        self.last_write_time = None  # 前回保存した時刻
+        self.error = None  # 保存スレッドで発生した例外
+        self.condition = threading.Condition()
+        self.writer = None  # 保存スレッド
 
     def __call__(self, val_loss, model):
         """__call__
@@ -40,7 +59,7 @@ class EarlyStopping:
             self.counter += 1  # ストップカウンタを+1
             if self.verbose:  # 表示を有効にした場合は経過を表示
                 # 現在のカウンタを表示する
-                print(
+                self.trace_func(
                     f'EarlyStopping counter: {self.counter} out of {self.patience}')
             if self.counter >= self.patience:  # 設定カウントを上回ったらストップフラグをTrueに変更
                 self.early_stop = True
@@ -52,14 +71,96 @@ class EarlyStopping:
     def checkpoint(self, val_loss, model):
         """checkpoint
 
-        ベストスコアを更新した場合にモデルを保存する関数
+        ベストスコアを更新した場合にモデルの重みをCPUにコピーし、保存スレッドに渡す関数
 
         Args:
             val_loss (float): データの損失値
             model (torch.nn.Module): 機械学習モデル
         """
         if self.verbose:  # 表示を有効にした場合は、前回のベストスコアからどれだけ更新したか？を表示
-            print(
+            self.trace_func(
                 f'Validation loss decreased ({self.val_loss_min:.6f} --> {val_loss:.6f}).  Saving model ...')
-        torch.save(model.state_dict(), self.path)  # ベストモデルを指定したpathに保存
+        self.best_state_dict = {key: value.detach().to("cpu", copy=True)
+                                for key, value in model.state_dict().items()}
+        with self.condition:
+            # 保存待ちの重みは新しい重みで置き換える
+            self.pending_state_dict = self.best_state_dict
+            self.condition.notify_all()
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, daemon=True)
+            self.writer.start()
         self.val_loss_min = val_loss  # その時のlossを記録する
+
+    def write_loop(self):
+        """write_loop
+
+        保存待ちの重みをディスクに書き込む保存スレッドの処理
+        """
+        while True:
+            with self.condition:
+                while self.pending_state_dict is None and not self.is_closed:
+                    self.condition.wait()
+                if self.pending_state_dict is None:
+                    return
+                if self.last_write_time is not None and not self.is_closed:
+                    # 保存間隔が空くまで待つ、その間に新しい重みが来たらそちらを保存する
+                    wait_time = self.last_write_time + self.checkpoint_interval - time.monotonic()
+                    if wait_time > 0:
+                        self.condition.wait(wait_time)
+                        continue
+                state_dict = self.pending_state_dict
+                self.pending_state_dict = None
+                self.is_writing = True
+            error = None
+            try:
+                tmp_path = self.path + ".tmp"
+                torch.save(state_dict, tmp_path)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                error = e
+            finally:
+                # 保存に失敗しても待っているスレッドを起こし、例外はflushまたはcloseで送出する
+                with self.condition:
+                    if error is not None:
+                        self.error = error
+                    self.is_writing = False
+                    self.last_write_time = time.monotonic()
+                    self.condition.notify_all()
+
+    def raise_error(self):
+        """raise_error
+
+        保存スレッドで発生した例外があれば送出する関数
+        """
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """flush
+
+        保存待ちの重みが全てディスクに書き込まれるまで待つ関数
+        保存に失敗していた場合はその例外を送出する
+        """
+        with self.condition:
+            # 保存間隔を待たずに書き込ませる
+            self.last_write_time = None
+            self.condition.notify_all()
+            while self.writer is not None and (self.pending_state_dict is not None or self.is_writing):
+                self.condition.wait()
+            self.raise_error()
+
+    def close(self):
+        """close
+
+        保存待ちの重みを書き込んでから保存スレッドを終了する関数
+        学習を終了するときに必ず呼び出す
+        保存に失敗していた場合はその例外を送出する
+        """
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify_all()
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        self.raise_error()
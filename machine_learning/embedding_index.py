@@ -0,0 +1,241 @@
+import json
+import os
+import numpy as np
+import torch
+
+
+def extract_embeddings(model, loader, device="cpu"):
+    """extract_embeddings
+
+    学習済みのモデルで論理式の埋め込みをまとめて計算する関数
+
+    Args:
+        model (model.GCN or model.LSTM): embeddingメソッドを持つ学習済みのモデル
+        loader (torch.utils.data.DataLoader): 論理式のデータローダー
+            GCNの場合はtorch_geometricのDataLoader、LSTMの場合はpad_collateで(X, y)を返すDataLoader
+        device (str): 計算するデバイス
+
+    Returns:
+        (numpy.ndarray): (論理式数, 埋め込みの次元数)のfloat32の配列
+    """
+    model = model.to(device).eval()
+    embeddings = []
+    with torch.inference_mode():
+        for batch in loader:
+            if isinstance(batch, (list, tuple)):
+                batch = batch[0]
+            embeddings.append(model.embedding(batch.to(device)).float().cpu().numpy())
+    return np.concatenate(embeddings)
+
+
+def normalize_rows(vectors):
+    """normalize_rows
+
+    各行をL2ノルムで割って単位ベクトルにする関数(ノルムが0の行はそのまま)
+
+    Args:
+        vectors (numpy.ndarray): (個数, 次元数)の配列
+
+    Returns:
+        (numpy.ndarray): 正規化したfloat32の配列
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def top_k(scores, k):
+    """top_k
+
+    各行のスコアの上位k個のインデックスを降順に取り出す関数
+
+    Args:
+        scores (numpy.ndarray): (クエリ数, 候補数)のスコア
+        k (int): 取り出す個数
+
+    Returns:
+        top_scores (numpy.ndarray): (クエリ数, k)のスコア
+        top_indices (numpy.ndarray): (クエリ数, k)の候補のインデックス
+    """
+    k = min(k, scores.shape[1])
+    indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+class EmbeddingIndex():
+    """EmbeddingIndex
+
+    公理の埋め込みを保持し、コサイン類似度で近い公理を検索するクラス
+    埋め込みは単位ベクトルに正規化したfloat32の配列として保持し、内積でコサイン類似度を計算する
+    近似検索では乱択超平面によるLSHの複数のハッシュ表のいずれかでクエリと同じバケットに入った公理のみを候補とし、
+    候補についてのみ正確な類似度を計算する
+    ハッシュ表は符号でソートした公理のインデックスの配列として持ち、バケットは二分探索で取り出す
+
+    Attributes:
+        embeddings (numpy.ndarray): (公理数, 次元数)の正規化した埋め込み
+        ids (list): 公理の名前のリスト
+        planes (numpy.ndarray): (ハッシュ表の数, 次元数, ビット数)のLSHの超平面、build_lshを呼ぶまではNone
+        sorted_codes (numpy.ndarray): (ハッシュ表の数, 公理数)のソートした符号、build_lshを呼ぶまではNone
+        orders (numpy.ndarray): (ハッシュ表の数, 公理数)のsorted_codesの順に並べた公理のインデックス
+    """
+
+    def __init__(self, embeddings, ids=None):
+        self.embeddings = normalize_rows(embeddings)
+        self.ids = list(ids) if ids is not None else list(range(len(self.embeddings)))
+        if len(self.ids) != len(self.embeddings):
+            raise ValueError("the number of ids does not match the number of embeddings")
+        self.planes = None
+        self.sorted_codes = None
+        self.orders = None
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def save(self, dir_path):
+        """save
+
+        インデックスをディレクトリに保存する関数
+        embeddings.npy, ids.json と、LSHを構築済みならlsh_planes.npy, lsh_codes.npy, lsh_orders.npyを書き込む
+
+        Args:
+            dir_path (str): 保存するディレクトリ
+        """
+        os.makedirs(dir_path, exist_ok=True)
+        np.save(os.path.join(dir_path, "embeddings.npy"), self.embeddings)
+        with open(os.path.join(dir_path, "ids.json"), "w") as f:
+            json.dump(self.ids, f)
+        if self.planes is not None:
+            np.save(os.path.join(dir_path, "lsh_planes.npy"), self.planes)
+            np.save(os.path.join(dir_path, "lsh_codes.npy"), self.sorted_codes)
+            np.save(os.path.join(dir_path, "lsh_orders.npy"), self.orders)
+
+    @classmethod
+    def load(cls, dir_path, mmap=True):
+        """load
+
+        saveで保存したインデックスを読み込む関数
+
+        Args:
+            dir_path (str): 保存したディレクトリ
+            mmap (bool): 埋め込みをメモリマップで開くかどうか
+
+        Returns:
+            (EmbeddingIndex): 読み込んだインデックス
+        """
+        index = cls.__new__(cls)
+        mmap_mode = "r" if mmap else None
+        index.embeddings = np.load(os.path.join(dir_path, "embeddings.npy"), mmap_mode=mmap_mode)
+        with open(os.path.join(dir_path, "ids.json")) as f:
+            index.ids = json.load(f)
+        index.planes = None
+        index.sorted_codes = None
+        index.orders = None
+        if os.path.exists(os.path.join(dir_path, "lsh_planes.npy")):
+            index.planes = np.load(os.path.join(dir_path, "lsh_planes.npy"))
+            index.sorted_codes = np.load(os.path.join(dir_path, "lsh_codes.npy"), mmap_mode=mmap_mode)
+            index.orders = np.load(os.path.join(dir_path, "lsh_orders.npy"), mmap_mode=mmap_mode)
+        return index
+
+    def build_lsh(self, n_tables=32, n_bits=12, seed=0, chunk_size=65536):
+        """build_lsh
+
+        乱択超平面によるLSHのハッシュ表を構築する関数
+        n_bitsを大きくするとバケットが小さくなり速くなるが、n_tablesを増やさないと再現率が下がる
+
+        Args:
+            n_tables (int): ハッシュ表の数
+            n_bits (int): 1つのハッシュ表の符号のビット数(32以下)
+            seed (int): 超平面の乱数のシード値
+            chunk_size (int): 一度に符号化する公理の数
+        """
+        if not 0 < n_bits <= 32:
+            raise ValueError("n_bits must be between 1 and 32")
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal(
+            (n_tables, self.embeddings.shape[1], n_bits)).astype(np.float32)
+        codes = np.concatenate([
+            self.hash(self.embeddings[start:start + chunk_size])
+            for start in range(0, len(self.embeddings), chunk_size)], axis=1)
+        self.orders = np.argsort(codes, axis=1, kind="stable").astype(np.int64)
+        self.sorted_codes = np.take_along_axis(codes, self.orders, axis=1)
+
+    def hash(self, vectors):
+        """hash
+
+        ベクトルを各ハッシュ表の符号に変換する関数
+
+        Args:
+            vectors (numpy.ndarray): (個数, 次元数)の配列
+
+        Returns:
+            (numpy.ndarray): (ハッシュ表の数, 個数)のuint32の符号
+        """
+        bits = np.einsum("nd,tdb->tnb", np.asarray(vectors, dtype=np.float32), self.planes) > 0
+        weights = np.left_shift(np.uint32(1), np.arange(self.planes.shape[2], dtype=np.uint32))
+        return (bits.astype(np.uint32) * weights).sum(axis=2, dtype=np.uint32)
+
+    def search(self, queries, k=10, approximate=False, chunk_size=262144):
+        """search
+
+        クエリの埋め込みとコサイン類似度が高い公理を検索する関数
+
+        Args:
+            queries (numpy.ndarray): (クエリ数, 次元数)または(次元数,)のクエリの埋め込み
+            k (int): 取り出す公理の数
+            approximate (bool): LSHで候補を絞り込んでから検索するかどうか(build_lshが必要)
+            chunk_size (int): 正確な検索で一度に類似度を計算する公理の数
+
+        Returns:
+            scores (numpy.ndarray): (クエリ数, k)のコサイン類似度
+            indices (numpy.ndarray): (クエリ数, k)の公理のインデックス、idsで名前に変換できる
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        if approximate:
+            if self.planes is None:
+                raise RuntimeError("build_lsh must be called before approximate search")
+            return self.search_lsh(queries, k)
+        best_scores, best_indices = None, None
+        for start in range(0, len(self.embeddings), chunk_size):
+            scores, indices = top_k(queries @ self.embeddings[start:start + chunk_size].T, k)
+            indices += start
+            if best_scores is not None:
+                scores, order = top_k(np.concatenate([best_scores, scores], axis=1), k)
+                indices = np.take_along_axis(
+                    np.concatenate([best_indices, indices], axis=1), order, axis=1)
+            best_scores, best_indices = scores, indices
+        return best_scores, best_indices
+
+    def search_lsh(self, queries, k):
+        """search_lsh
+
+        いずれかのハッシュ表でクエリと同じバケットに入った公理から、コサイン類似度が高い公理を検索する関数
+        候補がk個に満たないクエリは全件を検索する
+
+        Args:
+            queries (numpy.ndarray): (クエリ数, 次元数)の正規化したクエリの埋め込み
+            k (int): 取り出す公理の数
+
+        Returns:
+            scores (numpy.ndarray): (クエリ数, k)のコサイン類似度
+            indices (numpy.ndarray): (クエリ数, k)の公理のインデックス
+        """
+        query_codes = self.hash(queries)
+        all_scores, all_indices = [], []
+        for i, query in enumerate(queries):
+            buckets = []
+            for table in range(len(self.planes)):
+                code = query_codes[table, i]
+                low = np.searchsorted(self.sorted_codes[table], code, side="left")
+                high = np.searchsorted(self.sorted_codes[table], code, side="right")
+                buckets.append(self.orders[table, low:high])
+            candidates = np.unique(np.concatenate(buckets))
+            if len(candidates) < k:
+                scores, indices = self.search(query, k)
+            else:
+                scores, order = top_k((self.embeddings[candidates] @ query)[np.newaxis], k)
+                indices = candidates[order]
+            all_scores.append(scores[0])
+            all_indices.append(indices[0])
+        return np.stack(all_scores), np.stack(all_indices)
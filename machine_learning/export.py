@@ -0,0 +1,159 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from model import GCN
+
+
+def gcn_normalized_adjacency(edge_index, num_nodes: int):
+    """gcn_normalized_adjacency
+
+    自己ループを加えた隣接行列を次数で正規化した疎行列 D^-1/2 (A + I) D^-1/2 を作成する関数
+    torch_geometricのGCNConvと同じく、エッジ(source, target)はsourceからtargetへの伝播として扱う
+
+    Args:
+        edge_index (torch.Tensor): (2, エッジ数)のエッジのテンソル
+        num_nodes (int): ノード数
+
+    Returns:
+        (torch.Tensor): (ノード数, ノード数)の疎行列、[target, source]に正規化した重みを持つ
+    """
+    loops = torch.arange(num_nodes, device=edge_index.device)
+    sources = torch.cat([edge_index[0], loops])
+    targets = torch.cat([edge_index[1], loops])
+    weights = torch.ones(sources.shape[0], device=edge_index.device)
+    degrees = torch.zeros(num_nodes, device=edge_index.device).index_add_(0, targets, weights)
+    inverse_sqrt = degrees.pow(-0.5)
+    weights = inverse_sqrt[sources] * inverse_sqrt[targets]
+    return torch.sparse_coo_tensor(torch.stack([targets, sources]), weights,
+                                   (num_nodes, num_nodes)).coalesce()
+
+
+class SparseGCNConv(nn.Module):
+    """SparseGCNConv
+
+    GCNConvの推論を疎行列積のみで行う層
+
+    Attributes:
+        lin (torch.nn.Linear): 重み(バイアスなし)
+        bias (torch.nn.Parameter): バイアス
+    """
+
+    def __init__(self, in_channels, out_channels):
+        super(SparseGCNConv, self).__init__()
+        self.lin = nn.Linear(in_channels, out_channels, bias=False)
+        self.bias = nn.Parameter(torch.zeros(out_channels))
+
+    def forward(self, x, adjacency):
+        return torch.sparse.mm(adjacency, self.lin(x)) + self.bias
+
+
+class SparseGCN(nn.Module):
+    """SparseGCN
+
+    model.GCNと同じ計算をtorch_geometricを使わずに行う推論用のモデル
+    TorchScriptに変換でき、読み込みにtorch以外のライブラリを必要としない
+
+    Attributes:
+        n_features (int): 入力の次元数
+        n_conv_hidden (int): GCNの隠れ層の数
+        dim (int): GCNの次元数
+        n_mlp_hidden (int): MLPの隠れ層の数
+    """
+
+    def __init__(self, n_features, n_conv_hidden, dim, n_mlp_hidden):
+        super(SparseGCN, self).__init__()
+        self.graphconv1 = SparseGCNConv(n_features, dim)
+        self.bn1 = nn.BatchNorm1d(dim)
+        self.graphconv_hidden = nn.ModuleList(
+            [SparseGCNConv(dim, dim) for _ in range(n_conv_hidden)])
+        self.bn_conv = nn.ModuleList([nn.BatchNorm1d(dim) for _ in range(n_conv_hidden)])
+        self.mlp_hidden = nn.ModuleList([nn.Linear(dim, dim) for _ in range(n_mlp_hidden)])
+        self.bn_mlp = nn.ModuleList([nn.BatchNorm1d(dim) for _ in range(n_mlp_hidden)])
+        self.mlp_out = nn.Linear(dim, 1)
+
+    @classmethod
+    def from_gcn(cls, gcn):
+        """from_gcn
+
+        学習済みのmodel.GCNの重みを引き継いだSparseGCNを作成する関数
+
+        Args:
+            gcn (model.GCN): 学習済みのGCN
+
+        Returns:
+            (SparseGCN): 推論モードのSparseGCN
+        """
+        sparse_gcn = cls(gcn.n_features, gcn.n_conv_hidden, gcn.dim, gcn.n_mlp_hidden)
+        # GCNConvの重みはlin.weightとbiasなので、state_dictのキーはそのまま対応する
+        sparse_gcn.load_state_dict(gcn.state_dict())
+        return sparse_gcn.eval()
+
+    def forward(self, x, edge_index, batch, num_graphs: int):
+        adjacency = gcn_normalized_adjacency(edge_index, x.shape[0])
+        x = F.relu(self.graphconv1(x, adjacency))
+        x = self.bn1(x)
+        for graphconv, bn_conv in zip(self.graphconv_hidden, self.bn_conv):
+            x = graphconv(x, adjacency)
+            x = bn_conv(x)
+        x = torch.zeros((num_graphs, x.shape[1]), dtype=x.dtype).index_add_(0, batch, x)
+        for fc_mlp, bn_mlp in zip(self.mlp_hidden, self.bn_mlp):
+            x = F.relu(fc_mlp(x))
+            x = bn_mlp(x)
+        x = self.mlp_out(x)
+        return x
+
+
+def export_model(model, path, example_input=None):
+    """export_model
+
+    学習済みのモデルをTorchScriptに変換して保存する関数
+    GCNはSparseGCNに変換してからscriptし、それ以外のモデルはexample_inputでtraceする
+
+    Args:
+        model (torch.nn.Module): model.pyの学習済みのモデル
+        path (str): 保存するパス
+        example_input (torch.Tensor): trace用の入力(GCN以外で必須)
+            NN, CNN, RNN, LSTMは(バッチサイズ, 系列長)のトークンIDのテンソル
+
+    Returns:
+        (torch.jit.ScriptModule): 変換したモデル
+    """
+    model = model.eval()
+    if isinstance(model, GCN):
+        exported = torch.jit.script(SparseGCN.from_gcn(model))
+    else:
+        with torch.inference_mode():
+            exported = torch.jit.trace(model, example_input)
+    exported = torch.jit.freeze(exported)
+    torch.jit.save(exported, path)
+    return exported
+
+
+def check_export(model, exported, inputs, atol=1e-5):
+    """check_export
+
+    変換したモデルの出力が元のモデルの出力と一致するかを確認する関数
+
+    Args:
+        model (torch.nn.Module): 元のモデル
+        exported (torch.jit.ScriptModule): 変換したモデル
+        inputs (list): 入力のリスト、GCNの場合はtorch_geometricのDataまたはBatch(ミニバッチ)のリスト
+        atol (float): 許容する絶対誤差
+
+    Returns:
+        (float): 出力の差の絶対値の最大値
+    """
+    model = model.eval()
+    max_error = 0.0
+    with torch.inference_mode():
+        for data in inputs:
+            expected = model(data)
+            if isinstance(model, GCN):
+                # GraphBatchBuilderで作ったミニバッチ(Data)はnum_graphsを持たない
+                num_graphs = getattr(data, "num_graphs", None) or int(data.batch.max()) + 1
+                actual = exported(data.x, data.edge_index, data.batch, int(num_graphs))
+            else:
+                actual = exported(data)
+            max_error = max(max_error, (expected - actual).abs().max().item())
+    assert max_error <= atol, f"exported model differs from eager model: {max_error}"
+    return max_error
@@ -0,0 +1,338 @@
+import json
+from collections import Counter
+from multiprocessing import Pool
+import numpy as np
+import scipy.sparse as sp
+
+PAD = "<pad>"
+UNK = "<unk>"
+# term walkのハッシュ計算に用いる素数
+HASH_PRIME = 1000003
+
+
+class Vocabulary():
+    """Vocabulary
+
+    ノードのラベルとトークンIDを対応付けるクラス
+    ID 0はパディング、ID 1は未知語に予約されている
+
+    Attributes:
+        token2id (dict): ラベルをkey、トークンIDをvalueとした辞書
+        id2token (list): トークンIDの順に並べたラベルのリスト
+    """
+
+    def __init__(self, tokens=None):
+        self.token2id = dict()
+        self.id2token = []
+        for token in [PAD, UNK] + list(tokens or []):
+            self.add(token)
+
+    def __len__(self):
+        return len(self.id2token)
+
+    def add(self, token):
+        """add
+
+        ラベルを語彙に追加する関数
+
+        Args:
+            token (str): 追加するラベル
+
+        Returns:
+            (int): ラベルのトークンID
+        """
+        if token not in self.token2id:
+            self.token2id[token] = len(self.id2token)
+            self.id2token.append(token)
+        return self.token2id[token]
+
+    def get_id(self, token):
+        """get_id
+
+        ラベルのトークンIDを取得する関数、語彙にないラベルは未知語のIDになる
+
+        Args:
+            token (str): ラベル
+
+        Returns:
+            (int): トークンID
+        """
+        return self.token2id.get(token, 1)
+
+    def save(self, path):
+        """save
+
+        語彙をjsonファイルに保存する関数
+
+        Args:
+            path (str): 保存するjsonファイルのパス
+        """
+        with open(path, "w") as f:
+            json.dump(self.id2token[2:], f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """load
+
+        jsonファイルから語彙を読み込む関数
+
+        Args:
+            path (str): 語彙のjsonファイルのパス
+
+        Returns:
+            (Vocabulary): 読み込んだ語彙
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def build(cls, json_paths, min_count=1):
+        """build
+
+        正規化された論理式のjsonファイルから語彙を作成する関数
+
+        Args:
+            json_paths (list): 正規化された論理式のjsonファイルのパスのリスト
+            min_count (int): 語彙に含めるラベルの最小出現回数
+
+        Returns:
+            (Vocabulary): 作成した語彙
+        """
+        counter = Counter()
+        for path in json_paths:
+            with open(path) as f:
+                counter.update(node["label"] for node in json.load(f)["nodes"])
+        return cls(sorted(token for token, count in counter.items()
+                          if count >= min_count))
+
+
+def pad_sequences(tokens, offsets, max_length=None):
+    """pad_sequences
+
+    連結されたトークン列をパディングした2次元配列に変換する関数
+
+    Args:
+        tokens (numpy.ndarray): 全論理式のトークンIDを連結した配列
+        offsets (numpy.ndarray): 各論理式のトークン列の開始位置(長さは論理式数+1)
+        max_length (int): 系列長の上限、Noneなら最長の系列に合わせる
+
+    Returns:
+        (numpy.ndarray): (論理式数, 系列長)のトークンIDの配列
+    """
+    lengths = np.diff(offsets)
+    if max_length is None:
+        max_length = int(lengths.max()) if len(lengths) else 0
+    lengths = np.minimum(lengths, max_length)
+    padded = np.zeros((len(lengths), max_length), dtype=tokens.dtype)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    padded[rows, columns] = tokens[np.repeat(offsets[:-1], lengths) + columns]
+    return padded
+
+
+class Featurizer():
+    """Featurizer
+
+    Converter.save_normalized_formulaで保存した正規化された論理式のグラフをまとめて走査し、
+    トークン列とterm walkの特徴量に変換するクラス
+
+    Attributes:
+        vocabulary (Vocabulary): ラベルとトークンIDの語彙
+        n_features (int): term walkの特徴量の次元数(ハッシュのバケット数)
+        walk_length (int): term walkの最大の長さ(ノード数)
+    """
+
+    def __init__(self, vocabulary, n_features=2**14, walk_length=3):
+        self.vocabulary = vocabulary
+        self.n_features = n_features
+        self.walk_length = walk_length
+
+    def load_graph(self, path):
+        """load_graph
+
+        正規化された論理式のjsonファイルを読み込み、配列に変換する関数
+        ノードIDは0からの連番に振り直す
+
+        Args:
+            path (str): 正規化された論理式のjsonファイルのパス
+
+        Returns:
+            label_ids (numpy.ndarray): 各ノードのトークンID
+            is_token (numpy.ndarray): 各ノードがトークン列に含まれるかどうか(coordinateノードはFalse)
+            sources (numpy.ndarray): エッジの始点
+            targets (numpy.ndarray): エッジの終点
+        """
+        with open(path) as f:
+            json_root = json.load(f)
+        return self.graph_arrays(json_root)
+
+    def graph_arrays(self, json_root):
+        """graph_arrays
+
+        node-link形式の正規化された論理式のグラフを配列に変換する関数
+        ノードIDは0からの連番に振り直す
+
+        Args:
+            json_root (dict): node-link形式のグラフ
+
+        Returns:
+            label_ids (numpy.ndarray): 各ノードのトークンID
+            is_token (numpy.ndarray): 各ノードがトークン列に含まれるかどうか(coordinateノードはFalse)
+            sources (numpy.ndarray): エッジの始点
+            targets (numpy.ndarray): エッジの終点
+        """
+        nodes = json_root["nodes"]
+        links = json_root["links"]
+        node2index = {node["id"]: index for index, node in enumerate(nodes)}
+        label_ids = np.fromiter((self.vocabulary.get_id(node["label"]) for node in nodes),
+                                dtype=np.int64, count=len(nodes))
+        is_token = np.fromiter((node.get("token_type") != "coordinate" for node in nodes),
+                               dtype=bool, count=len(nodes))
+        edges = np.fromiter((node2index[node_id] for link in links
+                             for node_id in (link["source"], link["target"])),
+                            dtype=np.int64, count=2 * len(links)).reshape(-1, 2)
+        return label_ids, is_token, edges[:, 0], edges[:, 1]
+
+    def token_sequence(self, label_ids, is_token, sources, targets):
+        """token_sequence
+
+        根から深さ優先(行きがけ順)にグラフを走査し、トークン列を作成する関数
+
+        Args:
+            label_ids (numpy.ndarray): 各ノードのトークンID
+            is_token (numpy.ndarray): 各ノードがトークン列に含まれるかどうか
+            sources (numpy.ndarray): エッジの始点
+            targets (numpy.ndarray): エッジの終点
+
+        Returns:
+            (numpy.ndarray): トークンIDの列
+        """
+        n_nodes = len(label_ids)
+        order = np.argsort(sources, kind="stable")
+        indptr = np.searchsorted(sources[order], np.arange(n_nodes + 1))
+        has_parent = np.zeros(n_nodes, dtype=bool)
+        has_parent[targets] = True
+        # 走査は逐次的なので、要素アクセスの速いlistに変換してから行う
+        children = targets[order].tolist()
+        indptr = indptr.tolist()
+        token_labels = np.where(is_token, label_ids, -1).tolist()
+        sequence = []
+        stack = np.flatnonzero(~has_parent)[::-1].tolist()
+        while stack:
+            node = stack.pop()
+            if token_labels[node] >= 0:
+                sequence.append(token_labels[node])
+            stack.extend(reversed(children[indptr[node]:indptr[node + 1]]))
+        return np.array(sequence, dtype=np.int64)
+
+    def term_walks(self, label_ids, graph_ids, sources, targets, n_graphs):
+        """term_walks
+
+        複数のグラフをまとめたグラフ上で長さwalk_length以下の全てのwalkを列挙し、
+        walkのラベル列をハッシュした特徴量の出現回数を数える関数
+
+        Args:
+            label_ids (numpy.ndarray): 各ノードのトークンID
+            graph_ids (numpy.ndarray): 各ノードが属するグラフの番号
+            sources (numpy.ndarray): エッジの始点
+            targets (numpy.ndarray): エッジの終点
+            n_graphs (int): グラフの数
+
+        Returns:
+            (scipy.sparse.csr_matrix): (グラフ数, n_features)のterm walkの出現回数の行列
+        """
+        n_nodes = len(label_ids)
+        order = np.argsort(sources, kind="stable")
+        children = targets[order]
+        indptr = np.searchsorted(sources[order], np.arange(n_nodes + 1))
+        degrees = np.diff(indptr)
+
+        ends = np.arange(n_nodes)
+        hashes = (label_ids + 1) % self.n_features
+        rows = [graph_ids]
+        columns = [hashes]
+        for length in range(2, self.walk_length + 1):
+            # 各walkの終点の子でwalkを延長する
+            counts = degrees[ends]
+            starts = np.repeat(indptr[ends] - np.cumsum(counts) + counts, counts)
+            ends = children[starts + np.arange(counts.sum())]
+            hashes = (np.repeat(hashes, counts) * HASH_PRIME +
+                      label_ids[ends] + length) % self.n_features
+            rows.append(graph_ids[ends])
+            columns.append(hashes)
+        rows = np.concatenate(rows)
+        columns = np.concatenate(columns)
+        data = np.ones(len(rows), dtype=np.float32)
+        walks = sp.coo_matrix((data, (rows, columns)),
+                              shape=(n_graphs, self.n_features))
+        return walks.tocsr()
+
+    def transform(self, json_paths):
+        """transform
+
+        正規化された論理式のjsonファイルをまとめてトークン列とterm walkの特徴量に変換する関数
+
+        Args:
+            json_paths (list): 正規化された論理式のjsonファイルのパスのリスト
+
+        Returns:
+            tokens (numpy.ndarray): 全論理式のトークンIDを連結した配列
+            offsets (numpy.ndarray): 各論理式のトークン列の開始位置(長さは論理式数+1)
+            walks (scipy.sparse.csr_matrix): (論理式数, n_features)のterm walkの出現回数の行列
+        """
+        sequences = []
+        all_label_ids = []
+        all_graph_ids = []
+        all_sources = []
+        all_targets = []
+        node_offset = 0
+        for graph_id, path in enumerate(json_paths):
+            label_ids, is_token, sources, targets = self.load_graph(path)
+            sequences.append(self.token_sequence(
+                label_ids, is_token, sources, targets))
+            all_label_ids.append(label_ids)
+            all_graph_ids.append(np.full(len(label_ids), graph_id))
+            all_sources.append(sources + node_offset)
+            all_targets.append(targets + node_offset)
+            node_offset += len(label_ids)
+
+        lengths = [len(sequence) for sequence in sequences]
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        tokens = np.concatenate(sequences) if sequences else np.zeros(0, dtype=np.int64)
+        if not json_paths:
+            return tokens, offsets, sp.csr_matrix((0, self.n_features), dtype=np.float32)
+        walks = self.term_walks(np.concatenate(all_label_ids),
+                                np.concatenate(all_graph_ids),
+                                np.concatenate(all_sources),
+                                np.concatenate(all_targets),
+                                len(json_paths))
+        return tokens, offsets, walks
+
+    def transform_parallel(self, json_paths, processes=None, chunk_size=1024):
+        """transform_parallel
+
+        transformをchunk_size個ずつのファイルに分けてプロセスプールで並列に実行し、結果を連結する関数
+
+        Args:
+            json_paths (list): 正規化された論理式のjsonファイルのパスのリスト
+            processes (int): プロセス数、Noneならcpu数
+            chunk_size (int): 1プロセスにまとめて渡すファイル数
+
+        Returns:
+            tokens (numpy.ndarray): 全論理式のトークンIDを連結した配列
+            offsets (numpy.ndarray): 各論理式のトークン列の開始位置(長さは論理式数+1)
+            walks (scipy.sparse.csr_matrix): (論理式数, n_features)のterm walkの出現回数の行列
+        """
+        chunks = [json_paths[i:i + chunk_size]
+                  for i in range(0, len(json_paths), chunk_size)]
+        if len(chunks) <= 1:
+            return self.transform(json_paths)
+        with Pool(processes) as pool:
+            results = pool.map(self.transform, chunks)
+        tokens = np.concatenate([result[0] for result in results])
+        offsets = [np.zeros(1, dtype=np.int64)]
+        for _, chunk_offsets, _ in results:
+            offsets.append(chunk_offsets[1:] + offsets[-1][-1])
+        walks = sp.vstack([result[2] for result in results], format="csr")
+        return tokens, np.concatenate(offsets), walks
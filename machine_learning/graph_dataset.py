@@ -0,0 +1,180 @@
+import os
+import sys
+from itertools import chain
+import numpy as np
+import torch
+from torch_geometric.data import Data, InMemoryDataset
+sys.path.append(os.path.join(os.path.pardir))  # nopep8
+from handler import NetworkxHandler
+from featurizer import Vocabulary
+
+
+class GraphBatchBuilder():
+    """GraphBatchBuilder
+
+    NetworkxHandlerの隣接情報からGCNの入力(x, edge_index, batch)を直接作成するクラス
+    ノードの特徴量はラベルとトークンの種類(token_type)のone-hotを連結したもの
+
+    Attributes:
+        label_vocabulary (Vocabulary): ラベルの語彙
+        token_type_vocabulary (Vocabulary): トークンの種類の語彙
+        frozen (bool): Trueなら語彙にないラベルは未知語として扱い、語彙を増やさない
+    """
+
+    def __init__(self, label_vocabulary=None, token_type_vocabulary=None, frozen=False):
+        self.label_vocabulary = label_vocabulary or Vocabulary()
+        self.token_type_vocabulary = token_type_vocabulary or Vocabulary()
+        self.frozen = frozen
+
+    @property
+    def n_features(self):
+        """n_features
+
+        ノードの特徴量の次元数(GCNのn_features)
+        """
+        return len(self.label_vocabulary) + len(self.token_type_vocabulary)
+
+    def intern(self, vocabulary, token):
+        """intern
+
+        語彙からトークンIDを取得する関数、frozenでなければ未知のトークンを語彙に追加する
+
+        Args:
+            vocabulary (Vocabulary): 語彙
+            token (str): ラベルまたはトークンの種類
+
+        Returns:
+            (int): トークンID
+        """
+        if self.frozen:
+            return vocabulary.get_id(token)
+        return vocabulary.add(token)
+
+    def graph_arrays(self, nx_handler):
+        """graph_arrays
+
+        1つのグラフをラベルID、トークンの種類のID、edge_indexの配列に変換する関数
+        ノードIDは0からの連番に振り直す
+
+        Args:
+            nx_handler (NetworkxHandler): 正規化された論理式のグラフのハンドラ
+
+        Returns:
+            label_ids (numpy.ndarray): 各ノードのラベルID
+            token_type_ids (numpy.ndarray): 各ノードのトークンの種類のID
+            edge_index (numpy.ndarray): (2, エッジ数)のエッジの配列
+        """
+        nodes = np.array(nx_handler.get_all_nodes(), dtype=np.int64)
+        label_ids = np.array([self.intern(self.label_vocabulary, nx_handler.get_label(node))
+                              for node in nodes.tolist()], dtype=np.int64)
+        token_type_ids = np.array([self.intern(self.token_type_vocabulary,
+                                               nx_handler.get_attr(node).get("token_type"))
+                                   for node in nodes.tolist()], dtype=np.int64)
+        # networkxグラフを作成しないよう、ハンドラの隣接リストから直接エッジを取得する
+        source2targets = nx_handler.source2targets
+        flat_edges = np.fromiter(chain.from_iterable((source, target) for source in nodes.tolist()
+                                                     for target in source2targets.get(source, ())),
+                                 dtype=np.int64)
+        node2index = np.full(int(nodes.max()) + 1 if len(nodes) else 0, -1, dtype=np.int64)
+        node2index[nodes] = np.arange(len(nodes))
+        edge_index = node2index[flat_edges].reshape(-1, 2).T
+        return label_ids, token_type_ids, edge_index
+
+    def build_batch(self, graph_arrays_list, y=None):
+        """build_batch
+
+        複数のグラフの配列を連結し、1つのミニバッチ(Data)を作成する関数
+        各テンソルは連結後のサイズで一度だけ確保する
+
+        Args:
+            graph_arrays_list (list): graph_arraysの返り値のリスト
+            y (list): 各グラフの目的変数、Noneなら付与しない
+
+        Returns:
+            (torch_geometric.data.Data): x, edge_index, batch(, y)を持つミニバッチ
+        """
+        n_nodes = np.array([len(arrays[0]) for arrays in graph_arrays_list], dtype=np.int64)
+        n_edges = np.array([arrays[2].shape[1] for arrays in graph_arrays_list], dtype=np.int64)
+        node_offsets = np.cumsum(n_nodes) - n_nodes
+
+        label_ids = np.concatenate([arrays[0] for arrays in graph_arrays_list])
+        token_type_ids = np.concatenate([arrays[1] for arrays in graph_arrays_list])
+        edge_index = np.concatenate([arrays[2] for arrays in graph_arrays_list], axis=1)
+        edge_index += np.repeat(node_offsets, n_edges)
+
+        x = torch.zeros((int(n_nodes.sum()), self.n_features))
+        rows = torch.arange(x.shape[0])
+        x[rows, torch.from_numpy(label_ids)] = 1
+        x[rows, torch.from_numpy(token_type_ids) + len(self.label_vocabulary)] = 1
+        batch = torch.from_numpy(np.repeat(np.arange(len(n_nodes)), n_nodes))
+        data = Data(x=x, edge_index=torch.from_numpy(edge_index), batch=batch)
+        if y is not None:
+            data.y = torch.tensor(y, dtype=torch.float).reshape(-1, 1)
+        return data
+
+    def build(self, nx_handlers, y=None):
+        """build
+
+        NetworkxHandlerのリストから1つのミニバッチ(Data)を作成する関数
+
+        Args:
+            nx_handlers (list): 正規化された論理式のグラフのハンドラのリスト
+            y (list): 各グラフの目的変数、Noneなら付与しない
+
+        Returns:
+            (torch_geometric.data.Data): x, edge_index, batch(, y)を持つミニバッチ
+        """
+        return self.build_batch([self.graph_arrays(nx_handler) for nx_handler in nx_handlers], y)
+
+
+class FormulaGraphDataset(InMemoryDataset):
+    """FormulaGraphDataset
+
+    正規化された論理式のjsonファイルを一度だけ読み込んでGCNの入力に変換し、
+    ディスクに保存するデータセット
+    2回目以降は保存したテンソルを読み込むだけで、jsonの読み込みとデコードは行わない
+
+    Attributes:
+        root (str): 変換したデータを保存するディレクトリ
+        json_paths (list): 正規化された論理式のjsonファイルのパスのリスト
+        y (list): 各論理式の目的変数
+        builder (GraphBatchBuilder): 入力を作成するビルダー、語彙を固定する場合はfrozenにして渡す
+            変換済みのデータを読み込む場合は、保存されている語彙で初期化される
+    """
+
+    def __init__(self, root, json_paths=None, y=None, builder=None):
+        self.json_paths = json_paths
+        self.y = y
+        self.builder = builder or GraphBatchBuilder()
+        super(FormulaGraphDataset, self).__init__(root)
+        self.load(self.processed_paths[0])
+        if builder is None:
+            self.builder = GraphBatchBuilder(Vocabulary.load(self.processed_paths[1]),
+                                             Vocabulary.load(self.processed_paths[2]),
+                                             frozen=True)
+
+    @property
+    def processed_file_names(self):
+        return ["formula_graphs.pt", "label_vocabulary.json", "token_type_vocabulary.json"]
+
+    def process(self):
+        data_list = []
+        for index, path in enumerate(self.json_paths):
+            nx_handler = NetworkxHandler()
+            nx_handler.load_json(path)
+            label_ids, token_type_ids, edge_index = self.builder.graph_arrays(nx_handler)
+            data_list.append(Data(label_ids=torch.from_numpy(label_ids),
+                                  token_type_ids=torch.from_numpy(token_type_ids),
+                                  edge_index=torch.from_numpy(edge_index),
+                                  y=torch.tensor([[self.y[index]]], dtype=torch.float),
+                                  num_nodes=len(label_ids)))
+        # 全てのグラフを読み込んでから特徴量を作ることで、語彙のサイズを揃える
+        n_labels = len(self.builder.label_vocabulary)
+        for data in data_list:
+            data.x = torch.zeros((data.num_nodes, self.builder.n_features))
+            rows = torch.arange(data.num_nodes)
+            data.x[rows, data.label_ids] = 1
+            data.x[rows, data.token_type_ids + n_labels] = 1
+        self.save(data_list, self.processed_paths[0])
+        self.builder.label_vocabulary.save(self.processed_paths[1])
+        self.builder.token_type_vocabulary.save(self.processed_paths[2])
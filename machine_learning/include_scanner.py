@@ -0,0 +1,190 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# include('Axioms/SET001-0.ax'). や include('Axioms/SET001-0.ax',[a,b]). にマッチする正規表現
+# FILE_NAMEトークンと同じく、シングルクォートを含めたファイル名を取得する
+INCLUDE_PATTERN = re.compile(r"^include\s*\(\s*('(?:[^'\\]|\\.)*')")
+
+CACHE_VERSION = 1
+
+
+def strip_comments(line, in_block_comment):
+    """strip_comments
+
+    1行からコメント(% および /* */)を取り除く関数
+
+    Args:
+        line (str): 問題ファイルの1行
+        in_block_comment (bool): 行の開始時点でブロックコメントの中にいるかどうか
+
+    Returns:
+        text (str): コメントを取り除いた文字列
+        in_block_comment (bool): 行の終了時点でブロックコメントの中にいるかどうか
+    """
+    text = ""
+    position = 0
+    while position < len(line):
+        if in_block_comment:
+            end = line.find("*/", position)
+            if end == -1:
+                return text, True
+            position = end + 2
+            in_block_comment = False
+            continue
+        block_start = line.find("/*", position)
+        line_comment = line.find("%", position)
+        if line_comment != -1 and (block_start == -1 or line_comment < block_start):
+            return text + line[position:line_comment], False
+        if block_start == -1:
+            return text + line[position:], False
+        text += line[position:block_start]
+        position = block_start + 2
+        in_block_comment = True
+    return text, in_block_comment
+
+
+def scan_includes(problem_path):
+    """scan_includes
+
+    問題ファイルのヘッダとinclude文のみを読み、includeされているファイルのリストを取得する関数
+    文法による構文解析は行わず、include以外の文(fof(...)など)が現れた時点で読み込みを終了する
+
+    Args:
+        problem_path (str): 問題ファイルのパス
+
+    Returns:
+        included_files (list): includeされているファイルのリスト
+    """
+    included_files = []
+    statement = ""
+    in_block_comment = False
+    with open(problem_path, "r", encoding="utf-8", errors="replace") as problem_file:
+        for line in problem_file:
+            text, in_block_comment = strip_comments(line, in_block_comment)
+            statement += text.strip()
+            if not statement:
+                continue
+            if not "include".startswith(statement[:7]):
+                # include以外の文が始まったので、以降にinclude文は無いとみなす
+                break
+            # include文が複数行にわたる場合は文末の "." まで読み進める
+            while statement.startswith("include") and ")." in statement:
+                end = statement.index(").") + 2
+                match = INCLUDE_PATTERN.match(statement[:end])
+                if match:
+                    included_files.append(match.group(1))
+                statement = statement[end:].lstrip()
+            if statement and not "include".startswith(statement[:7]):
+                break
+    return included_files
+
+
+class IncludeScanner():
+    """IncludeScanner
+
+    問題ファイルのinclude文をプロセスプールで並列に走査し、結果をディスクにキャッシュするクラス
+    キャッシュはファイルの更新時刻とサイズを保持し、新規または更新されたファイルのみ再走査する
+
+    Attributes:
+        cache_path (str): キャッシュファイル(json)のパス、Noneならキャッシュしない
+        max_workers (int): プロセスプールのワーカー数、Noneならcpu数
+        chunksize (int): 1ワーカーにまとめて渡すファイル数
+    """
+
+    def __init__(self, cache_path=None, max_workers=None, chunksize=64):
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.path2entry = self.load_cache()
+
+    def load_cache(self):
+        """load_cache
+
+        キャッシュファイルを読み込む関数
+
+        Returns:
+            (dict): 問題ファイルのパスをkey、{"mtime_ns", "size", "includes"}をvalueとした辞書
+        """
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return dict()
+        with open(self.cache_path, "r") as f:
+            cache = json.load(f)
+        if cache.get("version") != CACHE_VERSION:
+            return dict()
+        return cache["files"]
+
+    def save_cache(self):
+        """save_cache
+
+        キャッシュファイルを書き込む関数
+        書き込み途中で中断してもキャッシュが壊れないように、一時ファイルに書いてから置き換える
+        """
+        if self.cache_path is None:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CACHE_VERSION,
+                       "files": self.path2entry}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def is_cached(self, problem_path, stat):
+        """is_cached
+
+        問題ファイルの走査結果がキャッシュされていて、最新かどうかを判定する関数
+
+        Args:
+            problem_path (str): 問題ファイルのパス
+            stat (os.stat_result): 問題ファイルのstat
+
+        Returns:
+            (bool): キャッシュが最新ならTrue、そうでないならFalse
+        """
+        entry = self.path2entry.get(problem_path)
+        return (entry is not None and
+                entry["mtime_ns"] == stat.st_mtime_ns and
+                entry["size"] == stat.st_size)
+
+    def scan(self, problem_file_paths):
+        """scan
+
+        問題ファイルのinclude文を走査する関数
+        キャッシュが最新でないファイルのみをプロセスプールで走査し、キャッシュを更新する
+
+        Args:
+            problem_file_paths (list): 問題ファイルのパスのリスト
+
+        Returns:
+            path2includes (dict): 問題ファイルのパスをkey、includeされているファイルのリストをvalueとした辞書
+        """
+        path2stat = {path: os.stat(path) for path in problem_file_paths}
+        stale_paths = [path for path, stat in path2stat.items()
+                       if not self.is_cached(path, stat)]
+        if stale_paths:
+            if len(stale_paths) < self.chunksize or self.max_workers == 1:
+                results = map(scan_includes, stale_paths)
+                self.update_entries(stale_paths, results, path2stat)
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    results = executor.map(
+                        scan_includes, stale_paths, chunksize=self.chunksize)
+                    self.update_entries(stale_paths, results, path2stat)
+            self.save_cache()
+        return {path: self.path2entry[path]["includes"] for path in problem_file_paths}
+
+    def update_entries(self, problem_file_paths, results, path2stat):
+        """update_entries
+
+        走査結果でキャッシュのエントリを更新する関数
+
+        Args:
+            problem_file_paths (list): 走査した問題ファイルのパスのリスト
+            results (iterable): 各問題ファイルのincludeされているファイルのリスト
+            path2stat (dict): 問題ファイルのパスをkey、os.stat_resultをvalueとした辞書
+        """
+        for path, included_files in zip(problem_file_paths, results):
+            stat = path2stat[path]
+            self.path2entry[path] = {"mtime_ns": stat.st_mtime_ns,
+                                     "size": stat.st_size,
+                                     "includes": included_files}
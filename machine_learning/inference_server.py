@@ -0,0 +1,306 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import torch
+from networkx.readwrite import json_graph
+sys.path.append(os.path.join(os.path.pardir))  # nopep8
+from handler import NetworkxHandler
+from symbol_table import SymbolTable
+from dataset import pad_collate
+from sweep import build_model
+
+
+class SequenceEncoder():
+    """SequenceEncoder
+
+    正規化された論理式のグラフをNN, CNN, RNN, LSTMの入力(トークン列)に変換するクラス
+
+    Attributes:
+        featurizer (Featurizer): 学習時と同じ語彙を持つFeaturizer
+    """
+
+    def __init__(self, featurizer):
+        self.featurizer = featurizer
+
+    def encode(self, graph):
+        """encode
+
+        1つのグラフをトークン列に変換する関数
+
+        Args:
+            graph (dict): node-link形式の正規化された論理式のグラフ
+
+        Returns:
+            (torch.Tensor): トークンIDの列
+        """
+        return torch.from_numpy(self.featurizer.token_sequence(
+            *self.featurizer.graph_arrays(graph)))
+
+    def collate(self, samples):
+        """collate
+
+        トークン列をパディングしてミニバッチにする関数
+
+        Args:
+            samples (list): encodeの返り値のリスト
+
+        Returns:
+            (torch.Tensor): (バッチサイズ, 最長の系列長)のトークンIDのテンソル
+        """
+        X, _ = pad_collate([(sample, torch.zeros(1)) for sample in samples])
+        return X
+
+
+class GraphEncoder():
+    """GraphEncoder
+
+    正規化された論理式のグラフをGCNの入力に変換するクラス
+
+    Attributes:
+        builder (GraphBatchBuilder): 学習時と同じ語彙を持つ、frozenなGraphBatchBuilder
+    """
+
+    def __init__(self, builder):
+        self.builder = builder
+
+    def encode(self, graph):
+        """encode
+
+        1つのグラフをラベルID、トークンの種類のID、edge_indexの配列に変換する関数
+
+        Args:
+            graph (dict): node-link形式の正規化された論理式のグラフ
+
+        Returns:
+            (tuple): GraphBatchBuilder.graph_arraysの返り値
+        """
+        # 外部から届いたラベルを共有の記号表に登録し続けないよう、リクエストごとの記号表を使う
+        nx_handler = NetworkxHandler(SymbolTable())
+        nx_handler.init_graph(json_graph.node_link_graph(graph))
+        return self.builder.graph_arrays(nx_handler)
+
+    def collate(self, samples):
+        """collate
+
+        複数のグラフの配列を1つのミニバッチにする関数
+
+        Args:
+            samples (list): encodeの返り値のリスト
+
+        Returns:
+            (torch_geometric.data.Data): GCNの入力のミニバッチ
+        """
+        return self.builder.build_batch(samples)
+
+
+def load_model(model_config, checkpoint_path, device="cpu"):
+    """load_model
+
+    学習済みのモデルを読み込む関数
+
+    Args:
+        model_config (dict): "model"にモデルのクラス名を含むハイパーパラメータの辞書
+        checkpoint_path (str): EarlyStoppingで保存したstate_dictのパス
+        device (str): モデルを置くデバイス
+
+    Returns:
+        (torch.nn.Module): 推論モードのモデル
+    """
+    model = build_model(model_config)
+    model.load_state_dict(torch.load(checkpoint_path, map_location=device))
+    return model.to(device).eval()
+
+
+class InferenceServer():
+    """InferenceServer
+
+    論理式のグラフを1つずつ受け付け、同時に届いたリクエストをミニバッチにまとめてスコアを計算するクラス
+    最初のリクエストが届いてからmax_latency秒経つか、max_batch_size個集まった時点で推論する
+    ミニバッチの推論が失敗した場合は1つずつ推論し直し、失敗したリクエストだけを失敗させる
+
+    Attributes:
+        model (torch.nn.Module): 学習済みのモデル
+        encoder (SequenceEncoder or GraphEncoder): グラフをモデルの入力に変換するエンコーダ
+        max_batch_size (int): ミニバッチの最大サイズ
+        max_latency (float): 最初のリクエストからミニバッチを確定するまでの最大の待ち時間(秒)
+        device (str): 推論するデバイス
+        is_closed (bool): closeが呼ばれたかどうか
+        lock (threading.Lock): is_closedとリクエストのキューへの追加を保護するロック
+    """
+
+    def __init__(self, model, encoder, max_batch_size=64, max_latency=0.005, device="cpu"):
+        self.model = model
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.device = device
+        self.requests = queue.Queue()
+        self.is_closed = False
+        self.lock = threading.Lock()
+        self.worker = threading.Thread(target=self.batch_loop, daemon=True)
+        self.worker.start()
+
+    def submit(self, graph):
+        """submit
+
+        グラフのスコア計算を依頼する関数
+        入力への変換は呼び出し元のスレッドで行い、推論スレッドと並行させる
+        closeの後に呼ばれた場合は、RuntimeErrorを設定したFutureを返す
+
+        Args:
+            graph (dict): node-link形式の正規化された論理式のグラフ
+
+        Returns:
+            (concurrent.futures.Future): スコア(float)を返すFuture
+        """
+        future = Future()
+        try:
+            sample = self.encoder.encode(graph)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        with self.lock:
+            if self.is_closed:
+                future.set_exception(RuntimeError("InferenceServer is closed"))
+                return future
+            self.requests.put((sample, future))
+        return future
+
+    def score(self, graph):
+        """score
+
+        グラフのスコアを計算し、結果が出るまで待つ関数
+
+        Args:
+            graph (dict): node-link形式の正規化された論理式のグラフ
+
+        Returns:
+            (float): スコア
+        """
+        return self.submit(graph).result()
+
+    def close(self):
+        """close
+
+        受け付け済みのリクエストを処理してから推論スレッドを終了する関数
+        """
+        with self.lock:
+            if not self.is_closed:
+                self.is_closed = True
+                self.requests.put(None)
+        self.worker.join()
+
+    def collect_batch(self):
+        """collect_batch
+
+        キューからリクエストを取り出してミニバッチを作る関数
+
+        Returns:
+            batch (list): (モデルの入力に変換したグラフ, Future)のリスト
+            is_closed (bool): closeが呼ばれたかどうか
+        """
+        request = self.requests.get()
+        if request is None:
+            return [], True
+        batch = [request]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def batch_loop(self):
+        """batch_loop
+
+        ミニバッチ単位で推論し、各リクエストのFutureに結果を設定する推論スレッドの処理
+        """
+        is_closed = False
+        while not is_closed:
+            batch, is_closed = self.collect_batch()
+            if not batch:
+                continue
+            try:
+                scores = self.infer([sample for sample, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # 1つの不正なリクエストで同じミニバッチの他のリクエストが失敗しないよう、1つずつ推論し直す
+                for sample, future in batch:
+                    try:
+                        future.set_result(self.infer([sample])[0])
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            for (_, future), score in zip(batch, scores):
+                future.set_result(score)
+
+    def infer(self, samples):
+        """infer
+
+        モデルの入力に変換したグラフのリストをミニバッチにして推論する関数
+
+        Args:
+            samples (list): encoderのencodeの返り値のリスト
+
+        Returns:
+            (list): サンプルごとのスコア(float)のリスト
+        """
+        with torch.inference_mode():
+            output = self.model(self.encoder.collate(samples).to(self.device))
+        return output.reshape(-1).tolist()
+
+
+def serve_http(inference_server, host="127.0.0.1", port=8000):
+    """serve_http
+
+    InferenceServerをHTTPで公開する関数
+    POST /score に {"graph": グラフ} または {"graphs": [グラフ, ...]} を送ると、
+    {"score": スコア} または {"scores": [スコア, ...]} を返す
+
+    Args:
+        inference_server (InferenceServer): 推論サーバー
+        host (str): 待ち受けるホスト
+        port (int): 待ち受けるポート
+
+    Returns:
+        (http.server.ThreadingHTTPServer): 起動前のHTTPサーバー、serve_forever()で起動する
+    """
+    class ScoreRequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/score":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length))
+                if "graphs" in request:
+                    futures = [inference_server.submit(graph) for graph in request["graphs"]]
+                    response = {"scores": [future.result() for future in futures]}
+                else:
+                    response = {"score": inference_server.score(request["graph"])}
+            except Exception as e:
+                self.send_error(400, str(e))
+                return
+            body = json.dumps(response).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), ScoreRequestHandler)
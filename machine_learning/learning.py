@@ -2,8 +2,8 @@ import torch
 import numpy as np
 import random
 from tqdm import tqdm
-from sklearn.metrics import r2_score
 from early_stopping import EarlyStopping
+from metrics import MetricAccumulator
 
 
 # リソースの選択（CPU/GPU）
@@ -33,7 +33,7 @@ SEED = 42
 fix_seed(SEED)
 
 
-def train(model, dataloader, criterion, optimizer):
+def train(model, dataloader, criterion, optimizer, metrics=None, device=DEVICE):
     """train
 
     与えられたデータで指定されたモデルを訓練する関数
@@ -43,30 +43,30 @@ def train(model, dataloader, criterion, optimizer):
         dataloader (torch.utils.data.dataloader.DataLoader): データローダー
         criterion (torch.nn.modules.loss): 損失関数
         optimizer (torch.optim): 最適化関数
+        metrics (MetricAccumulator): 指標、Noneなら損失値とR2スコア
+        device (torch.device): データを転送するデバイス、モデルと同じデバイスを指定する
 
     Returns:
         average_loss (float): 平均損失値
-        average_r2_score (float): 平均R2スコア
+        r2 (float): エポック全体のR2スコア
     """
     model.train()
-    total_loss = 0
-    r2 = 0
+    metrics = metrics or MetricAccumulator()
+    metrics.reset()
     for X, y in dataloader:
-        X = X.to(DEVICE)
-        y = y.to(DEVICE)
+        X = X.to(device)
+        y = y.to(device)
         optimizer.zero_grad()
         output = model(X)
         loss = criterion(output, y)
         loss.backward()
         optimizer.step()
-        total_loss += loss.item()
-        r2 += r2_score(y_pred=output.tolist(), y_correct=y.tolist())
-    average_loss = total_loss / len(dataloader)
-    average_r2_score = r2 / len(dataloader)
-    return average_loss, average_r2_score
+        metrics.update(output, y, loss)
+    values = metrics.compute()
+    return values["loss"], values["r2"]
 
 
-def eval(model, dataloader, criterion):
+def eval(model, dataloader, criterion, metrics=None, device=DEVICE):
     """eval
 
     与えられたデータで指定されたモデルを評価する関数
@@ -75,27 +75,28 @@ def eval(model, dataloader, criterion):
         model (torch.nn.Module): 機械学習モデル
         dataloader (torch.utils.data.dataloader.DataLoader): データローダー
         criterion (torch.nn.modules.loss): 損失関数
+        metrics (MetricAccumulator): 指標、Noneなら損失値とR2スコア
+        device (torch.device): データを転送するデバイス、モデルと同じデバイスを指定する
 
     Returns:
         average_loss (float): 平均損失値
-        average_r2_score (float): 平均R2スコア
+        r2 (float): エポック全体のR2スコア
     """
     model.eval()
-    total_loss = 0
-    r2 = 0
-    for X, y in dataloader:
-        X = X.to(DEVICE)
-        y = y.to(DEVICE)
-        output = model(X)
-        loss = criterion(output, y)
-        total_loss += loss.item()
-        r2 += r2_score(y_pred=output.tolist(), y_correct=y.tolist())
-    average_loss = total_loss / len(dataloader)
-    average_r2_score = r2 / len(dataloader)
-    return average_loss, average_r2_score
-
-
-def predict(model, dataloader):
+    metrics = metrics or MetricAccumulator()
+    metrics.reset()
+    with torch.no_grad():
+        for X, y in dataloader:
+            X = X.to(device)
+            y = y.to(device)
+            output = model(X)
+            loss = criterion(output, y)
+            metrics.update(output, y, loss)
+    values = metrics.compute()
+    return values["loss"], values["r2"]
+
+
+def predict(model, dataloader, device=DEVICE):
     """predict
 
     与えられたデータで指定されたモデルを予測する関数
@@ -103,6 +104,7 @@ def predict(model, dataloader):
     Args:
         model (torch.nn.Module): 機械学習モデル
         dataloader (torch.utils.data.dataloader.DataLoader): データローダー
+        device (torch.device): データを転送するデバイス、モデルと同じデバイスを指定する
 
     Returns:
         y_pred (list): 予測値
@@ -111,16 +113,18 @@ def predict(model, dataloader):
     model.eval()
     y_pred = []
     y_correct = []
-    for X, y in dataloader:
-        X = X.to(DEVICE)
-        y = y.to(DEVICE)
-        output = model(X)
-        y_pred.extend(output.tolist())
-        y_correct.extend(y.tolist())
+    with torch.inference_mode():
+        for X, y in dataloader:
+            X = X.to(device)
+            y = y.to(device)
+            output = model(X)
+            y_pred.extend(output.tolist())
+            y_correct.extend(y.tolist())
     return y_pred, y_correct
 
 
-def learn_model(model, train_loader, test_loader, criterion, optimizer, epochs):
+def learn_model(model, train_loader, test_loader, criterion, optimizer, epochs,
+                checkpoint_path='checkpoint.pt', checkpoint_interval=0):
     """learn_model
 
     与えられたデータで指定されたモデルを訓練・評価する関数
@@ -132,6 +136,8 @@ def learn_model(model, train_loader, test_loader, criterion, optimizer, epochs):
         criterion (torch.nn.modules.loss): 損失関数
         optimizer (torch.optim): 最適化関数
         epochs (int): エポック数
+        checkpoint_path (str): ベストモデルを保存するパス
+        checkpoint_interval (float): ベストモデルをディスクへ保存する最短の間隔(秒)
 
     Returns:
         train_loss (list): 訓練データの損失値
@@ -145,29 +151,34 @@ def learn_model(model, train_loader, test_loader, criterion, optimizer, epochs):
     test_loss = []
     train_r2 = []
     test_r2 = []
-    early_stopping = EarlyStopping(patience=20, verbose=True)
-    for epoch in tqdm(range(1, epochs+1)):
-        loss, r2 = train(model, train_loader, criterion, optimizer)
-        train_loss.append(loss)
-        train_r2.append(r2)
-        loss, r2 = eval(model, test_loader, criterion)
-        test_loss.append(loss)
-        test_r2.append(r2)
-        print(
-            f"epoch: {epoch},\
-                train_loss: {train_loss[-1]},\
-                    test_loss: {test_loss[-1]},\
-                        train_r2: {train_r2[-1]},\
-                            test_r2: {test_r2[-1]}")
-        early_stopping(test_loss[-1], model)
-        if early_stopping.early_stop:
-            print("Early stopping")
-            break
+    early_stopping = EarlyStopping(patience=20, verbose=True, path=checkpoint_path,
+                                   checkpoint_interval=checkpoint_interval)
+    try:
+        for epoch in tqdm(range(1, epochs+1)):
+            loss, r2 = train(model, train_loader, criterion, optimizer)
+            train_loss.append(loss)
+            train_r2.append(r2)
+            loss, r2 = eval(model, test_loader, criterion)
+            test_loss.append(loss)
+            test_r2.append(r2)
+            print(
+                f"epoch: {epoch},\
+                    train_loss: {train_loss[-1]},\
+                        test_loss: {test_loss[-1]},\
+                            train_r2: {train_r2[-1]},\
+                                test_r2: {test_r2[-1]}")
+            early_stopping(test_loss[-1], model)
+            if early_stopping.early_stop:
+                print("Early stopping")
+                break
+    finally:
+        # 保存待ちのベストモデルを必ずディスクに書き込む
+        early_stopping.close()
     pred, correct = predict(model, test_loader)
     return train_loss, test_loss, train_r2, test_r2, pred, correct
 
 
-def train_gcn(model, dataloader, criterion, optimizer):
+def train_gcn(model, dataloader, criterion, optimizer, metrics=None, device=None):
     """train_gcn
 
     与えられたデータで指定されたGCNモデルを訓練する関数
@@ -177,28 +188,30 @@ def train_gcn(model, dataloader, criterion, optimizer):
         dataloader (torch_geometric.loader.dataloader.DataLoader): データローダー
         criterion (torch.nn.modules.loss): 損失関数
         optimizer (torch.optim): 最適化関数
+        metrics (MetricAccumulator): 指標、Noneなら損失値とR2スコア
+        device (torch.device): データを転送するデバイス、Noneなら転送しない
 
     Returns:
         average_loss(float): 平均損失値
-        average_r2_score(float): 平均R2スコア
+        r2(float): エポック全体のR2スコア
     """
     model.train()
-    total_loss = 0
-    r2 = 0
+    metrics = metrics or MetricAccumulator()
+    metrics.reset()
     for data in dataloader:
+        if device is not None:
+            data = data.to(device)
         optimizer.zero_grad()
         output = model(data)
         loss = criterion(output, data.y)
         loss.backward()
         optimizer.step()
-        total_loss += loss.item()
-        r2 += r2_score(y_pred=output.tolist(), y_correct=data.y.tolist())
-    average_loss = total_loss / len(dataloader)
-    average_r2_score = r2 / len(dataloader)
-    return average_loss, average_r2_score
+        metrics.update(output, data.y, loss)
+    values = metrics.compute()
+    return values["loss"], values["r2"]
 
 
-def eval_gcn(model, dataloader, criterion):
+def eval_gcn(model, dataloader, criterion, metrics=None, device=None):
     """eval_gcn
 
     与えられたデータで指定されたGCNモデルを評価する関数
@@ -207,25 +220,28 @@ def eval_gcn(model, dataloader, criterion):
         model (torch.nn.Module): 機械学習モデル(GCN)
         dataloader (torch_geometric.loader.dataloader.DataLoader): データローダー
         criterion (torch.nn.modules.loss): 損失関数
+        metrics (MetricAccumulator): 指標、Noneなら損失値とR2スコア
+        device (torch.device): データを転送するデバイス、Noneなら転送しない
 
     Returns:
         average_loss(float): 平均損失値
-        average_r2_score(float): 平均R2スコア
+        r2(float): エポック全体のR2スコア
     """
     model.eval()
-    total_loss = 0
-    r2 = 0
-    for data in dataloader:
-        output = model(data)
-        loss = criterion(output, data.y)
-        total_loss += loss.item()
-        r2 += r2_score(y_pred=output.tolist(), y_correct=data.y.tolist())
-    average_loss = total_loss / len(dataloader)
-    average_r2_score = r2 / len(dataloader)
-    return average_loss, average_r2_score
-
-
-def predict_gcn(model, dataloader):
+    metrics = metrics or MetricAccumulator()
+    metrics.reset()
+    with torch.no_grad():
+        for data in dataloader:
+            if device is not None:
+                data = data.to(device)
+            output = model(data)
+            loss = criterion(output, data.y)
+            metrics.update(output, data.y, loss)
+    values = metrics.compute()
+    return values["loss"], values["r2"]
+
+
+def predict_gcn(model, dataloader, device=None):
     """predict
 
     与えられたデータで指定されたGCNモデルを予測する関数
@@ -233,6 +249,7 @@ def predict_gcn(model, dataloader):
     Args:
         model (torch.nn.Module): 機械学習モデル(GCN)
         dataloader (torch_geometric.loader.dataloader.DataLoader): データローダー
+        device (torch.device): データを転送するデバイス、Noneなら転送しない
 
     Returns:
         tuple[list]: 予測値と正解値
@@ -240,14 +257,18 @@ def predict_gcn(model, dataloader):
     model.eval()
     y_pred = []
     y_correct = []
-    for data in dataloader:
-        output = model(data)
-        y_pred.extend(output.tolist())
-        y_correct.extend(data.y.tolist())
+    with torch.inference_mode():
+        for data in dataloader:
+            if device is not None:
+                data = data.to(device)
+            output = model(data)
+            y_pred.extend(output.tolist())
+            y_correct.extend(data.y.tolist())
     return y_pred, y_correct
 
 
-def learn_gcn(model, train_loader, test_loader, criterion, optimizer, epochs):
+def learn_gcn(model, train_loader, test_loader, criterion, optimizer, epochs,
+              checkpoint_path='checkpoint.pt', checkpoint_interval=0):
     """learn_gcn
 
     与えられたデータで指定されたGCNモデルを訓練・評価する関数
@@ -259,6 +280,8 @@ def learn_gcn(model, train_loader, test_loader, criterion, optimizer, epochs):
         criterion (torch.nn.modules.loss): 損失関数
         optimizer (torch.optim): 最適化関数
         epochs (int): エポック数
+        checkpoint_path (str): ベストモデルを保存するパス
+        checkpoint_interval (float): ベストモデルをディスクへ保存する最短の間隔(秒)
 
     Returns:
         train_loss (list): 訓練データの損失値
@@ -272,23 +295,28 @@ def learn_gcn(model, train_loader, test_loader, criterion, optimizer, epochs):
     test_loss = []
     train_r2 = []
     test_r2 = []
-    early_stopping = EarlyStopping(patience=20, verbose=True)
-    for epoch in tqdm(range(1, epochs+1)):
-        loss, r2 = train_gcn(model, train_loader, criterion, optimizer)
-        train_loss.append(loss)
-        train_r2.append(r2)
-        loss, r2 = eval_gcn(model, test_loader, criterion)
-        test_loss.append(loss)
-        test_r2.append(r2)
-        print(
-            f"epoch: {epoch},\
-                train_loss: {train_loss[-1]},\
-                    test_loss: {test_loss[-1]},\
-                        train_r2: {train_r2[-1]},\
-                            test_r2: {test_r2[-1]}")
-        early_stopping(test_loss[-1], model)
-        if early_stopping.early_stop:
-            print("Early stopping")
-            break
+    early_stopping = EarlyStopping(patience=20, verbose=True, path=checkpoint_path,
+                                   checkpoint_interval=checkpoint_interval)
+    try:
+        for epoch in tqdm(range(1, epochs+1)):
+            loss, r2 = train_gcn(model, train_loader, criterion, optimizer)
+            train_loss.append(loss)
+            train_r2.append(r2)
+            loss, r2 = eval_gcn(model, test_loader, criterion)
+            test_loss.append(loss)
+            test_r2.append(r2)
+            print(
+                f"epoch: {epoch},\
+                    train_loss: {train_loss[-1]},\
+                        test_loss: {test_loss[-1]},\
+                            train_r2: {train_r2[-1]},\
+                                test_r2: {test_r2[-1]}")
+            early_stopping(test_loss[-1], model)
+            if early_stopping.early_stop:
+                print("Early stopping")
+                break
+    finally:
+        # 保存待ちのベストモデルを必ずディスクに書き込む
+        early_stopping.close()
     pred, correct = predict_gcn(model, test_loader)
     return train_loss, test_loss, train_r2, test_r2, pred, correct
@@ -0,0 +1,139 @@
+import torch
+
+
+class Metric:
+    """Metric
+
+    ミニバッチごとの統計量をデバイス上に累積し、エポックの最後に一度だけ値を計算する指標の基底クラス
+    updateではテンソル演算のみを行い、item()やtolist()によるデバイスとの同期を起こさない
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """reset
+
+        累積した統計量を初期化する関数
+        """
+        raise NotImplementedError
+
+    def update(self, output, y, loss):
+        """update
+
+        ミニバッチの出力から統計量を累積する関数
+
+        Args:
+            output (torch.Tensor): モデルの出力
+            y (torch.Tensor): 正解値
+            loss (torch.Tensor): ミニバッチの損失値(平均)
+        """
+        raise NotImplementedError
+
+    def compute(self):
+        """compute
+
+        累積した統計量から指標の値を計算する関数
+        1つもサンプルを累積していない場合はValueErrorを送出する
+
+        Returns:
+            (torch.Tensor): 指標の値(0次元テンソル)
+        """
+        raise NotImplementedError
+
+
+class MeanLoss(Metric):
+    """MeanLoss
+
+    サンプル数で重み付けした損失値の平均
+    """
+
+    def reset(self):
+        self.total = None
+        self.count = 0
+
+    def update(self, output, y, loss):
+        batch_loss = loss.detach().double() * y.shape[0]
+        self.total = batch_loss if self.total is None else self.total + batch_loss
+        self.count += y.shape[0]
+
+    def compute(self):
+        if self.count == 0:
+            raise ValueError("no samples")
+        return self.total / self.count
+
+
+class R2Score(Metric):
+    """R2Score
+
+    エポック全体のR2スコア
+    残差平方和、正解値の和、正解値の二乗和、サンプル数を累積し、ミニバッチの平均ではなく厳密な値を計算する
+    """
+
+    def reset(self):
+        # [残差平方和, 正解値の和, 正解値の二乗和]
+        self.stats = None
+        self.count = 0
+
+    def update(self, output, y, loss):
+        output = output.detach().double()
+        y = y.detach().double()
+        stats = torch.stack([torch.sum((y - output) ** 2), torch.sum(y), torch.sum(y ** 2)])
+        self.stats = stats if self.stats is None else self.stats + stats
+        self.count += y.numel()
+
+    def compute(self):
+        if self.count == 0:
+            raise ValueError("no samples")
+        sse, sum_y, sum_y2 = self.stats
+        sst = sum_y2 - sum_y ** 2 / self.count
+        # 正解値が定数の場合はsklearnと同じく、完全一致なら1、そうでないなら0とする
+        if_constant = (sse == 0).double()
+        return torch.where(sst > 0, 1 - sse / sst, if_constant)
+
+
+class MetricAccumulator:
+    """MetricAccumulator
+
+    複数の指標をまとめて累積し、エポックの最後に一度の同期で全ての値を取得するクラス
+
+    Attributes:
+        metrics (dict): 指標名をkey、Metricをvalueとした辞書
+    """
+
+    def __init__(self, metrics=None):
+        if metrics is None:
+            metrics = {"loss": MeanLoss(), "r2": R2Score()}
+        self.metrics = metrics
+
+    def reset(self):
+        """reset
+
+        全ての指標の統計量を初期化する関数
+        """
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def update(self, output, y, loss):
+        """update
+
+        全ての指標にミニバッチの出力を累積する関数
+
+        Args:
+            output (torch.Tensor): モデルの出力
+            y (torch.Tensor): 正解値
+            loss (torch.Tensor): ミニバッチの損失値(平均)
+        """
+        for metric in self.metrics.values():
+            metric.update(output, y, loss)
+
+    def compute(self):
+        """compute
+
+        全ての指標の値を計算する関数
+
+        Returns:
+            (dict): 指標名をkey、指標の値(float)をvalueとした辞書
+        """
+        values = torch.stack([metric.compute() for metric in self.metrics.values()])
+        return dict(zip(self.metrics.keys(), values.tolist()))
@@ -179,10 +179,25 @@ class LSTM(nn.Module):
         self.lstm = nn.LSTM(embedding_size, hidden_size, batch_first=True)
         self.out = nn.Linear(hidden_size, output_size)
 
-    def forward(self, x, state=None):
+    def embedding(self, x, state=None):
+        """embedding
+
+        出力層の直前の、隠れ状態を系列方向に平均した論理式の埋め込みを計算する関数
+
+        Args:
+            x (torch.Tensor): (バッチサイズ, 系列長)のトークンIDのテンソル
+            state (tuple): LSTMの初期状態
+
+        Returns:
+            (torch.Tensor): (バッチサイズ, hidden_size)の埋め込み
+        """
         x = self.embed(x)
         x, (h, c) = self.lstm(x, state)
-        x = self.out(x.mean(dim=1))
+        return x.mean(dim=1)
+
+    def forward(self, x, state=None):
+        x = self.embedding(x, state)
+        x = self.out(x)
         return x
 
 
@@ -243,14 +258,27 @@ class GCN(torch.nn.Module):
         )
         self.mlp_out = Linear(self.dim, 1)
 
-    def forward(self, data):
+    def embedding(self, data):
+        """embedding
+
+        グラフ畳み込みの後にglobal_add_poolで集約した論理式の埋め込みを計算する関数
+
+        Args:
+            data (torch_geometric.data.Data): GCNの入力のミニバッチ
+
+        Returns:
+            (torch.Tensor): (グラフ数, dim)の埋め込み
+        """
         x, edge_index = data.x, data.edge_index
         x = F.relu(self.graphconv1(x, edge_index))
         x = self.bn1(x)
         for graphconv, bn_conv in zip(self.graphconv_hidden, self.bn_conv):
             x = graphconv(x, edge_index)
             x = bn_conv(x)
-        x = global_add_pool(x, data.batch)
+        return global_add_pool(x, data.batch)
+
+    def forward(self, data):
+        x = self.embedding(data)
         for fc_mlp, bn_mlp in zip(self.mlp_hidden, self.bn_mlp):
             x = F.relu(fc_mlp(x))
             x = bn_mlp(x)
@@ -0,0 +1,53 @@
+import torch
+
+# export.export_modelで保存したモデルを推論するための最小限のモジュール
+# 読み込みを速くするため、torch以外のライブラリ(torch_geometric, sklearn, tqdmなど)はimportしない
+
+
+def load(path):
+    """load
+
+    TorchScriptに変換したモデルを読み込む関数
+
+    Args:
+        path (str): export.export_modelで保存したパス
+
+    Returns:
+        (torch.jit.ScriptModule): 推論モードのモデル
+    """
+    model = torch.jit.load(path, map_location="cpu")
+    return model.eval()
+
+
+def score_tokens(model, tokens):
+    """score_tokens
+
+    NN, CNN, RNN, LSTMを変換したモデルで1つの論理式のスコアを計算する関数
+
+    Args:
+        model (torch.jit.ScriptModule): 変換したモデル
+        tokens (list): 論理式のトークンIDの列
+
+    Returns:
+        (float): スコア
+    """
+    with torch.inference_mode():
+        return model(torch.tensor([tokens], dtype=torch.long)).item()
+
+
+def score_graph(model, x, edge_index):
+    """score_graph
+
+    GCNを変換したモデルで1つの論理式のスコアを計算する関数
+
+    Args:
+        model (torch.jit.ScriptModule): 変換したモデル
+        x (torch.Tensor): (ノード数, 特徴量の次元数)のノードの特徴量
+        edge_index (torch.Tensor): (2, エッジ数)のエッジのテンソル
+
+    Returns:
+        (float): スコア
+    """
+    with torch.inference_mode():
+        batch = torch.zeros(x.shape[0], dtype=torch.long)
+        return model(x, edge_index, batch, 1).item()
@@ -0,0 +1,280 @@
+import csv
+import inspect
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+import model as models
+from dataset import pad_collate
+from learning import fix_seed, train, eval, train_gcn, eval_gcn
+
+
+def grid_search_space(search_space):
+    """grid_search_space
+
+    探索空間の全ての組み合わせを列挙する関数
+
+    Args:
+        search_space (dict): ハイパーパラメータ名をkey、候補のリストをvalueとした辞書
+            例: {"model": ["LSTM", "CNN"], "hidden_size": [32, 64], "lr": [1e-3, 1e-4]}
+
+    Returns:
+        (list): ハイパーパラメータの辞書のリスト
+    """
+    names = list(search_space.keys())
+    return [dict(zip(names, values))
+            for values in itertools.product(*(search_space[name] for name in names))]
+
+
+def random_search_space(search_space, n_trials, seed=0):
+    """random_search_space
+
+    探索空間からランダムにハイパーパラメータをサンプリングする関数
+
+    Args:
+        search_space (dict): ハイパーパラメータ名をkey、候補のリストまたは(最小値, 最大値)のタプルをvalueとした辞書
+            タプルの場合は整数なら一様に、実数なら対数一様にサンプリングする
+        n_trials (int): サンプリングする数
+        seed (int): 乱数のシード値
+
+    Returns:
+        (list): ハイパーパラメータの辞書のリスト
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_trials):
+        config = dict()
+        for name, candidates in search_space.items():
+            if isinstance(candidates, tuple):
+                low, high = candidates
+                if isinstance(low, int) and isinstance(high, int):
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                config[name] = rng.choice(candidates)
+        configs.append(config)
+    return configs
+
+
+def kfold_indices(n_samples, n_splits, seed=0):
+    """kfold_indices
+
+    データのインデックスをk個に分割し、(訓練データ, 検証データ)のインデックスの組を作成する関数
+
+    Args:
+        n_samples (int): データ数
+        n_splits (int): 分割数、1なら8:2に分割した1組のみを返す
+        seed (int): 乱数のシード値
+
+    Returns:
+        (list): (訓練データのインデックス, 検証データのインデックス)のリスト
+    """
+    indices = np.random.default_rng(seed).permutation(n_samples)
+    if n_splits == 1:
+        n_test = max(1, n_samples // 5)
+        return [(indices[n_test:].tolist(), indices[:n_test].tolist())]
+    folds = np.array_split(indices, n_splits)
+    return [(np.concatenate(folds[:i] + folds[i + 1:]).tolist(), folds[i].tolist())
+            for i in range(n_splits)]
+
+
+def build_model(config):
+    """build_model
+
+    ハイパーパラメータからmodel.pyのモデルを作成する関数
+    モデルのコンストラクタの引数にないハイパーパラメータは無視する
+
+    Args:
+        config (dict): "model"にモデルのクラス名を含むハイパーパラメータの辞書
+
+    Returns:
+        (torch.nn.Module): 作成したモデル
+    """
+    model_class = getattr(models, config["model"])
+    parameters = inspect.signature(model_class.__init__).parameters
+    return model_class(**{name: value for name, value in config.items()
+                          if name in parameters and name != "self"})
+
+
+def create_loader(dataset, indices, config, shuffle):
+    """create_loader
+
+    データセットの一部からモデルに合わせたデータローダーを作成する関数
+
+    Args:
+        dataset (torch.utils.data.Dataset): データセット
+        indices (list): 使用するデータのインデックス
+        config (dict): ハイパーパラメータの辞書
+        shuffle (bool): シャッフルするかどうか
+
+    Returns:
+        (torch.utils.data.DataLoader): データローダー
+    """
+    batch_size = config.get("batch_size", 64)
+    if config["model"] == "GCN":
+        from torch_geometric.loader import DataLoader
+        return DataLoader(dataset[indices], batch_size=batch_size, shuffle=shuffle)
+    subset = torch.utils.data.Subset(dataset, indices)
+    return torch.utils.data.DataLoader(subset, batch_size=batch_size, shuffle=shuffle,
+                                       collate_fn=config.get("collate_fn", pad_collate))
+
+
+def get_devices():
+    """get_devices
+
+    試行に割り当てるデバイスのリストを取得する関数
+
+    Returns:
+        (list): 利用できる全てのGPU、GPUがなければcpuのみのリスト
+    """
+    if torch.cuda.is_available():
+        return [f"cuda:{index}" for index in range(torch.cuda.device_count())]
+    return ["cpu"]
+
+
+def should_prune(history, lock, epoch, val_loss, n_startup_trials):
+    """should_prune
+
+    他の試行の同じエポックでの検証損失の中央値より悪い場合に、試行を打ち切るかどうかを判定する関数
+    判定に用いた検証損失は履歴に追加する
+
+    Args:
+        history (multiprocessing.managers.DictProxy): エポックをkey、検証損失のリストをvalueとした共有辞書
+        lock (multiprocessing.managers.AcquirerProxy): historyを更新するためのロック
+        epoch (int): エポック
+        val_loss (float): 検証損失
+        n_startup_trials (int): 打ち切りの判定を始めるのに必要な他の試行の数
+
+    Returns:
+        (bool): 打ち切るならTrue、そうでないならFalse
+    """
+    if history is None:
+        return False
+    with lock:
+        losses = history.get(epoch, [])
+        history[epoch] = losses + [val_loss]
+    return len(losses) >= n_startup_trials and val_loss > float(np.median(losses))
+
+
+def run_trial(trial):
+    """run_trial
+
+    1つのハイパーパラメータと1つの分割で学習・評価を行う関数(プロセスプールのワーカーで実行される)
+
+    Args:
+        trial (dict): 試行の設定
+            trial_id, fold, config, seed, device, dataset, train_indices, test_indices, epochs,
+            patience, n_threads, history, lock, min_epochs, n_startup_trials
+
+    Returns:
+        (dict): 試行の結果
+    """
+    torch.set_num_threads(trial["n_threads"])
+    fix_seed(trial["seed"])
+    config = trial["config"]
+    dataset = trial["dataset"]
+    # プロセス全体のデバイスではなく、試行に割り当てられたデバイスで学習する
+    device = torch.device(trial["device"])
+    model = build_model(config).to(device)
+    criterion = torch.nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.get("lr", 1e-3))
+    train_loader = create_loader(dataset, trial["train_indices"], config, True)
+    test_loader = create_loader(dataset, trial["test_indices"], config, False)
+    train_epoch, eval_epoch = ((train_gcn, eval_gcn) if config["model"] == "GCN"
+                               else (train, eval))
+
+    start = time.perf_counter()
+    best_loss, best_r2, best_epoch = np.inf, None, 0
+    pruned = False
+    epoch = 0
+    for epoch in range(1, trial["epochs"] + 1):
+        train_epoch(model, train_loader, criterion, optimizer, device=device)
+        val_loss, val_r2 = eval_epoch(model, test_loader, criterion, device=device)
+        if val_loss < best_loss:
+            best_loss, best_r2, best_epoch = val_loss, val_r2, epoch
+        elif epoch - best_epoch >= trial["patience"]:
+            break
+        if epoch >= trial["min_epochs"] and should_prune(
+                trial["history"], trial["lock"], epoch, val_loss, trial["n_startup_trials"]):
+            pruned = True
+            break
+    result = {"trial_id": trial["trial_id"], "fold": trial["fold"], "seed": trial["seed"],
+              "device": trial["device"]}
+    result.update({name: value for name, value in config.items() if name != "collate_fn"})
+    result.update({"best_val_loss": best_loss, "best_val_r2": best_r2,
+                   "best_epoch": best_epoch, "epochs": epoch, "pruned": pruned,
+                   "seconds": time.perf_counter() - start})
+    return result
+
+
+def write_results(results, path):
+    """write_results
+
+    試行の結果をcsvファイルに書き込む関数
+
+    Args:
+        results (list): 試行の結果の辞書のリスト
+        path (str): 書き込むcsvファイルのパス
+    """
+    fieldnames = []
+    for result in results:
+        fieldnames.extend(name for name in result if name not in fieldnames)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def run_sweep(dataset, configs, results_path, n_splits=1, epochs=100, patience=10,
+              max_workers=None, seed=42, prune=True, min_epochs=5, n_startup_trials=4, devices=None):
+    """run_sweep
+
+    ハイパーパラメータの候補と分割の全ての組み合わせをプロセスプールで並列に学習・評価し、結果をcsvに保存する関数
+    各試行には異なるシード値を与え、コア数をワーカー数で割ったスレッド数で演算させることでコアの取り合いを防ぐ
+    試行はdevicesに順番に割り当てる
+
+    Args:
+        dataset (torch.utils.data.Dataset): データセット(GCNの場合はtorch_geometricのデータセット)
+        configs (list): grid_search_spaceまたはrandom_search_spaceで作成したハイパーパラメータの辞書のリスト
+        results_path (str): 結果を保存するcsvファイルのパス
+        n_splits (int): 交差検証の分割数
+        epochs (int): 最大エポック数
+        patience (int): 検証損失が改善しない場合に試行を終了するまでのエポック数
+        max_workers (int): 並列に実行する試行の数、Noneならcpu数
+        seed (int): 乱数のシード値
+        prune (bool): 見込みのない試行を打ち切るかどうか
+        min_epochs (int): 打ち切りの判定を始めるエポック数
+        n_startup_trials (int): 打ち切りの判定を始めるのに必要な他の試行の数
+        devices (list): 試行に割り当てるデバイスのリスト、Noneなら利用できる全てのGPU(なければcpu)
+
+    Returns:
+        results (list): 試行の結果の辞書のリスト
+    """
+    max_workers = max_workers or os.cpu_count()
+    n_threads = max(1, os.cpu_count() // max_workers)
+    splits = kfold_indices(len(dataset), n_splits, seed)
+    devices = devices or get_devices()
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        history = manager.dict() if prune else None
+        lock = manager.Lock() if prune else None
+        trials = []
+        for trial_id, config in enumerate(configs):
+            for fold, (train_indices, test_indices) in enumerate(splits):
+                trials.append({"trial_id": trial_id, "fold": fold, "config": config,
+                               "seed": seed + trial_id * n_splits + fold,
+                               "device": devices[len(trials) % len(devices)],
+                               "dataset": dataset, "train_indices": train_indices,
+                               "test_indices": test_indices, "epochs": epochs,
+                               "patience": patience, "n_threads": n_threads,
+                               "history": history, "lock": lock, "min_epochs": min_epochs,
+                               "n_startup_trials": n_startup_trials})
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            results = list(executor.map(run_trial, trials))
+    write_results(results, results_path)
+    return results
@@ -1,10 +1,10 @@
 import os
 import sys
 import subprocess
-from lark import Tree
 from collections import defaultdict
 sys.path.append(os.path.join(os.path.pardir))  # nopep8
-from parse_tstp import ParseTstp
+from parse_tstp import ParseTstp, is_token
+from include_scanner import IncludeScanner  # nopep8
 
 
 class TptpProblemSelector():
@@ -15,12 +15,15 @@ class TptpProblemSelector():
     Attributes:
         vampire_path (str): Vampireの実行ファイルのパス
         grammar_path (str): 使用するtptp文法ファイルのパス
+        include_cache_path (str): include文の走査結果をキャッシュするファイルのパス
+        max_workers (int): include文を走査するプロセスプールのワーカー数
     """
 
-    def __init__(self, vampire_path, grammar_path):
+    def __init__(self, vampire_path, grammar_path, include_cache_path=None, max_workers=None):
         self.vampire_path = vampire_path
         self.grammar_path = grammar_path
         self.parse_tstp = ParseTstp(self.grammar_path)
+        self.include_scanner = IncludeScanner(include_cache_path, max_workers)
 
     def run_vampire_clausify(self, problem_path):
         """run_vampire_clausify
@@ -53,7 +56,7 @@ class TptpProblemSelector():
         """
         if included_files is None:
             included_files = list()
-        if isinstance(node, Tree):
+        if not is_token(node):
             for child in node.children:
                 self.get_included_files(child)
         else:
@@ -85,6 +88,7 @@ class TptpProblemSelector():
         """create_axiom_set2theorems
 
         公理ファイルセットをkey、そのセットを使用している定理ファイルのリストをvalueとした辞書を作成する関数
+        include文はIncludeScannerで構文解析をせずに並列で走査し、走査結果はキャッシュされる
 
         Args:
             problem_file_paths (list): 問題ファイルのパスのリスト
@@ -93,14 +97,9 @@ class TptpProblemSelector():
             axiom_set2theorems (dict): 公理ファイルセットをkey、そのセットを使用している問題ファイルをvalueとした辞書
         """
         axiom_set2theorems = defaultdict(list)
+        path2includes = self.include_scanner.scan(problem_file_paths)
         for problem_file_path in problem_file_paths:
-            with open(problem_file_path, "r") as problem_file:
-                problem = problem_file.read()
-            problem_cst = self.parse_tstp.parse(problem)
-            included_files = self.get_included_files(problem_cst)
-            if not included_files:
-                axiom_set2theorems[""].append(problem_file_path)
-            included_files.sort()
+            included_files = sorted(path2includes[problem_file_path])
             included_files_text = ",".join(map(str, included_files))
             axiom_set2theorems[included_files_text].append(problem_file_path)
         return axiom_set2theorems
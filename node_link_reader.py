@@ -0,0 +1,168 @@
+import json
+import os
+import re
+
+# networkxのnode-link形式のjson({"directed": ..., "nodes": [...], "links": [...]})を読み込むためのイベント列
+# json.loadはファイル全体の辞書を作るため、大きな抽象構文木ではファイルの大きさの数倍のメモリを使う
+# ここではファイルをchunk_sizeずつ読み、nodesとlinks(edges)の配列を要素ごとにデコードして
+# (key, 要素)のイベントとして返すため、メモリはchunk_sizeと1要素分で済む
+# orjsonがインストールされていて、ファイルがFAST_PATH_MAX_BYTES以下なら、orjsonでファイル全体を読み込む方が速い
+
+# 要素ごとに返す配列のkey(networkx 3.4以降はedgesでも保存できる)
+ARRAY_KEYS = {"nodes", "links", "edges"}
+DEFAULT_CHUNK_SIZE = 1 << 20
+FAST_PATH_MAX_BYTES = 64 << 20
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class NodeLinkScanner:
+    """NodeLinkScanner
+
+    node-link形式のjsonファイルを少しずつ読み、トップレベルのkeyと値をイベントとして返すクラス
+    nodes, links, edgesの配列は要素ごとに(key, 要素)を返し、それ以外のkeyは(key, 値)を返す
+
+    Attributes:
+        f (file): テキストモードで開いたjsonファイル
+        chunk_size (int): 一度に読む文字数
+        buffer (str): 読み込んだがまだデコードしていない文字列
+        pos (int): buffer内の現在位置
+        offset (int): bufferの先頭のファイル内での位置(エラーメッセージ用)
+    """
+
+    def __init__(self, f, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0
+        self.eof = False
+
+    def error(self, message):
+        """error
+
+        ファイル内の位置を付けたValueErrorを作成する関数
+        """
+        return ValueError(f"{message} at char {self.offset + self.pos}")
+
+    def read_more(self, size):
+        """read_more
+
+        ファイルからsize文字を読み、デコード済みの部分を捨ててbufferに追加する関数
+
+        Returns:
+            (bool): 読めたならTrue、ファイルの終わりならFalse
+        """
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """peek
+
+        空白を読み飛ばし、次の文字を返す関数(位置は進めない)
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more(self.chunk_size):
+                raise self.error("Unexpected end of file")
+
+    def expect(self, chars):
+        """expect
+
+        次の文字がcharsのいずれかであることを確認して読み進め、その文字を返す関数
+        """
+        char = self.peek()
+        if char not in chars:
+            raise self.error(f"Expecting one of {chars!r}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """decode
+
+        次のjsonの値を1つデコードする関数
+        値がbufferの終わりで切れている場合は、ファイルを読み足してデコードし直す
+        数値のように切れていてもデコードできてしまう値があるため、bufferの終わりまで使った場合も読み足す
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self.read_more(max(self.chunk_size, len(self.buffer))):
+                    raise self.error("Invalid or truncated value")
+                continue
+            if end < len(self.buffer) or self.eof or not self.read_more(self.chunk_size):
+                self.pos = end
+                return value
+
+    def __iter__(self):
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            key = self.decode()
+            self.expect(":")
+            if key in ARRAY_KEYS and self.peek() == "[":
+                self.pos += 1
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self.decode()
+                        if self.expect(",]") == "]":
+                            break
+            else:
+                yield key, self.decode()
+            if self.expect(",}") == "}":
+                return
+
+
+def iter_loaded(loaded_json):
+    """iter_loaded
+
+    読み込み済みのnode-link形式の辞書から、NodeLinkScannerと同じイベントを返す関数
+    """
+    for key, value in loaded_json.items():
+        if key in ARRAY_KEYS and isinstance(value, list):
+            for item in value:
+                yield key, item
+        else:
+            yield key, value
+
+
+def iter_node_link(path, chunk_size=DEFAULT_CHUNK_SIZE, fast=None):
+    """iter_node_link
+
+    node-link形式のjsonファイルを読み、(key, 値または配列の要素)のイベントを返す関数
+
+    Args:
+        path (str): jsonファイルのパス
+        chunk_size (int): ストリームで読むときに一度に読む文字数
+        fast (bool): Trueならorjsonでファイル全体を読み込む、Falseならストリームで読む
+            Noneならorjsonがインストールされていてファイルの大きさがFAST_PATH_MAX_BYTES以下のときにorjsonを使う
+
+    Returns:
+        (iterator): (key, 値)のイテレータ
+    """
+    if fast is None:
+        fast = orjson is not None and os.path.getsize(path) <= FAST_PATH_MAX_BYTES
+    if fast:
+        with open(path, "rb") as f:
+            yield from iter_loaded(orjson.loads(f.read()))
+        return
+    with open(path, encoding="utf-8") as f:
+        yield from NodeLinkScanner(f, chunk_size)
@@ -1,8 +1,17 @@
 from copy import copy
 import json
 import os
-from networkx.readwrite import json_graph
-from handler import NetworkxHandler
+from handler import NetworkxHandler, SubtreeView
+from instrumentation import INSTRUMENTATION
+from symbol_table import SYMBOL_TABLE
+from term_dag import load_ast
+
+# 論理記号のラベルのID、ラベルの比較は文字列ではなくIDの整数比較で行う
+FORALL_ID = SYMBOL_TABLE.intern("!")
+AND_ID = SYMBOL_TABLE.intern("&")
+OR_ID = SYMBOL_TABLE.intern("|")
+NOT_ID = SYMBOL_TABLE.intern("~")
+LOGIC_SYMBOL_IDS = {AND_ID, OR_ID, NOT_ID}
 
 
 class DeductionTree:
@@ -10,6 +19,13 @@ class DeductionTree:
         self.nx = NetworkxHandler()
         self.nx.load_json(path)
 
+    @classmethod
+    def from_store(cls, store, problem):
+        # formula_store.FormulaStoreに保存した証明のグラフから作成する
+        deduction_tree = cls.__new__(cls)
+        deduction_tree.nx = store.load_deduction_tree(problem)
+        return deduction_tree
+
     def collect_cnf_nodes_recursively(self, node, cnf_nodes, is_cnf=False):
         targets = self.nx.get_children(node)
         for target in targets:
@@ -34,8 +50,15 @@ class DeductionTree:
 
 class FofTree:
     def __init__(self, path):
-        self.nx = NetworkxHandler()
-        self.nx.load_json(path)
+        # TermDagの形式で保存した抽象構文木も読み込める
+        self.nx = load_ast(path)
+
+    @classmethod
+    def from_store(cls, store, problem):
+        # formula_store.FormulaStoreに保存した抽象構文木から作成する
+        fof_tree = cls.__new__(cls)
+        fof_tree.nx = store.load_ast(problem)
+        return fof_tree
 
     def get_formula_root(self, fof_name):
         nodes = self.nx.get_nodes(fof_name)
@@ -50,6 +73,13 @@ class FofTree:
         formula_root = self.nx.get_children(theorem_root)[2]
         return formula_root
 
+    def get_formula(self, fof_name):
+        # 論理式の部分木をコピーせずに参照するビュー、変更したときだけコピーする
+        formula_root = self.get_formula_root(fof_name)
+        if formula_root is None:
+            return None
+        return SubtreeView(self.nx, formula_root)
+
     def is_name_node(self, node, attr):
         return self.is_token(node) and attr["token_type"] == "NAME"
 
@@ -62,23 +92,58 @@ class Converter():
         self.fof_tree = FofTree(fof_json_path)
         self.deduction_tree = DeductionTree(deduction_tree_json_path)
 
-    def save_normalized_formula(self, dir_path):
+    @classmethod
+    def from_store(cls, store, problem):
+        # formula_store.FormulaStoreに保存した抽象構文木と証明のグラフから作成する
+        converter = cls.__new__(cls)
+        converter.fof_tree = FofTree.from_store(store, problem)
+        converter.deduction_tree = DeductionTree.from_store(store, problem)
+        return converter
+
+    def iter_normalized_formula(self):
+        # cnf_transformation以降の論理式を正規化し、(論理式名, 正規化した論理式のグラフ)を返す
         nodes = self.deduction_tree.collect_cnf_nodes()
         for node in nodes:
             fof_name = self.deduction_tree.nx.get_label(node)
             formula_root = self.fof_tree.get_formula_root(fof_name)
-            graph = self.normalize_formula(formula_root)
-            json_root = json_graph.node_link_data(graph)
-            with open(os.path.join(dir_path, fof_name+".json"), "w") as f:
-                json.dump(json_root, f, indent=4)
+            yield fof_name, self.normalize_formula(formula_root)
+
+    def save_normalized_formula(self, dir_path, symbol_index=None):
+        # symbol_indexを渡した場合は、正規化した論理式の記号をdir_pathのファイルとして索引に追加する
+        from networkx.readwrite import json_graph
+        from symbol_index import extract_normalized_symbols
+        formulas = []
+        for fof_name, graph in self.iter_normalized_formula():
+            if symbol_index is not None:
+                formulas.append(extract_normalized_symbols(fof_name, graph))
+            with INSTRUMENTATION.span("dump_json"):
+                json_root = json_graph.node_link_data(graph)
+                with open(os.path.join(dir_path, fof_name+".json"), "w") as f:
+                    json.dump(json_root, f, indent=4)
+        if symbol_index is not None:
+            symbol_index.add_file(dir_path, formulas)
+
+    def save_normalized_formula_to_store(self, store, problem):
+        # 正規化した論理式をformula_store.FormulaStoreの問題problemに保存する
+        for fof_name, graph in self.iter_normalized_formula():
+            with INSTRUMENTATION.span("dump_json"):
+                store.add_normalized_formula(problem, fof_name, graph)
 
     def normalize_formula(self, formula_root):
         output_nx = NetworkxHandler()
-        self.remove_redundant_nodes(output_nx, formula_root)
-        self.arrange_conjuction(output_nx)
-        self.arrange_disjunction(output_nx)
-        self.coordinate_node(output_nx)
-        self.merge_negation(output_nx)
+        with INSTRUMENTATION.span("normalize_formula") as span:
+            with INSTRUMENTATION.span("remove_redundant_nodes"):
+                self.remove_redundant_nodes(output_nx, formula_root)
+            with INSTRUMENTATION.span("arrange_conjuction"):
+                self.arrange_conjuction(output_nx)
+            with INSTRUMENTATION.span("arrange_disjunction"):
+                self.arrange_disjunction(output_nx)
+            with INSTRUMENTATION.span("coordinate_node"):
+                self.coordinate_node(output_nx)
+            with INSTRUMENTATION.span("merge_negation"):
+                self.merge_negation(output_nx)
+            if span:
+                span.add(nodes=len(output_nx.get_all_nodes()))
         return output_nx.get_graph()
 
     def remove_redundant_nodes(self, output_nx, node, parent_node=None):
@@ -86,8 +151,9 @@ class Converter():
         # 1.Quantifier情報が入っているノード
         # 2.トークン情報が入っていないノード
         # 型付きの論理式(tffなど)では変数の型情報が消える
-        label = self.fof_tree.nx.get_label(node)
-        if self.is_reserve_node(node, label):
+        label_id = self.fof_tree.nx.get_label_id(node)
+        if self.is_reserve_node(node, label_id):
+            label = self.fof_tree.nx.get_label(node)
             new_node = output_nx.get_next_node()
             last_node = new_node
             attr = self.fof_tree.nx.get_attr(node)
@@ -97,7 +163,7 @@ class Converter():
         else:
             last_node = parent_node
         for child in self.fof_tree.nx.get_children(node):
-            if label == "!":
+            if label_id == FORALL_ID:
                 # logic_formulaだけが現れるケースには未対応
                 # 全称量化子の子がvariable_listのみのケースの場合
                 if len(self.fof_tree.nx.get_children(node)) == 1:
@@ -110,14 +176,14 @@ class Converter():
             else:
                 self.remove_redundant_nodes(output_nx, child, last_node)
 
-    def is_reserve_node(self, node, label):
-        return self.fof_tree.is_token(node) and not label == "!"
+    def is_reserve_node(self, node, label_id):
+        return self.fof_tree.is_token(node) and not label_id == FORALL_ID
 
     def arrange_conjuction(self, output_nx):
         assert len(output_nx.get_orphans()) == 1
         root = output_nx.get_orphans().pop()
         # Rootが & ではない
-        if not "&" in output_nx.get_label(root):
+        if not output_nx.get_label_id(root) == AND_ID:
             # Rootに & を追加する
             node = output_nx.get_next_node()
             output_nx.add_node("&", token_type="AND_CONNECTIVE")
@@ -126,8 +192,7 @@ class Converter():
         else:
             # dfsで探索し、& が再帰されて使用されている場合は統合する
             def merge_conjunction_recursively(node):
-                label = output_nx.get_label(node)
-                if label == "&":
+                if output_nx.get_label_id(node) == AND_ID:
                     children = copy(output_nx.get_children(node))
                     for child in children:
                         output_nx.add_edge(root, child)
@@ -144,7 +209,7 @@ class Converter():
         children = copy(output_nx.get_children(conjuction_node))
         for child in children:
             # & の子が | ではない
-            if not "|" in output_nx.get_label(child):
+            if not output_nx.get_label_id(child) == OR_ID:
                 output_nx.remove_edge(conjuction_node, child)
                 # &の子に|を追加
                 next_node = output_nx.get_next_node()
@@ -156,8 +221,7 @@ class Converter():
                 # dfsで探索し、| が再帰されて使用されている場合は統合する
 
                 def merge_disjunction_recursively(node):
-                    label = output_nx.get_label(node)
-                    if label == "|":
+                    if output_nx.get_label_id(node) == OR_ID:
                         children = copy(output_nx.get_children(node))
                         for child in children:
                             output_nx.add_edge(disjunction_node, child)
@@ -168,20 +232,20 @@ class Converter():
                 for grand_child in grand_children:
                     merge_disjunction_recursively(grand_child)
 
-    def is_logic_symbol(self, label):
-        return label in {"&", "|", "~"}
+    def is_logic_symbol(self, label_id):
+        return label_id in LOGIC_SYMBOL_IDS
 
     def coordinate_node(self, output_nx):
         label2nodes = copy(output_nx.label2nodes)
-        for label in label2nodes:
-            if not self.is_logic_symbol(label) and len(label2nodes[label]) > 1:
+        for label_id in label2nodes:
+            if not self.is_logic_symbol(label_id) and len(label2nodes[label_id]) > 1:
                 # 1つのラベルに複数のノードが存在する場合
                 # それらを結合するノードを追加する
                 token_type = output_nx.get_attr(
-                    label2nodes[label][0])["token_type"]
+                    label2nodes[label_id][0])["token_type"]
                 new_node = output_nx.add_node(
                     token_type, token_type="coordinate")
-                for node in label2nodes[label]:
+                for node in label2nodes[label_id]:
                     output_nx.add_edge(node, new_node)
 
     def merge_negation(self, output_nx, node=None):
@@ -191,8 +255,7 @@ class Converter():
             node = output_nx.get_orphans().pop()
         children = copy(output_nx.get_children(node))
         for child in children:
-            label = output_nx.get_label(node)
-            if label == "~":
+            if output_nx.get_label_id(node) == NOT_ID:
                 parents = output_nx.get_parents(node)
                 output_nx.remove_node(node)
                 if parents:
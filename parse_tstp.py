@@ -1,7 +1,12 @@
+from contextlib import contextmanager
+import gc
+import hashlib
 import json
-from lark import Lark, Tree, Token
-from networkx.readwrite import json_graph
+import os
+from cnf_parser import CnfParser
 from handler import NetworkxHandler
+from instrumentation import INSTRUMENTATION
+from term_dag import TermDag, load_ast
 
 # 方針
 # 1. 基本的に子が一つしかなく記号などを含んでいない場合は飛ばす
@@ -134,6 +139,96 @@ NODE_KEEP_RULE = {
 }
 
 
+# (文法ファイルの絶対パス, 位置情報を記録するか)をkey、パーサーをvalueとした辞書(プロセスごとに1回だけパーサーを作成する)
+PARSERS = dict()
+
+
+def grammar_digest(grammar_path):
+    """grammar_digest
+
+    文法ファイルのsha256を計算する関数
+    生成したスタンドアロンパーサーが現在の文法ファイルから生成されたものかどうかの確認に使う
+
+    Args:
+        grammar_path (str): 文法ファイルのパス
+
+    Returns:
+        (str): sha256の16進数の文字列
+    """
+    with open(grammar_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def get_parser(grammar_path, keep_positions=False):
+    """get_parser
+
+    文法ファイルのパーサーを取得する関数
+    build_tstp_parser.pyで生成したtstp_parser.pyが同じ文法ファイルから生成されていればそれを使い、
+    そうでなければlarkで文法ファイルを読み込んでEarleyパーサーを作成する
+    スタンドアロンパーサーはkeep_positionsがFalseならトークンの位置情報を記録しない(lean_lexer.py)
+    Earleyパーサーは常に位置情報を記録する
+
+    Args:
+        grammar_path (str): 文法ファイルのパス
+        keep_positions (bool): Trueならトークンに行番号や列番号などの位置情報を記録する
+
+    Returns:
+        (Lark or LeanParser): tptp_rootから構文解析するパーサー
+    """
+    key = (os.path.abspath(grammar_path), keep_positions)
+    parser = PARSERS.get(key)
+    if parser is not None:
+        return parser
+    with INSTRUMENTATION.span("load_grammar", keep_positions=keep_positions):
+        try:
+            import tstp_parser
+        except ImportError:
+            tstp_parser = None
+        if tstp_parser is not None and tstp_parser.GRAMMAR_SHA256 == grammar_digest(grammar_path):
+            if keep_positions:
+                parser = tstp_parser.Lark_StandAlone()
+            else:
+                from lean_lexer import LeanParser
+                parser = LeanParser()
+        else:
+            from lark import Lark
+            with open(grammar_path, encoding="utf-8") as grammar:
+                parser = Lark(grammar.read(), start="tptp_root")
+    PARSERS[key] = parser
+    return parser
+
+
+@contextmanager
+def pause_gc():
+    """pause_gc
+
+    withの中でガベージコレクションを止める関数
+    構文木は循環参照を含まないが、大量のオブジェクトを作る間にGCが何度も走り、大きな証明では解析時間の大半になる
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def is_token(cst):
+    """is_token
+
+    具象構文木のノードがトークンかどうかを判定する関数
+    larkのTokenとスタンドアロンパーサーのTokenはどちらもstrのサブクラスなので、strかどうかで判定する
+
+    Args:
+        cst (Tree or Token): 具象構文木のノード
+
+    Returns:
+        (bool): トークンならTrue、そうでないならFalse
+    """
+    return isinstance(cst, str)
+
+
 class ParseTstp():
     """Parse_Tstp
 
@@ -141,10 +236,13 @@ class ParseTstp():
 
     Attributes:
         grammar_path (str): 使用するtptp文法ファイルのパス
+        keep_positions (bool): Trueなら具象構文木のトークンに位置情報を記録する
+            Falseでも構文エラーは行番号と列番号付きで報告する
     """
 
-    def __init__(self, grammar_path):
+    def __init__(self, grammar_path, keep_positions=False):
         self.grammar_path = grammar_path
+        self.keep_positions = keep_positions
 
     def __satisfy_parent_condition(self, node_name, parent_node_name):
         """__satisfy_parent_condition
@@ -220,7 +318,7 @@ class ParseTstp():
             (bool): 残すならTrue、そうでないならFalse
         """
 
-        assert type(node) == Tree
+        assert not is_token(node)
         node_name = node.data
 
         # 1.NODE_KEEP_RULEにノード名があり，条件が書かれていない場合
@@ -270,7 +368,7 @@ class ParseTstp():
             (bool): トークン情報を付与するならTrueそうでないならFalse
         """
         child_token_names = set([child.type for child in node.children
-                                 if type(child) == Token])
+                                 if is_token(child)])
         child_names_in_rule = self.__get_children_from_rule(node.data)
         # ファンクターや演算子等のトークンが子にあるならトークン情報を付与する(方針5,6,8)
         # NODE_KEEP_RULE[node.data]["child"]とcstの子のトークンに積集合があるかを調べることで
@@ -291,7 +389,7 @@ class ParseTstp():
                 抽象構文木のグラフを管理するインスタンス
         """
         ast_id = ast_handler.get_next_node()
-        if type(cst) == Tree:
+        if not is_token(cst):
             label = cst.data
             ast_handler.add_node(label)
         else:
@@ -313,7 +411,7 @@ class ParseTstp():
         Returns:
             (bool): 具象構文木の子のトークンを上に上げるならTrue、そうでないならFalse
         """
-        if type(child_node) == Token:
+        if is_token(child_node):
             child_token_name = child_node.type
             return self.__satisfy_token_remove_condition(child_token_name, node_name)
         else:
@@ -340,9 +438,15 @@ class ParseTstp():
                 抽象構文木のグラフを管理するインスタンス
         """
         if ast_handler is None:
+            # 再帰呼び出しではなく最初の呼び出しのときだけ計測する
             ast_handler = NetworkxHandler()
+            with INSTRUMENTATION.span("convert_cst2ast") as span:
+                self.convert_cst2ast(cst, cst_parent_name, ast_parent_id, ast_handler)
+                if span:
+                    span.add(nodes=len(ast_handler.get_all_nodes()))
+            return ast_handler
 
-        if type(cst) == Token:
+        if is_token(cst):
             # トークンの場合
             token_name = cst.type
             if not self.__satisfy_token_remove_condition(token_name, cst_parent_name):
@@ -350,7 +454,6 @@ class ParseTstp():
                     cst, ast_parent_id, ast_handler)
         else:
             # 内部ノードの場合
-            assert type(cst) == Tree
 
             cst_name = cst.data
             ast_next_parent_id = ast_parent_id
@@ -372,10 +475,33 @@ class ParseTstp():
 
         return ast_handler
 
+    def convert_cst2dag(self, cst_root):
+        """convert_cst2dag
+
+        具象構文木から、同じ部分木を共有する抽象構文木(TermDag)を作成する関数
+        入力(annotated_formulaやinclude)ごとに抽象構文木を作成してTermDagに登録するため、
+        全体の抽象構文木を一度に作成することはない
+
+        Args:
+            cst_root (Tree): tptpの文法で構文解析した構文木の根
+
+        Returns:
+            dag (TermDag): 抽象構文木のTermDag
+        """
+        dag = TermDag()
+        root_children = []
+        for child in cst_root.children:
+            ast_handler = self.convert_cst2ast(child, cst_root.data)
+            for ast_root in sorted(ast_handler.get_orphans()):
+                root_children.append(dag.add_tree(ast_handler, ast_root))
+        dag.root = dag.intern(cst_root.data, root_children)
+        return dag
+
     def parse_tstp(self, tstp):
         """parse_tstp
 
         入力されたtstpファイルを読み込んだ文字列をtptpの文法で構文解析することで構文木を作成し、それを返す関数
+        パーサーはget_parserでプロセスごとに1回だけ作成する
 
         Args:
             tstp (str): tstpファイルを読み込んだ文字列
@@ -383,12 +509,48 @@ class ParseTstp():
         Returns:
             cst_root (Tree): tptpの文法で構文解析した構文木
         """
-        with open(self.grammar_path, encoding="utf-8") as grammar:
-            parser = Lark(grammar.read(), start="tptp_root")
+        parser = get_parser(self.grammar_path, self.keep_positions)
+        with pause_gc(), INSTRUMENTATION.span("parse_tstp") as span:
             cst_root = parser.parse(tstp)
+            if span:
+                span.add(bytes=len(tstp))
 
         return cst_root
 
+    def convert_tstp2ast(self, tstp):
+        """convert_tstp2ast
+
+        入力されたtstpファイルを読み込んだ文字列から抽象構文木を作成する関数
+        cnfの入力はcnf_parser.pyの手書きのパーサーで直接抽象構文木にし、
+        それ以外の入力はlarkで構文解析してconvert_cst2astで変換する
+        どちらの場合もconvert_cst2ast(parse_tstp(tstp))と同じ抽象構文木になる
+
+        Args:
+            tstp (str): tstpファイルを読み込んだ文字列
+
+        Returns:
+            ast_handler (NetworkxHandler): 抽象構文木のグラフを管理するインスタンス
+        """
+        with pause_gc(), INSTRUMENTATION.span("convert_tstp2ast") as span:
+            ast_handler = CnfParser(tstp).parse(self.__convert_inputs_with_lark)
+            if span:
+                span.add(bytes=len(tstp), nodes=len(ast_handler.get_all_nodes()))
+        return ast_handler
+
+    def __convert_inputs_with_lark(self, tstp, ast_parent_id, ast_handler):
+        """__convert_inputs_with_lark
+
+        手書きのパーサーで扱えない入力をlarkで構文解析し、抽象構文木に追加する関数
+
+        Args:
+            tstp (str): 入力の文字列
+            ast_parent_id (int): 抽象構文木のtptp_rootのノードID
+            ast_handler (NetworkxHandler): 抽象構文木のグラフを管理するインスタンス
+        """
+        cst_root = self.parse_tstp(tstp)
+        for child in cst_root.children:
+            self.convert_cst2ast(child, cst_root.data, ast_parent_id, ast_handler)
+
     def get_inference_children(self, annotations_id, ast_handler):
         """get_inference_children
 
@@ -458,40 +620,43 @@ class ParseTstp():
         抽象構文木から証明のグラフを作成する関数
 
         Args:
-            ast_path(str): networkxで作成した抽象構文木のグラフ(json)のパス
+            ast_path(str): networkxで作成した抽象構文木のグラフ(json)またはTermDag(json)のパス
 
         Returns:
             graph(networkx.classes.digraph.DiGraph): 証明のグラフのnetworkxのインスタンス
         """
-        ast_handler = NetworkxHandler()
-        ast_handler.load_json(ast_path)
-        deduction_handler = NetworkxHandler()
-        deduction_tree_edges = []
-        fof_list = ast_handler.get_children(0)
-        for fof in fof_list:
-            fof_children = ast_handler.get_children(fof)
-            formula_name_node = fof_children[0]
-            annotations_node = fof_children[-1]
-            formula_name = ast_handler.get_label(formula_name_node)
-            inference_rule = self.__get_inference_rule(
-                annotations_node, ast_handler)
-            deduction_handler.add_node(
-                formula_name, inference_rule=inference_rule)
-            assumption_formulas = self.__get_assumption_formulas(
-                annotations_node, ast_handler)
-            for assumption_formula in assumption_formulas:
-                assumption_formula_label = ast_handler.get_label(
-                    assumption_formula)
-                deduction_tree_edges.append(
-                    (assumption_formula_label, formula_name))
-        for source_label, target_label in deduction_tree_edges:
-            source = deduction_handler.get_nodes(source_label)[0]
-            target = deduction_handler.get_nodes(target_label)[0]
-            deduction_handler.add_edge(source, target)
-        graph = deduction_handler.get_graph()
+        ast_handler = load_ast(ast_path)
+        with INSTRUMENTATION.span("create_deduction_tree") as span:
+            deduction_handler = NetworkxHandler()
+            deduction_tree_edges = []
+            assert len(ast_handler.get_orphans()) == 1
+            fof_list = ast_handler.get_children(ast_handler.get_orphans().pop())
+            for fof in fof_list:
+                fof_children = ast_handler.get_children(fof)
+                formula_name_node = fof_children[0]
+                annotations_node = fof_children[-1]
+                formula_name = ast_handler.get_label(formula_name_node)
+                inference_rule = self.__get_inference_rule(
+                    annotations_node, ast_handler)
+                deduction_handler.add_node(
+                    formula_name, inference_rule=inference_rule)
+                assumption_formulas = self.__get_assumption_formulas(
+                    annotations_node, ast_handler)
+                for assumption_formula in assumption_formulas:
+                    assumption_formula_label = ast_handler.get_label(
+                        assumption_formula)
+                    deduction_tree_edges.append(
+                        (assumption_formula_label, formula_name))
+            for source_label, target_label in deduction_tree_edges:
+                source = deduction_handler.get_nodes(source_label)[0]
+                target = deduction_handler.get_nodes(target_label)[0]
+                deduction_handler.add_edge(source, target)
+            graph = deduction_handler.get_graph()
+            if span:
+                span.add(nodes=graph.number_of_nodes())
         return graph
 
-    def convert_tstp2json(self, tstp_path, json_path):
+    def convert_tstp2json(self, tstp_path, json_path, dag=False, symbol_index=None):
         """convert_tstp2json
 
         解析結果をjsonで保存する
@@ -499,12 +664,25 @@ class ParseTstp():
         Args:
             tstp_path (str): 解析するtstpファイルのパス
             json_path (str): 保存するjsonファイルのパス
+            dag (bool): Trueなら同じ部分木を共有したTermDagの形式で保存する
+            symbol_index (SymbolIndex): 渡した場合は、保存する抽象構文木の記号をtstp_pathのファイルとして索引に追加する
         """
         with open(tstp_path, "r") as f:
             tstp = f.read()
-        cst_root = self.parse_tstp(tstp)
-        ast_handler = self.convert_cst2ast(cst_root)
+        if dag:
+            term_dag = self.convert_cst2dag(self.parse_tstp(tstp))
+            if symbol_index is not None:
+                symbol_index.add_ast(tstp_path, term_dag)
+            term_dag.save_json(json_path)
+            return
+        from networkx.readwrite import json_graph
+        ast_handler = self.convert_tstp2ast(tstp)
+        if symbol_index is not None:
+            symbol_index.add_ast(tstp_path, ast_handler)
         ast_graph = ast_handler.get_graph()
-        json_root = json_graph.node_link_data(ast_graph)
-        with open(json_path, "w") as f:
-            json.dump(json_root, f, indent=4)
+        with INSTRUMENTATION.span("dump_json") as span:
+            json_root = json_graph.node_link_data(ast_graph)
+            with open(json_path, "w") as f:
+                json.dump(json_root, f, indent=4)
+            if span:
+                span.add(nodes=ast_graph.number_of_nodes())
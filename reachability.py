@@ -0,0 +1,263 @@
+import json
+import os
+import random
+from handler import NetworkxHandler
+
+# 証明のグラフ(create_deduction_tree_graph_on_networkxで作成したグラフ、エッジは前提から導出した式へ向かう)の到達可能性の索引
+# ノードをトポロジカル順に並べ、トポロジカル順の番号で前提と導出した式の隣接リストを持つ
+# 祖先の集合はノードごとに持たず(持つとノード数の2乗のメモリが必要になる)、問い合わせのたびに前提をたどって求める
+# たどるのは答えに含まれるノードとその前提のエッジだけなので、部分証明の取得は答えの大きさに比例する時間で済む
+# 「AはBの導出に使われているか」には、DFSの帰りがけ順の区間ラベル(GRAIL)を複数持ち、
+# Bの区間がAの区間に含まれないラベルが1つでもあれば使われていないと判定する
+# 判定できない場合は、区間とトポロジカル順の番号で枝刈りしながらAから導出した式をたどる
+
+
+class ReachabilityIndex:
+    """ReachabilityIndex
+
+    証明のグラフの到達可能性の索引
+    メモリはノード数とエッジ数に比例する(区間ラベルはノードごとにn_labels組)
+    作成後に元のグラフを変更しても索引には反映されない
+
+    Attributes:
+        nx_handler (NetworkxHandler): 証明のグラフのハンドラ
+        nodes (list): トポロジカル順(前提が先)のノードIDのリスト
+        node2index (dict): ノードIDをkey、トポロジカル順の番号をvalueとした辞書
+        parents (list): トポロジカル順の番号ごとの、前提の番号のリスト
+        children (list): トポロジカル順の番号ごとの、導出した式の番号のリスト
+        labels (list): 区間ラベルごとの(区間の下端のリスト, 帰りがけ順の番号のリスト)
+    """
+
+    def __init__(self, nx_handler, n_labels=2, seed=0):
+        self.nx_handler = nx_handler
+        self.nodes = self.topological_sort()
+        self.node2index = {node: index for index, node in enumerate(self.nodes)}
+        self.parents = [[self.node2index[parent] for parent in nx_handler.get_parents(node)]
+                        for node in self.nodes]
+        self.children = [[self.node2index[child] for child in nx_handler.get_children(node)]
+                         for node in self.nodes]
+        rng = random.Random(seed)
+        self.labels = [self.create_label(rng) for _ in range(n_labels)]
+
+    def topological_sort(self):
+        """topological_sort
+
+        証明のグラフのノードをトポロジカル順に並べる関数
+        同じ順位のノードはノードIDの順に並べる
+
+        Returns:
+            nodes (list): トポロジカル順のノードIDのリスト
+        """
+        all_nodes = self.nx_handler.get_all_nodes()
+        in_degrees = {node: len(self.nx_handler.get_parents(node)) for node in all_nodes}
+        nodes = [node for node in all_nodes if in_degrees[node] == 0]
+        for node in nodes:
+            for child in self.nx_handler.get_children(node):
+                in_degrees[child] -= 1
+                if in_degrees[child] == 0:
+                    nodes.append(child)
+        if len(nodes) != len(all_nodes):
+            raise ValueError("The deduction graph has a cycle")
+        return nodes
+
+    def create_label(self, rng):
+        """create_label
+
+        導出した式の向きにランダムな順でDFSを行い、区間ラベルを作成する関数
+        ノードuの区間は[uの子孫の帰りがけ順の番号の最小値, uの帰りがけ順の番号]で、
+        vがuの子孫ならvの区間はuの区間に含まれる
+
+        Args:
+            rng (random.Random): 子をたどる順番を決める乱数
+
+        Returns:
+            lows (list): トポロジカル順の番号ごとの区間の下端
+            posts (list): トポロジカル順の番号ごとの帰りがけ順の番号
+        """
+        n_nodes = len(self.nodes)
+        posts = [-1] * n_nodes
+        roots = [index for index in range(n_nodes) if not self.parents[index]]
+        rng.shuffle(roots)
+        rank = 0
+        for root in roots:
+            posts[root] = -2  # 訪問中
+            stack = [(root, iter(rng.sample(self.children[root], len(self.children[root]))))]
+            while stack:
+                index, children = stack[-1]
+                for child in children:
+                    if posts[child] == -1:
+                        posts[child] = -2
+                        stack.append((child, iter(rng.sample(self.children[child], len(self.children[child])))))
+                        break
+                else:
+                    stack.pop()
+                    posts[index] = rank
+                    rank += 1
+        # 子孫の下端の最小値は、トポロジカル順の逆順に子の下端から求める
+        lows = posts[:]
+        for index in range(n_nodes - 1, -1, -1):
+            for child in self.children[index]:
+                if lows[child] < lows[index]:
+                    lows[index] = lows[child]
+        return lows, posts
+
+    def may_reach(self, source, target):
+        """may_reach
+
+        区間ラベルでsourceからtargetに到達できる可能性があるかを判定する関数
+        Falseなら到達できないが、Trueでも到達できるとは限らない
+
+        Args:
+            source (int): 始点のトポロジカル順の番号
+            target (int): 終点のトポロジカル順の番号
+
+        Returns:
+            (bool): 全ての区間ラベルでtargetの区間がsourceの区間に含まれるならTrue
+        """
+        for lows, posts in self.labels:
+            if not (lows[source] <= lows[target] and posts[target] <= posts[source]):
+                return False
+        return True
+
+    def is_used_to_derive(self, premise, conclusion):
+        """is_used_to_derive
+
+        premiseがconclusionの導出に(間接的にでも)使われているかどうかを判定する関数
+        区間ラベルで判定できない場合は、conclusionに到達しうる子だけをたどる
+
+        Args:
+            premise (int): 前提のノードID
+            conclusion (int): 導出した式のノードID
+
+        Returns:
+            (bool): 使われているならTrue、そうでないならFalse
+        """
+        source = self.node2index[premise]
+        target = self.node2index[conclusion]
+        if source >= target or not self.may_reach(source, target):
+            return False
+        visited = {source}
+        stack = [source]
+        while stack:
+            index = stack.pop()
+            for child in self.children[index]:
+                if child == target:
+                    return True
+                # トポロジカル順でtargetより後ろのノードからはtargetに到達できない
+                if child < target and child not in visited and self.may_reach(child, target):
+                    visited.add(child)
+                    stack.append(child)
+        return False
+
+    def collect(self, index, neighbors):
+        """collect
+
+        隣接リストをたどって到達できるノードの番号をトポロジカル順に集める関数
+        たどるのは到達できるノードとそのエッジだけなので、答えの大きさに比例する時間で済む
+
+        Args:
+            index (int): 始点のトポロジカル順の番号
+            neighbors (list): たどる向きの隣接リスト(parentsまたはchildren)
+
+        Returns:
+            (list): 始点を含まない、到達できるノードの番号の昇順のリスト
+        """
+        visited = {index}
+        stack = [index]
+        while stack:
+            for neighbor in neighbors[stack.pop()]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        visited.remove(index)
+        return sorted(visited)
+
+    def get_premises(self, node):
+        """get_premises
+
+        ノードの導出に使われた全ての式(祖先)を取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (list): 祖先のノードIDのトポロジカル順のリスト
+        """
+        return [self.nodes[index] for index in self.collect(self.node2index[node], self.parents)]
+
+    def get_consequences(self, node):
+        """get_consequences
+
+        ノードを使って導出された全ての式(子孫)を取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (list): 子孫のノードIDのトポロジカル順のリスト
+        """
+        return [self.nodes[index] for index in self.collect(self.node2index[node], self.children)]
+
+    def get_sub_proof(self, node):
+        """get_sub_proof
+
+        ノードを導出するのに必要な最小の部分証明(ノードとその祖先)を取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (list): 部分証明のノードIDのトポロジカル順のリスト(最後がnode)
+        """
+        return self.get_premises(node) + [node]
+
+    def slice(self, node):
+        """slice
+
+        ノードの部分証明を新しい証明のグラフとして取り出す関数
+        ノードのラベルとアトリビュート(inference_rule)はそのまま、ノードIDはトポロジカル順に振り直す
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            sub_proof (NetworkxHandler): 部分証明のグラフのハンドラ
+        """
+        sub_proof = NetworkxHandler()
+        node2new_node = dict()
+        for sub_proof_node in self.get_sub_proof(node):
+            new_node = sub_proof.add_node(self.nx_handler.get_label(sub_proof_node),
+                                          **self.nx_handler.get_attr(sub_proof_node))
+            node2new_node[sub_proof_node] = new_node
+            for parent in self.nx_handler.get_parents(sub_proof_node):
+                sub_proof.add_edge(node2new_node[parent], new_node)
+        return sub_proof
+
+    def slice_all(self, nodes):
+        """slice_all
+
+        複数のノードの部分証明を取り出す関数
+
+        Args:
+            nodes (iterable): ノードIDのイテレータ
+
+        Returns:
+            (iterator): (ノードID, 部分証明のハンドラ)のイテレータ
+        """
+        for node in nodes:
+            yield node, self.slice(node)
+
+    def save_slices(self, nodes, dir_path):
+        """save_slices
+
+        複数のノードの部分証明を、ノードのラベル(論理式名).jsonとしてnetworkxのjson形式で保存する関数
+
+        Args:
+            nodes (iterable): ノードIDのイテレータ
+            dir_path (str): 保存するディレクトリのパス
+        """
+        from networkx.readwrite import json_graph
+        for node, sub_proof in self.slice_all(nodes):
+            json_root = json_graph.node_link_data(sub_proof.get_graph())
+            with open(os.path.join(dir_path, self.nx_handler.get_label(node) + ".json"), "w") as f:
+                json.dump(json_root, f, indent=4)
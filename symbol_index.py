@@ -0,0 +1,397 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+import sqlite3
+import sys
+import zlib
+
+# 構文解析した証明のコーパスの記号の転置索引(sqlite)
+# 記号("functor:f", "name:a1", "rule:resolution", "premise:a1"など)ごとに、その記号を含む論理式のIDの昇順のリスト(ポスティング)を持つ
+# ポスティングはIDの差分をuint32の配列にしてzlibで圧縮する
+# 可変長整数の方が小さくなるが、Pythonでの復号が遅いため、復号がCで済む(zlib, array, accumulate)この形式にする
+# 配列はリトルエンディアンで保存する
+# ポスティングはBLOCK_SIZE個以下のIDのブロックに分けて、ブロックの最初のIDをkeyにして保存する
+# 論理式のIDは追加順に振るため、ブロックをIDの順に連結すれば昇順のポスティングになる
+# ANDでは小さいポスティングの候補を含むブロックだけを復号すればよいため、頻出する記号とのANDも速い
+# 追加は記号ごとにメモリにため、flushのたびにブロックとして書き込む
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS formulas (id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL, name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS postings (
+    symbol TEXT NOT NULL, first_id INTEGER NOT NULL, count INTEGER NOT NULL, data BLOB NOT NULL,
+    PRIMARY KEY (symbol, first_id)
+) WITHOUT ROWID;
+"""
+# 記号として索引に登録するトークンの種類
+FUNCTOR_TOKEN_TYPES = {"FUNCTOR", "DEFINED_FUNCTOR"}
+DEFAULT_FLUSH_SIZE = 100000
+BLOCK_SIZE = 4096
+
+
+def encode_postings(formula_ids):
+    """encode_postings
+
+    昇順の論理式のIDのリストを、差分のuint32の配列をzlibで圧縮したバイト列にする関数
+    """
+    deltas = array("I", (formula_id - previous for formula_id, previous in zip(formula_ids, [0] + formula_ids)))
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    return zlib.compress(deltas.tobytes())
+
+
+def decode_postings(data):
+    """decode_postings
+
+    encode_postingsで作成したバイト列を論理式のIDのリストに戻す関数
+    """
+    deltas = array("I")
+    deltas.frombytes(zlib.decompress(data))
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    return list(accumulate(deltas))
+
+
+def iter_blocks(symbol, formula_ids):
+    """iter_blocks
+
+    記号の昇順の論理式のIDのリストを、postingsの行(記号, 最初のID, IDの数, バイト列)に分ける関数
+    """
+    for start in range(0, len(formula_ids), BLOCK_SIZE):
+        block = formula_ids[start:start + BLOCK_SIZE]
+        yield symbol, block[0], len(block), encode_postings(block)
+
+
+def iter_formula_nodes(ast):
+    """iter_formula_nodes
+
+    抽象構文木の論理式(fof, cnfなど)のノードを返す関数
+    """
+    assert len(ast.get_orphans()) == 1
+    return ast.get_children(ast.get_orphans().pop())
+
+
+def extract_symbols(ast):
+    """extract_symbols
+
+    抽象構文木の論理式ごとに、索引に登録する記号を取得する関数
+    論理式名(name)、論理式に現れる関数記号と述語記号(functor)、推論規則(rule)、推論に使った論理式名(premise)を記号にする
+
+    Args:
+        ast (NetworkxHandler or TermDag): convert_tstp2astまたはconvert_cst2dagで作成した抽象構文木
+
+    Returns:
+        (list): (論理式名, 記号のset)のリスト
+    """
+    formulas = []
+    for formula_node in iter_formula_nodes(ast):
+        children = ast.get_children(formula_node)
+        name = ast.get_label(children[0])
+        symbols = {"name:" + name}
+        # TermDagでは共有された部分木を複数回たどらないように、たどったノードを記録する
+        visited = set()
+        stack = [children[2]] if len(children) > 2 else []
+        while stack:
+            node = stack.pop()
+            if node in visited:
+                continue
+            visited.add(node)
+            if ast.get_attr(node).get("token_type") in FUNCTOR_TOKEN_TYPES:
+                symbols.add("functor:" + ast.get_label(node))
+            stack.extend(ast.get_children(node))
+        annotations = ast.get_children(children[-1]) if len(children) > 3 else []
+        if annotations and "inference" in ast.get_label(annotations[0]):
+            inference_children = ast.get_children(annotations[0])
+            if inference_children:
+                symbols.add("rule:" + ast.get_label(inference_children[0]))
+                for premise in ast.get_children(inference_children[-1]):
+                    symbols.add("premise:" + ast.get_label(premise))
+        formulas.append((name, symbols))
+    return formulas
+
+
+def extract_normalized_symbols(fof_name, graph):
+    """extract_normalized_symbols
+
+    Converter.normalize_formulaで正規化した論理式の、索引に登録する記号を取得する関数
+    merge_negationで付けた~は除く
+
+    Args:
+        fof_name (str): 論理式名
+        graph (networkx.DiGraph): 正規化した論理式のグラフ
+
+    Returns:
+        (tuple): (論理式名, 記号のset)
+    """
+    symbols = {"name:" + fof_name}
+    for _, attr in graph.nodes(data=True):
+        if attr.get("token_type") in FUNCTOR_TOKEN_TYPES:
+            symbols.add("functor:" + attr["label"].lstrip("~"))
+    return fof_name, symbols
+
+
+class SymbolIndex:
+    """SymbolIndex
+
+    記号の転置索引のクラス
+    ファイル単位で追加し、既に追加したファイルは追加しないため、同じファイルを何度追加しても結果は変わらない
+
+    Attributes:
+        connection (sqlite3.Connection): 索引のデータベース
+        flush_size (int): メモリにためる論理式の数、これを超えたらflushする
+        next_id (int): 次に追加する論理式のID
+        next_file_id (int): 次に追加するファイルのID
+        pending_postings (dict): 記号をkey、まだ書き込んでいない論理式のIDのリストをvalueとした辞書
+        pending_files (list): まだ書き込んでいない(ファイルのID, パス)のリスト
+        pending_formulas (list): まだ書き込んでいない(論理式のID, ファイルのID, 論理式名)のリスト
+        pending_paths (set): まだ書き込んでいないファイルのパスのset
+    """
+
+    def __init__(self, path, flush_size=DEFAULT_FLUSH_SIZE):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.flush_size = flush_size
+        self.next_id = self.connection.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM formulas").fetchone()[0]
+        self.next_file_id = self.connection.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM files").fetchone()[0]
+        self.pending_postings = dict()
+        self.pending_files = []
+        self.pending_formulas = []
+        self.pending_paths = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """close
+
+        ためている追加を書き込み、データベースを閉じる関数
+        """
+        self.flush()
+        self.connection.close()
+
+    def has_file(self, path):
+        """has_file
+
+        ファイルが索引に追加済みかどうかを判定する関数
+        """
+        if path in self.pending_paths:
+            return True
+        return self.connection.execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone() is not None
+
+    def add_file(self, path, formulas):
+        """add_file
+
+        ファイルの論理式の記号を索引に追加する関数
+
+        Args:
+            path (str): ファイルのパス(または入力の名前)
+            formulas (iterable): extract_symbolsで取得した(論理式名, 記号のset)のイテレータ
+
+        Returns:
+            (bool): 追加したならTrue、追加済みのファイルならFalse
+        """
+        if self.has_file(path):
+            return False
+        file_id = self.next_file_id
+        self.next_file_id += 1
+        self.pending_files.append((file_id, path))
+        self.pending_paths.add(path)
+        for name, symbols in formulas:
+            formula_id = self.next_id
+            self.next_id += 1
+            self.pending_formulas.append((formula_id, file_id, name))
+            for symbol in symbols:
+                self.pending_postings.setdefault(symbol, []).append(formula_id)
+        if len(self.pending_formulas) >= self.flush_size:
+            self.flush()
+        return True
+
+    def add_ast(self, path, ast):
+        """add_ast
+
+        抽象構文木の論理式の記号を索引に追加する関数
+
+        Args:
+            path (str): 抽象構文木を作成したファイルのパス(または入力の名前)
+            ast (NetworkxHandler or TermDag): 抽象構文木
+
+        Returns:
+            (bool): 追加したならTrue、追加済みのファイルならFalse
+        """
+        return self.add_file(path, extract_symbols(ast))
+
+    def is_flushed(self):
+        """is_flushed
+
+        ためている追加がない(追加したファイルが全て書き込まれている)かどうかを判定する関数
+        """
+        return not self.pending_files
+
+    def flush(self):
+        """flush
+
+        ためている追加を1つのトランザクションで書き込む関数
+        """
+        if self.is_flushed():
+            return
+        with self.connection:
+            self.connection.executemany("INSERT INTO files VALUES (?, ?)", self.pending_files)
+            self.connection.executemany("INSERT INTO formulas VALUES (?, ?, ?)", self.pending_formulas)
+            self.connection.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                (row for symbol, formula_ids in self.pending_postings.items()
+                 for row in iter_blocks(symbol, formula_ids)))
+        self.pending_postings = dict()
+        self.pending_files = []
+        self.pending_formulas = []
+        self.pending_paths = set()
+
+    def compact(self):
+        """compact
+
+        記号ごとのブロックを、BLOCK_SIZE個ずつのブロックにまとめ直す関数
+        flushのたびに小さいブロックが増え、検索が遅くなるため、索引を作り終えたら実行する
+        """
+        self.flush()
+        symbols = [symbol for symbol, in self.connection.execute(
+            "SELECT symbol FROM postings GROUP BY symbol HAVING COUNT(*) > (SUM(count) + ? - 1) / ?",
+            (BLOCK_SIZE, BLOCK_SIZE))]
+        with self.connection:
+            for symbol in symbols:
+                formula_ids = self.lookup(symbol)
+                self.connection.execute("DELETE FROM postings WHERE symbol = ?", (symbol,))
+                self.connection.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)",
+                                            iter_blocks(symbol, formula_ids))
+        self.connection.execute("VACUUM")
+
+    def count(self, symbol):
+        """count
+
+        記号を含む論理式の数を取得する関数(ブロックを復号しない)
+        """
+        return self.connection.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM postings WHERE symbol = ?", (symbol,)).fetchone()[0]
+
+    def lookup(self, symbol):
+        """lookup
+
+        記号を含む論理式のIDを取得する関数(書き込み済みの追加のみ)
+
+        Args:
+            symbol (str): 記号、例: "functor:f"
+
+        Returns:
+            (list): 論理式のIDの昇順のリスト
+        """
+        formula_ids = []
+        for data, in self.connection.execute(
+                "SELECT data FROM postings WHERE symbol = ? ORDER BY first_id", (symbol,)):
+            formula_ids += decode_postings(data)
+        return formula_ids
+
+    def filter(self, symbol, candidates):
+        """filter
+
+        論理式のIDのsetのうち、記号を含むものを取得する関数
+        候補を含むブロックだけを復号する
+
+        Args:
+            symbol (str): 記号
+            candidates (set): 論理式のIDのset
+
+        Returns:
+            (set): 記号を含む論理式のIDのset
+        """
+        first_ids = [first_id for first_id, in self.connection.execute(
+            "SELECT first_id FROM postings WHERE symbol = ? ORDER BY first_id", (symbol,))]
+        blocks = {first_ids[index] for index in (bisect_right(first_ids, candidate) - 1 for candidate in candidates)
+                  if index >= 0}
+        if len(blocks) * 2 > len(first_ids):
+            return candidates.intersection(self.lookup(symbol))
+        result = set()
+        for first_id in blocks:
+            data, = self.connection.execute(
+                "SELECT data FROM postings WHERE symbol = ? AND first_id = ?", (symbol, first_id)).fetchone()
+            result.update(candidates.intersection(decode_postings(data)))
+        return result
+
+    def query(self, expression):
+        """query
+
+        記号のAND/ORの式に一致する論理式のIDを取得する関数
+
+        Args:
+            expression (str or tuple): 記号、または("and", 式, ...)、("or", 式, ...)
+                例: ("and", "functor:f", ("or", "rule:resolution", "rule:superposition"))
+
+        Returns:
+            (list): 論理式のIDの昇順のリスト
+        """
+        if isinstance(expression, str):
+            return self.lookup(expression)
+        return sorted(self.evaluate(expression))
+
+    def evaluate(self, expression):
+        """evaluate
+
+        queryの式を評価し、論理式のIDのsetを返す関数
+        ANDは記号以外の式と最も少ない記号のうち小さい方を候補にし、残りの記号はfilterで候補を絞り込む
+        """
+        if isinstance(expression, str):
+            return set(self.lookup(expression))
+        operator, *operands = expression
+        if operator == "or":
+            return set().union(*(self.evaluate(operand) for operand in operands))
+        if operator != "and":
+            raise ValueError(f"Unknown operator: {operator}")
+        symbols = sorted((operand for operand in operands if isinstance(operand, str)), key=self.count)
+        results = sorted((self.evaluate(operand) for operand in operands if not isinstance(operand, str)), key=len)
+        if symbols and (not results or self.count(symbols[0]) < len(results[0])):
+            results.insert(0, set(self.lookup(symbols.pop(0))))
+        if not results:
+            return set()
+        candidates = set.intersection(*results)
+        for symbol in symbols:
+            if not candidates:
+                break
+            candidates = self.filter(symbol, candidates)
+        return candidates
+
+    def get_formulas(self, formula_ids):
+        """get_formulas
+
+        論理式のIDから(ファイルのパス, 論理式名)を取得する関数
+
+        Args:
+            formula_ids (iterable): 論理式のIDのイテレータ
+
+        Returns:
+            (list): formula_idsと同じ順の(ファイルのパス, 論理式名)のリスト
+        """
+        formula_ids = list(formula_ids)
+        id2formula = dict()
+        # sqliteの変数の数の上限を超えないように分けて問い合わせる
+        for start in range(0, len(formula_ids), 500):
+            chunk = formula_ids[start:start + 500]
+            id2formula.update((formula_id, (path, name)) for formula_id, path, name in self.connection.execute(
+                "SELECT formulas.id, files.path, formulas.name FROM formulas JOIN files ON files.id = formulas.file_id "
+                f"WHERE formulas.id IN ({','.join('?' * len(chunk))})", chunk))
+        return [id2formula[formula_id] for formula_id in formula_ids]
+
+    def get_files(self, formula_ids):
+        """get_files
+
+        論理式のIDからその論理式を含むファイルのパスを取得する関数
+        例: query("premise:a1")の結果から、公理a1を使った証明を求める
+
+        Args:
+            formula_ids (iterable): 論理式のIDのイテレータ
+
+        Returns:
+            (list): ファイルのパスの昇順のリスト
+        """
+        return sorted({path for path, _ in self.get_formulas(formula_ids)})
@@ -0,0 +1,101 @@
+import threading
+
+
+class SymbolTable:
+    """SymbolTable
+
+    ラベルやトークンの種類の文字列に整数のIDを割り当てるクラス
+    同じ文字列は1つのオブジェクトを共有し、比較はIDの整数比較で行えるようにする
+    新しい文字列の登録はロックで排他し、複数のスレッドから同時にinternしても同じIDを割り当てない
+
+    Attributes:
+        symbol2id (dict): 文字列をkey、IDをvalueとした辞書
+        id2symbol (list): IDごとの文字列
+    """
+
+    def __init__(self):
+        self.symbol2id = dict()
+        self.id2symbol = []
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # ロックはpickleできないため、読み込んだ側で作り直す
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.id2symbol)
+
+    def intern(self, symbol):
+        """intern
+
+        文字列のIDを取得する関数、登録されていない文字列なら新しいIDを割り当てる
+
+        Args:
+            symbol (str): 文字列(lark.Tokenなどstrのサブクラスはstrに変換して登録する)
+
+        Returns:
+            (int): ID
+        """
+        symbol_id = self.symbol2id.get(symbol)
+        if symbol_id is not None:
+            return symbol_id
+        with self.lock:
+            # ロックを待つ間に他のスレッドが登録している場合がある
+            symbol_id = self.symbol2id.get(symbol)
+            if symbol_id is None:
+                symbol_id = len(self.id2symbol)
+                # Tokenは行番号などを持つため、登録するのは文字列のみにする
+                symbol = str(symbol)
+                # id2symbolに追加してからsymbol2idに登録し、ロックの外で読むスレッドが未登録のIDを見ないようにする
+                self.id2symbol.append(symbol)
+                self.symbol2id[symbol] = symbol_id
+        return symbol_id
+
+    def get_id(self, symbol):
+        """get_id
+
+        登録済みの文字列のIDを取得する関数
+
+        Args:
+            symbol (str): 文字列
+
+        Returns:
+            (int): ID、登録されていなければNone
+        """
+        return self.symbol2id.get(symbol)
+
+    def get_symbol(self, symbol_id):
+        """get_symbol
+
+        IDから文字列を取得する関数
+
+        Args:
+            symbol_id (int): ID
+
+        Returns:
+            (str): 文字列
+        """
+        return self.id2symbol[symbol_id]
+
+    def canonical(self, symbol):
+        """canonical
+
+        登録済みの同じ文字列のオブジェクトを取得する関数、登録されていない文字列なら登録する
+
+        Args:
+            symbol (str): 文字列
+
+        Returns:
+            (str): 共有している文字列のオブジェクト
+        """
+        return self.id2symbol[self.intern(symbol)]
+
+
+# ParseTstp, NetworkxHandler, Converterで共有する記号表
+SYMBOL_TABLE = SymbolTable()
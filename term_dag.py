@@ -0,0 +1,378 @@
+from collections import defaultdict
+from itertools import chain
+import json
+from handler import NetworkxHandler
+from instrumentation import INSTRUMENTATION
+from node_link_reader import iter_node_link
+from symbol_table import SYMBOL_TABLE
+
+
+class TermDag:
+    """TermDag
+
+    ラベル、トークンの種類、子の並びが同じ部分木を1つのノードで共有する(hash-consing)抽象構文木のクラス
+    証明の各ステップに繰り返し現れる項やリテラルを共有することで、ノード数を異なる部分木の数に抑える
+    NetworkxHandlerの参照系の関数と同じ名前の関数を持つため、木を読むだけの処理にはそのまま渡せる
+    ただし共有されたノードは親を複数持つ
+
+    Attributes:
+        symbol_table (SymbolTable): ラベルとトークンの種類の記号表、省略時はSYMBOL_TABLEを共有する
+        key2node (dict): (ラベルのID, トークンの種類, 子のタプル)をkey、ノードIDをvalueとした辞書
+        node2label (list): ノードIDごとのラベルのID
+        node2attr (list): ノードIDごとのアトリビュート(ラベルを除く)
+        node2children (list): ノードIDごとの子のタプル
+        node2parents (list): ノードIDごとの親のリスト(参照の数だけ重複する)
+        node2size (list): ノードIDごとの、木に展開したときの部分木のノード数
+        label2nodes (dict): ラベルのIDをkey、ノードIDのリストをvalueとした辞書
+        root (int): 根のノードID
+    """
+
+    def __init__(self, symbol_table=None):
+        self.symbol_table = SYMBOL_TABLE if symbol_table is None else symbol_table
+        self.key2node = dict()
+        self.node2label = []
+        self.node2attr = []
+        self.node2children = []
+        self.node2parents = []
+        self.node2size = []
+        self.label2nodes = defaultdict(list)
+        self.root = None
+
+    def intern(self, label, children, **attr):
+        """intern
+
+        ノードを登録する関数
+        同じラベル、アトリビュート、子の並びを持つノードが既にあれば、新しく作らずにそのノードIDを返す
+
+        Args:
+            label (str): ノードのラベル
+            children (list): 子のノードIDのリスト(登録済みのノード)
+            attr (dict): ノードのアトリビュート
+                例: {"token_type": "FUNCTOR"}
+
+        Returns:
+            (int): ノードID
+        """
+        children = tuple(children)
+        label_id = self.symbol_table.intern(label)
+        key = (label_id, attr.get("token_type"), children)
+        node = self.key2node.get(key)
+        if node is not None:
+            return node
+        node = len(self.node2label)
+        self.key2node[key] = node
+        self.node2label.append(label_id)
+        self.node2attr.append({name: self.symbol_table.canonical(value) if isinstance(value, str)
+                               else value for name, value in attr.items()})
+        self.node2children.append(children)
+        self.node2parents.append([])
+        self.node2size.append(1 + sum(self.node2size[child] for child in children))
+        self.label2nodes[label_id].append(node)
+        for child in children:
+            self.node2parents[child].append(node)
+        return node
+
+    def add_tree(self, nx_handler, node):
+        """add_tree
+
+        NetworkxHandlerの木の部分木を登録する関数
+
+        Args:
+            nx_handler (NetworkxHandler): 木のハンドラ
+            node (int): 登録する部分木の根のノードID
+
+        Returns:
+            (int): 部分木の根のTermDagでのノードID
+        """
+        # 深い木で再帰の上限に達しないよう、スタックを使って帰りがけ順に登録する
+        interned = dict()
+        stack = [(node, False)]
+        while stack:
+            current_node, is_visited = stack.pop()
+            children = nx_handler.get_children(current_node)
+            if not is_visited:
+                stack.append((current_node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+            interned[current_node] = self.intern(
+                nx_handler.get_label(current_node),
+                [interned[child] for child in children],
+                **nx_handler.get_attr(current_node))
+        return interned[node]
+
+    @classmethod
+    def from_handler(cls, nx_handler):
+        """from_handler
+
+        NetworkxHandlerの抽象構文木からTermDagを作成する関数
+
+        Args:
+            nx_handler (NetworkxHandler): 抽象構文木のハンドラ
+
+        Returns:
+            (TermDag): 作成したTermDag
+        """
+        dag = cls()
+        assert len(nx_handler.get_orphans()) == 1
+        dag.root = dag.add_tree(nx_handler, nx_handler.get_orphans().pop())
+        return dag
+
+    def get_children(self, node):
+        """get_children
+
+        ノードの子を取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (tuple): ノードの子のタプル
+        """
+        return self.node2children[node]
+
+    def get_parents(self, node):
+        """get_parents
+
+        ノードの親を取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (list): ノードの親のリスト、同じ親から複数回参照されている場合はその数だけ含む
+        """
+        return self.node2parents[node]
+
+    def get_refcount(self, node):
+        """get_refcount
+
+        ノードが親から参照されている数を取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (int): 参照数
+        """
+        return len(self.node2parents[node])
+
+    def get_label(self, node):
+        """get_label
+
+        ノードのラベルを取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (str): ノードのラベル
+        """
+        return self.symbol_table.get_symbol(self.node2label[node])
+
+    def get_label_id(self, node):
+        """get_label_id
+
+        ノードのラベルの記号表でのIDを取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (int): ラベルのID
+        """
+        return self.node2label[node]
+
+    def get_attr(self, node):
+        """get_attr
+
+        ノードのアトリビュートを取得する関数
+
+        Args:
+            node (int): ノードID
+
+        Returns:
+            (dict): ノードのアトリビュート
+        """
+        return self.node2attr[node]
+
+    def get_nodes(self, label):
+        """get_nodes
+
+        ラベルからノードを取得する関数
+
+        Args:
+            label (str): ラベル
+
+        Returns:
+            (list): ノードIDのリスト、そのラベルのノードがなければ空のリスト
+        """
+        # 問い合わせたラベルを記号表とlabel2nodesに登録しないよう、internせずに引く
+        label_id = self.symbol_table.get_id(label)
+        if label_id is None:
+            return []
+        return self.label2nodes.get(label_id, [])
+
+    def get_all_nodes(self):
+        """get_all_nodes
+
+        ノードのリストを取得する関数
+
+        Returns:
+            (list): ノードのリスト
+        """
+        return list(range(len(self.node2label)))
+
+    def get_orphans(self):
+        """get_orphans
+
+        親ノードがないノードを取得する関数
+
+        Returns:
+            (set): 親ノードがないノードのset
+        """
+        return {node for node, parents in enumerate(self.node2parents) if not parents}
+
+    def expand(self, node=None):
+        """expand
+
+        部分木を共有しない木に展開し、NetworkxHandlerとして返す関数
+        ノードIDは行きがけ順に振るため、convert_cst2astで作成した抽象構文木と同じグラフになる
+
+        Args:
+            node (int): 展開する部分木の根のノードID、Noneなら根
+
+        Returns:
+            (NetworkxHandler): 展開した木のハンドラ
+        """
+        if node is None:
+            node = self.root
+        nx_handler = NetworkxHandler()
+        stack = [(node, None)]
+        while stack:
+            current_node, parent = stack.pop()
+            new_node = nx_handler.add_node(
+                self.get_label(current_node), **self.get_attr(current_node))
+            if parent is not None:
+                nx_handler.add_edge(parent, new_node)
+            stack.extend((child, new_node) for child in reversed(self.get_children(current_node)))
+        return nx_handler
+
+    def get_compression_stats(self):
+        """get_compression_stats
+
+        木に展開したときのノード数と共有後のノード数を比較する関数
+
+        Returns:
+            (dict): tree_nodes(展開したときのノード数)、dag_nodes(共有後のノード数)、
+                ratio(tree_nodes / dag_nodes)、shared_nodes(2回以上参照されているノード数)
+        """
+        tree_nodes = self.node2size[self.root]
+        dag_nodes = len(self.node2label)
+        shared_nodes = sum(1 for parents in self.node2parents if len(parents) > 1)
+        return {"tree_nodes": tree_nodes, "dag_nodes": dag_nodes,
+                "ratio": tree_nodes / dag_nodes, "shared_nodes": shared_nodes}
+
+    def to_json(self):
+        """to_json
+
+        TermDagをjsonに変換できる辞書にする関数
+        networkxのnode-link形式では同じ子への複数のエッジと子の順序を表せないため、
+        ノードごとに子のリストを持つ形式にする
+
+        Returns:
+            (dict): {"term_dag": True, "root": 根のノードID, "nodes": [{"label", "children", アトリビュート}, ...]}
+        """
+        nodes = []
+        for node, label_id in enumerate(self.node2label):
+            nodes.append(dict(self.node2attr[node], label=self.symbol_table.get_symbol(label_id),
+                              children=list(self.node2children[node])))
+        return {"term_dag": True, "root": self.root, "nodes": nodes}
+
+    def save_json(self, path):
+        """save_json
+
+        TermDagをjsonファイルに保存する関数
+
+        Args:
+            path (str): 保存するjsonファイルのパス
+        """
+        with INSTRUMENTATION.span("dump_json") as span:
+            with open(path, "w") as f:
+                json.dump(self.to_json(), f)
+            if span:
+                span.add(nodes=len(self.get_all_nodes()))
+
+    @classmethod
+    def load_json(cls, path):
+        """load_json
+
+        save_jsonで保存したjsonファイルからTermDagを作成する関数
+
+        Args:
+            path (str): jsonファイルのパス
+
+        Returns:
+            (TermDag): 読み込んだTermDag
+        """
+        with INSTRUMENTATION.span("load_json") as span:
+            with open(path) as f:
+                loaded_json = json.load(f)
+            dag = cls.from_json(loaded_json)
+            if span:
+                span.add(nodes=len(dag.get_all_nodes()))
+        return dag
+
+    @classmethod
+    def from_json(cls, loaded_json):
+        """from_json
+
+        to_jsonの形式の辞書からTermDagを作成する関数
+
+        Args:
+            loaded_json (dict): to_jsonの形式の辞書
+
+        Returns:
+            (TermDag): 作成したTermDag
+        """
+        dag = cls()
+        # 子は親より先に登録されているため、先頭から順に登録すればノードIDは保存時と一致する
+        for attr in loaded_json["nodes"]:
+            attr = dict(attr)
+            label = attr.pop("label")
+            children = attr.pop("children")
+            dag.intern(label, children, **attr)
+        dag.root = loaded_json["root"]
+        return dag
+
+
+def load_ast(path):
+    """load_ast
+
+    抽象構文木のjsonファイルを読み込む関数
+    TermDag.save_jsonの形式ならTermDag、networkxのnode-link形式ならNetworkxHandlerを返す
+
+    Args:
+        path (str): 抽象構文木のjsonファイルのパス
+
+    Returns:
+        (TermDag or NetworkxHandler): 抽象構文木
+    """
+    with INSTRUMENTATION.span("load_json") as span:
+        events = iter_node_link(path)
+        first_event = next(events, (None, None))
+        events = chain([first_event], events)
+        if first_event == ("term_dag", True):
+            # TermDag.to_jsonはterm_dagを最初のkeyにする
+            loaded_json = {"nodes": []}
+            for key, value in events:
+                if key == "nodes":
+                    loaded_json["nodes"].append(value)
+                else:
+                    loaded_json[key] = value
+            ast = TermDag.from_json(loaded_json)
+        else:
+            ast = NetworkxHandler()
+            ast.init_node_link(events)
+        if span:
+            span.add(nodes=len(ast.get_all_nodes()))
+    return ast
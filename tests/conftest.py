@@ -0,0 +1,48 @@
+import sys
+import os
+import pytest
+sys.path.append(os.pardir)
+from tptpparser import run_batch  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+PROOF_PATH = os.path.join("data", "proof.p")
+
+
+@pytest.fixture
+def proof_path():
+    # テストで共通に使う証明(公理2つと、それらから導出したcnf 2つ)のパス
+    return PROOF_PATH
+
+
+@pytest.fixture
+def tstp(proof_path):
+    # テストで共通に使う証明の内容
+    with open(proof_path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def create_inputs(tmp_path, tstp):
+    # 証明をtmp_path/proofsにa.p, b.p, ...として書き込み、run_batchの入力を返す
+    # 引数は入力ごとの証明の置き換え(変更前, 変更後)で、Noneなら証明をそのまま書き込む
+    def create(*replacements):
+        input_dir = tmp_path / "proofs"
+        input_dir.mkdir(exist_ok=True)
+        inputs = []
+        for i, replacement in enumerate(replacements):
+            file_name = chr(ord("a") + i) + ".p"
+            (input_dir / file_name).write_text(tstp if replacement is None else tstp.replace(*replacement))
+            inputs.append((file_name, str(input_dir / file_name)))
+        return inputs
+    return create
+
+
+@pytest.fixture
+def run_pipeline(tmp_path, create_inputs):
+    # create_inputsで作成した入力をrun_batchでtmp_path/outに出力し、(集計, 出力ディレクトリ)を返す
+    def run(stages, replacements=(None, None), **kwargs):
+        output_dir = tmp_path / "out"
+        summary = run_batch(create_inputs(*replacements), str(output_dir), stages, progress=False,
+                            grammar_path=GRAMMAR_PATH, **kwargs)
+        return summary, output_dir
+    return run
@@ -0,0 +1,4 @@
+fof(a1,axiom,![X]:(p(X)=>q(f(X)))).
+fof(a2,axiom,r($sum(1,2))).
+cnf(f1,plain,~p(X)|q(f(X)),inference(cnf_transformation,[status(thm)],[a1])).
+cnf(f2,plain,p(a),inference(resolution,[status(thm)],[f1,a2])).
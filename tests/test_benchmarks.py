@@ -0,0 +1,30 @@
+import sys
+import os
+sys.path.append(os.pardir)
+sys.path.append(os.path.join(os.pardir, "benchmarks"))
+from generate_tstp import DIALECTS, generate_proof  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+from run_benchmarks import compare  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+
+
+class TestGenerateTstp:
+    def test_generate_proof(self):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        for dialect in DIALECTS:
+            tstp = generate_proof(30, depth=4, width=3, dialect=dialect, seed=1)
+            assert tstp == generate_proof(30, depth=4, width=3, dialect=dialect, seed=1)
+            assert tstp != generate_proof(30, depth=4, width=3, dialect=dialect, seed=2)
+            # tff, thfは記号の型宣言の後に30個の論理式が続く
+            n_types = sum(",type," in line for line in tstp.splitlines())
+            assert (n_types > 0) == (dialect in ("tff", "thf"))
+            assert len(parse_tstp.parse_tstp(tstp).children) == 30 + n_types
+
+
+class TestRunBenchmarks:
+    def test_compare(self):
+        baseline = {"cases": {"cnf": {"stages": {"parse_tstp": 1.0, "convert_cst2ast": 1.0}}}}
+        results = {"cases": {"cnf": {"stages": {"parse_tstp": 1.2, "convert_cst2ast": 1.3, "new_stage": 9.0}},
+                             "new_case": {"stages": {"parse_tstp": 9.0}}}}
+        assert compare(results, baseline, 0.25) == [("cnf", "convert_cst2ast", 1.0, 1.3)]
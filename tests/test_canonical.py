@@ -0,0 +1,91 @@
+import json
+import sys
+import os
+import pytest
+sys.path.append(os.pardir)
+from canonical import canonical_form, canonical_hash, deduplicate, deduplicate_hashes, Deduplicator  # nopep8
+from handler import NetworkxHandler  # nopep8
+from normalize import Converter  # nopep8
+
+
+def create_clause(converter, literals):
+    # literals: [(ラベル, [引数...]), ...]、引数は大文字で始まれば変数、それ以外は定数
+    nx_handler = NetworkxHandler()
+    conjunction = nx_handler.add_node("&", token_type="AND_CONNECTIVE")
+    disjunction = nx_handler.add_node("|", token_type="VLINE")
+    nx_handler.add_edge(conjunction, disjunction)
+    for label, arguments in literals:
+        literal = nx_handler.add_node(label, token_type="FUNCTOR")
+        nx_handler.add_edge(disjunction, literal)
+        for argument in arguments:
+            token_type = "VARIABLE" if argument[0].isupper() else "FUNCTOR"
+            nx_handler.add_edge(literal, nx_handler.add_node(argument, token_type=token_type))
+    converter.coordinate_node(nx_handler)
+    return nx_handler
+
+
+class TestCanonical:
+    @pytest.fixture
+    def get_converter(self):
+        fof_json_path = os.path.join("data", "fof_tree.json")
+        deduction_tree_json_path = os.path.join("data", "deduction_tree.json")
+        return Converter(fof_json_path, deduction_tree_json_path)
+
+    def test_rename_and_reorder(self, get_converter):
+        converter = get_converter
+        clause = create_clause(converter, [("p", ["X0", "X1"]), ("~q", ["X1"]), ("r", ["a"])])
+        variant = create_clause(converter, [("r", ["a"]), ("~q", ["Y"]), ("p", ["Z", "Y"])])
+        assert canonical_form(clause) == canonical_form(variant)
+        assert canonical_hash(clause) == canonical_hash(variant)
+        assert "VARIABLE/2:V0" in canonical_form(clause)
+        assert "X0" not in canonical_form(clause)
+
+    def test_distinguish(self, get_converter):
+        converter = get_converter
+        hashes = {canonical_hash(create_clause(converter, literals)) for literals in [
+            [("p", ["X", "X"])],
+            [("p", ["X", "Y"])],
+            [("p", ["X", "a"])],
+            [("~p", ["X", "Y"])],
+            [("p", ["X"]), ("q", ["X"])],
+            [("p", ["X"]), ("q", ["Y"])],
+            [("p(", ["X"])],
+            [("p", ["(X"])],
+        ]}
+        assert len(hashes) == 8
+
+    def test_deduplicate(self, get_converter, tmp_path):
+        converter = get_converter
+        converter.save_normalized_formula(tmp_path)
+        json_paths = sorted(str(path) for path in tmp_path.iterdir())
+        assert json_paths
+        # 変数を改名し、子の順序を逆にしたコピーを追加する
+        with open(json_paths[0]) as f:
+            json_root = json.load(f)
+        for node in json_root["nodes"]:
+            if node.get("token_type") == "VARIABLE":
+                node["label"] = "Y" + node["label"]
+        json_root["links"].reverse()
+        copy_path = str(tmp_path / "zz_copy.json")
+        with open(copy_path, "w") as f:
+            json.dump(json_root, f)
+        deduplicator = Deduplicator()
+        results = list(deduplicate(json_paths + [copy_path], deduplicator))
+        assert [path for path, _, _ in results] == json_paths + [copy_path]
+        assert results[-1][1] == results[0][1]
+        assert results[-1][2] == json_paths[0]
+        assert results[0][2] is None
+        for path, formula_hash, first_path in results:
+            if first_path is None:
+                assert deduplicator.hash2key[formula_hash] == path
+        assert len(deduplicator) == len({formula_hash for _, formula_hash, _ in results})
+
+    def test_canonical_stage(self, run_pipeline):
+        # 変数名と論理和の順序だけが異なる証明
+        summary, output_dir = run_pipeline(["parse", "deduction", "normalize", "canonical"],
+                                           replacements=(None, ("~p(X)|q(f(X))", "q(f(Y))|~p(Y)")))
+        assert summary == {"done": 2, "failed": 0, "skipped": 0}
+        hash_paths = [str(output_dir / name / "hashes.json") for name in ["a", "b"]]
+        results = list(deduplicate_hashes(hash_paths))
+        assert [(name, first) for _, name, _, first in results] == [
+            ("f1", None), ("f2", None), ("f1", (hash_paths[0], "f1")), ("f2", (hash_paths[0], "f2"))]
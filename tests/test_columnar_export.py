@@ -0,0 +1,110 @@
+from collections import Counter
+import sys
+import os
+import numpy as np
+import pytest
+sys.path.append(os.pardir)
+from columnar_export import (ColumnarExporter, depth_histogram, export_output_dirs, formula_depths,  # nopep8
+                             inference_rule_histogram, load_dictionary, load_table, symbol_frequencies)
+from handler import NetworkxHandler  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+
+
+def get_depth(nx_handler, node):
+    children = nx_handler.get_children(node)
+    return 1 + max(get_depth(nx_handler, child) for child in children) if children else 0
+
+
+class TestColumnarExport:
+    @pytest.fixture
+    def get_proof(self, tmp_path, proof_path):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        ast_path = str(tmp_path / "ast.json")
+        parse_tstp.convert_tstp2json(proof_path, ast_path)
+        ast = NetworkxHandler()
+        ast.load_json(ast_path)
+        deduction_tree = NetworkxHandler()
+        deduction_tree.init_graph(parse_tstp.create_deduction_tree_graph_on_networkx(ast_path))
+        return ast, deduction_tree
+
+    def export(self, proof, dir_path, row_group_size):
+        ast, deduction_tree = proof
+        with ColumnarExporter(dir_path, row_group_size=row_group_size, file_format="npz") as exporter:
+            for file_name in ["a.p", "b.p"]:
+                exporter.add_ast(file_name, ast)
+                exporter.add_deduction_tree(file_name, deduction_tree)
+        return ast, deduction_tree
+
+    def test_tables(self, get_proof, tmp_path):
+        dir_path = str(tmp_path / "columns")
+        ast, deduction_tree = self.export(get_proof, dir_path, row_group_size=1)
+        # ファイルごとに行グループを書き込む
+        assert sorted(os.listdir(dir_path))[:2] == ["deduction_edges-00000.npz", "deduction_edges-00001.npz"]
+        dictionary = load_dictionary(dir_path)
+        assert dictionary["files"] == ["a.p", "b.p"]
+        nodes = load_table(dir_path, "nodes")
+        assert len(nodes["node"]) == 2 * len(ast.get_all_nodes())
+        a_nodes = {column: values[nodes["file_id"] == 0] for column, values in nodes.items()}
+        for node, parent, label, depth in zip(a_nodes["node"], a_nodes["parent"], a_nodes["label"], a_nodes["depth"]):
+            assert dictionary["labels"][label] == ast.get_label(node)
+            assert parent == (ast.get_parents(node)[0] if ast.get_parents(node) else -1)
+            # get_ascendantsはノード自身を含む
+            assert depth == len(ast.get_ascendants(node)) - 1
+        edges = load_table(dir_path, "edges")
+        assert len(edges["source"]) == 2 * ast.get_graph().number_of_edges()
+        formulas = load_table(dir_path, "formulas")
+        assert list(formulas["formula"]) == list(range(8))
+        assert [dictionary["labels"][name] for name in formulas["name"]] == ["a1", "a2", "f1", "f2"] * 2
+        deduction_edges = load_table(dir_path, "deduction_edges")
+        assert len(deduction_edges["source"]) == 2 * deduction_tree.get_graph().number_of_edges()
+
+    def test_aggregates(self, get_proof, tmp_path):
+        dir_path = str(tmp_path / "columns")
+        ast, deduction_tree = self.export(get_proof, dir_path, row_group_size=1000)
+        rules = Counter(deduction_tree.get_attr(node).get("inference_rule") for node in deduction_tree.get_all_nodes())
+        assert inference_rule_histogram(dir_path) == {rule: 2 * count for rule, count in rules.items()}
+        functors = Counter(ast.get_label(node) for node in ast.get_all_nodes()
+                           if ast.get_attr(node).get("token_type") in {"FUNCTOR", "DEFINED_FUNCTOR"})
+        frequencies = symbol_frequencies(dir_path)
+        assert frequencies == {label: 2 * count for label, count in functors.items()}
+        assert list(frequencies.values()) == sorted(frequencies.values(), reverse=True)
+        assert symbol_frequencies(dir_path, top=1) == {"p": 6}
+        root = ast.get_orphans().pop()
+        expected_depths = [get_depth(ast, formula) for formula in ast.get_children(root)] * 2
+        assert list(formula_depths(dir_path)) == expected_depths
+        assert list(depth_histogram(dir_path)) == list(np.bincount(expected_depths))
+
+    def test_deduction_tree_row_groups(self, get_proof, tmp_path):
+        _, deduction_tree = get_proof
+        dir_path = str(tmp_path / "columns")
+        # 証明のグラフだけを追加する場合も、row_group_size行ごとに書き込む
+        with ColumnarExporter(dir_path, row_group_size=1, file_format="npz") as exporter:
+            for file_name in ["a.p", "b.p", "c.p"]:
+                exporter.add_deduction_tree(file_name, deduction_tree)
+                assert not exporter.columns["deduction_nodes"]["node"]
+        assert sorted(os.listdir(dir_path))[:3] == [
+            "deduction_edges-00000.npz", "deduction_edges-00001.npz", "deduction_edges-00002.npz"]
+        deduction_nodes = load_table(dir_path, "deduction_nodes")
+        assert list(deduction_nodes["file_id"]) == [0] * 4 + [1] * 4 + [2] * 4
+
+    def test_append(self, get_proof, tmp_path):
+        dir_path = str(tmp_path / "columns")
+        self.export(get_proof, dir_path, row_group_size=1000)
+        with ColumnarExporter(dir_path, file_format="npz") as exporter:
+            handler = NetworkxHandler()
+            root = handler.add_node("tptp_root")
+            formula = handler.add_node("cnf", token_type="CNF")
+            handler.add_edge(root, formula)
+            handler.add_edge(formula, handler.add_node("c1", token_type="NAME"))
+            exporter.add_ast("c.p", handler)
+        assert list(load_table(dir_path, "formulas")["formula"]) == list(range(9))
+        assert load_dictionary(dir_path)["files"] == ["a.p", "b.p", "c.p"]
+
+    def test_export_output_dirs(self, run_pipeline, tmp_path):
+        _, output_dir = run_pipeline(["parse", "deduction"], replacements=(None,), dag=True)
+        dir_path = str(tmp_path / "columns")
+        export_output_dirs(str(output_dir), dir_path, file_format="npz")
+        assert load_dictionary(dir_path)["files"] == ["a"]
+        assert inference_rule_histogram(dir_path) == {None: 2, "cnf_transformation": 1, "resolution": 1}
@@ -0,0 +1,57 @@
+import pickle
+import sys
+import os
+import numpy as np
+import pytest
+import torch
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from dataset import BucketBatchSampler, MemmapDataset, pad_collate, save_token_dataset  # nopep8
+
+
+class TestDataset:
+    @pytest.fixture
+    def get_dataset(self, tmp_path):
+        rng = np.random.default_rng(0)
+        lengths = rng.integers(1, 30, size=203)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        tokens = rng.integers(2, 100, size=int(offsets[-1]))
+        y = rng.random(len(lengths))
+        dir_path = str(tmp_path / "tokens")
+        save_token_dataset(dir_path, tokens, offsets, y)
+        return MemmapDataset(dir_path), tokens, offsets, y
+
+    def test_memmap_dataset(self, get_dataset):
+        dataset, tokens, offsets, y = get_dataset
+        assert len(dataset) == len(offsets) - 1
+        assert dataset.lengths.tolist() == np.diff(offsets).tolist()
+        sequence, target = dataset[5]
+        assert sequence.tolist() == tokens[offsets[5]:offsets[6]].tolist()
+        assert target.item() == pytest.approx(y[5])
+        # pickleしたデータセットはメモリマップを持たず、アクセス時に開き直す
+        copied = pickle.loads(pickle.dumps(dataset))
+        assert copied.tokens is None
+        assert copied[5][0].tolist() == sequence.tolist()
+
+    @pytest.mark.parametrize("drop_last", [False, True])
+    @pytest.mark.parametrize("shuffle", [False, True])
+    @pytest.mark.parametrize("bucket_size", [1, 3, 100])
+    def test_bucket_batch_sampler(self, get_dataset, drop_last, shuffle, bucket_size):
+        dataset, _, _, _ = get_dataset
+        sampler = BucketBatchSampler(dataset.lengths, batch_size=8, bucket_size=bucket_size,
+                                     shuffle=shuffle, drop_last=drop_last)
+        batches = list(sampler)
+        assert len(sampler) == len(batches)
+        indices = [index for batch in batches for index in batch]
+        assert len(indices) == len(set(indices))
+        if drop_last:
+            assert all(len(batch) == 8 for batch in batches)
+        else:
+            assert sorted(indices) == list(range(len(dataset)))
+
+    def test_pad_collate(self):
+        batch = [(torch.tensor([3, 4]), torch.tensor([0.5])),
+                 (torch.tensor([5, 6, 7]), torch.tensor([1.0]))]
+        X, y = pad_collate(batch)
+        assert X.tolist() == [[3, 4, 0], [5, 6, 7]]
+        assert y.tolist() == [[0.5], [1.0]]
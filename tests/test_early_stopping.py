@@ -0,0 +1,53 @@
+import sys
+import os
+import threading
+import pytest
+import torch
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+import early_stopping  # nopep8
+from early_stopping import EarlyStopping  # nopep8
+
+
+class TestEarlyStopping:
+    def test_checkpoint(self, tmp_path):
+        path = str(tmp_path / "checkpoint.pt")
+        model = torch.nn.Linear(3, 1)
+        stopper = EarlyStopping(patience=2, path=path, trace_func=lambda message: None)
+        stopper(1.0, model)
+        with torch.no_grad():
+            model.weight.add_(1)
+        stopper(0.5, model)
+        stopper.flush()
+        saved = torch.load(path)
+        assert torch.equal(saved["weight"], model.weight)
+        # ベストスコアを更新しなければ保存しない
+        stopper(0.7, model)
+        stopper(0.8, model)
+        assert stopper.early_stop
+        stopper.close()
+        assert torch.equal(torch.load(path)["weight"], saved["weight"])
+
+    def test_write_error(self, tmp_path, monkeypatch):
+        def save(state_dict, path):
+            raise OSError("disk full")
+        monkeypatch.setattr(early_stopping.torch, "save", save)
+        stopper = EarlyStopping(path=str(tmp_path / "checkpoint.pt"), trace_func=lambda message: None)
+        stopper(1.0, torch.nn.Linear(3, 1))
+        # 保存に失敗してもflushは待ち続けず、例外を送出する
+        errors = []
+
+        def flush():
+            try:
+                stopper.flush()
+            except OSError as e:
+                errors.append(e)
+        flusher = threading.Thread(target=flush, daemon=True)
+        flusher.start()
+        flusher.join(timeout=10)
+        assert not flusher.is_alive()
+        assert len(errors) == 1
+        assert not stopper.is_writing
+        stopper(0.5, torch.nn.Linear(3, 1))
+        with pytest.raises(OSError, match="disk full"):
+            stopper.close()
+        assert stopper.writer is None
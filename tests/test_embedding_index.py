@@ -0,0 +1,93 @@
+import glob
+import sys
+import os
+import numpy as np
+import pytest
+import torch
+sys.path.append(os.pardir)
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from embedding_index import EmbeddingIndex, extract_embeddings  # nopep8
+from graph_dataset import GraphBatchBuilder  # nopep8
+from handler import NetworkxHandler  # nopep8
+from model import GCN  # nopep8
+
+JSON_PATHS = sorted(glob.glob(os.path.join("expected", "coordinate_node", "*.json")))
+
+
+def brute_force(embeddings, queries, k):
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ embeddings.T
+    indices = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, indices, axis=1), indices
+
+
+class TestEmbeddingIndex:
+    @pytest.fixture
+    def get_embeddings(self):
+        rng = np.random.default_rng(0)
+        return rng.standard_normal((1000, 16)).astype(np.float32), rng.standard_normal((20, 16)).astype(np.float32)
+
+    def test_exact_search(self, get_embeddings):
+        embeddings, queries = get_embeddings
+        index = EmbeddingIndex(embeddings)
+        expected_scores, expected_indices = brute_force(embeddings, queries, 10)
+        # 複数のチャンクにまたがる場合も同じ結果になる
+        for chunk_size in [1000, 64, 7]:
+            scores, indices = index.search(queries, k=10, chunk_size=chunk_size)
+            assert indices.tolist() == expected_indices.tolist()
+            assert np.allclose(scores, expected_scores, atol=1e-5)
+        scores, indices = index.search(queries[0], k=3)
+        assert indices.tolist() == expected_indices[:1, :3].tolist()
+
+    def test_lsh_search(self, get_embeddings):
+        embeddings, queries = get_embeddings
+        index = EmbeddingIndex(embeddings)
+        with pytest.raises(RuntimeError):
+            index.search(queries, approximate=True)
+        index.build_lsh(n_tables=16, n_bits=4, chunk_size=300)
+        _, expected_indices = brute_force(embeddings, queries, 10)
+        scores, indices = index.search(queries, k=10, approximate=True)
+        # 候補は正確に再計算するので、スコアは降順で実際の類似度と一致する
+        assert np.all(np.diff(scores, axis=1) <= 0)
+        assert np.allclose(scores, np.take_along_axis(queries @ index.embeddings.T, indices, axis=1)
+                           / np.linalg.norm(queries, axis=1, keepdims=True), atol=1e-5)
+        recall = np.mean([len(set(row) & set(expected_row)) / 10
+                          for row, expected_row in zip(indices.tolist(), expected_indices.tolist())])
+        assert recall >= 0.8
+
+    def test_save_load(self, get_embeddings, tmp_path):
+        embeddings, queries = get_embeddings
+        index = EmbeddingIndex(embeddings, ids=[f"ax{i}" for i in range(len(embeddings))])
+        index.build_lsh(n_tables=4, n_bits=6)
+        dir_path = str(tmp_path / "index")
+        index.save(dir_path)
+        loaded = EmbeddingIndex.load(dir_path)
+        assert loaded.ids == index.ids
+        assert isinstance(loaded.embeddings, np.memmap)
+        for approximate in [False, True]:
+            scores, indices = index.search(queries, k=5, approximate=approximate)
+            loaded_scores, loaded_indices = loaded.search(queries, k=5, approximate=approximate)
+            assert loaded_indices.tolist() == indices.tolist()
+            assert np.allclose(loaded_scores, scores)
+        with pytest.raises(ValueError):
+            EmbeddingIndex(embeddings, ids=["ax0"])
+
+    def test_extract_embeddings(self):
+        nx_handlers = []
+        for path in JSON_PATHS:
+            nx_handler = NetworkxHandler()
+            nx_handler.load_json(path)
+            nx_handlers.append(nx_handler)
+        builder = GraphBatchBuilder()
+        for nx_handler in nx_handlers:
+            builder.graph_arrays(nx_handler)
+        builder.frozen = True
+        torch.manual_seed(0)
+        model = GCN(builder.n_features, 1, 8, 1)
+        loader = [builder.build(nx_handlers[:2]), builder.build(nx_handlers[2:])]
+        embeddings = extract_embeddings(model, loader)
+        assert embeddings.shape == (len(nx_handlers), 8)
+        with torch.inference_mode():
+            expected = model.embedding(builder.build(nx_handlers)).numpy()
+        assert np.allclose(embeddings, expected, atol=1e-5)
@@ -0,0 +1,75 @@
+import glob
+import sys
+import os
+import pytest
+import torch
+sys.path.append(os.pardir)
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+import runtime  # nopep8
+from export import SparseGCN, check_export, export_model  # nopep8
+from graph_dataset import GraphBatchBuilder  # nopep8
+from handler import NetworkxHandler  # nopep8
+from model import GCN, LSTM, NN  # nopep8
+
+JSON_PATHS = sorted(glob.glob(os.path.join("expected", "coordinate_node", "*.json")))
+
+
+class TestExport:
+    @pytest.fixture
+    def get_gcn(self):
+        nx_handlers = []
+        for path in JSON_PATHS:
+            nx_handler = NetworkxHandler()
+            nx_handler.load_json(path)
+            nx_handlers.append(nx_handler)
+        builder = GraphBatchBuilder()
+        # 語彙を先に作り、全てのミニバッチの特徴量の次元を揃える
+        for nx_handler in nx_handlers:
+            builder.graph_arrays(nx_handler)
+        builder.frozen = True
+        batches = [builder.build(nx_handlers[:3]), builder.build(nx_handlers[3:])]
+        torch.manual_seed(0)
+        gcn = GCN(builder.n_features, 2, 8, 2)
+        # BatchNormの統計量を初期値から動かしておく
+        gcn.train()
+        for data in batches:
+            gcn(data)
+        return gcn.eval(), builder, nx_handlers, batches
+
+    def test_sparse_gcn(self, get_gcn):
+        gcn, _, _, batches = get_gcn
+        sparse_gcn = SparseGCN.from_gcn(gcn)
+        assert not sparse_gcn.training
+        assert check_export(gcn, sparse_gcn, batches, atol=1e-5) <= 1e-5
+
+    def test_export_gcn(self, get_gcn, tmp_path):
+        gcn, builder, nx_handlers, batches = get_gcn
+        path = str(tmp_path / "gcn.pt")
+        exported = export_model(gcn, path)
+        check_export(gcn, exported, batches)
+        loaded = runtime.load(path)
+        data = builder.build(nx_handlers[:1])
+        with torch.inference_mode():
+            expected = gcn(data).item()
+        assert runtime.score_graph(loaded, data.x, data.edge_index) == pytest.approx(expected, abs=1e-5)
+
+    @pytest.mark.parametrize("model_class", [NN, LSTM])
+    def test_export_sequence_model(self, model_class, tmp_path):
+        torch.manual_seed(0)
+        model = model_class(20, 4, 8, 1)
+        inputs = [torch.randint(1, 20, (3, 6)), torch.randint(1, 20, (3, 6))]
+        path = str(tmp_path / "model.pt")
+        exported = export_model(model, path, example_input=inputs[0])
+        check_export(model, exported, inputs)
+        tokens = inputs[1][0].tolist()
+        with torch.inference_mode():
+            expected = model(torch.tensor([tokens])).item()
+        assert runtime.score_tokens(runtime.load(path), tokens) == pytest.approx(expected, abs=1e-5)
+
+    def test_check_export_mismatch(self, get_gcn):
+        gcn, _, _, batches = get_gcn
+        sparse_gcn = SparseGCN.from_gcn(gcn)
+        with torch.no_grad():
+            sparse_gcn.mlp_out.bias.add_(1)
+        with pytest.raises(AssertionError):
+            check_export(gcn, sparse_gcn, batches)
@@ -0,0 +1,86 @@
+import glob
+import json
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from featurizer import PAD, UNK, Featurizer, Vocabulary, pad_sequences  # nopep8
+
+JSON_PATHS = sorted(glob.glob(os.path.join("expected", "coordinate_node", "*.json")))
+
+
+def get_preorder(json_root):
+    # 子はnode-linkのlinksの順に辿る
+    children = {node["id"]: [] for node in json_root["nodes"]}
+    has_parent = set()
+    for link in json_root["links"]:
+        children[link["source"]].append(link["target"])
+        has_parent.add(link["target"])
+    id2node = {node["id"]: node for node in json_root["nodes"]}
+    labels = []
+
+    def visit(node_id):
+        if id2node[node_id].get("token_type") != "coordinate":
+            labels.append(id2node[node_id]["label"])
+        for child in children[node_id]:
+            visit(child)
+    for node in json_root["nodes"]:
+        if node["id"] not in has_parent:
+            visit(node["id"])
+    return labels
+
+
+def count_walks(json_root, walk_length):
+    children = {node["id"]: [] for node in json_root["nodes"]}
+    for link in json_root["links"]:
+        children[link["source"]].append(link["target"])
+    ends = list(children)
+    count = len(ends)
+    for _ in range(walk_length - 1):
+        ends = [child for end in ends for child in children[end]]
+        count += len(ends)
+    return count
+
+
+class TestFeaturizer:
+    def test_vocabulary(self, tmp_path):
+        vocabulary = Vocabulary.build(JSON_PATHS)
+        assert vocabulary.get_id(PAD) == 0
+        assert vocabulary.get_id(UNK) == 1
+        assert vocabulary.get_id("unknown label") == 1
+        assert vocabulary.id2token[2:] == sorted(vocabulary.id2token[2:])
+        path = str(tmp_path / "vocabulary.json")
+        vocabulary.save(path)
+        loaded = Vocabulary.load(path)
+        assert loaded.token2id == vocabulary.token2id
+        assert loaded.id2token == vocabulary.id2token
+        # 出現回数が少ないラベルは未知語になる
+        assert len(Vocabulary.build(JSON_PATHS, min_count=1000)) == 2
+
+    def test_pad_sequences(self):
+        tokens = np.array([3, 4, 5, 6, 7, 8])
+        offsets = np.array([0, 2, 2, 6])
+        assert pad_sequences(tokens, offsets).tolist() == [[3, 4, 0, 0], [0, 0, 0, 0], [5, 6, 7, 8]]
+        assert pad_sequences(tokens, offsets, max_length=3).tolist() == [[3, 4, 0], [0, 0, 0], [5, 6, 7]]
+
+    def test_transform(self):
+        vocabulary = Vocabulary.build(JSON_PATHS)
+        featurizer = Featurizer(vocabulary, n_features=2**10, walk_length=3)
+        tokens, offsets, walks = featurizer.transform(JSON_PATHS)
+        assert len(offsets) == len(JSON_PATHS) + 1
+        assert walks.shape == (len(JSON_PATHS), 2**10)
+        for index, path in enumerate(JSON_PATHS):
+            with open(path) as f:
+                json_root = json.load(f)
+            sequence = tokens[offsets[index]:offsets[index + 1]]
+            assert [vocabulary.id2token[token] for token in sequence] == get_preorder(json_root)
+            assert walks[index].sum() == count_walks(json_root, 3)
+
+    def test_transform_parallel(self):
+        featurizer = Featurizer(Vocabulary.build(JSON_PATHS), n_features=2**10)
+        tokens, offsets, walks = featurizer.transform(JSON_PATHS)
+        parallel_tokens, parallel_offsets, parallel_walks = featurizer.transform_parallel(
+            JSON_PATHS, processes=2, chunk_size=2)
+        assert parallel_tokens.tolist() == tokens.tolist()
+        assert parallel_offsets.tolist() == offsets.tolist()
+        assert (parallel_walks != walks).nnz == 0
@@ -0,0 +1,154 @@
+import functools
+import json
+import sqlite3
+import sys
+import os
+import pytest
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+import formula_store  # nopep8
+from formula_store import FormulaStore  # nopep8
+from normalize import Converter, DeductionTree, FofTree  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+import symbol_index  # nopep8
+from term_dag import TermDag  # nopep8
+from tptpparser import load_manifest  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+
+
+class TestFormulaStore:
+    @pytest.fixture
+    def get_output_dir(self, run_pipeline):
+        # ファイルに保存するパイプラインの出力
+        _, output_dir = run_pipeline(["parse", "deduction", "normalize"],
+                                     replacements=(None, ("resolution", "superposition")))
+        return output_dir
+
+    def test_import(self, get_output_dir, tmp_path):
+        output_dir = get_output_dir
+        store_path = str(tmp_path / "store.sqlite")
+        with FormulaStore(store_path) as store:
+            for problem in ["a", "b"]:
+                store.import_output_dir(problem, str(output_dir / problem))
+        # closeでコミットされ、別の接続から読める
+        with FormulaStore(store_path) as store:
+            assert store.get_problems() == ["a", "b"]
+            assert store.find_formulas(name="f2") == [("a", "f2", "resolution"), ("b", "f2", "superposition")]
+            assert store.find_formulas(inference_rule="cnf_transformation", problem="b") == [
+                ("b", "f1", "cnf_transformation")]
+            assert store.count_inference_rules() == {None: 4, "cnf_transformation": 2, "resolution": 1,
+                                                     "superposition": 1}
+            assert store.get_normalized_formula_names("a") == ["f1", "f2"]
+            # ファイルから読み込んだ場合と同じ木になる
+            fof_tree = FofTree.from_store(store, "a")
+            expected_fof_tree = FofTree(str(output_dir / "a" / "ast.json"))
+            assert fof_tree.nx.get_graph().nodes(data=True) == expected_fof_tree.nx.get_graph().nodes(data=True)
+            assert list(fof_tree.nx.get_graph().edges()) == list(expected_fof_tree.nx.get_graph().edges())
+            deduction_tree = DeductionTree.from_store(store, "a")
+            expected_deduction_tree = DeductionTree(str(output_dir / "a" / "deduction_tree.json"))
+            assert (deduction_tree.nx.get_graph().nodes(data=True) ==
+                    expected_deduction_tree.nx.get_graph().nodes(data=True))
+            assert deduction_tree.collect_cnf_nodes() == expected_deduction_tree.collect_cnf_nodes()
+            for name in ["f1", "f2"]:
+                with open(output_dir / "a" / "formulas" / (name + ".json")) as f:
+                    expected = json.load(f)
+                graph = store.load_normalized_formula("a", name).get_graph()
+                assert json_graph.node_link_data(graph) == expected
+            with pytest.raises(KeyError):
+                store.load_ast("c")
+
+    def test_converter(self, get_output_dir, tmp_path, tstp):
+        output_dir = get_output_dir
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        with FormulaStore(str(tmp_path / "store.sqlite"), batch_size=2) as store:
+            store.add_ast("a", parse_tstp.convert_tstp2ast(tstp))
+            store.add_deduction_tree(
+                "a", parse_tstp.create_deduction_tree_graph_on_networkx(str(output_dir / "a" / "ast.json")))
+            Converter.from_store(store, "a").save_normalized_formula_to_store(store, "a")
+            for name in ["f1", "f2"]:
+                with open(output_dir / "a" / "formulas" / (name + ".json")) as f:
+                    expected = json.load(f)
+                assert json_graph.node_link_data(store.load_normalized_formula("a", name).get_graph()) == expected
+            # 保存済みの証明のグラフは置き換える
+            store.add_deduction_tree("a", DeductionTree(str(output_dir / "b" / "deduction_tree.json")).nx.get_graph())
+            assert store.find_formulas(problem="a", inference_rule="superposition") == [("a", "f2", "superposition")]
+            assert len(store.find_formulas(problem="a")) == 4
+
+    def test_term_dag(self, tmp_path, tstp):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        dag = parse_tstp.convert_cst2dag(parse_tstp.parse_tstp(tstp))
+        with FormulaStore(str(tmp_path / "store.sqlite")) as store:
+            store.add_ast("a", dag)
+            loaded = store.load_ast("a")
+        assert isinstance(loaded, TermDag)
+        assert loaded.to_json() == dag.to_json()
+
+    def test_store_stage(self, run_pipeline):
+        summary, output_dir = run_pipeline(["parse", "deduction", "normalize", "store"],
+                                           replacements=(None, ("resolution", "superposition")), workers=2)
+        assert summary == {"done": 2, "failed": 0, "skipped": 0}
+        # 正規化した論理式はファイルに保存せず、直接ストアに保存する
+        assert not (output_dir / "a" / "formulas").exists()
+        converter = Converter(str(output_dir / "a" / "ast.json"), str(output_dir / "a" / "deduction_tree.json"))
+        expected = {name: json_graph.node_link_data(graph) for name, graph in converter.iter_normalized_formula()}
+        with FormulaStore(str(output_dir / "store.sqlite")) as store:
+            assert sorted(store.get_problems()) == ["a.p", "b.p"]
+            assert store.find_formulas(inference_rule="superposition") == [("b.p", "f2", "superposition")]
+            assert store.get_normalized_formula_names("a.p") == sorted(expected)
+            for name, json_root in expected.items():
+                assert json_graph.node_link_data(store.load_normalized_formula("a.p", name).get_graph()) == json_root
+        # storeの前に中断した場合は、ファイルに保存していないnormalizeも実行し直す
+        manifest_path = output_dir / "manifest.jsonl"
+        results = [json.loads(line) for line in manifest_path.read_text().splitlines()]
+        for result in results:
+            result["stages"].remove("store")
+        manifest_path.write_text("".join(json.dumps(result) + "\n" for result in results))
+        (output_dir / "store.sqlite").unlink()
+        summary, _ = run_pipeline(["parse", "deduction", "normalize", "store"],
+                                  replacements=(None, ("resolution", "superposition")))
+        assert summary == {"done": 2, "failed": 0, "skipped": 0}
+        assert [json.loads(line)["stages"] for line in manifest_path.read_text().splitlines()][-1] == [
+            "normalize", "store"]
+        with FormulaStore(str(output_dir / "store.sqlite")) as store:
+            assert store.get_normalized_formula_names("b.p") == sorted(expected)
+
+    def test_store_stage_with_canonical(self, run_pipeline):
+        # canonicalはformulas/を読むため、一緒に実行する場合はファイルにも保存する
+        summary, output_dir = run_pipeline(["parse", "deduction", "normalize", "canonical", "store"])
+        assert summary == {"done": 2, "failed": 0, "skipped": 0}
+        assert sorted(os.listdir(output_dir / "a" / "formulas")) == ["f1.json", "f2.json"]
+        with FormulaStore(str(output_dir / "store.sqlite")) as store:
+            for name in ["f1", "f2"]:
+                with open(output_dir / "a" / "formulas" / (name + ".json")) as f:
+                    expected = json.load(f)
+                assert json_graph.node_link_data(store.load_normalized_formula("a.p", name).get_graph()) == expected
+
+    def test_manifest_with_index(self, run_pipeline, tmp_path, monkeypatch):
+        output_dir = tmp_path / "out"
+        snapshots = []
+
+        class RecordingStore(FormulaStore):
+            def add_output(self, problem, output):
+                # 追加する前に、マニフェストに記録済みの入力と、索引とストアに書き込み済みの入力を記録する
+                names = set(load_manifest(str(output_dir / "manifest.jsonl")))
+                connection = sqlite3.connect(str(output_dir / "symbols.sqlite"))
+                files = {path for path, in connection.execute("SELECT path FROM files")}
+                connection.close()
+                connection = sqlite3.connect(str(output_dir / "store.sqlite"))
+                problems = {name for name, in connection.execute("SELECT name FROM problems")}
+                connection.close()
+                snapshots.append((names, files, problems))
+                super(RecordingStore, self).add_output(problem, output)
+
+        # 索引は2入力(8論理式)ごと、ストアは3入力ごとに書き込み、書き込む間隔を揃えない
+        monkeypatch.setattr(symbol_index, "SymbolIndex", functools.partial(symbol_index.SymbolIndex, flush_size=5))
+        monkeypatch.setattr(formula_store, "FormulaStore", functools.partial(RecordingStore, batch_size=3))
+        summary, _ = run_pipeline(["parse", "index", "deduction", "normalize", "store"],
+                                  replacements=(None,) * 5)
+        assert summary == {"done": 5, "failed": 0, "skipped": 0}
+        for names, files, problems in snapshots:
+            assert names <= files and names <= problems
+        # 索引が書き込むたびにストアもコミットし、マニフェストに追記する(片方ずつ待つと最後まで追記されない)
+        assert [len(names) for names, _, _ in snapshots] == [0, 0, 2, 2, 4]
+        assert len(load_manifest(str(output_dir / "manifest.jsonl"))) == 5
@@ -0,0 +1,74 @@
+import glob
+import sys
+import os
+import torch
+sys.path.append(os.pardir)
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from graph_dataset import FormulaGraphDataset, GraphBatchBuilder  # nopep8
+from handler import NetworkxHandler  # nopep8
+
+JSON_PATHS = sorted(glob.glob(os.path.join("expected", "coordinate_node", "*.json")))
+
+
+def load_handlers():
+    nx_handlers = []
+    for path in JSON_PATHS:
+        nx_handler = NetworkxHandler()
+        nx_handler.load_json(path)
+        nx_handlers.append(nx_handler)
+    return nx_handlers
+
+
+class TestGraphDataset:
+    def test_build(self):
+        nx_handlers = load_handlers()
+        builder = GraphBatchBuilder()
+        data = builder.build(nx_handlers, y=list(range(len(nx_handlers))))
+        # 隣接リストから変換し、networkxグラフは作成しない
+        assert all(nx_handler._graph is None for nx_handler in nx_handlers)
+        n_nodes = [len(nx_handler.get_all_nodes()) for nx_handler in nx_handlers]
+        assert data.x.shape == (sum(n_nodes), builder.n_features)
+        # ラベルとトークンの種類のtwo-hot
+        assert data.x.sum(dim=1).tolist() == [2] * sum(n_nodes)
+        assert data.batch.tolist() == [index for index, n in enumerate(n_nodes) for _ in range(n)]
+        assert data.y.reshape(-1).tolist() == list(range(len(nx_handlers)))
+        # 各グラフのedge_indexはそれまでのグラフのノード数だけずれる
+        offset = 0
+        start = 0
+        for index, nx_handler in enumerate(nx_handlers):
+            nodes = nx_handler.get_all_nodes()
+            edges = nx_handler.get_all_edges()
+            edge_index = data.edge_index[:, start:start + len(edges)]
+            assert [(nodes[source - offset], nodes[target - offset])
+                    for source, target in edge_index.T.tolist()] == list(edges)
+            assert (data.batch[edge_index] == index).all()
+            for node_index, node in enumerate(nodes):
+                row = data.x[offset + node_index]
+                assert builder.label_vocabulary.id2token[int(row[:len(builder.label_vocabulary)].argmax())] == \
+                    nx_handler.get_label(node)
+            offset += len(nodes)
+            start += len(edges)
+        assert start == data.edge_index.shape[1]
+
+    def test_frozen(self):
+        nx_handlers = load_handlers()
+        builder = GraphBatchBuilder()
+        builder.build(nx_handlers[:1])
+        n_labels = len(builder.label_vocabulary)
+        frozen_builder = GraphBatchBuilder(builder.label_vocabulary, builder.token_type_vocabulary, frozen=True)
+        label_ids, _, _ = frozen_builder.graph_arrays(nx_handlers[-1])
+        assert len(builder.label_vocabulary) == n_labels
+        assert 1 in label_ids.tolist()
+
+    def test_dataset(self, tmp_path):
+        root = str(tmp_path / "dataset")
+        dataset = FormulaGraphDataset(root, JSON_PATHS, y=[0.5] * len(JSON_PATHS))
+        assert len(dataset) == len(JSON_PATHS)
+        # 2回目はjsonを読まずに保存したテンソルと語彙を読み込む
+        reloaded = FormulaGraphDataset(root)
+        assert reloaded.builder.frozen
+        assert reloaded.builder.label_vocabulary.id2token == dataset.builder.label_vocabulary.id2token
+        for data, reloaded_data in zip(dataset, reloaded):
+            assert torch.equal(data.x, reloaded_data.x)
+            assert torch.equal(data.edge_index, reloaded_data.edge_index)
+            assert data.x.shape[1] == dataset.builder.n_features
@@ -0,0 +1,51 @@
+import sys
+import os
+import pytest
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from include_scanner import scan_includes, IncludeScanner  # nopep8
+
+PROBLEM = """%------------------------------------------------------------------------------
+% include('Axioms/COMMENT.ax').
+%------------------------------------------------------------------------------
+/*
+include('Axioms/BLOCK.ax').
+*/
+include('Axioms/SET001-0.ax').
+include('Axioms/SET001-1.ax',
+    [a,b]).
+%------------------------------------------------------------------------------
+cnf(a,axiom,p(a)).
+include('Axioms/AFTER_FORMULA.ax').
+"""
+
+
+class TestIncludeScanner:
+    @pytest.fixture
+    def get_problem_path(self, tmp_path):
+        problem_path = tmp_path / "SET001-1.p"
+        problem_path.write_text(PROBLEM)
+        return str(problem_path)
+
+    def test_scan_includes(self, get_problem_path):
+        included_files = scan_includes(get_problem_path)
+        assert included_files == ["'Axioms/SET001-0.ax'",
+                                  "'Axioms/SET001-1.ax'"]
+
+    def test_scan_with_cache(self, get_problem_path, tmp_path):
+        cache_path = str(tmp_path / "includes.json")
+        problem_path = get_problem_path
+        scanner = IncludeScanner(cache_path)
+        path2includes = scanner.scan([problem_path])
+        assert len(path2includes[problem_path]) == 2
+
+        # キャッシュが最新なら再走査されない
+        scanner = IncludeScanner(cache_path)
+        scanner.path2entry[problem_path]["includes"] = ["cached"]
+        assert scanner.scan([problem_path])[problem_path] == ["cached"]
+
+        # 更新されたファイルは再走査される
+        with open(problem_path, "w") as f:
+            f.write("include('Axioms/NEW.ax').\n")
+        scanner = IncludeScanner(cache_path)
+        path2includes = scanner.scan([problem_path])
+        assert path2includes[problem_path] == ["'Axioms/NEW.ax'"]
@@ -0,0 +1,184 @@
+import glob
+import json
+import threading
+import urllib.request
+import sys
+import os
+import pytest
+import torch
+sys.path.append(os.pardir)
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from featurizer import Featurizer, Vocabulary  # nopep8
+from graph_dataset import GraphBatchBuilder  # nopep8
+from handler import NetworkxHandler  # nopep8
+from inference_server import GraphEncoder, InferenceServer, SequenceEncoder, load_model, serve_http  # nopep8
+from model import GCN  # nopep8
+from symbol_table import SYMBOL_TABLE  # nopep8
+
+JSON_PATHS = sorted(glob.glob(os.path.join("expected", "coordinate_node", "*.json")))
+
+
+def load_graphs():
+    graphs = []
+    for path in JSON_PATHS:
+        with open(path) as f:
+            graphs.append(json.load(f))
+    return graphs
+
+
+class RecordingModel(torch.nn.Module):
+    # 推論したミニバッチのサイズを記録する
+    def __init__(self, model):
+        super(RecordingModel, self).__init__()
+        self.model = model
+        self.batch_sizes = []
+
+    def forward(self, data):
+        output = self.model(data)
+        self.batch_sizes.append(output.shape[0])
+        return output
+
+
+class FailingEncoder:
+    # "bad"を含むグラフはencodeでは受け付け、ミニバッチにしたときに失敗させる
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def encode(self, graph):
+        return None if graph.get("bad") else self.encoder.encode(graph)
+
+    def collate(self, samples):
+        if any(sample is None for sample in samples):
+            raise ValueError("bad sample")
+        return self.encoder.collate(samples)
+
+
+class TestInferenceServer:
+    @pytest.fixture
+    def get_encoder(self):
+        builder = GraphBatchBuilder()
+        for path in JSON_PATHS:
+            nx_handler = NetworkxHandler()
+            nx_handler.load_json(path)
+            builder.graph_arrays(nx_handler)
+        builder.frozen = True
+        torch.manual_seed(0)
+        model = GCN(builder.n_features, 2, 8, 2).eval()
+        return GraphEncoder(builder), model
+
+    def expected_scores(self, encoder, model, graphs):
+        with torch.inference_mode():
+            return [model(encoder.collate([encoder.encode(graph)])).item() for graph in graphs]
+
+    def test_single_request(self, get_encoder):
+        encoder, model = get_encoder
+        graph = load_graphs()[0]
+        recording_model = RecordingModel(model)
+        server = InferenceServer(recording_model, encoder, max_batch_size=8, max_latency=0.001)
+        try:
+            assert server.score(graph) == pytest.approx(self.expected_scores(encoder, model, [graph])[0], abs=1e-6)
+        finally:
+            server.close()
+        assert recording_model.batch_sizes == [1]
+
+    def test_batching(self, get_encoder):
+        encoder, model = get_encoder
+        graphs = load_graphs()
+        recording_model = RecordingModel(model)
+        # 最初のリクエストから十分長く待たせ、全てのリクエストを1つのミニバッチにまとめる
+        server = InferenceServer(recording_model, encoder, max_batch_size=len(graphs), max_latency=5)
+        try:
+            futures = [server.submit(graph) for graph in graphs]
+            scores = [future.result(timeout=10) for future in futures]
+        finally:
+            server.close()
+        assert recording_model.batch_sizes == [len(graphs)]
+        assert scores == pytest.approx(self.expected_scores(encoder, model, graphs), abs=1e-5)
+
+    def test_errors(self, get_encoder):
+        encoder, model = get_encoder
+        server = InferenceServer(model, encoder)
+        try:
+            with pytest.raises(KeyError):
+                server.score({"nodes": [{"id": 0}], "links": []})
+            # エラーの後も推論を続けられる
+            graph = load_graphs()[0]
+            assert server.score(graph) == pytest.approx(self.expected_scores(encoder, model, [graph])[0], abs=1e-6)
+        finally:
+            server.close()
+
+    def test_bad_request_in_batch(self, get_encoder):
+        encoder, model = get_encoder
+        graphs = load_graphs()
+        recording_model = RecordingModel(model)
+        server = InferenceServer(recording_model, FailingEncoder(encoder), max_batch_size=len(graphs) + 1,
+                                 max_latency=5)
+        try:
+            futures = [server.submit(graph) for graph in graphs[:1] + [{"bad": True}] + graphs[1:]]
+            bad_future = futures.pop(1)
+            scores = [future.result(timeout=10) for future in futures]
+            with pytest.raises(ValueError):
+                bad_future.result(timeout=10)
+        finally:
+            server.close()
+        # ミニバッチの推論が失敗したら、1つずつ推論し直して不正なリクエストだけを失敗させる
+        assert recording_model.batch_sizes == [1] * len(graphs)
+        assert scores == pytest.approx(self.expected_scores(encoder, model, graphs), abs=1e-5)
+
+    def test_submit_after_close(self, get_encoder):
+        encoder, model = get_encoder
+        server = InferenceServer(model, encoder)
+        server.close()
+        server.close()
+        # 推論スレッドは終了しているため、待ち続けずにすぐに失敗する
+        with pytest.raises(RuntimeError):
+            server.submit(load_graphs()[0]).result(timeout=1)
+
+    def test_symbol_table(self, get_encoder):
+        encoder, _ = get_encoder
+        graph = load_graphs()[0]
+        graph["nodes"][0]["label"] = "unseen_label_from_request"
+        n_symbols = len(SYMBOL_TABLE)
+        encoder.encode(graph)
+        # リクエストのラベルは共有の記号表に登録しない
+        assert len(SYMBOL_TABLE) == n_symbols
+        assert SYMBOL_TABLE.get_id("unseen_label_from_request") is None
+
+    def test_sequence_encoder(self):
+        vocabulary = Vocabulary.build(JSON_PATHS)
+        encoder = SequenceEncoder(Featurizer(vocabulary))
+        graphs = load_graphs()
+        X = encoder.collate([encoder.encode(graph) for graph in graphs[:2]])
+        tokens, offsets, _ = Featurizer(vocabulary).transform(JSON_PATHS[:2])
+        assert X[0, :offsets[1]].tolist() == tokens[:offsets[1]].tolist()
+        assert X[1, :offsets[2] - offsets[1]].tolist() == tokens[offsets[1]:].tolist()
+
+    def test_load_model(self, get_encoder, tmp_path):
+        encoder, model = get_encoder
+        checkpoint_path = str(tmp_path / "checkpoint.pt")
+        torch.save(model.state_dict(), checkpoint_path)
+        config = {"model": "GCN", "n_features": encoder.builder.n_features, "n_conv_hidden": 2, "dim": 8,
+                  "n_mlp_hidden": 2}
+        loaded = load_model(config, checkpoint_path)
+        assert not loaded.training
+        graph = load_graphs()[0]
+        assert self.expected_scores(encoder, loaded, [graph]) == self.expected_scores(encoder, model, [graph])
+
+    def test_serve_http(self, get_encoder):
+        encoder, model = get_encoder
+        graphs = load_graphs()
+        server = InferenceServer(model, encoder)
+        http_server = serve_http(server, port=0)
+        thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = "http://127.0.0.1:{}/score".format(http_server.server_address[1])
+            request = urllib.request.Request(url, data=json.dumps({"graphs": graphs}).encode("utf-8"),
+                                             method="POST")
+            with urllib.request.urlopen(request, timeout=10) as response:
+                scores = json.loads(response.read())["scores"]
+        finally:
+            http_server.shutdown()
+            http_server.server_close()
+            server.close()
+        assert scores == pytest.approx(self.expected_scores(encoder, model, graphs), abs=1e-5)
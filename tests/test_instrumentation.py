@@ -0,0 +1,68 @@
+import json
+import sys
+import os
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+from instrumentation import INSTRUMENTATION, NULL_SPAN, Instrumentation  # nopep8
+from normalize import Converter  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+
+
+class TestInstrumentation:
+    def test_disabled(self):
+        instrumentation = Instrumentation()
+        with instrumentation.span("parse_tstp") as span:
+            assert span is NULL_SPAN
+            assert not span
+        assert instrumentation.records == []
+
+    def test_nested_spans(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable(trace_memory=True)
+        try:
+            instrumentation.set_file("a.p")
+            with instrumentation.span("outer"):
+                for _ in range(2):
+                    with instrumentation.span("inner") as span:
+                        span.add(nodes=3)
+                        data = [0] * 100000
+                del data
+        finally:
+            instrumentation.disable()
+        inner, _, outer = instrumentation.records
+        assert (inner["depth"], outer["depth"]) == (1, 0)
+        assert outer["wall"] >= inner["wall"] and inner["file"] == "a.p"
+        assert outer["peak_memory"] >= inner["peak_memory"] >= 800000
+        rows = {row["name"]: row for row in instrumentation.summary()}
+        assert rows["inner"]["count"] == 2 and rows["inner"]["counters"]["nodes"] == 6
+        assert "inner" in instrumentation.format_summary(by_file=True)
+        events = instrumentation.to_chrome_trace()["traceEvents"]
+        assert [event["name"] for event in events] == ["outer", "inner", "inner"]
+        assert all(event["ph"] == "X" for event in events)
+
+    def test_pipeline(self, tmp_path, tstp):
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.enable()
+        try:
+            tstp_path = tmp_path / "proof.p"
+            tstp_path.write_text(tstp)
+            ast_path = str(tmp_path / "ast.json")
+            deduction_tree_path = str(tmp_path / "deduction_tree.json")
+            parse_tstp = ParseTstp(GRAMMAR_PATH)
+            parse_tstp.convert_tstp2json(str(tstp_path), ast_path)
+            graph = parse_tstp.create_deduction_tree_graph_on_networkx(ast_path)
+            with open(deduction_tree_path, "w") as f:
+                json.dump(json_graph.node_link_data(graph), f)
+            Converter(ast_path, deduction_tree_path).save_normalized_formula(str(tmp_path))
+        finally:
+            INSTRUMENTATION.disable()
+        rows = {row["name"]: row for row in INSTRUMENTATION.summary()}
+        INSTRUMENTATION.reset()
+        for stage in ["parse_tstp", "convert_tstp2ast", "dump_json", "load_json", "create_deduction_tree",
+                      "normalize_formula", "remove_redundant_nodes", "arrange_conjuction", "arrange_disjunction",
+                      "coordinate_node", "merge_negation"]:
+            assert stage in rows, stage
+        assert rows["create_deduction_tree"]["counters"]["nodes"] == 4
+        assert rows["normalize_formula"]["count"] == 2
@@ -0,0 +1,59 @@
+import sys
+import os
+import numpy as np
+import pytest
+import torch
+from sklearn.metrics import r2_score
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from metrics import MeanLoss, MetricAccumulator, R2Score  # nopep8
+
+
+def split_batches(y, output, batch_sizes):
+    start = 0
+    for batch_size in batch_sizes:
+        yield (torch.from_numpy(output[start:start + batch_size]).float().reshape(-1, 1),
+               torch.from_numpy(y[start:start + batch_size]).float().reshape(-1, 1))
+        start += batch_size
+
+
+class TestMetrics:
+    def test_accumulator(self):
+        rng = np.random.default_rng(0)
+        batch_sizes = [32, 32, 7, 1]
+        y = rng.normal(size=sum(batch_sizes)).astype(np.float32)
+        output = (y + rng.normal(scale=0.5, size=len(y))).astype(np.float32)
+        criterion = torch.nn.MSELoss()
+        metrics = MetricAccumulator()
+        for output_batch, y_batch in split_batches(y, output, batch_sizes):
+            metrics.update(output_batch, y_batch, criterion(output_batch, y_batch))
+        values = metrics.compute()
+        # エポック全体の値はミニバッチの平均ではなく、全サンプルから計算した値と一致する
+        assert values["loss"] == pytest.approx(np.mean((y - output) ** 2), rel=1e-5)
+        assert values["r2"] == pytest.approx(r2_score(y, output), rel=1e-5)
+        metrics.reset()
+        output_batch, y_batch = next(split_batches(y, output, [4]))
+        metrics.update(output_batch, y_batch, criterion(output_batch, y_batch))
+        assert metrics.compute()["r2"] == pytest.approx(r2_score(y[:4], output[:4]), rel=1e-5)
+
+    def test_constant_target(self):
+        y = torch.ones((4, 1))
+        r2 = R2Score()
+        r2.update(y.clone(), y, None)
+        assert r2.compute().item() == r2_score(y.numpy(), y.numpy())
+        r2.reset()
+        r2.update(y * 2, y, None)
+        assert r2.compute().item() == r2_score(y.numpy(), (y * 2).numpy())
+
+    def test_mean_loss(self):
+        loss = MeanLoss()
+        loss.update(None, torch.zeros((3, 1)), torch.tensor(1.0))
+        loss.update(None, torch.zeros((1, 1)), torch.tensor(5.0))
+        assert loss.compute().item() == pytest.approx(2.0)
+
+    def test_no_samples(self):
+        # 空のデータローダーではTypeErrorではなく、サンプルがないことを示すValueErrorを送出する
+        for metric in [MeanLoss(), R2Score()]:
+            with pytest.raises(ValueError, match="no samples"):
+                metric.compute()
+        with pytest.raises(ValueError, match="no samples"):
+            MetricAccumulator().compute()
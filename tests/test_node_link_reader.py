@@ -0,0 +1,66 @@
+import sys
+import os
+import pytest
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+from handler import NetworkxHandler  # nopep8
+from node_link_reader import iter_node_link  # nopep8
+
+FOF_TREE_PATH = os.path.join("data", "fof_tree.json")
+
+
+def get_state(nx_handler):
+    return (dict(nx_handler.node2label), nx_handler.node2attr, dict(nx_handler.source2targets),
+            dict(nx_handler.target2sources), nx_handler.next_node)
+
+
+class TestNodeLinkReader:
+    @pytest.fixture
+    def get_expected(self):
+        nx_handler = NetworkxHandler()
+        nx_handler.load_json(FOF_TREE_PATH, stream=False)
+        return nx_handler
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+    def test_stream(self, get_expected, chunk_size):
+        nx_handler = NetworkxHandler()
+        nx_handler.init_node_link(iter_node_link(FOF_TREE_PATH, chunk_size, fast=False))
+        assert get_state(nx_handler) == get_state(get_expected)
+        assert (json_graph.node_link_data(nx_handler.get_graph()) ==
+                json_graph.node_link_data(get_expected.get_graph()))
+
+    def test_fast(self, get_expected):
+        pytest.importorskip("orjson")
+        nx_handler = NetworkxHandler()
+        nx_handler.init_node_link(iter_node_link(FOF_TREE_PATH, fast=True))
+        assert get_state(nx_handler) == get_state(get_expected)
+
+    def test_edit_before_graph(self, get_expected):
+        # networkxグラフを作成する前の編集も、作成したグラフに反映される
+        nx_handler = NetworkxHandler()
+        nx_handler.load_json(FOF_TREE_PATH)
+        for handler in [nx_handler, get_expected]:
+            child = handler.get_children(0)[0]
+            handler.remove_edge(0, child)
+            handler.add_edge(handler.add_node("new", token_type="NAME"), child)
+            handler.set_label(child, "renamed")
+        assert (json_graph.node_link_data(nx_handler.get_graph()) ==
+                json_graph.node_link_data(get_expected.get_graph()))
+
+    def test_edges_without_graph(self, get_expected):
+        # エッジの取得ではnetworkxグラフを作成せず、グラフと同じ順序でエッジを返す
+        nx_handler = NetworkxHandler()
+        nx_handler.load_json(FOF_TREE_PATH)
+        nx_handler.add_edge(nx_handler.add_node("new", token_type="NAME"), 1)
+        edges = nx_handler.get_all_edges()
+        assert nx_handler._graph is None
+        assert edges == list(nx_handler.get_graph_edges())
+        assert get_expected.get_all_edges() == list(get_expected.get_graph_edges())
+
+    def test_truncated(self, tmp_path):
+        with open(FOF_TREE_PATH) as f:
+            text = f.read()
+        truncated_path = tmp_path / "truncated.json"
+        truncated_path.write_text(text[:len(text) // 2])
+        with pytest.raises(ValueError):
+            list(iter_node_link(str(truncated_path), 64, fast=False))
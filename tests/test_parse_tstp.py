@@ -0,0 +1,93 @@
+import sys
+import os
+from lark import Lark
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+from cnf_parser import CnfParser  # nopep8
+from lean_lexer import LeanParser  # nopep8
+from parse_tstp import ParseTstp, get_parser, grammar_digest, is_token  # nopep8
+import tstp_parser  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+TSTP = """% comment
+include('Axioms/SET001+0.ax').
+fof(ax1,axiom,![X]:(p(X)=>q(X))).
+fof(ax2,axiom,?[X,Y]:(r(X,Y)&~s(Y))).
+fof(c,conjecture,(a<=>b)|(c<~>d)).
+fof(f3,axiom,'quoted atom'(a),file('x.p',f3)).
+cnf(c1,negated_conjecture,~p(X)|X=f(Y)|X!=a).
+cnf(c2,plain,$false,inference(resolution,[status(thm)],[c1,ax1])).
+cnf(n,axiom,q(1,-2,3.5,"distinct")).
+tff(t1,type,g:($i*$i)>$o).
+tff(t2,axiom,![X:$int]:$less(X,1)).
+thf(h1,axiom,^[X:$i]:(p@X) = p).
+"""
+CNF_TSTP = """% cnfだけの入力(トークンの種類の境界を含む)
+cnf(-1,plain,(p("d",1.5,-2/3,1e5) | X != 0 | ~ a = $$f(b)),a(X,"s",[],[u:v:[w],2],-3.0e-2),[x,y(z)]).
+cnf(include,cnf,cnf(cnf) | ~$true | 'q x'('a\\'b') = $sum(1,X)).
+cnf(f3,negated_conjecture,$false,inference(resolution,[status(thm)],[f1,f2])).
+cnf(f4,plain,p(X)|$cnf = a,introduced(definition,[new_symbols(naming,[sP0])])).
+cnf(f5,plain,p,file('a.p',n):x,[$cnf(p|q)]).
+"""
+
+
+class TestStandaloneParser:
+    def test_grammar_digest(self):
+        # tstp_EBNF.larkを変更したらbuild_tstp_parser.pyでtstp_parser.pyを生成し直す
+        assert tstp_parser.GRAMMAR_SHA256 == grammar_digest(GRAMMAR_PATH)
+
+    def test_same_ast_as_earley(self):
+        parse_tstp = ParseTstp(GRAMMAR_PATH, keep_positions=True)
+        assert isinstance(get_parser(GRAMMAR_PATH, keep_positions=True), tstp_parser.Lark)
+        with open(GRAMMAR_PATH, encoding="utf-8") as grammar:
+            earley_parser = Lark(grammar.read(), start="tptp_root")
+        expected = parse_tstp.convert_cst2ast(earley_parser.parse(TSTP))
+        ast_handler = parse_tstp.convert_cst2ast(parse_tstp.parse_tstp(TSTP))
+        assert (json_graph.node_link_data(ast_handler.get_graph()) ==
+                json_graph.node_link_data(expected.get_graph()))
+
+
+class TestLeanLexer:
+    def test_same_ast_as_positions(self):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        assert isinstance(get_parser(GRAMMAR_PATH), LeanParser)
+        cst_root = parse_tstp.parse_tstp(TSTP)
+        expected = ParseTstp(GRAMMAR_PATH, keep_positions=True).parse_tstp(TSTP)
+        tokens = [child for tree in cst_root.iter_subtrees() for child in tree.children if is_token(child)]
+        assert tokens and all(token.line is None for token in tokens)
+        assert all(child.line is not None for tree in expected.iter_subtrees()
+                   for child in tree.children if is_token(child))
+        assert (json_graph.node_link_data(parse_tstp.convert_cst2ast(cst_root).get_graph()) ==
+                json_graph.node_link_data(parse_tstp.convert_cst2ast(expected).get_graph()))
+
+    def test_error_position(self):
+        # 位置情報を記録しない場合も、構文エラーは行番号と列番号付きで報告する
+        for tstp, line, column in [("cnf(a,plain,p).\n  cnf(b,plain,&).", 2, 15),
+                                   ("cnf(a,plain,p).\n\ncnf(b,plain,# x).", 3, 13)]:
+            try:
+                ParseTstp(GRAMMAR_PATH).parse_tstp(tstp)
+            except tstp_parser.UnexpectedInput as e:
+                assert (e.line, e.column) == (line, column)
+            else:
+                assert False
+
+
+class TestCnfParser:
+    def test_same_ast_as_lark(self):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        for tstp in [CNF_TSTP, TSTP, CNF_TSTP + TSTP + CNF_TSTP]:
+            expected = parse_tstp.convert_cst2ast(parse_tstp.parse_tstp(tstp))
+            ast_handler = parse_tstp.convert_tstp2ast(tstp)
+            assert (json_graph.node_link_data(ast_handler.get_graph()) ==
+                    json_graph.node_link_data(expected.get_graph()))
+
+    def test_fallback(self):
+        # cnf以外の入力とformula_dataを含む入力だけが、連続する範囲ごとに元の行番号のままlarkに渡される
+        tstp = CNF_TSTP + TSTP
+        inputs = []
+        CnfParser(tstp).parse(lambda source, ast_parent_id, ast_handler: inputs.append(source))
+        lines = tstp.split("\n")
+        assert [source.strip().split("\n") for source in inputs] == [lines[5:12], lines[15:18]]
+        for source in inputs:
+            first_line = source.strip().split("\n")[0]
+            assert source[:source.index(first_line)].count("\n") == lines.index(first_line)
@@ -0,0 +1,72 @@
+import random
+import sys
+import os
+import networkx as nx
+import pytest
+sys.path.append(os.pardir)
+from handler import NetworkxHandler  # nopep8
+from normalize import DeductionTree  # nopep8
+from reachability import ReachabilityIndex  # nopep8
+
+
+class TestReachabilityIndex:
+    @pytest.fixture
+    def get_deduction_tree(self):
+        return DeductionTree(os.path.join("data", "deduction_tree.json"))
+
+    def test_random_dag(self):
+        rng = random.Random(0)
+        nx_handler = NetworkxHandler()
+        for i in range(200):
+            node = nx_handler.add_node(f"f{i}")
+            for parent in rng.sample(range(i), min(i, rng.randrange(3))):
+                nx_handler.add_edge(parent, node)
+        graph = nx_handler.get_graph()
+        # 区間ラベルの数によらず同じ答えになる
+        for n_labels in [0, 1, 3]:
+            index = ReachabilityIndex(nx_handler, n_labels=n_labels)
+            position = {node: i for i, node in enumerate(index.nodes)}
+            for node in nx_handler.get_all_nodes():
+                ancestors = nx.ancestors(graph, node)
+                premises = index.get_premises(node)
+                assert set(premises) == ancestors
+                assert premises == sorted(premises, key=position.get)
+                assert set(index.get_consequences(node)) == nx.descendants(graph, node)
+                for other in nx_handler.get_all_nodes():
+                    assert index.is_used_to_derive(other, node) == (other in ancestors)
+
+    def test_sub_proof(self, get_deduction_tree):
+        nx_handler = get_deduction_tree.nx
+        index = ReachabilityIndex(nx_handler)
+        nodes = nx_handler.get_all_nodes()
+        for node in nodes:
+            ascendants = nx_handler.get_ascendants(node)
+            sub_proof = index.get_sub_proof(node)
+            assert set(sub_proof) == ascendants and sub_proof[-1] == node
+            assert set(index.get_premises(node)) == ascendants - {node}
+            assert set(index.get_consequences(node)) == nx_handler.get_descendants(node) - {node}
+            for other in nodes:
+                assert index.is_used_to_derive(other, node) == (other in ascendants and other != node)
+
+    def test_slice(self, get_deduction_tree, tmp_path):
+        nx_handler = get_deduction_tree.nx
+        index = ReachabilityIndex(nx_handler)
+        for node, sub_proof in index.slice_all(nx_handler.get_all_nodes()):
+            labels = {nx_handler.get_label(sub_proof_node) for sub_proof_node in index.get_sub_proof(node)}
+            assert {sub_proof.get_label(new_node) for new_node in sub_proof.get_all_nodes()} == labels
+            edges = {(nx_handler.get_label(source), nx_handler.get_label(target))
+                     for source, target in nx_handler.get_all_edges()
+                     if nx_handler.get_label(target) in labels}
+            assert {(sub_proof.get_label(source), sub_proof.get_label(target))
+                    for source, target in sub_proof.get_all_edges()} == edges
+        index.save_slices(nx_handler.get_all_nodes(), str(tmp_path))
+        assert len(os.listdir(tmp_path)) == len(nx_handler.get_all_nodes())
+
+    def test_cycle(self):
+        nx_handler = NetworkxHandler()
+        first = nx_handler.add_node("f1")
+        second = nx_handler.add_node("f2")
+        nx_handler.add_edge(first, second)
+        nx_handler.add_edge(second, first)
+        with pytest.raises(ValueError):
+            ReachabilityIndex(nx_handler)
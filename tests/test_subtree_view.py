@@ -0,0 +1,68 @@
+import json
+import sys
+import os
+import pytest
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+from handler import SubtreeView  # nopep8
+from normalize import FofTree  # nopep8
+from term_dag import TermDag  # nopep8
+
+
+class TestSubtreeView:
+    @pytest.fixture
+    def get_fof_tree(self):
+        return FofTree(os.path.join("data", "fof_tree.json"))
+
+    @pytest.fixture
+    def get_fof_names(self):
+        with open(os.path.join("data", "fof_names.json"), "r") as f:
+            return json.load(f)
+
+    def test_read(self, get_fof_tree, get_fof_names):
+        fof_tree = get_fof_tree
+        for fof_name in get_fof_names:
+            view = fof_tree.get_formula(fof_name)
+            formula_root = fof_tree.get_formula_root(fof_name)
+            assert view.get_orphans() == {formula_root}
+            assert view.get_parents(formula_root) == []
+            nodes = view.get_all_nodes()
+            assert nodes[0] == formula_root
+            assert set(nodes) == fof_tree.nx.get_descendants(formula_root)
+            for node in nodes:
+                # 元のハンドラのリストと辞書をそのまま返す
+                assert view.get_children(node) is fof_tree.nx.get_children(node)
+                assert view.get_attr(node) is fof_tree.nx.get_attr(node)
+                assert view.get_label(node) == fof_tree.nx.get_label(node)
+            for label in {view.get_label(node) for node in nodes}:
+                assert set(view.get_nodes(label)) == set(fof_tree.nx.get_nodes(label)) & set(nodes)
+            subgraph = fof_tree.nx.get_graph().subgraph(nodes)
+            graph = view.get_graph()
+            assert dict(graph.nodes(data=True)) == dict(subgraph.nodes(data=True))
+            assert set(graph.edges()) == set(subgraph.edges())
+
+    def test_copy_on_write(self, get_fof_tree, get_fof_names):
+        fof_tree = get_fof_tree
+        expected = json_graph.node_link_data(fof_tree.nx.get_graph())
+        view = fof_tree.get_formula(get_fof_names[0])
+        child = view.get_children(view.root)[0]
+        view.remove_edge(view.root, child)
+        new_node = view.add_node("new", token_type="NAME")
+        view.add_edge(view.root, new_node)
+        view.set_label(view.root, "renamed")
+        assert view.copy is not None
+        assert view.get_children(view.root) == [new_node]
+        assert view.get_label(view.root) == "renamed"
+        assert fof_tree.nx.get_nodes("new") == []
+        assert json_graph.node_link_data(fof_tree.nx.get_graph()) == expected
+
+    def test_term_dag(self, get_fof_tree, get_fof_names):
+        fof_tree = get_fof_tree
+        dag = TermDag.from_handler(fof_tree.nx)
+        for fof_name in get_fof_names:
+            formula_root = fof_tree.get_formula_root(fof_name)
+            dag_root = dag.add_tree(fof_tree.nx, formula_root)
+            view = SubtreeView(dag, dag_root)
+            assert view.get_orphans() == {dag_root}
+            expected = json_graph.node_link_data(dag.expand(dag_root).get_graph())
+            assert json_graph.node_link_data(TermDag.from_handler(view.to_handler()).expand().get_graph()) == expected
@@ -0,0 +1,85 @@
+import csv
+import threading
+import sys
+import os
+import pytest
+import torch
+sys.path.append(os.path.join(os.pardir, "machine_learning"))
+from dataset import Dataset  # nopep8
+from sweep import grid_search_space, kfold_indices, random_search_space, run_sweep, run_trial, should_prune  # nopep8
+
+CONFIG = {"model": "NN", "input_size": 10, "embedding_size": 4, "hidden_size": 4, "output_size": 1,
+          "batch_size": 4}
+
+
+def create_dataset(n_samples=20):
+    generator = torch.Generator().manual_seed(0)
+    data = [torch.randint(2, 10, (int(length),), generator=generator)
+            for length in torch.randint(1, 6, (n_samples,), generator=generator)]
+    y = [torch.rand(1, generator=generator) for _ in range(n_samples)]
+    return Dataset(data, y)
+
+
+class TestSweep:
+    @pytest.mark.parametrize("n_samples, n_splits", [(10, 1), (10, 3), (11, 5)])
+    def test_kfold_indices(self, n_samples, n_splits):
+        splits = kfold_indices(n_samples, n_splits)
+        assert len(splits) == n_splits
+        for train_indices, test_indices in splits:
+            assert sorted(train_indices + test_indices) == list(range(n_samples))
+        if n_splits == 1:
+            assert len(splits[0][1]) == n_samples // 5
+        else:
+            # 各データはちょうど1回だけ検証データになる
+            assert sorted(index for _, test_indices in splits for index in test_indices) == list(range(n_samples))
+        assert kfold_indices(n_samples, n_splits) == splits
+
+    def test_grid_search_space(self):
+        configs = grid_search_space({"model": ["LSTM", "CNN"], "hidden_size": [32, 64, 128], "lr": [1e-3]})
+        assert len(configs) == 6
+        assert {(config["model"], config["hidden_size"]) for config in configs} == {
+            (model, hidden_size) for model in ["LSTM", "CNN"] for hidden_size in [32, 64, 128]}
+        assert all(config["lr"] == 1e-3 for config in configs)
+
+    def test_random_search_space(self):
+        search_space = {"model": ["LSTM", "CNN"], "hidden_size": (16, 64), "lr": (1e-4, 1e-2)}
+        configs = random_search_space(search_space, 50, seed=1)
+        assert len(configs) == 50
+        for config in configs:
+            assert config["model"] in ["LSTM", "CNN"]
+            assert isinstance(config["hidden_size"], int) and 16 <= config["hidden_size"] <= 64
+            assert 1e-4 <= config["lr"] <= 1e-2
+        assert random_search_space(search_space, 50, seed=1) == configs
+        assert random_search_space(search_space, 50, seed=2) != configs
+
+    def test_should_prune(self):
+        history = dict()
+        lock = threading.Lock()
+        assert not should_prune(None, None, 1, 10.0, 0)
+        # 他の試行が揃うまでは打ち切らない
+        for val_loss in [1.0, 2.0, 3.0]:
+            assert not should_prune(history, lock, 1, val_loss, 3)
+        assert history[1] == [1.0, 2.0, 3.0]
+        assert should_prune(history, lock, 1, 2.5, 3)
+        assert not should_prune(history, lock, 1, 1.5, 3)
+        assert not should_prune(history, lock, 2, 100.0, 3)
+
+    def test_run_trial(self):
+        dataset = create_dataset()
+        train_indices, test_indices = kfold_indices(len(dataset), 1)[0]
+        result = run_trial({"trial_id": 0, "fold": 0, "config": CONFIG, "seed": 0, "device": "cpu",
+                            "dataset": dataset, "train_indices": train_indices, "test_indices": test_indices,
+                            "epochs": 2, "patience": 10, "n_threads": 1, "history": None, "lock": None,
+                            "min_epochs": 1, "n_startup_trials": 1})
+        assert result["device"] == "cpu"
+        assert result["epochs"] == 2
+        assert not result["pruned"]
+
+    def test_run_sweep(self, tmp_path):
+        results_path = str(tmp_path / "results.csv")
+        results = run_sweep(create_dataset(), grid_search_space({key: [value] for key, value in CONFIG.items()}),
+                            results_path, n_splits=2, epochs=1, max_workers=1, devices=["cpu", "cpu:0"])
+        # 試行はデバイスに順番に割り当てられる
+        assert [result["device"] for result in results] == ["cpu", "cpu:0"]
+        with open(results_path) as f:
+            assert len(list(csv.DictReader(f))) == 2
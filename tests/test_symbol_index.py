@@ -0,0 +1,92 @@
+import json
+import sys
+import os
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+from normalize import Converter  # nopep8
+from parse_tstp import ParseTstp  # nopep8
+import symbol_index as symbol_index_module  # nopep8
+from symbol_index import SymbolIndex, decode_postings, encode_postings, extract_symbols  # nopep8
+from tptpparser import load_manifest  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+
+
+class TestSymbolIndex:
+    def test_postings(self):
+        formula_ids = [0, 3, 4, 100, 70000, 5000000]
+        assert decode_postings(encode_postings(formula_ids)) == formula_ids
+
+    def test_extract_symbols(self, tstp):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        formulas = extract_symbols(parse_tstp.convert_tstp2ast(tstp))
+        assert formulas == [
+            ("a1", {"name:a1", "functor:p", "functor:q", "functor:f"}),
+            ("a2", {"name:a2", "functor:r", "functor:$sum"}),
+            ("f1", {"name:f1", "functor:p", "functor:q", "functor:f", "rule:cnf_transformation", "premise:a1"}),
+            ("f2", {"name:f2", "functor:p", "functor:a", "rule:resolution", "premise:f1", "premise:a2"})]
+        # TermDagでも同じ記号を取得する
+        assert extract_symbols(parse_tstp.convert_cst2dag(parse_tstp.parse_tstp(tstp))) == formulas
+
+    def test_query(self, tmp_path):
+        index_path = str(tmp_path / "symbols.sqlite")
+        # 1ファイルごとにflushし、記号ごとに複数のブロックを作る
+        with SymbolIndex(index_path, flush_size=1) as symbol_index:
+            assert symbol_index.add_file("a", [("a1", {"functor:f", "functor:g"}), ("a2", {"functor:g"})])
+            assert symbol_index.add_file("b", [("b1", {"functor:f"}), ("b2", {"functor:h", "premise:a1"})])
+            assert not symbol_index.add_file("a", [("a3", {"functor:f"})])
+        with SymbolIndex(index_path) as symbol_index:
+            assert symbol_index.lookup("functor:f") == [0, 2]
+            assert symbol_index.query(("and", "functor:f", "functor:g")) == [0]
+            assert symbol_index.query(("or", "functor:h", ("and", "functor:g", "functor:f"))) == [0, 3]
+            assert symbol_index.query(("and", "functor:f", "functor:unknown")) == []
+            assert symbol_index.get_formulas([3, 0]) == [("b", "b2"), ("a", "a1")]
+            assert symbol_index.get_files(symbol_index.query("functor:f")) == ["a", "b"]
+            symbol_index.add_file("c", [("c1", {"functor:f"})])
+            symbol_index.compact()
+            assert symbol_index.connection.execute(
+                "SELECT COUNT(*) FROM postings WHERE symbol = 'functor:f'").fetchone()[0] == 1
+            assert symbol_index.lookup("functor:f") == [0, 2, 4]
+
+    def test_blocks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(symbol_index_module, "BLOCK_SIZE", 3)
+        with SymbolIndex(str(tmp_path / "symbols.sqlite")) as symbol_index:
+            symbol_index.add_file("a", [(f"a{i}", {"functor:f"} | ({"functor:g"} if i % 7 == 0 else set()))
+                                        for i in range(30)])
+            symbol_index.flush()
+            assert symbol_index.count("functor:f") == 30
+            assert symbol_index.connection.execute(
+                "SELECT COUNT(*) FROM postings WHERE symbol = 'functor:f'").fetchone()[0] == 10
+            assert symbol_index.lookup("functor:f") == list(range(30))
+            # gの候補を含むfのブロックだけを復号する
+            assert symbol_index.filter("functor:f", {0, 7}) == {0, 7}
+            assert symbol_index.query(("and", "functor:f", "functor:g")) == [0, 7, 14, 21, 28]
+            assert symbol_index.query(("and", "functor:f", ("or", "functor:g", "name:none"))) == [0, 7, 14, 21, 28]
+
+    def test_incremental(self, tmp_path, tstp):
+        parse_tstp = ParseTstp(GRAMMAR_PATH)
+        tstp_path = tmp_path / "proof.tstp"
+        tstp_path.write_text(tstp)
+        ast_path = str(tmp_path / "ast.json")
+        deduction_tree_path = str(tmp_path / "deduction_tree.json")
+        formula_dir = tmp_path / "formulas"
+        formula_dir.mkdir()
+        with SymbolIndex(str(tmp_path / "symbols.sqlite")) as symbol_index:
+            parse_tstp.convert_tstp2json(str(tstp_path), ast_path, symbol_index=symbol_index)
+            with open(deduction_tree_path, "w") as f:
+                json.dump(json_graph.node_link_data(parse_tstp.create_deduction_tree_graph_on_networkx(ast_path)), f)
+            Converter(ast_path, deduction_tree_path).save_normalized_formula(str(formula_dir), symbol_index)
+            symbol_index.flush()
+            assert symbol_index.get_formulas(symbol_index.query("premise:a1")) == [(str(tstp_path), "f1")]
+            # 正規化した論理式では~を除いた記号で検索できる
+            assert sorted(symbol_index.get_formulas(symbol_index.query("functor:p"))) == sorted([
+                (str(tstp_path), "a1"), (str(tstp_path), "f1"), (str(tstp_path), "f2"),
+                (str(formula_dir), "f1"), (str(formula_dir), "f2")])
+
+    def test_index_stage(self, run_pipeline):
+        summary, output_dir = run_pipeline(["parse", "index"], replacements=(None, ("p(a)", "p(b)")))
+        assert summary == {"done": 2, "failed": 0, "skipped": 0}
+        assert load_manifest(os.path.join(output_dir, "manifest.jsonl"))["b.p"]["stages"] == {"parse", "index"}
+        with SymbolIndex(os.path.join(output_dir, "symbols.sqlite")) as symbol_index:
+            assert symbol_index.get_files(symbol_index.query("rule:resolution")) == ["a.p", "b.p"]
+            assert symbol_index.get_formulas(symbol_index.query(("and", "name:f2", "functor:b"))) == [("b.p", "f2")]
@@ -0,0 +1,69 @@
+import pickle
+import threading
+import sys
+import os
+sys.path.append(os.pardir)
+from handler import NetworkxHandler  # nopep8
+from symbol_table import SymbolTable  # nopep8
+from term_dag import TermDag  # nopep8
+
+
+class TestSymbolTable:
+    def test_intern(self):
+        symbol_table = SymbolTable()
+        assert symbol_table.intern("p") == 0
+        assert symbol_table.intern("q") == 1
+        assert symbol_table.intern("p") == 0
+        assert symbol_table.get_id("r") is None
+        assert len(symbol_table) == 2
+        assert symbol_table.get_symbol(1) == "q"
+
+    def test_concurrent_intern(self):
+        symbol_table = SymbolTable()
+        n_threads = 8
+        barrier = threading.Barrier(n_threads)
+        results = [None] * n_threads
+
+        def intern_all(index):
+            barrier.wait()
+            # 全てのスレッドが同じ新しい記号を同時に登録する
+            results[index] = [symbol_table.intern(f"s{i}") for i in range(5000)]
+        threads = [threading.Thread(target=intern_all, args=(index,)) for index in range(n_threads)]
+        # スレッドを頻繁に切り替えさせ、登録の途中で割り込みが起きるようにする
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        assert all(result == results[0] for result in results)
+        assert len(symbol_table) == 5000
+        assert sorted(results[0]) == list(range(5000))
+        assert all(symbol_table.symbol2id[symbol] == symbol_id
+                   for symbol_id, symbol in enumerate(symbol_table.id2symbol))
+
+    def test_pickle(self):
+        symbol_table = SymbolTable()
+        symbol_table.intern("p")
+        loaded = pickle.loads(pickle.dumps(symbol_table))
+        assert loaded.id2symbol == ["p"]
+        assert loaded.intern("q") == 1
+
+    def test_get_nodes(self):
+        symbol_table = SymbolTable()
+        nx_handler = NetworkxHandler(symbol_table)
+        node = nx_handler.add_node("p", token_type="FUNCTOR")
+        dag = TermDag(symbol_table)
+        dag.intern("q", [], token_type="FUNCTOR")
+        n_symbols = len(symbol_table)
+        # 問い合わせただけのラベルは記号表にもハンドラにも登録しない
+        assert nx_handler.get_nodes("unknown") == []
+        assert dag.get_nodes("unknown") == []
+        assert nx_handler.get_nodes("q") == []
+        assert len(symbol_table) == n_symbols
+        assert symbol_table.get_id("q") not in nx_handler.label2nodes
+        assert nx_handler.get_nodes("p") == [node]
+        assert len(dag.get_nodes("q")) == 1
@@ -0,0 +1,43 @@
+import sys
+import os
+import pytest
+from networkx.readwrite import json_graph
+sys.path.append(os.pardir)
+from handler import NetworkxHandler  # nopep8
+from normalize import FofTree  # nopep8
+from term_dag import TermDag  # nopep8
+
+
+class TestTermDag:
+    @pytest.fixture
+    def get_fof_tree_handler(self):
+        nx_handler = NetworkxHandler()
+        nx_handler.load_json(os.path.join("data", "fof_tree.json"))
+        return nx_handler
+
+    def test_expand(self, get_fof_tree_handler):
+        nx_handler = get_fof_tree_handler
+        dag = TermDag.from_handler(nx_handler)
+        stats = dag.get_compression_stats()
+        assert stats["tree_nodes"] == len(nx_handler.get_all_nodes())
+        assert stats["dag_nodes"] < stats["tree_nodes"]
+        expected = json_graph.node_link_data(nx_handler.get_graph())
+        assert json_graph.node_link_data(dag.expand().get_graph()) == expected
+
+    def test_fof_tree_on_dag(self, get_fof_tree_handler, tmp_path):
+        nx_handler = get_fof_tree_handler
+        dag_path = str(tmp_path / "fof_dag.json")
+        TermDag.from_handler(nx_handler).save_json(dag_path)
+        tree = FofTree(os.path.join("data", "fof_tree.json"))
+        dag_tree = FofTree(dag_path)
+        name_nodes = [node for node in tree.nx.get_all_nodes()
+                      if tree.is_token(node) and tree.is_name_node(node, tree.nx.get_attr(node))]
+        assert name_nodes
+        for name_node in name_nodes:
+            fof_name = tree.nx.get_label(name_node)
+            formula_root = tree.get_formula_root(fof_name)
+            dag_formula_root = dag_tree.get_formula_root(fof_name)
+            expected_labels = [tree.nx.get_label(node)
+                               for node in sorted(tree.nx.get_descendants(formula_root))]
+            expanded = dag_tree.nx.expand(dag_formula_root)
+            assert [expanded.get_label(node) for node in expanded.get_all_nodes()] == expected_labels
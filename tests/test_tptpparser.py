@@ -0,0 +1,78 @@
+import json
+import sys
+import os
+import pytest
+sys.path.append(os.pardir)
+from instrumentation import INSTRUMENTATION  # nopep8
+from tptpparser import check_inputs, find_inputs, load_manifest, run_batch  # nopep8
+
+GRAMMAR_PATH = os.path.join(os.pardir, "tstp_EBNF.lark")
+
+
+class TestTptpparser:
+    def create_inputs(self, tmp_path, tstp):
+        input_dir = tmp_path / "proofs"
+        (input_dir / "sub").mkdir(parents=True)
+        (input_dir / "a.p").write_text(tstp)
+        (input_dir / "sub" / "b.tstp").write_text(tstp)
+        (input_dir / "bad.p").write_text("fof(x,axiom,(p&)).\n")
+        (input_dir / "notes.txt").write_text("")
+        return find_inputs([str(input_dir)], [".p", ".tstp"])
+
+    def test_find_inputs(self, tmp_path, tstp):
+        inputs = self.create_inputs(tmp_path, tstp)
+        assert [name for name, _ in inputs] == [os.path.join("proofs", "a.p"), os.path.join("proofs", "bad.p"),
+                                                os.path.join("proofs", "sub", "b.tstp")]
+
+    def test_duplicate_inputs(self, tmp_path, tstp):
+        for dir_name in ["a", "b"]:
+            (tmp_path / dir_name).mkdir()
+            (tmp_path / dir_name / "p1.p").write_text(tstp)
+        (tmp_path / "a" / "p1.tstp").write_text(tstp)
+        # 別々のディレクトリの同じ名前のファイルは、マニフェストと出力ディレクトリを共有してしまう
+        inputs = find_inputs([str(tmp_path / "a" / "p1.p"), str(tmp_path / "b" / "p1.p")], [".p"])
+        with pytest.raises(ValueError, match="same name"):
+            run_batch(inputs, str(tmp_path / "out"), ["parse"], progress=False, grammar_path=GRAMMAR_PATH)
+        assert not os.path.exists(tmp_path / "out")
+        # 拡張子だけが異なるファイルも同じ出力ディレクトリになる
+        with pytest.raises(ValueError):
+            check_inputs(find_inputs([str(tmp_path / "a")], [".p", ".tstp"]))
+        # ディレクトリを渡せば名前にディレクトリ名が含まれる
+        check_inputs(find_inputs([str(tmp_path / "a"), str(tmp_path / "b")], [".p"]))
+
+    def test_resume(self, tmp_path, tstp):
+        inputs = self.create_inputs(tmp_path, tstp)
+        output_dir = str(tmp_path / "out")
+        summary = run_batch(inputs, output_dir, ["parse", "deduction"], progress=False, grammar_path=GRAMMAR_PATH)
+        assert summary == {"done": 2, "failed": 1, "skipped": 0}
+        name2entry = load_manifest(os.path.join(output_dir, "manifest.jsonl"))
+        assert name2entry[os.path.join("proofs", "bad.p")] == {"stages": set(), "failed": True}
+        # 終了した段階と失敗した入力は実行しない
+        summary = run_batch(inputs, output_dir, ["parse", "deduction", "normalize"], progress=False,
+                            grammar_path=GRAMMAR_PATH)
+        assert summary == {"done": 2, "failed": 0, "skipped": 1}
+        formula_dir = os.path.join(output_dir, "proofs", "sub", "b", "formulas")
+        assert sorted(os.listdir(formula_dir)) == ["f1.json", "f2.json"]
+        with open(os.path.join(output_dir, "manifest.jsonl")) as f:
+            results = [json.loads(line) for line in f]
+        assert results[-1]["stages"] == ["normalize"]
+        # 中断して書き込み途中になった行は無視する
+        with open(os.path.join(output_dir, "manifest.jsonl"), "a") as f:
+            f.write('{"name": "proofs/a.p", "sta')
+        summary = run_batch(inputs, output_dir, ["parse", "deduction", "normalize"], progress=False,
+                            retry_failed=True, grammar_path=GRAMMAR_PATH)
+        assert summary == {"done": 0, "failed": 1, "skipped": 2}
+        name2entry = load_manifest(os.path.join(output_dir, "manifest.jsonl"))
+        assert name2entry[os.path.join("proofs", "bad.p")]["failed"]
+        assert len(name2entry) == 3
+
+    def test_parallel_profile(self, tmp_path, tstp):
+        inputs = self.create_inputs(tmp_path, tstp)
+        INSTRUMENTATION.reset()
+        summary = run_batch(inputs, str(tmp_path / "out"), ["parse", "deduction", "normalize"], workers=2,
+                            progress=False, grammar_path=GRAMMAR_PATH, profile=True)
+        rows = {row["name"]: row for row in INSTRUMENTATION.summary()}
+        INSTRUMENTATION.reset()
+        assert summary == {"done": 2, "failed": 1, "skipped": 0}
+        assert rows["parse"]["count"] == 3 and rows["normalize"]["count"] == 2
+        assert rows["normalize_formula"]["count"] == 4
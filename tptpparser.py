@@ -0,0 +1,465 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from instrumentation import INSTRUMENTATION
+
+# 自動定理証明(prove)、構文解析(parse)、記号の索引への追加(index)、証明のグラフの作成(deduction)、論理式の正規化(normalize)、
+# 正規化した論理式の標準形のハッシュの計算(canonical)を問題ファイルやtstpファイルの集まりに対して実行するコマンド
+# 入力ファイルごとに出力ディレクトリを作り、各段階の出力は以下のファイルに保存する
+#   prove: proof.tstp, parse: ast.json, deduction: deduction_tree.json, normalize: formulas/<論理式名>.json,
+#   canonical: hashes.json
+# indexは全ての入力で共有する索引(symbol_index.SymbolIndex)に、入力の名前をファイルのパスとして追加する
+# storeは前の段階の出力を全ての入力で共有するストア(formula_store.FormulaStore)に、入力の名前を問題名として保存する
+# normalizeとstoreを一緒に実行する場合は、論理式ごとのファイルを作らずに正規化した論理式を直接ストアに保存する
+# (canonicalも一緒に実行する場合はcanonicalがformulas/を読むため、ファイルにも保存する)
+# 途中の段階から始める場合は、前の段階の出力を出力ディレクトリから読み込む
+# 終了した入力はマニフェスト(jsonl)に1行ずつ追記し、中断後に同じコマンドを実行すると終了していない入力から再開する
+STAGES = ["prove", "parse", "index", "deduction", "normalize", "canonical", "store"]
+DEFAULT_GRAMMAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tstp_EBNF.lark")
+
+
+def find_inputs(paths, suffixes):
+    """find_inputs
+
+    入力ファイルを列挙する関数
+    ディレクトリはsuffixesのいずれかで終わるファイルを再帰的に探す
+
+    Args:
+        paths (list): ファイルまたはディレクトリのパスのリスト
+        suffixes (list): ディレクトリから探すファイルの拡張子のリスト
+
+    Returns:
+        inputs (list): (入力の名前, ファイルのパス)のリスト
+            入力の名前は、ファイルならファイル名、ディレクトリ内のファイルならディレクトリ名からの相対パス
+    """
+    inputs = []
+    for path in paths:
+        if not os.path.isdir(path):
+            inputs.append((os.path.basename(path), path))
+            continue
+        root = os.path.normpath(path)
+        found = []
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names.sort()
+            for file_name in file_names:
+                if file_name.endswith(tuple(suffixes)):
+                    file_path = os.path.join(dir_path, file_name)
+                    name = os.path.join(os.path.basename(root), os.path.relpath(file_path, root))
+                    found.append((name, file_path))
+        inputs += sorted(found)
+    return inputs
+
+
+def check_inputs(inputs):
+    """check_inputs
+
+    入力の名前と出力ディレクトリが重複していないかを確認する関数
+    別々のディレクトリにある同じ名前のファイル(a/p1.pとb/p1.p)や、拡張子だけが異なるファイル(p1.pとp1.tstp)は
+    マニフェストの行や出力ディレクトリを共有してしまうため、重複している場合はValueErrorを送出する
+
+    Args:
+        inputs (list): find_inputsで取得した(入力の名前, ファイルのパス)のリスト
+    """
+    dir_name2path = dict()
+    for name, path in inputs:
+        dir_name = os.path.normpath(os.path.splitext(name)[0])
+        if dir_name in dir_name2path:
+            raise ValueError(f"inputs {dir_name2path[dir_name]} and {path} have the same name {dir_name}; "
+                             "pass their parent directories instead so that the names include the directory")
+        dir_name2path[dir_name] = path
+
+
+def load_manifest(manifest_path):
+    """load_manifest
+
+    マニフェストを読み込み、入力ごとに終了した段階と失敗したかどうかをまとめる関数
+    書き込み途中で中断した最後の行は無視する
+
+    Args:
+        manifest_path (str): マニフェスト(jsonl)のパス
+
+    Returns:
+        name2entry (dict): 入力の名前をkey、{"stages": 終了した段階のset, "failed": 失敗したか}をvalueとした辞書
+    """
+    name2entry = dict()
+    if not os.path.exists(manifest_path):
+        return name2entry
+    with open(manifest_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entry = name2entry.setdefault(result["name"], {"stages": set(), "failed": False})
+            entry["stages"].update(result["stages"])
+            entry["failed"] = result["failed"] is not None
+    return name2entry
+
+
+class Pipeline:
+    """Pipeline
+
+    1つの入力ファイルに対して各段階を実行するクラス、並列実行のときはワーカープロセスごとに作成する
+
+    Attributes:
+        parse_tstp (ParseTstp): 構文解析に使うインスタンス
+        vampire_path (str): vampireの実行ファイルのパス、proveを実行しないならNone
+        dag (bool): Trueなら抽象構文木をTermDagの形式で保存する
+        profile (bool): Trueなら各段階を計測し、計測結果を入力ごとの結果に含める
+    """
+
+    def __init__(self, grammar_path=DEFAULT_GRAMMAR_PATH, vampire_path=None, dag=False, profile=False,
+                 trace_memory=False):
+        # 構文解析と正規化に必要なモジュールはimportに時間がかかるため、Pipelineを作るときにimportする
+        from parse_tstp import ParseTstp
+        self.parse_tstp = ParseTstp(grammar_path)
+        self.vampire_path = vampire_path
+        self.dag = dag
+        self.profile = profile
+        if profile:
+            INSTRUMENTATION.enable(trace_memory)
+
+    def run_stage(self, stage, input_path, output_dir, stages=(), normalized_formulas=None):
+        """run_stage
+
+        1つの段階を実行する関数
+
+        Args:
+            stage (str): 段階名(STAGESのいずれか)
+            input_path (str): 入力ファイルのパス
+            output_dir (str): 入力ファイルの出力ディレクトリ
+            stages (list): 同じ入力に対して実行する段階のリスト、
+                storeを含みcanonicalを含まないならnormalizeは正規化した論理式をファイルに保存せずに返す
+            normalized_formulas (list): storeで保存するnormalizeの出力、Noneならformulas/から読み込む
+
+        Returns:
+            output: indexならextract_symbolsで取得した(論理式名, 記号のset)のリスト、
+                ファイルに保存しないnormalizeならformula_store.compress_normalized_formulasの戻り値、
+                storeならformula_store.read_output_dirの戻り値、それ以外はNone
+        """
+        tstp_path = os.path.join(output_dir, "proof.tstp")
+        ast_path = os.path.join(output_dir, "ast.json")
+        deduction_tree_path = os.path.join(output_dir, "deduction_tree.json")
+        if stage == "prove":
+            from vampire_executor import VampireExecutor
+            VampireExecutor(self.vampire_path).run(input_path, tstp_path)
+        elif stage == "parse":
+            if not os.path.exists(tstp_path):
+                tstp_path = input_path
+            self.parse_tstp.convert_tstp2json(tstp_path, ast_path, self.dag)
+        elif stage == "index":
+            # 索引への書き込みはrun_batchのプロセスで行うため、ここでは記号を取得して返すだけにする
+            from symbol_index import extract_symbols
+            from term_dag import load_ast
+            return extract_symbols(load_ast(ast_path))
+        elif stage == "deduction":
+            from networkx.readwrite import json_graph
+            graph = self.parse_tstp.create_deduction_tree_graph_on_networkx(ast_path)
+            with INSTRUMENTATION.span("dump_json"):
+                with open(deduction_tree_path, "w") as f:
+                    json.dump(json_graph.node_link_data(graph), f, indent=4)
+        elif stage == "normalize":
+            from normalize import Converter
+            converter = Converter(ast_path, deduction_tree_path)
+            if "store" in stages and "canonical" not in stages:
+                # ストアへの書き込みはrun_batchのプロセスで行うため、ファイルに保存せずに圧縮してstoreに渡す
+                from formula_store import compress_normalized_formulas
+                return compress_normalized_formulas(converter.iter_normalized_formula())
+            formula_dir = os.path.join(output_dir, "formulas")
+            os.makedirs(formula_dir, exist_ok=True)
+            converter.save_normalized_formula(formula_dir)
+        elif stage == "canonical":
+            from canonical import save_formula_hashes
+            save_formula_hashes(os.path.join(output_dir, "formulas"), os.path.join(output_dir, "hashes.json"))
+        elif stage == "store":
+            # indexと同じく、データベースへの書き込みはrun_batchのプロセスで行い、ここでは読み込みと圧縮だけを行う
+            from formula_store import read_output_dir
+            output = read_output_dir(output_dir, read_formulas=normalized_formulas is None)
+            if normalized_formulas is not None:
+                output["normalized_formulas"] = normalized_formulas
+            return output
+
+    def run(self, task):
+        """run
+
+        1つの入力ファイルに対してtaskの段階を順に実行する関数
+        段階が例外を送出したら、以降の段階は実行しない
+
+        Args:
+            task (dict): {"name": 入力の名前, "path": 入力ファイルのパス, "output_dir": 出力ディレクトリ,
+                          "stages": 実行する段階のリスト}
+
+        Returns:
+            result (dict): {"name", "stages": 終了した段階のリスト, "failed": 失敗した段階またはNone,
+                            "error": エラーメッセージ, "seconds": 実行時間, "bytes": 入力ファイルの大きさ,
+                            "records": profileがTrueならspanの記録, "symbols": indexの出力,
+                            "store": storeの出力}
+        """
+        start = time.perf_counter()
+        result = {"name": task["name"], "stages": [], "failed": None, "error": None}
+        os.makedirs(task["output_dir"], exist_ok=True)
+        INSTRUMENTATION.set_file(task["name"])
+        normalized_formulas = None
+        for stage in task["stages"]:
+            try:
+                with INSTRUMENTATION.span(stage):
+                    output = self.run_stage(stage, task["path"], task["output_dir"], task["stages"],
+                                            normalized_formulas)
+            except Exception as e:
+                result["failed"] = stage
+                result["error"] = f"{type(e).__name__}: {e}"
+                break
+            result["stages"].append(stage)
+            if stage == "index":
+                result["symbols"] = output
+            elif stage == "normalize":
+                normalized_formulas = output
+            elif stage == "store":
+                result["store"] = output
+        result["seconds"] = time.perf_counter() - start
+        result["bytes"] = os.path.getsize(task["path"])
+        if self.profile:
+            result["records"] = INSTRUMENTATION.records
+            INSTRUMENTATION.reset()
+        return result
+
+
+# ワーカープロセスごとのPipeline
+PIPELINE = None
+
+
+def init_worker(options):
+    """init_worker
+
+    ワーカープロセスの初期化関数、プロセスごとにPipelineを1つ作る
+    """
+    global PIPELINE
+    sys.setrecursionlimit(100000)
+    PIPELINE = Pipeline(**options)
+
+
+def run_in_worker(task):
+    """run_in_worker
+
+    ワーカープロセスのPipelineでtaskを実行する関数
+    """
+    return PIPELINE.run(task)
+
+
+class Progress:
+    """Progress
+
+    終了した入力の数、スループット(入力/秒, MB/秒)、残り時間、失敗した数を標準エラー出力の1行に表示するクラス
+    表示の更新はinterval秒に1回にする
+
+    Attributes:
+        total (int): 入力の数
+        enabled (bool): Falseなら表示しない
+        interval (float): 表示を更新する間隔(秒)
+    """
+
+    def __init__(self, total, enabled=True, interval=0.5):
+        self.total = total
+        self.enabled = enabled
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last_update = 0
+
+    def update(self, result):
+        """update
+
+        入力が1つ終了したときに呼ぶ関数
+        """
+        self.done += 1
+        self.failed += result["failed"] is not None
+        self.bytes += result["bytes"]
+        now = time.perf_counter()
+        if now - self.last_update >= self.interval or self.done == self.total:
+            self.last_update = now
+            self.show(now)
+
+    def show(self, now):
+        """show
+
+        現在の進捗を表示する関数
+        """
+        if not self.enabled:
+            return
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.done / elapsed
+        eta = (self.total - self.done) / rate if rate > 0 else 0
+        sys.stderr.write(f"\r[{self.done}/{self.total}] {rate:.2f} files/s, {self.bytes / 1e6 / elapsed:.2f} MB/s, "
+                         f"ETA {eta:.0f} s, {self.failed} failed")
+        if self.done == self.total:
+            sys.stderr.write("\n")
+        sys.stderr.flush()
+
+
+def run_batch(inputs, output_dir, stages, manifest_path=None, workers=1, chunksize=1, retry_failed=False,
+              progress=True, index_path=None, store_path=None, **options):
+    """run_batch
+
+    入力ファイルの集まりに対して各段階を実行する関数
+    マニフェストに記録済みの段階は実行せず、入力が終了するたびに結果をマニフェストに追記する
+    入力の名前または出力ディレクトリが重複している場合はValueErrorを送出する
+
+    Args:
+        inputs (list): find_inputsで取得した(入力の名前, ファイルのパス)のリスト
+        output_dir (str): 出力ディレクトリ、入力ごとに<output_dir>/<入力の名前から拡張子を除いたもの>に出力する
+        stages (list): 実行する段階のリスト(STAGESの順に実行する)
+        manifest_path (str): マニフェストのパス、Noneなら<output_dir>/manifest.jsonl
+        workers (int): ワーカープロセスの数、1ならこのプロセスで実行する
+        chunksize (int): 1ワーカーにまとめて渡す入力の数
+        retry_failed (bool): Trueなら以前に失敗した入力も実行し直す
+        progress (bool): Trueなら進捗を表示する
+        index_path (str): indexで追加する索引のパス、Noneなら<output_dir>/symbols.sqlite
+        store_path (str): storeで保存するストアのパス、Noneなら<output_dir>/store.sqlite
+        **options: Pipelineの引数
+
+    Returns:
+        (dict): {"done": 今回終了した入力の数, "failed": 今回失敗した入力の数, "skipped": 実行しなかった入力の数}
+    """
+    check_inputs(inputs)
+    stages = [stage for stage in STAGES if stage in stages]
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    os.makedirs(output_dir, exist_ok=True)
+    name2entry = load_manifest(manifest_path)
+    tasks = []
+    for name, path in inputs:
+        entry = name2entry.get(name, {"stages": set(), "failed": False})
+        finished = entry["stages"]
+        if "store" in stages and "store" not in finished:
+            # storeと一緒に実行したnormalizeは論理式をファイルに保存しないため、storeを実行し直すときはnormalizeも実行し直す
+            finished = finished - {"normalize"}
+        remaining = [stage for stage in stages if stage not in finished]
+        if not remaining or (entry["failed"] and not retry_failed):
+            continue
+        tasks.append({"name": name, "path": path, "output_dir": os.path.join(output_dir, os.path.splitext(name)[0]),
+                      "stages": remaining})
+    summary = {"done": 0, "failed": 0, "skipped": len(inputs) - len(tasks)}
+    progress = Progress(len(tasks), progress)
+    profile = options.get("profile", False)
+    records = []
+    if os.path.exists(manifest_path) and os.path.getsize(manifest_path) > 0:
+        # 中断して書き込み途中になった行に続けて書き込まないように、改行してから追記する
+        with open(manifest_path, "rb+") as manifest:
+            manifest.seek(-1, os.SEEK_END)
+            if manifest.read(1) != b"\n":
+                manifest.write(b"\n")
+    symbol_index = None
+    if "index" in stages:
+        from symbol_index import SymbolIndex
+        symbol_index = SymbolIndex(index_path or os.path.join(output_dir, "symbols.sqlite"))
+    store = None
+    if "store" in stages:
+        from formula_store import FormulaStore
+        store = FormulaStore(store_path or os.path.join(output_dir, "store.sqlite"))
+    # 索引やストアに書き込む前にマニフェストに記録すると、中断したときに書き込まれていない入力が終了扱いになるため、
+    # 索引をflushし、ストアをコミットするまでマニフェストに書き込まずにためておく
+    pending_lines = []
+    with open(manifest_path, "a") as manifest:
+        if workers == 1:
+            init_worker(options)
+            results = map(run_in_worker, tasks)
+            pool = None
+        else:
+            pool = Pool(workers, initializer=init_worker, initargs=(options,))
+            results = pool.imap_unordered(run_in_worker, tasks, chunksize)
+        try:
+            for result in results:
+                if profile:
+                    records += result.pop("records")
+                flushed = False
+                symbols = result.pop("symbols", None)
+                if symbols is not None:
+                    symbol_index.add_file(result["name"], symbols)
+                    flushed = symbol_index.is_flushed()
+                output = result.pop("store", None)
+                if output is not None:
+                    store.add_output(result["name"], output)
+                    flushed = flushed or store.pending == 0
+                pending_lines.append(json.dumps(result) + "\n")
+                if flushed:
+                    # 索引とストアは別々の間隔で書き込むため、片方が書き込んだらもう片方も書き込み、
+                    # 両方が同時に書き込み済みになるまでマニフェストへの書き込みが遅れないようにする
+                    if symbol_index is not None:
+                        symbol_index.flush()
+                    if store is not None:
+                        store.commit()
+                if (symbol_index is None or symbol_index.is_flushed()) and (store is None or store.pending == 0):
+                    # 中断しても終了した入力が失われないように、1行ごとにflushする
+                    manifest.write("".join(pending_lines))
+                    manifest.flush()
+                    pending_lines = []
+                summary["failed" if result["failed"] else "done"] += 1
+                progress.update(result)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            if symbol_index is not None:
+                symbol_index.close()
+            if store is not None:
+                store.close()
+            manifest.write("".join(pending_lines))
+    if profile:
+        INSTRUMENTATION.disable()
+        INSTRUMENTATION.add_records(records)
+    return summary
+
+
+def main():
+    """main
+
+    tptpparserコマンドのエントリーポイント
+    """
+    parser = argparse.ArgumentParser(
+        prog="tptpparser", description="問題ファイルやtstpファイルの集まりに対して証明から正規化までの各段階を実行する")
+    parser.add_argument("inputs", nargs="+", help="入力ファイルまたはディレクトリ")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=["parse", "deduction", "normalize"])
+    parser.add_argument("--suffixes", nargs="+", default=[".p", ".tstp"], help="ディレクトリから探すファイルの拡張子")
+    parser.add_argument("--vampire", help="vampireの実行ファイルのパス(proveで必要)")
+    parser.add_argument("--grammar", default=DEFAULT_GRAMMAR_PATH)
+    parser.add_argument("--dag", action="store_true", help="抽象構文木をTermDagの形式で保存する")
+    parser.add_argument("--manifest", help="マニフェストのパス(省略時は<output-dir>/manifest.jsonl)")
+    parser.add_argument("--index", help="indexで追加する索引のパス(省略時は<output-dir>/symbols.sqlite)")
+    parser.add_argument("--store", help="storeで保存するストアのパス(省略時は<output-dir>/store.sqlite)")
+    parser.add_argument("--retry-failed", action="store_true", help="以前に失敗した入力も実行し直す")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="ワーカープロセスの数")
+    parser.add_argument("--chunksize", type=int, default=1, help="1ワーカーにまとめて渡す入力の数")
+    parser.add_argument("-q", "--quiet", action="store_true", help="進捗を表示しない")
+    parser.add_argument("--profile", action="store_true", help="各段階を計測して集計表を表示し、Chromeトレースを保存する")
+    parser.add_argument("--trace", help="Chromeトレースのパス(省略時は<output-dir>/trace.json)")
+    parser.add_argument("--trace-memory", action="store_true", help="--profileでtracemallocのピークメモリも計測する")
+    args = parser.parse_args()
+    if "prove" in args.stages and args.vampire is None:
+        parser.error("--vampire is required for the prove stage")
+
+    inputs = find_inputs(args.inputs, args.suffixes)
+    try:
+        check_inputs(inputs)
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    summary = run_batch(inputs, args.output_dir, args.stages, args.manifest, args.workers, args.chunksize,
+                        args.retry_failed, not args.quiet, args.index, args.store, grammar_path=args.grammar,
+                        vampire_path=args.vampire, dag=args.dag, profile=args.profile, trace_memory=args.trace_memory)
+    print(f"{summary['done']} done, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"in {time.perf_counter() - start:.1f} s")
+    if args.profile:
+        print(INSTRUMENTATION.format_summary())
+        INSTRUMENTATION.save_chrome_trace(args.trace or os.path.join(args.output_dir, "trace.json"))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3576 @@
+# The file was automatically generated by Lark v1.3.1
+__version__ = "1.3.1"
+
+#
+#
+#   Lark Stand-alone Generator Tool
+# ----------------------------------
+# Generates a stand-alone LALR(1) parser
+#
+# Git:    https://github.com/erezsh/lark
+# Author: Erez Shinan (erezshin@gmail.com)
+#
+#
+#    >>> LICENSE
+#
+#    This tool and its generated code use a separate license from Lark,
+#    and are subject to the terms of the Mozilla Public License, v. 2.0.
+#    If a copy of the MPL was not distributed with this
+#    file, You can obtain one at https://mozilla.org/MPL/2.0/.
+#
+#    If you wish to purchase a commercial license for this tool and its
+#    generated code, you may contact me via email or otherwise.
+#
+#    If MPL2 is incompatible with your free or open-source project,
+#    contact me and we'll work it out.
+#
+#
+
+from copy import deepcopy
+from abc import ABC, abstractmethod
+from types import ModuleType
+from typing import (
+    TypeVar, Generic, Type, Tuple, List, Dict, Iterator, Collection, Callable, Optional, FrozenSet, Any,
+    Union, Iterable, IO, TYPE_CHECKING, overload, Sequence,
+    Pattern as REPattern, ClassVar, Set, Mapping
+)
+
+
+class LarkError(Exception):
+    pass
+
+
+class ConfigurationError(LarkError, ValueError):
+    pass
+
+
+def assert_config(value, options: Collection, msg='Got %r, expected one of %s'):
+    if value not in options:
+        raise ConfigurationError(msg % (value, options))
+
+
+class GrammarError(LarkError):
+    pass
+
+
+class ParseError(LarkError):
+    pass
+
+
+class LexError(LarkError):
+    pass
+
+T = TypeVar('T')
+
+class UnexpectedInput(LarkError):
+    #--
+    line: int
+    column: int
+    pos_in_stream = None
+    state: Any
+    _terminals_by_name = None
+    interactive_parser: 'InteractiveParser'
+
+    def get_context(self, text: str, span: int=40) -> str:
+        #--
+        pos = self.pos_in_stream or 0
+        start = max(pos - span, 0)
+        end = pos + span
+        if not isinstance(text, bytes):
+            before = text[start:pos].rsplit('\n', 1)[-1]
+            after = text[pos:end].split('\n', 1)[0]
+            return before + after + '\n' + ' ' * len(before.expandtabs()) + '^\n'
+        else:
+            before = text[start:pos].rsplit(b'\n', 1)[-1]
+            after = text[pos:end].split(b'\n', 1)[0]
+            return (before + after + b'\n' + b' ' * len(before.expandtabs()) + b'^\n').decode("ascii", "backslashreplace")
+
+    def match_examples(self, parse_fn: 'Callable[[str], Tree]',
+                             examples: Union[Mapping[T, Iterable[str]], Iterable[Tuple[T, Iterable[str]]]],
+                             token_type_match_fallback: bool=False,
+                             use_accepts: bool=True
+                         ) -> Optional[T]:
+        #--
+        assert self.state is not None, "Not supported for this exception"
+
+        if isinstance(examples, Mapping):
+            examples = examples.items()
+
+        candidate = (None, False)
+        for i, (label, example) in enumerate(examples):
+            assert not isinstance(example, str), "Expecting a list"
+
+            for j, malformed in enumerate(example):
+                try:
+                    parse_fn(malformed)
+                except UnexpectedInput as ut:
+                    if ut.state == self.state:
+                        if (
+                            use_accepts
+                            and isinstance(self, UnexpectedToken)
+                            and isinstance(ut, UnexpectedToken)
+                            and ut.accepts != self.accepts
+                        ):
+                            logger.debug("Different accepts with same state[%d]: %s != %s at example [%s][%s]" %
+                                         (self.state, self.accepts, ut.accepts, i, j))
+                            continue
+                        if (
+                            isinstance(self, (UnexpectedToken, UnexpectedEOF))
+                            and isinstance(ut, (UnexpectedToken, UnexpectedEOF))
+                        ):
+                            if ut.token == self.token:  ##
+
+                                logger.debug("Exact Match at example [%s][%s]" % (i, j))
+                                return label
+
+                            if token_type_match_fallback:
+                                ##
+
+                                if (ut.token.type == self.token.type) and not candidate[-1]:
+                                    logger.debug("Token Type Fallback at example [%s][%s]" % (i, j))
+                                    candidate = label, True
+
+                        if candidate[0] is None:
+                            logger.debug("Same State match at example [%s][%s]" % (i, j))
+                            candidate = label, False
+
+        return candidate[0]
+
+    def _format_expected(self, expected):
+        if self._terminals_by_name:
+            d = self._terminals_by_name
+            expected = [d[t_name].user_repr() if t_name in d else t_name for t_name in expected]
+        return "Expected one of: \n\t* %s\n" % '\n\t* '.join(expected)
+
+
+class UnexpectedEOF(ParseError, UnexpectedInput):
+    #--
+    expected: 'List[Token]'
+
+    def __init__(self, expected, state=None, terminals_by_name=None):
+        super(UnexpectedEOF, self).__init__()
+
+        self.expected = expected
+        self.state = state
+        from .lexer import Token
+        self.token = Token("<EOF>", "")  ##
+
+        self.pos_in_stream = -1
+        self.line = -1
+        self.column = -1
+        self._terminals_by_name = terminals_by_name
+
+
+    def __str__(self):
+        message = "Unexpected end-of-input. "
+        message += self._format_expected(self.expected)
+        return message
+
+
+class UnexpectedCharacters(LexError, UnexpectedInput):
+    #--
+
+    allowed: Set[str]
+    considered_tokens: Set[Any]
+
+    def __init__(self, seq, lex_pos, line, column, allowed=None, considered_tokens=None, state=None, token_history=None,
+                 terminals_by_name=None, considered_rules=None):
+        super(UnexpectedCharacters, self).__init__()
+
+        ##
+
+        self.line = line
+        self.column = column
+        self.pos_in_stream = lex_pos
+        self.state = state
+        self._terminals_by_name = terminals_by_name
+
+        self.allowed = allowed
+        self.considered_tokens = considered_tokens
+        self.considered_rules = considered_rules
+        self.token_history = token_history
+
+        if isinstance(seq, bytes):
+            self.char = seq[lex_pos:lex_pos + 1].decode("ascii", "backslashreplace")
+        else:
+            self.char = seq[lex_pos]
+        self._context = self.get_context(seq)
+
+
+    def __str__(self):
+        message = "No terminal matches '%s' in the current parser context, at line %d col %d" % (self.char, self.line, self.column)
+        message += '\n\n' + self._context
+        if self.allowed:
+            message += self._format_expected(self.allowed)
+        if self.token_history:
+            message += '\nPrevious tokens: %s\n' % ', '.join(repr(t) for t in self.token_history)
+        return message
+
+
+class UnexpectedToken(ParseError, UnexpectedInput):
+    #--
+
+    expected: Set[str]
+    considered_rules: Set[str]
+
+    def __init__(self, token, expected, considered_rules=None, state=None, interactive_parser=None, terminals_by_name=None, token_history=None):
+        super(UnexpectedToken, self).__init__()
+
+        ##
+
+        self.line = getattr(token, 'line', '?')
+        self.column = getattr(token, 'column', '?')
+        self.pos_in_stream = getattr(token, 'start_pos', None)
+        self.state = state
+
+        self.token = token
+        self.expected = expected  ##
+
+        self._accepts = NO_VALUE
+        self.considered_rules = considered_rules
+        self.interactive_parser = interactive_parser
+        self._terminals_by_name = terminals_by_name
+        self.token_history = token_history
+
+
+    @property
+    def accepts(self) -> Set[str]:
+        if self._accepts is NO_VALUE:
+            self._accepts = self.interactive_parser and self.interactive_parser.accepts()
+        return self._accepts
+
+    def __str__(self):
+        message = ("Unexpected token %r at line %s, column %s.\n%s"
+                   % (self.token, self.line, self.column, self._format_expected(self.accepts or self.expected)))
+        if self.token_history:
+            message += "Previous tokens: %r\n" % self.token_history
+
+        return message
+
+
+
+class VisitError(LarkError):
+    #--
+
+    obj: 'Union[Tree, Token]'
+    orig_exc: Exception
+
+    def __init__(self, rule, obj, orig_exc):
+        message = 'Error trying to process rule "%s":\n\n%s' % (rule, orig_exc)
+        super(VisitError, self).__init__(message)
+
+        self.rule = rule
+        self.obj = obj
+        self.orig_exc = orig_exc
+
+
+class MissingVariableError(LarkError):
+    pass
+
+
+import sys, re
+import logging
+from dataclasses import dataclass
+from typing import Generic, AnyStr
+
+logger: logging.Logger = logging.getLogger("lark")
+logger.addHandler(logging.StreamHandler())
+##
+
+##
+
+logger.setLevel(logging.CRITICAL)
+
+
+NO_VALUE = object()
+
+T = TypeVar("T")
+
+
+def classify(seq: Iterable, key: Optional[Callable] = None, value: Optional[Callable] = None) -> Dict:
+    d: Dict[Any, Any] = {}
+    for item in seq:
+        k = key(item) if (key is not None) else item
+        v = value(item) if (value is not None) else item
+        try:
+            d[k].append(v)
+        except KeyError:
+            d[k] = [v]
+    return d
+
+
+def _deserialize(data: Any, namespace: Dict[str, Any], memo: Dict) -> Any:
+    if isinstance(data, dict):
+        if '__type__' in data:  ##
+
+            class_ = namespace[data['__type__']]
+            return class_.deserialize(data, memo)
+        elif '@' in data:
+            return memo[data['@']]
+        return {key:_deserialize(value, namespace, memo) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [_deserialize(value, namespace, memo) for value in data]
+    return data
+
+
+_T = TypeVar("_T", bound="Serialize")
+
+class Serialize:
+    #--
+
+    def memo_serialize(self, types_to_memoize: List) -> Any:
+        memo = SerializeMemoizer(types_to_memoize)
+        return self.serialize(memo), memo.serialize()
+
+    def serialize(self, memo = None) -> Dict[str, Any]:
+        if memo and memo.in_types(self):
+            return {'@': memo.memoized.get(self)}
+
+        fields = getattr(self, '__serialize_fields__')
+        res = {f: _serialize(getattr(self, f), memo) for f in fields}
+        res['__type__'] = type(self).__name__
+        if hasattr(self, '_serialize'):
+            self._serialize(res, memo)
+        return res
+
+    @classmethod
+    def deserialize(cls: Type[_T], data: Dict[str, Any], memo: Dict[int, Any]) -> _T:
+        namespace = getattr(cls, '__serialize_namespace__', [])
+        namespace = {c.__name__:c for c in namespace}
+
+        fields = getattr(cls, '__serialize_fields__')
+
+        if '@' in data:
+            return memo[data['@']]
+
+        inst = cls.__new__(cls)
+        for f in fields:
+            try:
+                setattr(inst, f, _deserialize(data[f], namespace, memo))
+            except KeyError as e:
+                raise KeyError("Cannot find key for class", cls, e)
+
+        if hasattr(inst, '_deserialize'):
+            inst._deserialize()
+
+        return inst
+
+
+class SerializeMemoizer(Serialize):
+    #--
+
+    __serialize_fields__ = 'memoized',
+
+    def __init__(self, types_to_memoize: List) -> None:
+        self.types_to_memoize = tuple(types_to_memoize)
+        self.memoized = Enumerator()
+
+    def in_types(self, value: Serialize) -> bool:
+        return isinstance(value, self.types_to_memoize)
+
+    def serialize(self) -> Dict[int, Any]:  ##
+
+        return _serialize(self.memoized.reversed(), None)
+
+    @classmethod
+    def deserialize(cls, data: Dict[int, Any], namespace: Dict[str, Any], memo: Dict[Any, Any]) -> Dict[int, Any]:  ##
+
+        return _deserialize(data, namespace, memo)
+
+
+try:
+    import regex
+    _has_regex = True
+except ImportError:
+    _has_regex = False
+
+if sys.version_info >= (3, 11):
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+else:
+    import sre_parse
+    import sre_constants
+
+categ_pattern = re.compile(r'\\p{[A-Za-z_]+}')
+
+def get_regexp_width(expr: str) -> Union[Tuple[int, int], List[int]]:
+    if _has_regex:
+        ##
+
+        ##
+
+        ##
+
+        regexp_final = re.sub(categ_pattern, 'A', expr)
+    else:
+        if re.search(categ_pattern, expr):
+            raise ImportError('`regex` module must be installed in order to use Unicode categories.', expr)
+        regexp_final = expr
+    try:
+        ##
+
+        return [int(x) for x in sre_parse.parse(regexp_final).getwidth()]
+    except sre_constants.error:
+        if not _has_regex:
+            raise ValueError(expr)
+        else:
+            ##
+
+            ##
+
+            c = regex.compile(regexp_final)
+            ##
+
+            ##
+
+            MAXWIDTH = getattr(sre_parse, "MAXWIDTH", sre_constants.MAXREPEAT)
+            if c.match('') is None:
+                ##
+
+                return 1, int(MAXWIDTH)
+            else:
+                return 0, int(MAXWIDTH)
+
+
+@dataclass(frozen=True)
+class TextSlice(Generic[AnyStr]):
+    #--
+    text: AnyStr
+    start: int
+    end: int
+
+    def __post_init__(self):
+        if not isinstance(self.text, (str, bytes)):
+            raise TypeError("text must be str or bytes")
+
+        if self.start < 0:
+            object.__setattr__(self, 'start', self.start + len(self.text))
+            assert self.start >=0
+
+        if self.end is None:
+            object.__setattr__(self, 'end', len(self.text))
+        elif self.end < 0:
+            object.__setattr__(self, 'end', self.end + len(self.text))
+            assert self.end <= len(self.text)
+
+    @classmethod
+    def cast_from(cls, text: 'TextOrSlice') -> 'TextSlice[AnyStr]':
+        if isinstance(text, TextSlice):
+            return text
+
+        return cls(text, 0, len(text))
+
+    def is_complete_text(self):
+        return self.start == 0 and self.end == len(self.text)
+
+    def __len__(self):
+        return self.end - self.start
+
+    def count(self, substr: AnyStr):
+        return self.text.count(substr, self.start, self.end)
+
+    def rindex(self, substr: AnyStr):
+        return self.text.rindex(substr, self.start, self.end)
+
+
+TextOrSlice = Union[AnyStr, 'TextSlice[AnyStr]']
+LarkInput = Union[AnyStr, TextSlice[AnyStr], Any]
+
+
+
+class Meta:
+
+    empty: bool
+    line: int
+    column: int
+    start_pos: int
+    end_line: int
+    end_column: int
+    end_pos: int
+    orig_expansion: 'List[TerminalDef]'
+    match_tree: bool
+
+    def __init__(self):
+        self.empty = True
+
+
+_Leaf_T = TypeVar("_Leaf_T")
+Branch = Union[_Leaf_T, 'Tree[_Leaf_T]']
+
+
+class Tree(Generic[_Leaf_T]):
+    #--
+
+    data: str
+    children: 'List[Branch[_Leaf_T]]'
+
+    def __init__(self, data: str, children: 'List[Branch[_Leaf_T]]', meta: Optional[Meta]=None) -> None:
+        self.data = data
+        self.children = children
+        self._meta = meta
+
+    @property
+    def meta(self) -> Meta:
+        if self._meta is None:
+            self._meta = Meta()
+        return self._meta
+
+    def __repr__(self):
+        return 'Tree(%r, %r)' % (self.data, self.children)
+
+    __match_args__ = ("data", "children")
+
+    def _pretty_label(self):
+        return self.data
+
+    def _pretty(self, level, indent_str):
+        yield f'{indent_str*level}{self._pretty_label()}'
+        if len(self.children) == 1 and not isinstance(self.children[0], Tree):
+            yield f'\t{self.children[0]}\n'
+        else:
+            yield '\n'
+            for n in self.children:
+                if isinstance(n, Tree):
+                    yield from n._pretty(level+1, indent_str)
+                else:
+                    yield f'{indent_str*(level+1)}{n}\n'
+
+    def pretty(self, indent_str: str='  ') -> str:
+        #--
+        return ''.join(self._pretty(0, indent_str))
+
+    def __rich__(self, parent:Optional['rich.tree.Tree']=None) -> 'rich.tree.Tree':
+        #--
+        return self._rich(parent)
+
+    def _rich(self, parent):
+        if parent:
+            tree = parent.add(f'[bold]{self.data}[/bold]')
+        else:
+            import rich.tree
+            tree = rich.tree.Tree(self.data)
+
+        for c in self.children:
+            if isinstance(c, Tree):
+                c._rich(tree)
+            else:
+                tree.add(f'[green]{c}[/green]')
+
+        return tree
+
+    def __eq__(self, other):
+        try:
+            return self.data == other.data and self.children == other.children
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __hash__(self) -> int:
+        return hash((self.data, tuple(self.children)))
+
+    def iter_subtrees(self) -> 'Iterator[Tree[_Leaf_T]]':
+        #--
+        queue = [self]
+        subtrees = dict()
+        for subtree in queue:
+            subtrees[id(subtree)] = subtree
+            queue += [c for c in reversed(subtree.children)
+                      if isinstance(c, Tree) and id(c) not in subtrees]
+
+        del queue
+        return reversed(list(subtrees.values()))
+
+    def iter_subtrees_topdown(self):
+        #--
+        stack = [self]
+        stack_append = stack.append
+        stack_pop = stack.pop
+        while stack:
+            node = stack_pop()
+            if not isinstance(node, Tree):
+                continue
+            yield node
+            for child in reversed(node.children):
+                stack_append(child)
+
+    def find_pred(self, pred: 'Callable[[Tree[_Leaf_T]], bool]') -> 'Iterator[Tree[_Leaf_T]]':
+        #--
+        return filter(pred, self.iter_subtrees())
+
+    def find_data(self, data: str) -> 'Iterator[Tree[_Leaf_T]]':
+        #--
+        return self.find_pred(lambda t: t.data == data)
+
+
+from functools import wraps, update_wrapper
+from inspect import getmembers, getmro
+
+_Return_T = TypeVar('_Return_T')
+_Return_V = TypeVar('_Return_V')
+_Leaf_T = TypeVar('_Leaf_T')
+_Leaf_U = TypeVar('_Leaf_U')
+_R = TypeVar('_R')
+_FUNC = Callable[..., _Return_T]
+_DECORATED = Union[_FUNC, type]
+
+class _DiscardType:
+    #--
+
+    def __repr__(self):
+        return "lark.visitors.Discard"
+
+Discard = _DiscardType()
+
+##
+
+
+class _Decoratable:
+    #--
+
+    @classmethod
+    def _apply_v_args(cls, visit_wrapper):
+        mro = getmro(cls)
+        assert mro[0] is cls
+        libmembers = {name for _cls in mro[1:] for name, _ in getmembers(_cls)}
+        for name, value in getmembers(cls):
+
+            ##
+
+            if name.startswith('_') or (name in libmembers and name not in cls.__dict__):
+                continue
+            if not callable(value):
+                continue
+
+            ##
+
+            if isinstance(cls.__dict__[name], _VArgsWrapper):
+                continue
+
+            setattr(cls, name, _VArgsWrapper(cls.__dict__[name], visit_wrapper))
+        return cls
+
+    def __class_getitem__(cls, _):
+        return cls
+
+
+class Transformer(_Decoratable, ABC, Generic[_Leaf_T, _Return_T]):
+    #--
+    __visit_tokens__ = True   ##
+
+
+    def __init__(self,  visit_tokens: bool=True) -> None:
+        self.__visit_tokens__ = visit_tokens
+
+    def _call_userfunc(self, tree, new_children=None):
+        ##
+
+        children = new_children if new_children is not None else tree.children
+        try:
+            f = getattr(self, tree.data)
+        except AttributeError:
+            return self.__default__(tree.data, children, tree.meta)
+        else:
+            try:
+                wrapper = getattr(f, 'visit_wrapper', None)
+                if wrapper is not None:
+                    return f.visit_wrapper(f, tree.data, children, tree.meta)
+                else:
+                    return f(children)
+            except GrammarError:
+                raise
+            except Exception as e:
+                raise VisitError(tree.data, tree, e)
+
+    def _call_userfunc_token(self, token):
+        try:
+            f = getattr(self, token.type)
+        except AttributeError:
+            return self.__default_token__(token)
+        else:
+            try:
+                return f(token)
+            except GrammarError:
+                raise
+            except Exception as e:
+                raise VisitError(token.type, token, e)
+
+    def _transform_children(self, children):
+        for c in children:
+            if isinstance(c, Tree):
+                res = self._transform_tree(c)
+            elif self.__visit_tokens__ and isinstance(c, Token):
+                res = self._call_userfunc_token(c)
+            else:
+                res = c
+
+            if res is not Discard:
+                yield res
+
+    def _transform_tree(self, tree):
+        children = list(self._transform_children(tree.children))
+        return self._call_userfunc(tree, children)
+
+    def transform(self, tree: Tree[_Leaf_T]) -> _Return_T:
+        #--
+        res = list(self._transform_children([tree]))
+        if not res:
+            return None     ##
+
+        assert len(res) == 1
+        return res[0]
+
+    def __mul__(
+            self: 'Transformer[_Leaf_T, Tree[_Leaf_U]]',
+            other: 'Union[Transformer[_Leaf_U, _Return_V], TransformerChain[_Leaf_U, _Return_V,]]'
+    ) -> 'TransformerChain[_Leaf_T, _Return_V]':
+        #--
+        return TransformerChain(self, other)
+
+    def __default__(self, data, children, meta):
+        #--
+        return Tree(data, children, meta)
+
+    def __default_token__(self, token):
+        #--
+        return token
+
+
+def merge_transformers(base_transformer=None, **transformers_to_merge):
+    #--
+    if base_transformer is None:
+        base_transformer = Transformer()
+    for prefix, transformer in transformers_to_merge.items():
+        for method_name in dir(transformer):
+            method = getattr(transformer, method_name)
+            if not callable(method):
+                continue
+            if method_name.startswith("_") or method_name == "transform":
+                continue
+            prefixed_method = prefix + "__" + method_name
+            if hasattr(base_transformer, prefixed_method):
+                raise AttributeError("Cannot merge: method '%s' appears more than once" % prefixed_method)
+
+            setattr(base_transformer, prefixed_method, method)
+
+    return base_transformer
+
+
+class InlineTransformer(Transformer):   ##
+
+    def _call_userfunc(self, tree, new_children=None):
+        ##
+
+        children = new_children if new_children is not None else tree.children
+        try:
+            f = getattr(self, tree.data)
+        except AttributeError:
+            return self.__default__(tree.data, children, tree.meta)
+        else:
+            return f(*children)
+
+
+class TransformerChain(Generic[_Leaf_T, _Return_T]):
+
+    transformers: 'Tuple[Union[Transformer, TransformerChain], ...]'
+
+    def __init__(self, *transformers: 'Union[Transformer, TransformerChain]') -> None:
+        self.transformers = transformers
+
+    def transform(self, tree: Tree[_Leaf_T]) -> _Return_T:
+        for t in self.transformers:
+            tree = t.transform(tree)
+        return cast(_Return_T, tree)
+
+    def __mul__(
+            self: 'TransformerChain[_Leaf_T, Tree[_Leaf_U]]',
+            other: 'Union[Transformer[_Leaf_U, _Return_V], TransformerChain[_Leaf_U, _Return_V]]'
+    ) -> 'TransformerChain[_Leaf_T, _Return_V]':
+        return TransformerChain(*self.transformers + (other,))
+
+
+class Transformer_InPlace(Transformer[_Leaf_T, _Return_T]):
+    #--
+    def _transform_tree(self, tree):           ##
+
+        return self._call_userfunc(tree)
+
+    def transform(self, tree: Tree[_Leaf_T]) -> _Return_T:
+        for subtree in tree.iter_subtrees():
+            subtree.children = list(self._transform_children(subtree.children))
+
+        return self._transform_tree(tree)
+
+
+class Transformer_NonRecursive(Transformer[_Leaf_T, _Return_T]):
+    #--
+
+    def transform(self, tree: Tree[_Leaf_T]) -> _Return_T:
+        ##
+
+        rev_postfix = []
+        q: List[Branch[_Leaf_T]] = [tree]
+        while q:
+            t = q.pop()
+            rev_postfix.append(t)
+            if isinstance(t, Tree):
+                q += t.children
+
+        ##
+
+        stack: List = []
+        for x in reversed(rev_postfix):
+            if isinstance(x, Tree):
+                size = len(x.children)
+                if size:
+                    args = stack[-size:]
+                    del stack[-size:]
+                else:
+                    args = []
+
+                res = self._call_userfunc(x, args)
+                if res is not Discard:
+                    stack.append(res)
+
+            elif self.__visit_tokens__ and isinstance(x, Token):
+                res = self._call_userfunc_token(x)
+                if res is not Discard:
+                    stack.append(res)
+            else:
+                stack.append(x)
+
+        result, = stack  ##
+
+        ##
+
+        ##
+
+        ##
+
+        return cast(_Return_T, result)
+
+
+class Transformer_InPlaceRecursive(Transformer[_Leaf_T, _Return_T]):
+    #--
+    def _transform_tree(self, tree):
+        tree.children = list(self._transform_children(tree.children))
+        return self._call_userfunc(tree)
+
+
+##
+
+
+class VisitorBase:
+    def _call_userfunc(self, tree):
+        return getattr(self, tree.data, self.__default__)(tree)
+
+    def __default__(self, tree):
+        #--
+        return tree
+
+    def __class_getitem__(cls, _):
+        return cls
+
+
+class Visitor(VisitorBase, ABC, Generic[_Leaf_T]):
+    #--
+
+    def visit(self, tree: Tree[_Leaf_T]) -> Tree[_Leaf_T]:
+        #--
+        for subtree in tree.iter_subtrees():
+            self._call_userfunc(subtree)
+        return tree
+
+    def visit_topdown(self, tree: Tree[_Leaf_T]) -> Tree[_Leaf_T]:
+        #--
+        for subtree in tree.iter_subtrees_topdown():
+            self._call_userfunc(subtree)
+        return tree
+
+
+class Visitor_Recursive(VisitorBase, Generic[_Leaf_T]):
+    #--
+
+    def visit(self, tree: Tree[_Leaf_T]) -> Tree[_Leaf_T]:
+        #--
+        for child in tree.children:
+            if isinstance(child, Tree):
+                self.visit(child)
+
+        self._call_userfunc(tree)
+        return tree
+
+    def visit_topdown(self,tree: Tree[_Leaf_T]) -> Tree[_Leaf_T]:
+        #--
+        self._call_userfunc(tree)
+
+        for child in tree.children:
+            if isinstance(child, Tree):
+                self.visit_topdown(child)
+
+        return tree
+
+
+class Interpreter(_Decoratable, ABC, Generic[_Leaf_T, _Return_T]):
+    #--
+
+    def visit(self, tree: Tree[_Leaf_T]) -> _Return_T:
+        ##
+
+        ##
+
+        ##
+
+        return self._visit_tree(tree)
+
+    def _visit_tree(self, tree: Tree[_Leaf_T]):
+        f = getattr(self, tree.data)
+        wrapper = getattr(f, 'visit_wrapper', None)
+        if wrapper is not None:
+            return f.visit_wrapper(f, tree.data, tree.children, tree.meta)
+        else:
+            return f(tree)
+
+    def visit_children(self, tree: Tree[_Leaf_T]) -> List:
+        return [self._visit_tree(child) if isinstance(child, Tree) else child
+                for child in tree.children]
+
+    def __getattr__(self, name):
+        return self.__default__
+
+    def __default__(self, tree):
+        return self.visit_children(tree)
+
+
+_InterMethod = Callable[[Type[Interpreter], _Return_T], _R]
+
+def visit_children_decor(func: _InterMethod) -> _InterMethod:
+    #--
+    @wraps(func)
+    def inner(cls, tree):
+        values = cls.visit_children(tree)
+        return func(cls, values)
+    return inner
+
+##
+
+
+def _apply_v_args(obj, visit_wrapper):
+    try:
+        _apply = obj._apply_v_args
+    except AttributeError:
+        return _VArgsWrapper(obj, visit_wrapper)
+    else:
+        return _apply(visit_wrapper)
+
+
+class _VArgsWrapper:
+    #--
+    base_func: Callable
+
+    def __init__(self, func: Callable, visit_wrapper: Callable[[Callable, str, list, Any], Any]):
+        if isinstance(func, _VArgsWrapper):
+            func = func.base_func
+        self.base_func = func
+        self.visit_wrapper = visit_wrapper
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.base_func(*args, **kwargs)
+
+    def __get__(self, instance, owner=None):
+        try:
+            ##
+
+            ##
+
+            g = type(self.base_func).__get__
+        except AttributeError:
+            return self
+        else:
+            return _VArgsWrapper(g(self.base_func, instance, owner), self.visit_wrapper)
+
+    def __set_name__(self, owner, name):
+        try:
+            f = type(self.base_func).__set_name__
+        except AttributeError:
+            return
+        else:
+            f(self.base_func, owner, name)
+
+
+def _vargs_inline(f, _data, children, _meta):
+    return f(*children)
+def _vargs_meta_inline(f, _data, children, meta):
+    return f(meta, *children)
+def _vargs_meta(f, _data, children, meta):
+    return f(meta, children)
+def _vargs_tree(f, data, children, meta):
+    return f(Tree(data, children, meta))
+
+
+def v_args(inline: bool = False, meta: bool = False, tree: bool = False, wrapper: Optional[Callable] = None) -> Callable[[_DECORATED], _DECORATED]:
+    #--
+    if tree and (meta or inline):
+        raise ValueError("Visitor functions cannot combine 'tree' with 'meta' or 'inline'.")
+
+    func = None
+    if meta:
+        if inline:
+            func = _vargs_meta_inline
+        else:
+            func = _vargs_meta
+    elif inline:
+        func = _vargs_inline
+    elif tree:
+        func = _vargs_tree
+
+    if wrapper is not None:
+        if func is not None:
+            raise ValueError("Cannot use 'wrapper' along with 'tree', 'meta' or 'inline'.")
+        func = wrapper
+
+    def _visitor_args_dec(obj):
+        return _apply_v_args(obj, func)
+    return _visitor_args_dec
+
+
+
+TOKEN_DEFAULT_PRIORITY = 0
+
+
+class Symbol(Serialize):
+    __slots__ = ('name',)
+
+    name: str
+    is_term: ClassVar[bool] = NotImplemented
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __eq__(self, other):
+        if not isinstance(other, Symbol):
+            return NotImplemented
+        return self.is_term == other.is_term and self.name == other.name
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.name)
+
+    fullrepr = property(__repr__)
+
+    def renamed(self, f):
+        return type(self)(f(self.name))
+
+
+class Terminal(Symbol):
+    __serialize_fields__ = 'name', 'filter_out'
+
+    is_term: ClassVar[bool] = True
+
+    def __init__(self, name: str, filter_out: bool = False) -> None:
+        self.name = name
+        self.filter_out = filter_out
+
+    @property
+    def fullrepr(self):
+        return '%s(%r, %r)' % (type(self).__name__, self.name, self.filter_out)
+
+    def renamed(self, f):
+        return type(self)(f(self.name), self.filter_out)
+
+
+class NonTerminal(Symbol):
+    __serialize_fields__ = 'name',
+
+    is_term: ClassVar[bool] = False
+
+    def serialize(self, memo=None) -> Dict[str, Any]:
+        ##
+
+        ##
+
+        return {'name': str(self.name), '__type__': 'NonTerminal'}
+
+
+class RuleOptions(Serialize):
+    __serialize_fields__ = 'keep_all_tokens', 'expand1', 'priority', 'template_source', 'empty_indices'
+
+    keep_all_tokens: bool
+    expand1: bool
+    priority: Optional[int]
+    template_source: Optional[str]
+    empty_indices: Tuple[bool, ...]
+
+    def __init__(self, keep_all_tokens: bool=False, expand1: bool=False, priority: Optional[int]=None, template_source: Optional[str]=None, empty_indices: Tuple[bool, ...]=()) -> None:
+        self.keep_all_tokens = keep_all_tokens
+        self.expand1 = expand1
+        self.priority = priority
+        self.template_source = template_source
+        self.empty_indices = empty_indices
+
+    def __repr__(self):
+        return 'RuleOptions(%r, %r, %r, %r)' % (
+            self.keep_all_tokens,
+            self.expand1,
+            self.priority,
+            self.template_source
+        )
+
+
+class Rule(Serialize):
+    #--
+    __slots__ = ('origin', 'expansion', 'alias', 'options', 'order', '_hash')
+
+    __serialize_fields__ = 'origin', 'expansion', 'order', 'alias', 'options'
+    __serialize_namespace__ = Terminal, NonTerminal, RuleOptions
+
+    origin: NonTerminal
+    expansion: Sequence[Symbol]
+    order: int
+    alias: Optional[str]
+    options: RuleOptions
+    _hash: int
+
+    def __init__(self, origin: NonTerminal, expansion: Sequence[Symbol],
+                 order: int=0, alias: Optional[str]=None, options: Optional[RuleOptions]=None):
+        self.origin = origin
+        self.expansion = expansion
+        self.alias = alias
+        self.order = order
+        self.options = options or RuleOptions()
+        self._hash = hash((self.origin, tuple(self.expansion)))
+
+    def _deserialize(self):
+        self._hash = hash((self.origin, tuple(self.expansion)))
+
+    def __str__(self):
+        return '<%s : %s>' % (self.origin.name, ' '.join(x.name for x in self.expansion))
+
+    def __repr__(self):
+        return 'Rule(%r, %r, %r, %r)' % (self.origin, self.expansion, self.alias, self.options)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Rule):
+            return False
+        return self.origin == other.origin and self.expansion == other.expansion
+
+
+
+from contextlib import suppress
+from copy import copy
+
+try:  ##
+
+    has_interegular = bool(interegular)
+except NameError:
+    has_interegular = False
+
+class Pattern(Serialize, ABC):
+    #--
+
+    value: str
+    flags: Collection[str]
+    raw: Optional[str]
+    type: ClassVar[str]
+
+    def __init__(self, value: str, flags: Collection[str] = (), raw: Optional[str] = None) -> None:
+        self.value = value
+        self.flags = frozenset(flags)
+        self.raw = raw
+
+    def __repr__(self):
+        return repr(self.to_regexp())
+
+    ##
+
+    def __hash__(self):
+        return hash((type(self), self.value, self.flags))
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.value == other.value and self.flags == other.flags
+
+    @abstractmethod
+    def to_regexp(self) -> str:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def min_width(self) -> int:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def max_width(self) -> int:
+        raise NotImplementedError()
+
+    def _get_flags(self, value):
+        for f in self.flags:
+            value = ('(?%s:%s)' % (f, value))
+        return value
+
+
+class PatternStr(Pattern):
+    __serialize_fields__ = 'value', 'flags', 'raw'
+
+    type: ClassVar[str] = "str"
+
+    def to_regexp(self) -> str:
+        return self._get_flags(re.escape(self.value))
+
+    @property
+    def min_width(self) -> int:
+        return len(self.value)
+
+    @property
+    def max_width(self) -> int:
+        return len(self.value)
+
+
+class PatternRE(Pattern):
+    __serialize_fields__ = 'value', 'flags', 'raw', '_width'
+
+    type: ClassVar[str] = "re"
+
+    def to_regexp(self) -> str:
+        return self._get_flags(self.value)
+
+    _width = None
+    def _get_width(self):
+        if self._width is None:
+            self._width = get_regexp_width(self.to_regexp())
+        return self._width
+
+    @property
+    def min_width(self) -> int:
+        return self._get_width()[0]
+
+    @property
+    def max_width(self) -> int:
+        return self._get_width()[1]
+
+
+class TerminalDef(Serialize):
+    #--
+    __serialize_fields__ = 'name', 'pattern', 'priority'
+    __serialize_namespace__ = PatternStr, PatternRE
+
+    name: str
+    pattern: Pattern
+    priority: int
+
+    def __init__(self, name: str, pattern: Pattern, priority: int = TOKEN_DEFAULT_PRIORITY) -> None:
+        assert isinstance(pattern, Pattern), pattern
+        self.name = name
+        self.pattern = pattern
+        self.priority = priority
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (type(self).__name__, self.name, self.pattern)
+
+    def user_repr(self) -> str:
+        if self.name.startswith('__'):  ##
+
+            return self.pattern.raw or self.name
+        else:
+            return self.name
+
+_T = TypeVar('_T', bound="Token")
+
+class Token(str):
+    #--
+    __slots__ = ('type', 'start_pos', 'value', 'line', 'column', 'end_line', 'end_column', 'end_pos')
+
+    __match_args__ = ('type', 'value')
+
+    type: str
+    start_pos: Optional[int]
+    value: Any
+    line: Optional[int]
+    column: Optional[int]
+    end_line: Optional[int]
+    end_column: Optional[int]
+    end_pos: Optional[int]
+
+
+    @overload
+    def __new__(
+            cls,
+            type: str,
+            value: Any,
+            start_pos: Optional[int] = None,
+            line: Optional[int] = None,
+            column: Optional[int] = None,
+            end_line: Optional[int] = None,
+            end_column: Optional[int] = None,
+            end_pos: Optional[int] = None
+    ) -> 'Token':
+        ...
+
+    @overload
+    def __new__(
+            cls,
+            type_: str,
+            value: Any,
+            start_pos: Optional[int] = None,
+            line: Optional[int] = None,
+            column: Optional[int] = None,
+            end_line: Optional[int] = None,
+            end_column: Optional[int] = None,
+            end_pos: Optional[int] = None
+    ) -> 'Token':        ...
+
+    def __new__(cls, *args, **kwargs):
+        if "type_" in kwargs:
+            warnings.warn("`type_` is deprecated use `type` instead", DeprecationWarning)
+
+            if "type" in kwargs:
+                raise TypeError("Error: using both 'type' and the deprecated 'type_' as arguments.")
+            kwargs["type"] = kwargs.pop("type_")
+
+        return cls._future_new(*args, **kwargs)
+
+
+    @classmethod
+    def _future_new(cls, type, value, start_pos=None, line=None, column=None, end_line=None, end_column=None, end_pos=None):
+        inst = super(Token, cls).__new__(cls, value)
+
+        inst.type = type
+        inst.start_pos = start_pos
+        inst.value = value
+        inst.line = line
+        inst.column = column
+        inst.end_line = end_line
+        inst.end_column = end_column
+        inst.end_pos = end_pos
+        return inst
+
+    @overload
+    def update(self, type: Optional[str] = None, value: Optional[Any] = None) -> 'Token':
+        ...
+
+    @overload
+    def update(self, type_: Optional[str] = None, value: Optional[Any] = None) -> 'Token':
+        ...
+
+    def update(self, *args, **kwargs):
+        if "type_" in kwargs:
+            warnings.warn("`type_` is deprecated use `type` instead", DeprecationWarning)
+
+            if "type" in kwargs:
+                raise TypeError("Error: using both 'type' and the deprecated 'type_' as arguments.")
+            kwargs["type"] = kwargs.pop("type_")
+
+        return self._future_update(*args, **kwargs)
+
+    def _future_update(self, type: Optional[str] = None, value: Optional[Any] = None) -> 'Token':
+        return Token.new_borrow_pos(
+            type if type is not None else self.type,
+            value if value is not None else self.value,
+            self
+        )
+
+    @classmethod
+    def new_borrow_pos(cls: Type[_T], type_: str, value: Any, borrow_t: 'Token') -> _T:
+        return cls(type_, value, borrow_t.start_pos, borrow_t.line, borrow_t.column, borrow_t.end_line, borrow_t.end_column, borrow_t.end_pos)
+
+    def __reduce__(self):
+        return (self.__class__, (self.type, self.value, self.start_pos, self.line, self.column))
+
+    def __repr__(self):
+        return 'Token(%r, %r)' % (self.type, self.value)
+
+    def __deepcopy__(self, memo):
+        return Token(self.type, self.value, self.start_pos, self.line, self.column)
+
+    def __eq__(self, other):
+        if isinstance(other, Token) and self.type != other.type:
+            return False
+
+        return str.__eq__(self, other)
+
+    __hash__ = str.__hash__
+
+
+class LineCounter:
+    #--
+
+    __slots__ = 'char_pos', 'line', 'column', 'line_start_pos', 'newline_char'
+
+    def __init__(self, newline_char):
+        self.newline_char = newline_char
+        self.char_pos = 0
+        self.line = 1
+        self.column = 1
+        self.line_start_pos = 0
+
+    def __eq__(self, other):
+        if not isinstance(other, LineCounter):
+            return NotImplemented
+
+        return self.char_pos == other.char_pos and self.newline_char == other.newline_char
+
+    def feed(self, token: TextOrSlice, test_newline=True):
+        #--
+        if test_newline:
+            newlines = token.count(self.newline_char)
+            if newlines:
+                self.line += newlines
+                self.line_start_pos = self.char_pos + token.rindex(self.newline_char) + 1
+
+        self.char_pos += len(token)
+        self.column = self.char_pos - self.line_start_pos + 1
+
+
+class UnlessCallback:
+    def __init__(self, scanner: 'Scanner'):
+        self.scanner = scanner
+
+    def __call__(self, t: Token):
+        res = self.scanner.fullmatch(t.value)
+        if res is not None:
+            t.type = res
+        return t
+
+
+class CallChain:
+    def __init__(self, callback1, callback2, cond):
+        self.callback1 = callback1
+        self.callback2 = callback2
+        self.cond = cond
+
+    def __call__(self, t):
+        t2 = self.callback1(t)
+        return self.callback2(t) if self.cond(t2) else t2
+
+
+def _get_match(re_, regexp, s, flags):
+    m = re_.match(regexp, s, flags)
+    if m:
+        return m.group(0)
+
+def _create_unless(terminals, g_regex_flags, re_, use_bytes):
+    tokens_by_type = classify(terminals, lambda t: type(t.pattern))
+    assert len(tokens_by_type) <= 2, tokens_by_type.keys()
+    embedded_strs = set()
+    callback = {}
+    for retok in tokens_by_type.get(PatternRE, []):
+        unless = []
+        for strtok in tokens_by_type.get(PatternStr, []):
+            if strtok.priority != retok.priority:
+                continue
+            s = strtok.pattern.value
+            if s == _get_match(re_, retok.pattern.to_regexp(), s, g_regex_flags):
+                unless.append(strtok)
+                if strtok.pattern.flags <= retok.pattern.flags:
+                    embedded_strs.add(strtok)
+        if unless:
+            callback[retok.name] = UnlessCallback(Scanner(unless, g_regex_flags, re_, use_bytes=use_bytes))
+
+    new_terminals = [t for t in terminals if t not in embedded_strs]
+    return new_terminals, callback
+
+
+class Scanner:
+    def __init__(self, terminals, g_regex_flags, re_, use_bytes):
+        self.terminals = terminals
+        self.g_regex_flags = g_regex_flags
+        self.re_ = re_
+        self.use_bytes = use_bytes
+
+        self.allowed_types = {t.name for t in self.terminals}
+
+        self._mres = self._build_mres(terminals, len(terminals))
+
+    def _build_mres(self, terminals, max_size):
+        ##
+
+        ##
+
+        ##
+
+        mres = []
+        while terminals:
+            pattern = u'|'.join(u'(?P<%s>%s)' % (t.name, t.pattern.to_regexp()) for t in terminals[:max_size])
+            if self.use_bytes:
+                pattern = pattern.encode('latin-1')
+            try:
+                mre = self.re_.compile(pattern, self.g_regex_flags)
+            except AssertionError:  ##
+
+                return self._build_mres(terminals, max_size // 2)
+
+            mres.append(mre)
+            terminals = terminals[max_size:]
+        return mres
+
+    def match(self, text: TextSlice, pos):
+        for mre in self._mres:
+            m = mre.match(text.text, pos, text.end)
+            if m:
+                return m.group(0), m.lastgroup
+
+
+    def fullmatch(self, text: str) -> Optional[str]:
+        for mre in self._mres:
+            m = mre.fullmatch(text)
+            if m:
+                return m.lastgroup
+        return None
+
+def _regexp_has_newline(r: str):
+    #--
+    return '\n' in r or '\\n' in r or '\\s' in r or '[^' in r or ('(?s' in r and '.' in r)
+
+
+class LexerState:
+    #--
+
+    __slots__ = 'text', 'line_ctr', 'last_token'
+
+    text: TextSlice
+    line_ctr: LineCounter
+    last_token: Optional[Token]
+
+    def __init__(self, text: TextSlice, line_ctr: Optional[LineCounter] = None, last_token: Optional[Token]=None):
+        if isinstance(text, TextSlice):
+            if line_ctr is None:
+                line_ctr = LineCounter(b'\n' if isinstance(text.text, bytes) else '\n')
+
+                if text.start > 0:
+                    ##
+
+                    line_ctr.feed(TextSlice(text.text, 0, text.start))
+
+            if not (text.start <= line_ctr.char_pos <= text.end):
+                raise ValueError("LineCounter.char_pos is out of bounds")
+
+        self.text = text
+        self.line_ctr = line_ctr
+        self.last_token = last_token
+
+
+    def __eq__(self, other):
+        if not isinstance(other, LexerState):
+            return NotImplemented
+
+        return self.text == other.text and self.line_ctr == other.line_ctr and self.last_token == other.last_token
+
+    def __copy__(self):
+        return type(self)(self.text, copy(self.line_ctr), self.last_token)
+
+
+class LexerThread:
+    #--
+
+    def __init__(self, lexer: 'Lexer', lexer_state: Optional[LexerState]):
+        self.lexer = lexer
+        self.state = lexer_state
+
+    @classmethod
+    def from_text(cls, lexer: 'Lexer', text_or_slice: TextOrSlice) -> 'LexerThread':
+        text = TextSlice.cast_from(text_or_slice)
+        return cls(lexer, LexerState(text))
+
+    @classmethod
+    def from_custom_input(cls, lexer: 'Lexer', text: Any) -> 'LexerThread':
+        return cls(lexer, LexerState(text))
+
+    def lex(self, parser_state):
+        if self.state is None:
+            raise TypeError("Cannot lex: No text assigned to lexer state")
+        return self.lexer.lex(self.state, parser_state)
+
+    def __copy__(self):
+        return type(self)(self.lexer, copy(self.state))
+
+    _Token = Token
+
+
+_Callback = Callable[[Token], Token]
+
+class Lexer(ABC):
+    #--
+    @abstractmethod
+    def lex(self, lexer_state: LexerState, parser_state: Any) -> Iterator[Token]:
+        return NotImplemented
+
+    def make_lexer_state(self, text: str):
+        #--
+        return LexerState(TextSlice.cast_from(text))
+
+
+def _check_regex_collisions(terminal_to_regexp: Dict[TerminalDef, str], comparator, strict_mode, max_collisions_to_show=8):
+    if not comparator:
+        comparator = interegular.Comparator.from_regexes(terminal_to_regexp)
+
+    ##
+
+    ##
+
+    max_time = 2 if strict_mode else 0.2
+
+    ##
+
+    if comparator.count_marked_pairs() >= max_collisions_to_show:
+        return
+    for group in classify(terminal_to_regexp, lambda t: t.priority).values():
+        for a, b in comparator.check(group, skip_marked=True):
+            assert a.priority == b.priority
+            ##
+
+            comparator.mark(a, b)
+
+            ##
+
+            message = f"Collision between Terminals {a.name} and {b.name}. "
+            try:
+                example = comparator.get_example_overlap(a, b, max_time).format_multiline()
+            except ValueError:
+                ##
+
+                example = "No example could be found fast enough. However, the collision does still exists"
+            if strict_mode:
+                raise LexError(f"{message}\n{example}")
+            logger.warning("%s The lexer will choose between them arbitrarily.\n%s", message, example)
+            if comparator.count_marked_pairs() >= max_collisions_to_show:
+                logger.warning("Found 8 regex collisions, will not check for more.")
+                return
+
+
+class AbstractBasicLexer(Lexer):
+    terminals_by_name: Dict[str, TerminalDef]
+
+    @abstractmethod
+    def __init__(self, conf: 'LexerConf', comparator=None) -> None:
+        ...
+
+    @abstractmethod
+    def next_token(self, lex_state: LexerState, parser_state: Any = None) -> Token:
+        ...
+
+    def lex(self, state: LexerState, parser_state: Any) -> Iterator[Token]:
+        with suppress(EOFError):
+            while True:
+                yield self.next_token(state, parser_state)
+
+
+class BasicLexer(AbstractBasicLexer):
+    terminals: Collection[TerminalDef]
+    ignore_types: FrozenSet[str]
+    newline_types: FrozenSet[str]
+    user_callbacks: Dict[str, _Callback]
+    callback: Dict[str, _Callback]
+    re: ModuleType
+
+    def __init__(self, conf: 'LexerConf', comparator=None) -> None:
+        terminals = list(conf.terminals)
+        assert all(isinstance(t, TerminalDef) for t in terminals), terminals
+
+        self.re = conf.re_module
+
+        if not conf.skip_validation:
+            ##
+
+            terminal_to_regexp = {}
+            for t in terminals:
+                regexp = t.pattern.to_regexp()
+                try:
+                    self.re.compile(regexp, conf.g_regex_flags)
+                except self.re.error:
+                    raise LexError("Cannot compile token %s: %s" % (t.name, t.pattern))
+
+                if t.pattern.min_width == 0:
+                    raise LexError("Lexer does not allow zero-width terminals. (%s: %s)" % (t.name, t.pattern))
+                if t.pattern.type == "re":
+                    terminal_to_regexp[t] = regexp
+
+            if not (set(conf.ignore) <= {t.name for t in terminals}):
+                raise LexError("Ignore terminals are not defined: %s" % (set(conf.ignore) - {t.name for t in terminals}))
+
+            if has_interegular:
+                _check_regex_collisions(terminal_to_regexp, comparator, conf.strict)
+            elif conf.strict:
+                raise LexError("interegular must be installed for strict mode. Use `pip install 'lark[interegular]'`.")
+
+        ##
+
+        self.newline_types = frozenset(t.name for t in terminals if _regexp_has_newline(t.pattern.to_regexp()))
+        self.ignore_types = frozenset(conf.ignore)
+
+        terminals.sort(key=lambda x: (-x.priority, -x.pattern.max_width, -len(x.pattern.value), x.name))
+        self.terminals = terminals
+        self.user_callbacks = conf.callbacks
+        self.g_regex_flags = conf.g_regex_flags
+        self.use_bytes = conf.use_bytes
+        self.terminals_by_name = conf.terminals_by_name
+
+        self._scanner: Optional[Scanner] = None
+
+    def _build_scanner(self) -> Scanner:
+        terminals, self.callback = _create_unless(self.terminals, self.g_regex_flags, self.re, self.use_bytes)
+        assert all(self.callback.values())
+
+        for type_, f in self.user_callbacks.items():
+            if type_ in self.callback:
+                ##
+
+                self.callback[type_] = CallChain(self.callback[type_], f, lambda t: t.type == type_)
+            else:
+                self.callback[type_] = f
+
+        return Scanner(terminals, self.g_regex_flags, self.re, self.use_bytes)
+
+    @property
+    def scanner(self) -> Scanner:
+        if self._scanner is None:
+            self._scanner = self._build_scanner()
+        return self._scanner
+
+    def match(self, text, pos):
+        return self.scanner.match(text, pos)
+
+    def next_token(self, lex_state: LexerState, parser_state: Any = None) -> Token:
+        line_ctr = lex_state.line_ctr
+        while line_ctr.char_pos < lex_state.text.end:
+            res = self.match(lex_state.text, line_ctr.char_pos)
+            if not res:
+                allowed = self.scanner.allowed_types - self.ignore_types
+                if not allowed:
+                    allowed = {"<END-OF-FILE>"}
+                raise UnexpectedCharacters(lex_state.text.text, line_ctr.char_pos, line_ctr.line, line_ctr.column,
+                                           allowed=allowed, token_history=lex_state.last_token and [lex_state.last_token],
+                                           state=parser_state, terminals_by_name=self.terminals_by_name)
+
+            value, type_ = res
+
+            ignored = type_ in self.ignore_types
+            t = None
+            if not ignored or type_ in self.callback:
+                t = Token(type_, value, line_ctr.char_pos, line_ctr.line, line_ctr.column)
+            line_ctr.feed(value, type_ in self.newline_types)
+            if t is not None:
+                t.end_line = line_ctr.line
+                t.end_column = line_ctr.column
+                t.end_pos = line_ctr.char_pos
+                if t.type in self.callback:
+                    t = self.callback[t.type](t)
+                if not ignored:
+                    if not isinstance(t, Token):
+                        raise LexError("Callbacks must return a token (returned %r)" % t)
+                    lex_state.last_token = t
+                    return t
+
+        ##
+
+        raise EOFError(self)
+
+
+class ContextualLexer(Lexer):
+    lexers: Dict[int, AbstractBasicLexer]
+    root_lexer: AbstractBasicLexer
+
+    BasicLexer: Type[AbstractBasicLexer] = BasicLexer
+
+    def __init__(self, conf: 'LexerConf', states: Dict[int, Collection[str]], always_accept: Collection[str]=()) -> None:
+        terminals = list(conf.terminals)
+        terminals_by_name = conf.terminals_by_name
+
+        trad_conf = copy(conf)
+        trad_conf.terminals = terminals
+
+        if has_interegular and not conf.skip_validation:
+            comparator = interegular.Comparator.from_regexes({t: t.pattern.to_regexp() for t in terminals})
+        else:
+            comparator = None
+        lexer_by_tokens: Dict[FrozenSet[str], AbstractBasicLexer] = {}
+        self.lexers = {}
+        for state, accepts in states.items():
+            key = frozenset(accepts)
+            try:
+                lexer = lexer_by_tokens[key]
+            except KeyError:
+                accepts = set(accepts) | set(conf.ignore) | set(always_accept)
+                lexer_conf = copy(trad_conf)
+                lexer_conf.terminals = [terminals_by_name[n] for n in accepts if n in terminals_by_name]
+                lexer = self.BasicLexer(lexer_conf, comparator)
+                lexer_by_tokens[key] = lexer
+
+            self.lexers[state] = lexer
+
+        assert trad_conf.terminals is terminals
+        trad_conf.skip_validation = True  ##
+
+        self.root_lexer = self.BasicLexer(trad_conf, comparator)
+
+    def lex(self, lexer_state: LexerState, parser_state: 'ParserState') -> Iterator[Token]:
+        try:
+            while True:
+                lexer = self.lexers[parser_state.position]
+                yield lexer.next_token(lexer_state, parser_state)
+        except EOFError:
+            pass
+        except UnexpectedCharacters as e:
+            ##
+
+            ##
+
+            try:
+                last_token = lexer_state.last_token  ##
+
+                token = self.root_lexer.next_token(lexer_state, parser_state)
+                raise UnexpectedToken(token, e.allowed, state=parser_state, token_history=[last_token], terminals_by_name=self.root_lexer.terminals_by_name)
+            except UnexpectedCharacters:
+                raise e  ##
+
+
+
+
+_ParserArgType: 'TypeAlias' = 'Literal["earley", "lalr", "cyk", "auto"]'
+_LexerArgType: 'TypeAlias' = 'Union[Literal["auto", "basic", "contextual", "dynamic", "dynamic_complete"], Type[Lexer]]'
+_LexerCallback = Callable[[Token], Token]
+ParserCallbacks = Dict[str, Callable]
+
+class LexerConf(Serialize):
+    __serialize_fields__ = 'terminals', 'ignore', 'g_regex_flags', 'use_bytes', 'lexer_type'
+    __serialize_namespace__ = TerminalDef,
+
+    terminals: Collection[TerminalDef]
+    re_module: ModuleType
+    ignore: Collection[str]
+    postlex: 'Optional[PostLex]'
+    callbacks: Dict[str, _LexerCallback]
+    g_regex_flags: int
+    skip_validation: bool
+    use_bytes: bool
+    lexer_type: Optional[_LexerArgType]
+    strict: bool
+
+    def __init__(self, terminals: Collection[TerminalDef], re_module: ModuleType, ignore: Collection[str]=(), postlex: 'Optional[PostLex]'=None,
+                 callbacks: Optional[Dict[str, _LexerCallback]]=None, g_regex_flags: int=0, skip_validation: bool=False, use_bytes: bool=False, strict: bool=False):
+        self.terminals = terminals
+        self.terminals_by_name = {t.name: t for t in self.terminals}
+        assert len(self.terminals) == len(self.terminals_by_name)
+        self.ignore = ignore
+        self.postlex = postlex
+        self.callbacks = callbacks or {}
+        self.g_regex_flags = g_regex_flags
+        self.re_module = re_module
+        self.skip_validation = skip_validation
+        self.use_bytes = use_bytes
+        self.strict = strict
+        self.lexer_type = None
+
+    def _deserialize(self):
+        self.terminals_by_name = {t.name: t for t in self.terminals}
+
+    def __deepcopy__(self, memo=None):
+        return type(self)(
+            deepcopy(self.terminals, memo),
+            self.re_module,
+            deepcopy(self.ignore, memo),
+            deepcopy(self.postlex, memo),
+            deepcopy(self.callbacks, memo),
+            deepcopy(self.g_regex_flags, memo),
+            deepcopy(self.skip_validation, memo),
+            deepcopy(self.use_bytes, memo),
+        )
+
+class ParserConf(Serialize):
+    __serialize_fields__ = 'rules', 'start', 'parser_type'
+
+    rules: List['Rule']
+    callbacks: ParserCallbacks
+    start: List[str]
+    parser_type: _ParserArgType
+
+    def __init__(self, rules: List['Rule'], callbacks: ParserCallbacks, start: List[str]):
+        assert isinstance(start, list)
+        self.rules = rules
+        self.callbacks = callbacks
+        self.start = start
+
+
+from functools import partial, wraps
+from itertools import product
+
+
+class ExpandSingleChild:
+    def __init__(self, node_builder):
+        self.node_builder = node_builder
+
+    def __call__(self, children):
+        if len(children) == 1:
+            return children[0]
+        else:
+            return self.node_builder(children)
+
+
+
+class PropagatePositions:
+    def __init__(self, node_builder, node_filter=None):
+        self.node_builder = node_builder
+        self.node_filter = node_filter
+
+    def __call__(self, children):
+        res = self.node_builder(children)
+
+        if isinstance(res, Tree):
+            ##
+
+            ##
+
+            ##
+
+            ##
+
+
+            res_meta = res.meta
+
+            first_meta = self._pp_get_meta(children)
+            if first_meta is not None:
+                if not hasattr(res_meta, 'line'):
+                    ##
+
+                    res_meta.line = getattr(first_meta, 'container_line', first_meta.line)
+                    res_meta.column = getattr(first_meta, 'container_column', first_meta.column)
+                    res_meta.start_pos = getattr(first_meta, 'container_start_pos', first_meta.start_pos)
+                    res_meta.empty = False
+
+                res_meta.container_line = getattr(first_meta, 'container_line', first_meta.line)
+                res_meta.container_column = getattr(first_meta, 'container_column', first_meta.column)
+                res_meta.container_start_pos = getattr(first_meta, 'container_start_pos', first_meta.start_pos)
+
+            last_meta = self._pp_get_meta(reversed(children))
+            if last_meta is not None:
+                if not hasattr(res_meta, 'end_line'):
+                    res_meta.end_line = getattr(last_meta, 'container_end_line', last_meta.end_line)
+                    res_meta.end_column = getattr(last_meta, 'container_end_column', last_meta.end_column)
+                    res_meta.end_pos = getattr(last_meta, 'container_end_pos', last_meta.end_pos)
+                    res_meta.empty = False
+
+                res_meta.container_end_line = getattr(last_meta, 'container_end_line', last_meta.end_line)
+                res_meta.container_end_column = getattr(last_meta, 'container_end_column', last_meta.end_column)
+                res_meta.container_end_pos = getattr(last_meta, 'container_end_pos', last_meta.end_pos)
+
+        return res
+
+    def _pp_get_meta(self, children):
+        for c in children:
+            if self.node_filter is not None and not self.node_filter(c):
+                continue
+            if isinstance(c, Tree):
+                if not c.meta.empty:
+                    return c.meta
+            elif isinstance(c, Token):
+                return c
+            elif hasattr(c, '__lark_meta__'):
+                return c.__lark_meta__()
+
+def make_propagate_positions(option):
+    if callable(option):
+        return partial(PropagatePositions, node_filter=option)
+    elif option is True:
+        return PropagatePositions
+    elif option is False:
+        return None
+
+    raise ConfigurationError('Invalid option for propagate_positions: %r' % option)
+
+
+class ChildFilter:
+    def __init__(self, to_include, append_none, node_builder):
+        self.node_builder = node_builder
+        self.to_include = to_include
+        self.append_none = append_none
+
+    def __call__(self, children):
+        filtered = []
+
+        for i, to_expand, add_none in self.to_include:
+            if add_none:
+                filtered += [None] * add_none
+            if to_expand:
+                filtered += children[i].children
+            else:
+                filtered.append(children[i])
+
+        if self.append_none:
+            filtered += [None] * self.append_none
+
+        return self.node_builder(filtered)
+
+
+class ChildFilterLALR(ChildFilter):
+    #--
+
+    def __call__(self, children):
+        filtered = []
+        for i, to_expand, add_none in self.to_include:
+            if add_none:
+                filtered += [None] * add_none
+            if to_expand:
+                if filtered:
+                    filtered += children[i].children
+                else:   ##
+
+                    filtered = children[i].children
+            else:
+                filtered.append(children[i])
+
+        if self.append_none:
+            filtered += [None] * self.append_none
+
+        return self.node_builder(filtered)
+
+
+class ChildFilterLALR_NoPlaceholders(ChildFilter):
+    #--
+    def __init__(self, to_include, node_builder):
+        self.node_builder = node_builder
+        self.to_include = to_include
+
+    def __call__(self, children):
+        filtered = []
+        for i, to_expand in self.to_include:
+            if to_expand:
+                if filtered:
+                    filtered += children[i].children
+                else:   ##
+
+                    filtered = children[i].children
+            else:
+                filtered.append(children[i])
+        return self.node_builder(filtered)
+
+
+def _should_expand(sym):
+    return not sym.is_term and sym.name.startswith('_')
+
+
+def maybe_create_child_filter(expansion, keep_all_tokens, ambiguous, _empty_indices: List[bool]):
+    ##
+
+    if _empty_indices:
+        assert _empty_indices.count(False) == len(expansion)
+        s = ''.join(str(int(b)) for b in _empty_indices)
+        empty_indices = [len(ones) for ones in s.split('0')]
+        assert len(empty_indices) == len(expansion)+1, (empty_indices, len(expansion))
+    else:
+        empty_indices = [0] * (len(expansion)+1)
+
+    to_include = []
+    nones_to_add = 0
+    for i, sym in enumerate(expansion):
+        nones_to_add += empty_indices[i]
+        if keep_all_tokens or not (sym.is_term and sym.filter_out):
+            to_include.append((i, _should_expand(sym), nones_to_add))
+            nones_to_add = 0
+
+    nones_to_add += empty_indices[len(expansion)]
+
+    if _empty_indices or len(to_include) < len(expansion) or any(to_expand for i, to_expand,_ in to_include):
+        if _empty_indices or ambiguous:
+            return partial(ChildFilter if ambiguous else ChildFilterLALR, to_include, nones_to_add)
+        else:
+            ##
+
+            return partial(ChildFilterLALR_NoPlaceholders, [(i, x) for i,x,_ in to_include])
+
+
+class AmbiguousExpander:
+    #--
+    def __init__(self, to_expand, tree_class, node_builder):
+        self.node_builder = node_builder
+        self.tree_class = tree_class
+        self.to_expand = to_expand
+
+    def __call__(self, children):
+        def _is_ambig_tree(t):
+            return hasattr(t, 'data') and t.data == '_ambig'
+
+        ##
+
+        ##
+
+        ##
+
+        ##
+
+        ambiguous = []
+        for i, child in enumerate(children):
+            if _is_ambig_tree(child):
+                if i in self.to_expand:
+                    ambiguous.append(i)
+
+                child.expand_kids_by_data('_ambig')
+
+        if not ambiguous:
+            return self.node_builder(children)
+
+        expand = [child.children if i in ambiguous else (child,) for i, child in enumerate(children)]
+        return self.tree_class('_ambig', [self.node_builder(list(f)) for f in product(*expand)])
+
+
+def maybe_create_ambiguous_expander(tree_class, expansion, keep_all_tokens):
+    to_expand = [i for i, sym in enumerate(expansion)
+                 if keep_all_tokens or ((not (sym.is_term and sym.filter_out)) and _should_expand(sym))]
+    if to_expand:
+        return partial(AmbiguousExpander, to_expand, tree_class)
+
+
+class AmbiguousIntermediateExpander:
+    #--
+
+    def __init__(self, tree_class, node_builder):
+        self.node_builder = node_builder
+        self.tree_class = tree_class
+
+    def __call__(self, children):
+        def _is_iambig_tree(child):
+            return hasattr(child, 'data') and child.data == '_iambig'
+
+        def _collapse_iambig(children):
+            #--
+
+            ##
+
+            ##
+
+            if children and _is_iambig_tree(children[0]):
+                iambig_node = children[0]
+                result = []
+                for grandchild in iambig_node.children:
+                    collapsed = _collapse_iambig(grandchild.children)
+                    if collapsed:
+                        for child in collapsed:
+                            child.children += children[1:]
+                        result += collapsed
+                    else:
+                        new_tree = self.tree_class('_inter', grandchild.children + children[1:])
+                        result.append(new_tree)
+                return result
+
+        collapsed = _collapse_iambig(children)
+        if collapsed:
+            processed_nodes = [self.node_builder(c.children) for c in collapsed]
+            return self.tree_class('_ambig', processed_nodes)
+
+        return self.node_builder(children)
+
+
+
+def inplace_transformer(func):
+    @wraps(func)
+    def f(children):
+        ##
+
+        tree = Tree(func.__name__, children)
+        return func(tree)
+    return f
+
+
+def apply_visit_wrapper(func, name, wrapper):
+    if wrapper is _vargs_meta or wrapper is _vargs_meta_inline:
+        raise NotImplementedError("Meta args not supported for internal transformer; use YourTransformer().transform(parser.parse()) instead")
+
+    @wraps(func)
+    def f(children):
+        return wrapper(func, name, children, None)
+    return f
+
+
+class ParseTreeBuilder:
+    def __init__(self, rules, tree_class, propagate_positions=False, ambiguous=False, maybe_placeholders=False):
+        self.tree_class = tree_class
+        self.propagate_positions = propagate_positions
+        self.ambiguous = ambiguous
+        self.maybe_placeholders = maybe_placeholders
+
+        self.rule_builders = list(self._init_builders(rules))
+
+    def _init_builders(self, rules):
+        propagate_positions = make_propagate_positions(self.propagate_positions)
+
+        for rule in rules:
+            options = rule.options
+            keep_all_tokens = options.keep_all_tokens
+            expand_single_child = options.expand1
+
+            wrapper_chain = list(filter(None, [
+                (expand_single_child and not rule.alias) and ExpandSingleChild,
+                maybe_create_child_filter(rule.expansion, keep_all_tokens, self.ambiguous, options.empty_indices if self.maybe_placeholders else None),
+                propagate_positions,
+                self.ambiguous and maybe_create_ambiguous_expander(self.tree_class, rule.expansion, keep_all_tokens),
+                self.ambiguous and partial(AmbiguousIntermediateExpander, self.tree_class)
+            ]))
+
+            yield rule, wrapper_chain
+
+    def create_callback(self, transformer=None):
+        callbacks = {}
+
+        default_handler = getattr(transformer, '__default__', None)
+        if default_handler:
+            def default_callback(data, children):
+                return default_handler(data, children, None)
+        else:
+            default_callback = self.tree_class
+
+        for rule, wrapper_chain in self.rule_builders:
+
+            user_callback_name = rule.alias or rule.options.template_source or rule.origin.name
+            try:
+                f = getattr(transformer, user_callback_name)
+                wrapper = getattr(f, 'visit_wrapper', None)
+                if wrapper is not None:
+                    f = apply_visit_wrapper(f, user_callback_name, wrapper)
+                elif isinstance(transformer, Transformer_InPlace):
+                    f = inplace_transformer(f)
+            except AttributeError:
+                f = partial(default_callback, user_callback_name)
+
+            for w in wrapper_chain:
+                f = w(f)
+
+            if rule in callbacks:
+                raise GrammarError("Rule '%s' already exists" % (rule,))
+
+            callbacks[rule] = f
+
+        return callbacks
+
+
+
+class Action:
+    def __init__(self, name):
+        self.name = name
+    def __str__(self):
+        return self.name
+    def __repr__(self):
+        return str(self)
+
+Shift = Action('Shift')
+Reduce = Action('Reduce')
+
+StateT = TypeVar("StateT")
+
+class ParseTableBase(Generic[StateT]):
+    states: Dict[StateT, Dict[str, Tuple]]
+    start_states: Dict[str, StateT]
+    end_states: Dict[str, StateT]
+
+    def __init__(self, states, start_states, end_states):
+        self.states = states
+        self.start_states = start_states
+        self.end_states = end_states
+
+    def serialize(self, memo):
+        tokens = Enumerator()
+
+        states = {
+            state: {tokens.get(token): ((1, arg.serialize(memo)) if action is Reduce else (0, arg))
+                    for token, (action, arg) in actions.items()}
+            for state, actions in self.states.items()
+        }
+
+        return {
+            'tokens': tokens.reversed(),
+            'states': states,
+            'start_states': self.start_states,
+            'end_states': self.end_states,
+        }
+
+    @classmethod
+    def deserialize(cls, data, memo):
+        tokens = data['tokens']
+        states = {
+            state: {tokens[token]: ((Reduce, Rule.deserialize(arg, memo)) if action==1 else (Shift, arg))
+                    for token, (action, arg) in actions.items()}
+            for state, actions in data['states'].items()
+        }
+        return cls(states, data['start_states'], data['end_states'])
+
+class ParseTable(ParseTableBase['State']):
+    #--
+    pass
+
+
+class IntParseTable(ParseTableBase[int]):
+    #--
+
+    @classmethod
+    def from_ParseTable(cls, parse_table: ParseTable):
+        enum = list(parse_table.states)
+        state_to_idx: Dict['State', int] = {s:i for i,s in enumerate(enum)}
+        int_states = {}
+
+        for s, la in parse_table.states.items():
+            la = {k:(v[0], state_to_idx[v[1]]) if v[0] is Shift else v
+                  for k,v in la.items()}
+            int_states[ state_to_idx[s] ] = la
+
+
+        start_states = {start:state_to_idx[s] for start, s in parse_table.start_states.items()}
+        end_states = {start:state_to_idx[s] for start, s in parse_table.end_states.items()}
+        return cls(int_states, start_states, end_states)
+
+
+
+class ParseConf(Generic[StateT]):
+    __slots__ = 'parse_table', 'callbacks', 'start', 'start_state', 'end_state', 'states'
+
+    parse_table: ParseTableBase[StateT]
+    callbacks: ParserCallbacks
+    start: str
+
+    start_state: StateT
+    end_state: StateT
+    states: Dict[StateT, Dict[str, tuple]]
+
+    def __init__(self, parse_table: ParseTableBase[StateT], callbacks: ParserCallbacks, start: str):
+        self.parse_table = parse_table
+
+        self.start_state = self.parse_table.start_states[start]
+        self.end_state = self.parse_table.end_states[start]
+        self.states = self.parse_table.states
+
+        self.callbacks = callbacks
+        self.start = start
+
+class ParserState(Generic[StateT]):
+    __slots__ = 'parse_conf', 'lexer', 'state_stack', 'value_stack'
+
+    parse_conf: ParseConf[StateT]
+    lexer: LexerThread
+    state_stack: List[StateT]
+    value_stack: list
+
+    def __init__(self, parse_conf: ParseConf[StateT], lexer: LexerThread, state_stack=None, value_stack=None):
+        self.parse_conf = parse_conf
+        self.lexer = lexer
+        self.state_stack = state_stack or [self.parse_conf.start_state]
+        self.value_stack = value_stack or []
+
+    @property
+    def position(self) -> StateT:
+        return self.state_stack[-1]
+
+    ##
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ParserState):
+            return NotImplemented
+        return len(self.state_stack) == len(other.state_stack) and self.position == other.position
+
+    def __copy__(self):
+        return self.copy()
+
+    def copy(self, deepcopy_values=True) -> 'ParserState[StateT]':
+        return type(self)(
+            self.parse_conf,
+            self.lexer, ##
+
+            copy(self.state_stack),
+            deepcopy(self.value_stack) if deepcopy_values else copy(self.value_stack),
+        )
+
+    def feed_token(self, token: Token, is_end=False) -> Any:
+        state_stack = self.state_stack
+        value_stack = self.value_stack
+        states = self.parse_conf.states
+        end_state = self.parse_conf.end_state
+        callbacks = self.parse_conf.callbacks
+
+        while True:
+            state = state_stack[-1]
+            try:
+                action, arg = states[state][token.type]
+            except KeyError:
+                expected = {s for s in states[state].keys() if s.isupper()}
+                raise UnexpectedToken(token, expected, state=self, interactive_parser=None)
+
+            assert arg != end_state
+
+            if action is Shift:
+                ##
+
+                assert not is_end
+                state_stack.append(arg)
+                value_stack.append(token if token.type not in callbacks else callbacks[token.type](token))
+                return
+            else:
+                ##
+
+                rule = arg
+                size = len(rule.expansion)
+                if size:
+                    s = value_stack[-size:]
+                    del state_stack[-size:]
+                    del value_stack[-size:]
+                else:
+                    s = []
+
+                value = callbacks[rule](s) if callbacks else s
+
+                _action, new_state = states[state_stack[-1]][rule.origin.name]
+                assert _action is Shift
+                state_stack.append(new_state)
+                value_stack.append(value)
+
+                if is_end and state_stack[-1] == end_state:
+                    return value_stack[-1]
+
+
+class LALR_Parser(Serialize):
+    def __init__(self, parser_conf: ParserConf, debug: bool=False, strict: bool=False):
+        analysis = LALR_Analyzer(parser_conf, debug=debug, strict=strict)
+        analysis.compute_lalr()
+        callbacks = parser_conf.callbacks
+
+        self._parse_table = analysis.parse_table
+        self.parser_conf = parser_conf
+        self.parser = _Parser(analysis.parse_table, callbacks, debug)
+
+    @classmethod
+    def deserialize(cls, data, memo, callbacks, debug=False):
+        inst = cls.__new__(cls)
+        inst._parse_table = IntParseTable.deserialize(data, memo)
+        inst.parser = _Parser(inst._parse_table, callbacks, debug)
+        return inst
+
+    def serialize(self, memo: Any = None) -> Dict[str, Any]:
+        return self._parse_table.serialize(memo)
+
+    def parse_interactive(self, lexer: LexerThread, start: str):
+        return self.parser.parse(lexer, start, start_interactive=True)
+
+    def parse(self, lexer, start, on_error=None):
+        try:
+            return self.parser.parse(lexer, start)
+        except UnexpectedInput as e:
+            if on_error is None:
+                raise
+
+            while True:
+                if isinstance(e, UnexpectedCharacters):
+                    s = e.interactive_parser.lexer_thread.state
+                    p = s.line_ctr.char_pos
+
+                if not on_error(e):
+                    raise e
+
+                if isinstance(e, UnexpectedCharacters):
+                    ##
+
+                    if p == s.line_ctr.char_pos:
+                        s.line_ctr.feed(s.text.text[p:p+1])
+
+                try:
+                    return e.interactive_parser.resume_parse()
+                except UnexpectedToken as e2:
+                    if (isinstance(e, UnexpectedToken)
+                        and e.token.type == e2.token.type == '$END'
+                        and e.interactive_parser == e2.interactive_parser):
+                        ##
+
+                        raise e2
+                    e = e2
+                except UnexpectedCharacters as e2:
+                    e = e2
+
+
+class _Parser:
+    parse_table: ParseTableBase
+    callbacks: ParserCallbacks
+    debug: bool
+
+    def __init__(self, parse_table: ParseTableBase, callbacks: ParserCallbacks, debug: bool=False):
+        self.parse_table = parse_table
+        self.callbacks = callbacks
+        self.debug = debug
+
+    def parse(self, lexer: LexerThread, start: str, value_stack=None, state_stack=None, start_interactive=False):
+        parse_conf = ParseConf(self.parse_table, self.callbacks, start)
+        parser_state = ParserState(parse_conf, lexer, state_stack, value_stack)
+        if start_interactive:
+            return InteractiveParser(self, parser_state, parser_state.lexer)
+        return self.parse_from_state(parser_state)
+
+
+    def parse_from_state(self, state: ParserState, last_token: Optional[Token]=None):
+        #--
+        try:
+            token = last_token
+            for token in state.lexer.lex(state):
+                assert token is not None
+                state.feed_token(token)
+
+            end_token = Token.new_borrow_pos('$END', '', token) if token else Token('$END', '', 0, 1, 1)
+            return state.feed_token(end_token, True)
+        except UnexpectedInput as e:
+            try:
+                e.interactive_parser = InteractiveParser(self, state, state.lexer)
+            except NameError:
+                pass
+            raise e
+        except Exception as e:
+            if self.debug:
+                print("")
+                print("STATE STACK DUMP")
+                print("----------------")
+                for i, s in enumerate(state.state_stack):
+                    print('%d)' % i , s)
+                print("")
+
+            raise
+
+
+class InteractiveParser:
+    #--
+    def __init__(self, parser, parser_state: ParserState, lexer_thread: LexerThread):
+        self.parser = parser
+        self.parser_state = parser_state
+        self.lexer_thread = lexer_thread
+        self.result = None
+
+    @property
+    def lexer_state(self) -> LexerThread:
+        warnings.warn("lexer_state will be removed in subsequent releases. Use lexer_thread instead.", DeprecationWarning)
+        return self.lexer_thread
+
+    def feed_token(self, token: Token):
+        #--
+        return self.parser_state.feed_token(token, token.type == '$END')
+
+    def iter_parse(self) -> Iterator[Token]:
+        #--
+        for token in self.lexer_thread.lex(self.parser_state):
+            yield token
+            self.result = self.feed_token(token)
+
+    def exhaust_lexer(self) -> List[Token]:
+        #--
+        return list(self.iter_parse())
+
+
+    def feed_eof(self, last_token=None):
+        #--
+        eof = Token.new_borrow_pos('$END', '', last_token) if last_token is not None else self.lexer_thread._Token('$END', '', 0, 1, 1)
+        return self.feed_token(eof)
+
+
+    def __copy__(self):
+        #--
+        return self.copy()
+
+    def copy(self, deepcopy_values=True):
+        return type(self)(
+            self.parser,
+            self.parser_state.copy(deepcopy_values=deepcopy_values),
+            copy(self.lexer_thread),
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, InteractiveParser):
+            return False
+
+        return self.parser_state == other.parser_state and self.lexer_thread == other.lexer_thread
+
+    def as_immutable(self):
+        #--
+        p = copy(self)
+        return ImmutableInteractiveParser(p.parser, p.parser_state, p.lexer_thread)
+
+    def pretty(self):
+        #--
+        out = ["Parser choices:"]
+        for k, v in self.choices().items():
+            out.append('\t- %s -> %r' % (k, v))
+        out.append('stack size: %s' % len(self.parser_state.state_stack))
+        return '\n'.join(out)
+
+    def choices(self):
+        #--
+        return self.parser_state.parse_conf.parse_table.states[self.parser_state.position]
+
+    def accepts(self):
+        #--
+        accepts = set()
+        conf_no_callbacks = copy(self.parser_state.parse_conf)
+        ##
+
+        ##
+
+        conf_no_callbacks.callbacks = {}
+        for t in self.choices():
+            if t.isupper(): ##
+
+                new_cursor = self.copy(deepcopy_values=False)
+                new_cursor.parser_state.parse_conf = conf_no_callbacks
+                try:
+                    new_cursor.feed_token(self.lexer_thread._Token(t, ''))
+                except UnexpectedToken:
+                    pass
+                else:
+                    accepts.add(t)
+        return accepts
+
+    def resume_parse(self):
+        #--
+        return self.parser.parse_from_state(self.parser_state, last_token=self.lexer_thread.state.last_token)
+
+
+
+class ImmutableInteractiveParser(InteractiveParser):
+    #--
+
+    result = None
+
+    def __hash__(self):
+        return hash((self.parser_state, self.lexer_thread))
+
+    def feed_token(self, token):
+        c = copy(self)
+        c.result = InteractiveParser.feed_token(c, token)
+        return c
+
+    def exhaust_lexer(self):
+        #--
+        cursor = self.as_mutable()
+        cursor.exhaust_lexer()
+        return cursor.as_immutable()
+
+    def as_mutable(self):
+        #--
+        p = copy(self)
+        return InteractiveParser(p.parser, p.parser_state, p.lexer_thread)
+
+
+
+def _wrap_lexer(lexer_class):
+    future_interface = getattr(lexer_class, '__future_interface__', 0)
+    if future_interface == 2:
+        return lexer_class
+    elif future_interface == 1:
+        class CustomLexerWrapper1(Lexer):
+            def __init__(self, lexer_conf):
+                self.lexer = lexer_class(lexer_conf)
+            def lex(self, lexer_state, parser_state):
+                if isinstance(lexer_state.text, TextSlice) and not lexer_state.text.is_complete_text():
+                    raise TypeError("Interface=1 Custom Lexer don't support TextSlice")
+                lexer_state.text = lexer_state.text
+                return self.lexer.lex(lexer_state, parser_state)
+        return CustomLexerWrapper1
+    elif future_interface == 0:
+        class CustomLexerWrapper0(Lexer):
+            def __init__(self, lexer_conf):
+                self.lexer = lexer_class(lexer_conf)
+
+            def lex(self, lexer_state, parser_state):
+                if isinstance(lexer_state.text, TextSlice):
+                    if not lexer_state.text.is_complete_text():
+                        raise TypeError("Interface=0 Custom Lexer don't support TextSlice")
+                    return self.lexer.lex(lexer_state.text.text)
+                return self.lexer.lex(lexer_state.text)
+        return CustomLexerWrapper0
+    else:
+        raise ValueError(f"Unknown __future_interface__ value {future_interface}, integer 0-2 expected")
+
+
+def _deserialize_parsing_frontend(data, memo, lexer_conf, callbacks, options):
+    parser_conf = ParserConf.deserialize(data['parser_conf'], memo)
+    cls = (options and options._plugins.get('LALR_Parser')) or LALR_Parser
+    parser = cls.deserialize(data['parser'], memo, callbacks, options.debug)
+    parser_conf.callbacks = callbacks
+    return ParsingFrontend(lexer_conf, parser_conf, options, parser=parser)
+
+
+_parser_creators: 'Dict[str, Callable[[LexerConf, Any, Any], Any]]' = {}
+
+
+class ParsingFrontend(Serialize):
+    __serialize_fields__ = 'lexer_conf', 'parser_conf', 'parser'
+
+    lexer_conf: LexerConf
+    parser_conf: ParserConf
+    options: Any
+
+    def __init__(self, lexer_conf: LexerConf, parser_conf: ParserConf, options, parser=None):
+        self.parser_conf = parser_conf
+        self.lexer_conf = lexer_conf
+        self.options = options
+
+        ##
+
+        if parser:  ##
+
+            self.parser = parser
+        else:
+            create_parser = _parser_creators.get(parser_conf.parser_type)
+            assert create_parser is not None, "{} is not supported in standalone mode".format(
+                    parser_conf.parser_type
+                )
+            self.parser = create_parser(lexer_conf, parser_conf, options)
+
+        ##
+
+        lexer_type = lexer_conf.lexer_type
+        self.skip_lexer = False
+        if lexer_type in ('dynamic', 'dynamic_complete'):
+            assert lexer_conf.postlex is None
+            self.skip_lexer = True
+            return
+
+        if isinstance(lexer_type, type):
+            assert issubclass(lexer_type, Lexer)
+            self.lexer = _wrap_lexer(lexer_type)(lexer_conf)
+        elif isinstance(lexer_type, str):
+            create_lexer = {
+                'basic': create_basic_lexer,
+                'contextual': create_contextual_lexer,
+            }[lexer_type]
+            self.lexer = create_lexer(lexer_conf, self.parser, lexer_conf.postlex, options)
+        else:
+            raise TypeError("Bad value for lexer_type: {lexer_type}")
+
+        if lexer_conf.postlex:
+            self.lexer = PostLexConnector(self.lexer, lexer_conf.postlex)
+
+    def _verify_start(self, start=None):
+        if start is None:
+            start_decls = self.parser_conf.start
+            if len(start_decls) > 1:
+                raise ConfigurationError("Lark initialized with more than 1 possible start rule. Must specify which start rule to parse", start_decls)
+            start ,= start_decls
+        elif start not in self.parser_conf.start:
+            raise ConfigurationError("Unknown start rule %s. Must be one of %r" % (start, self.parser_conf.start))
+        return start
+
+    def _make_lexer_thread(self, text: Optional[LarkInput]) -> Union[LarkInput, LexerThread, None]:
+        cls = (self.options and self.options._plugins.get('LexerThread')) or LexerThread
+        if self.skip_lexer:
+            return text
+        if text is None:
+            return cls(self.lexer, None)
+        if isinstance(text, (str, bytes, TextSlice)):
+            return cls.from_text(self.lexer, text)
+        return cls.from_custom_input(self.lexer, text)
+
+    def parse(self, text: Optional[LarkInput], start=None, on_error=None):
+        if self.lexer_conf.lexer_type in ("dynamic", "dynamic_complete"):
+            if isinstance(text, TextSlice) and not text.is_complete_text():
+                raise TypeError(f"Lexer {self.lexer_conf.lexer_type} does not support text slices.")
+
+        chosen_start = self._verify_start(start)
+        kw = {} if on_error is None else {'on_error': on_error}
+        stream = self._make_lexer_thread(text)
+        return self.parser.parse(stream, chosen_start, **kw)
+
+    def parse_interactive(self, text: Optional[TextOrSlice]=None, start=None):
+        ##
+
+        ##
+
+        chosen_start = self._verify_start(start)
+        if self.parser_conf.parser_type != 'lalr':
+            raise ConfigurationError("parse_interactive() currently only works with parser='lalr' ")
+        stream = self._make_lexer_thread(text)
+        return self.parser.parse_interactive(stream, chosen_start)
+
+
+def _validate_frontend_args(parser, lexer) -> None:
+    assert_config(parser, ('lalr', 'earley', 'cyk'))
+    if not isinstance(lexer, type):     ##
+
+        expected = {
+            'lalr': ('basic', 'contextual'),
+            'earley': ('basic', 'dynamic', 'dynamic_complete'),
+            'cyk': ('basic', ),
+         }[parser]
+        assert_config(lexer, expected, 'Parser %r does not support lexer %%r, expected one of %%s' % parser)
+
+
+def _get_lexer_callbacks(transformer, terminals):
+    result = {}
+    for terminal in terminals:
+        callback = getattr(transformer, terminal.name, None)
+        if callback is not None:
+            result[terminal.name] = callback
+    return result
+
+class PostLexConnector:
+    def __init__(self, lexer, postlexer):
+        self.lexer = lexer
+        self.postlexer = postlexer
+
+    def lex(self, lexer_state, parser_state):
+        i = self.lexer.lex(lexer_state, parser_state)
+        return self.postlexer.process(i)
+
+
+
+def create_basic_lexer(lexer_conf, parser, postlex, options) -> BasicLexer:
+    cls = (options and options._plugins.get('BasicLexer')) or BasicLexer
+    return cls(lexer_conf)
+
+def create_contextual_lexer(lexer_conf: LexerConf, parser, postlex, options) -> ContextualLexer:
+    cls = (options and options._plugins.get('ContextualLexer')) or ContextualLexer
+    parse_table: ParseTableBase[int] = parser._parse_table
+    states: Dict[int, Collection[str]] = {idx:list(t.keys()) for idx, t in parse_table.states.items()}
+    always_accept: Collection[str] = postlex.always_accept if postlex else ()
+    return cls(lexer_conf, states, always_accept=always_accept)
+
+def create_lalr_parser(lexer_conf: LexerConf, parser_conf: ParserConf, options=None) -> LALR_Parser:
+    debug = options.debug if options else False
+    strict = options.strict if options else False
+    cls = (options and options._plugins.get('LALR_Parser')) or LALR_Parser
+    return cls(parser_conf, debug=debug, strict=strict)
+
+_parser_creators['lalr'] = create_lalr_parser
+
+
+
+
+class PostLex(ABC):
+    @abstractmethod
+    def process(self, stream: Iterator[Token]) -> Iterator[Token]:
+        return stream
+
+    always_accept: Iterable[str] = ()
+
+class LarkOptions(Serialize):
+    #--
+
+    start: List[str]
+    debug: bool
+    strict: bool
+    transformer: 'Optional[Transformer]'
+    propagate_positions: Union[bool, str]
+    maybe_placeholders: bool
+    cache: Union[bool, str]
+    cache_grammar: bool
+    regex: bool
+    g_regex_flags: int
+    keep_all_tokens: bool
+    tree_class: Optional[Callable[[str, List], Any]]
+    parser: _ParserArgType
+    lexer: _LexerArgType
+    ambiguity: 'Literal["auto", "resolve", "explicit", "forest"]'
+    postlex: Optional[PostLex]
+    priority: 'Optional[Literal["auto", "normal", "invert"]]'
+    lexer_callbacks: Dict[str, Callable[[Token], Token]]
+    use_bytes: bool
+    ordered_sets: bool
+    edit_terminals: Optional[Callable[[TerminalDef], TerminalDef]]
+    import_paths: 'List[Union[str, Callable[[Union[None, str, PackageResource], str], Tuple[str, str]]]]'
+    source_path: Optional[str]
+
+    OPTIONS_DOC = r"""
+    **===  General Options  ===**
+
+    start
+            The start symbol. Either a string, or a list of strings for multiple possible starts (Default: "start")
+    debug
+            Display debug information and extra warnings. Use only when debugging (Default: ``False``)
+            When used with Earley, it generates a forest graph as "sppf.png", if 'dot' is installed.
+    strict
+            Throw an exception on any potential ambiguity, including shift/reduce conflicts, and regex collisions.
+    transformer
+            Applies the transformer to every parse tree (equivalent to applying it after the parse, but faster)
+    propagate_positions
+            Propagates positional attributes into the 'meta' attribute of all tree branches.
+            Sets attributes: (line, column, end_line, end_column, start_pos, end_pos,
+                              container_line, container_column, container_end_line, container_end_column)
+            Accepts ``False``, ``True``, or a callable, which will filter which nodes to ignore when propagating.
+    maybe_placeholders
+            When ``True``, the ``[]`` operator returns ``None`` when not matched.
+            When ``False``,  ``[]`` behaves like the ``?`` operator, and returns no value at all.
+            (default= ``True``)
+    cache
+            Cache the results of the Lark grammar analysis, for x2 to x3 faster loading. LALR only for now.
+
+            - When ``False``, does nothing (default)
+            - When ``True``, caches to a temporary file in the local directory
+            - When given a string, caches to the path pointed by the string
+    cache_grammar
+            For use with ``cache`` option. When ``True``, the unanalyzed grammar is also included in the cache.
+            Useful for classes that require the ``Lark.grammar`` to be present (e.g. Reconstructor).
+            (default= ``False``)
+    regex
+            When True, uses the ``regex`` module instead of the stdlib ``re``.
+    g_regex_flags
+            Flags that are applied to all terminals (both regex and strings)
+    keep_all_tokens
+            Prevent the tree builder from automagically removing "punctuation" tokens (Default: ``False``)
+    tree_class
+            Lark will produce trees comprised of instances of this class instead of the default ``lark.Tree``.
+
+    **=== Algorithm Options ===**
+
+    parser
+            Decides which parser engine to use. Accepts "earley" or "lalr". (Default: "earley").
+            (there is also a "cyk" option for legacy)
+    lexer
+            Decides whether or not to use a lexer stage
+
+            - "auto" (default): Choose for me based on the parser
+            - "basic": Use a basic lexer
+            - "contextual": Stronger lexer (only works with parser="lalr")
+            - "dynamic": Flexible and powerful (only with parser="earley")
+            - "dynamic_complete": Same as dynamic, but tries *every* variation of tokenizing possible.
+    ambiguity
+            Decides how to handle ambiguity in the parse. Only relevant if parser="earley"
+
+            - "resolve": The parser will automatically choose the simplest derivation
+              (it chooses consistently: greedy for tokens, non-greedy for rules)
+            - "explicit": The parser will return all derivations wrapped in "_ambig" tree nodes (i.e. a forest).
+            - "forest": The parser will return the root of the shared packed parse forest.
+
+    **=== Misc. / Domain Specific Options ===**
+
+    postlex
+            Lexer post-processing (Default: ``None``) Only works with the basic and contextual lexers.
+    priority
+            How priorities should be evaluated - "auto", ``None``, "normal", "invert" (Default: "auto")
+    lexer_callbacks
+            Dictionary of callbacks for the lexer. May alter tokens during lexing. Use with caution.
+    use_bytes
+            Accept an input of type ``bytes`` instead of ``str``.
+    ordered_sets
+            Should Earley use ordered-sets to achieve stable output (~10% slower than regular sets. Default: True)
+    edit_terminals
+            A callback for editing the terminals before parse.
+    import_paths
+            A List of either paths or loader functions to specify from where grammars are imported
+    source_path
+            Override the source of from where the grammar was loaded. Useful for relative imports and unconventional grammar loading
+    **=== End of Options ===**
+    """
+    if __doc__:
+        __doc__ += OPTIONS_DOC
+
+
+    ##
+
+    ##
+
+    ##
+
+    ##
+
+    ##
+
+    ##
+
+    _defaults: Dict[str, Any] = {
+        'debug': False,
+        'strict': False,
+        'keep_all_tokens': False,
+        'tree_class': None,
+        'cache': False,
+        'cache_grammar': False,
+        'postlex': None,
+        'parser': 'earley',
+        'lexer': 'auto',
+        'transformer': None,
+        'start': 'start',
+        'priority': 'auto',
+        'ambiguity': 'auto',
+        'regex': False,
+        'propagate_positions': False,
+        'lexer_callbacks': {},
+        'maybe_placeholders': True,
+        'edit_terminals': None,
+        'g_regex_flags': 0,
+        'use_bytes': False,
+        'ordered_sets': True,
+        'import_paths': [],
+        'source_path': None,
+        '_plugins': {},
+    }
+
+    def __init__(self, options_dict: Dict[str, Any]) -> None:
+        o = dict(options_dict)
+
+        options = {}
+        for name, default in self._defaults.items():
+            if name in o:
+                value = o.pop(name)
+                if isinstance(default, bool) and name not in ('cache', 'use_bytes', 'propagate_positions'):
+                    value = bool(value)
+            else:
+                value = default
+
+            options[name] = value
+
+        if isinstance(options['start'], str):
+            options['start'] = [options['start']]
+
+        self.__dict__['options'] = options
+
+
+        assert_config(self.parser, ('earley', 'lalr', 'cyk', None))
+
+        if self.parser == 'earley' and self.transformer:
+            raise ConfigurationError('Cannot specify an embedded transformer when using the Earley algorithm. '
+                             'Please use your transformer on the resulting parse tree, or use a different algorithm (i.e. LALR)')
+
+        if self.cache_grammar and not self.cache:
+            raise ConfigurationError('cache_grammar cannot be set when cache is disabled')
+
+        if o:
+            raise ConfigurationError("Unknown options: %s" % o.keys())
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.__dict__['options'][name]
+        except KeyError as e:
+            raise AttributeError(e)
+
+    def __setattr__(self, name: str, value: str) -> None:
+        assert_config(name, self.options.keys(), "%r isn't a valid option. Expected one of: %s")
+        self.options[name] = value
+
+    def serialize(self, memo = None) -> Dict[str, Any]:
+        return self.options
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any], memo: Dict[int, Union[TerminalDef, Rule]]) -> "LarkOptions":
+        return cls(data)
+
+
+##
+
+##
+
+_LOAD_ALLOWED_OPTIONS = {'postlex', 'transformer', 'lexer_callbacks', 'use_bytes', 'debug', 'g_regex_flags', 'regex', 'propagate_positions', 'tree_class', '_plugins'}
+
+_VALID_PRIORITY_OPTIONS = ('auto', 'normal', 'invert', None)
+_VALID_AMBIGUITY_OPTIONS = ('auto', 'resolve', 'explicit', 'forest')
+
+
+_T = TypeVar('_T', bound="Lark")
+
+class Lark(Serialize):
+    #--
+
+    source_path: str
+    source_grammar: str
+    grammar: 'Grammar'
+    options: LarkOptions
+    lexer: Lexer
+    parser: 'ParsingFrontend'
+    terminals: Collection[TerminalDef]
+
+    __serialize_fields__ = ['parser', 'rules', 'options']
+
+    def __init__(self, grammar: 'Union[Grammar, str, IO[str]]', **options) -> None:
+        self.options = LarkOptions(options)
+        re_module: types.ModuleType
+
+        ##
+
+        if self.options.cache_grammar:
+            self.__serialize_fields__ = self.__serialize_fields__ + ['grammar']
+
+        ##
+
+        use_regex = self.options.regex
+        if use_regex:
+            if _has_regex:
+                re_module = regex
+            else:
+                raise ImportError('`regex` module must be installed if calling `Lark(regex=True)`.')
+        else:
+            re_module = re
+
+        ##
+
+        if self.options.source_path is None:
+            try:
+                self.source_path = grammar.name  ##
+
+            except AttributeError:
+                self.source_path = '<string>'
+        else:
+            self.source_path = self.options.source_path
+
+        ##
+
+        try:
+            read = grammar.read  ##
+
+        except AttributeError:
+            pass
+        else:
+            grammar = read()
+
+        cache_fn = None
+        cache_sha256 = None
+        if isinstance(grammar, str):
+            self.source_grammar = grammar
+            if self.options.use_bytes:
+                if not grammar.isascii():
+                    raise ConfigurationError("Grammar must be ascii only, when use_bytes=True")
+
+            if self.options.cache:
+                if self.options.parser != 'lalr':
+                    raise ConfigurationError("cache only works with parser='lalr' for now")
+
+                unhashable = ('transformer', 'postlex', 'lexer_callbacks', 'edit_terminals', '_plugins')
+                options_str = ''.join(k+str(v) for k, v in options.items() if k not in unhashable)
+                from . import __version__
+                s = grammar + options_str + __version__ + str(sys.version_info[:2])
+                cache_sha256 = sha256_digest(s)
+
+                if isinstance(self.options.cache, str):
+                    cache_fn = self.options.cache
+                else:
+                    if self.options.cache is not True:
+                        raise ConfigurationError("cache argument must be bool or str")
+
+                    try:
+                        username = getpass.getuser()
+                    except Exception:
+                        ##
+
+                        ##
+
+                        ##
+
+                        username = "unknown"
+
+
+                    cache_fn = tempfile.gettempdir() + "/.lark_%s_%s_%s_%s_%s.tmp" % (
+                        "cache_grammar" if self.options.cache_grammar else "cache", username, cache_sha256, *sys.version_info[:2])
+
+                old_options = self.options
+                try:
+                    with FS.open(cache_fn, 'rb') as f:
+                        logger.debug('Loading grammar from cache: %s', cache_fn)
+                        ##
+
+                        for name in (set(options) - _LOAD_ALLOWED_OPTIONS):
+                            del options[name]
+                        file_sha256 = f.readline().rstrip(b'\n')
+                        cached_used_files = pickle.load(f)
+                        if file_sha256 == cache_sha256.encode('utf8') and verify_used_files(cached_used_files):
+                            cached_parser_data = pickle.load(f)
+                            self._load(cached_parser_data, **options)
+                            return
+                except FileNotFoundError:
+                    ##
+
+                    pass
+                except Exception: ##
+
+                    logger.exception("Failed to load Lark from cache: %r. We will try to carry on.", cache_fn)
+
+                    ##
+
+                    ##
+
+                    self.options = old_options
+
+
+            ##
+
+            self.grammar, used_files = load_grammar(grammar, self.source_path, self.options.import_paths, self.options.keep_all_tokens)
+        else:
+            assert isinstance(grammar, Grammar)
+            self.grammar = grammar
+
+
+        if self.options.lexer == 'auto':
+            if self.options.parser == 'lalr':
+                self.options.lexer = 'contextual'
+            elif self.options.parser == 'earley':
+                if self.options.postlex is not None:
+                    logger.info("postlex can't be used with the dynamic lexer, so we use 'basic' instead. "
+                                "Consider using lalr with contextual instead of earley")
+                    self.options.lexer = 'basic'
+                else:
+                    self.options.lexer = 'dynamic'
+            elif self.options.parser == 'cyk':
+                self.options.lexer = 'basic'
+            else:
+                assert False, self.options.parser
+        lexer = self.options.lexer
+        if isinstance(lexer, type):
+            assert issubclass(lexer, Lexer)     ##
+
+        else:
+            assert_config(lexer, ('basic', 'contextual', 'dynamic', 'dynamic_complete'))
+            if self.options.postlex is not None and 'dynamic' in lexer:
+                raise ConfigurationError("Can't use postlex with a dynamic lexer. Use basic or contextual instead")
+
+        if self.options.ambiguity == 'auto':
+            if self.options.parser == 'earley':
+                self.options.ambiguity = 'resolve'
+        else:
+            assert_config(self.options.parser, ('earley', 'cyk'), "%r doesn't support disambiguation. Use one of these parsers instead: %s")
+
+        if self.options.priority == 'auto':
+            self.options.priority = 'normal'
+
+        if self.options.priority not in _VALID_PRIORITY_OPTIONS:
+            raise ConfigurationError("invalid priority option: %r. Must be one of %r" % (self.options.priority, _VALID_PRIORITY_OPTIONS))
+        if self.options.ambiguity not in _VALID_AMBIGUITY_OPTIONS:
+            raise ConfigurationError("invalid ambiguity option: %r. Must be one of %r" % (self.options.ambiguity, _VALID_AMBIGUITY_OPTIONS))
+
+        if self.options.parser is None:
+            terminals_to_keep = '*'     ##
+
+        elif self.options.postlex is not None:
+            terminals_to_keep = set(self.options.postlex.always_accept)
+        else:
+            terminals_to_keep = set()
+
+        ##
+
+        self.terminals, self.rules, self.ignore_tokens = self.grammar.compile(self.options.start, terminals_to_keep)
+
+        if self.options.edit_terminals:
+            for t in self.terminals:
+                self.options.edit_terminals(t)
+
+        self._terminals_dict = {t.name: t for t in self.terminals}
+
+        ##
+
+        if self.options.priority == 'invert':
+            for rule in self.rules:
+                if rule.options.priority is not None:
+                    rule.options.priority = -rule.options.priority
+            for term in self.terminals:
+                term.priority = -term.priority
+        ##
+
+        ##
+
+        ##
+
+        elif self.options.priority is None:
+            for rule in self.rules:
+                if rule.options.priority is not None:
+                    rule.options.priority = None
+            for term in self.terminals:
+                term.priority = 0
+
+        ##
+
+        self.lexer_conf = LexerConf(
+                self.terminals, re_module, self.ignore_tokens, self.options.postlex,
+                self.options.lexer_callbacks, self.options.g_regex_flags, use_bytes=self.options.use_bytes, strict=self.options.strict
+            )
+
+        if self.options.parser:
+            self.parser = self._build_parser()
+        elif lexer:
+            self.lexer = self._build_lexer()
+
+        if cache_fn:
+            logger.debug('Saving grammar to cache: %s', cache_fn)
+            try:
+                with FS.open(cache_fn, 'wb') as f:
+                    assert cache_sha256 is not None
+                    f.write(cache_sha256.encode('utf8') + b'\n')
+                    pickle.dump(used_files, f)
+                    self.save(f, _LOAD_ALLOWED_OPTIONS)
+            except IOError as e:
+                logger.exception("Failed to save Lark to cache: %r.", cache_fn, e)
+
+    if __doc__:
+        __doc__ += "\n\n" + LarkOptions.OPTIONS_DOC
+
+    def _build_lexer(self, dont_ignore: bool=False) -> BasicLexer:
+        lexer_conf = self.lexer_conf
+        if dont_ignore:
+            from copy import copy
+            lexer_conf = copy(lexer_conf)
+            lexer_conf.ignore = ()
+        return BasicLexer(lexer_conf)
+
+    def _prepare_callbacks(self) -> None:
+        self._callbacks = {}
+        ##
+
+        if self.options.ambiguity != 'forest':
+            self._parse_tree_builder = ParseTreeBuilder(
+                    self.rules,
+                    self.options.tree_class or Tree,
+                    self.options.propagate_positions,
+                    self.options.parser != 'lalr' and self.options.ambiguity == 'explicit',
+                    self.options.maybe_placeholders
+                )
+            self._callbacks = self._parse_tree_builder.create_callback(self.options.transformer)
+        self._callbacks.update(_get_lexer_callbacks(self.options.transformer, self.terminals))
+
+    def _build_parser(self) -> "ParsingFrontend":
+        self._prepare_callbacks()
+        _validate_frontend_args(self.options.parser, self.options.lexer)
+        parser_conf = ParserConf(self.rules, self._callbacks, self.options.start)
+        return _construct_parsing_frontend(
+            self.options.parser,
+            self.options.lexer,
+            self.lexer_conf,
+            parser_conf,
+            options=self.options
+        )
+
+    def save(self, f, exclude_options: Collection[str] = ()) -> None:
+        #--
+        if self.options.parser != 'lalr':
+            raise NotImplementedError("Lark.save() is only implemented for the LALR(1) parser.")
+        data, m = self.memo_serialize([TerminalDef, Rule])
+        if exclude_options:
+            data["options"] = {n: v for n, v in data["options"].items() if n not in exclude_options}
+        pickle.dump({'data': data, 'memo': m}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls: Type[_T], f) -> _T:
+        #--
+        inst = cls.__new__(cls)
+        return inst._load(f)
+
+    def _deserialize_lexer_conf(self, data: Dict[str, Any], memo: Dict[int, Union[TerminalDef, Rule]], options: LarkOptions) -> LexerConf:
+        lexer_conf = LexerConf.deserialize(data['lexer_conf'], memo)
+        lexer_conf.callbacks = options.lexer_callbacks or {}
+        lexer_conf.re_module = regex if options.regex else re
+        lexer_conf.use_bytes = options.use_bytes
+        lexer_conf.g_regex_flags = options.g_regex_flags
+        lexer_conf.skip_validation = True
+        lexer_conf.postlex = options.postlex
+        return lexer_conf
+
+    def _load(self: _T, f: Any, **kwargs) -> _T:
+        if isinstance(f, dict):
+            d = f
+        else:
+            d = pickle.load(f)
+        memo_json = d['memo']
+        data = d['data']
+
+        assert memo_json
+        memo = SerializeMemoizer.deserialize(memo_json, {'Rule': Rule, 'TerminalDef': TerminalDef}, {})
+        if 'grammar' in data:
+            self.grammar = Grammar.deserialize(data['grammar'], memo)
+        options = dict(data['options'])
+        if (set(kwargs) - _LOAD_ALLOWED_OPTIONS) & set(LarkOptions._defaults):
+            raise ConfigurationError("Some options are not allowed when loading a Parser: {}"
+                             .format(set(kwargs) - _LOAD_ALLOWED_OPTIONS))
+        options.update(kwargs)
+        self.options = LarkOptions.deserialize(options, memo)
+        self.rules = [Rule.deserialize(r, memo) for r in data['rules']]
+        self.source_path = '<deserialized>'
+        _validate_frontend_args(self.options.parser, self.options.lexer)
+        self.lexer_conf = self._deserialize_lexer_conf(data['parser'], memo, self.options)
+        self.terminals = self.lexer_conf.terminals
+        self._prepare_callbacks()
+        self._terminals_dict = {t.name: t for t in self.terminals}
+        self.parser = _deserialize_parsing_frontend(
+            data['parser'],
+            memo,
+            self.lexer_conf,
+            self._callbacks,
+            self.options,  ##
+
+        )
+        return self
+
+    @classmethod
+    def _load_from_dict(cls, data, memo, **kwargs):
+        inst = cls.__new__(cls)
+        return inst._load({'data': data, 'memo': memo}, **kwargs)
+
+    @classmethod
+    def open(cls: Type[_T], grammar_filename: str, rel_to: Optional[str]=None, **options) -> _T:
+        #--
+        if rel_to:
+            basepath = os.path.dirname(rel_to)
+            grammar_filename = os.path.join(basepath, grammar_filename)
+        with open(grammar_filename, encoding='utf8') as f:
+            return cls(f, **options)
+
+    @classmethod
+    def open_from_package(cls: Type[_T], package: str, grammar_path: str, search_paths: 'Sequence[str]'=[""], **options) -> _T:
+        #--
+        package_loader = FromPackageLoader(package, search_paths)
+        full_path, text = package_loader(None, grammar_path)
+        options.setdefault('source_path', full_path)
+        options.setdefault('import_paths', [])
+        options['import_paths'].append(package_loader)
+        return cls(text, **options)
+
+    def __repr__(self):
+        return 'Lark(open(%r), parser=%r, lexer=%r, ...)' % (self.source_path, self.options.parser, self.options.lexer)
+
+
+    def lex(self, text: TextOrSlice, dont_ignore: bool=False) -> Iterator[Token]:
+        #--
+        lexer: Lexer
+        if not hasattr(self, 'lexer') or dont_ignore:
+            lexer = self._build_lexer(dont_ignore)
+        else:
+            lexer = self.lexer
+        lexer_thread = LexerThread.from_text(lexer, text)
+        stream = lexer_thread.lex(None)
+        if self.options.postlex:
+            return self.options.postlex.process(stream)
+        return stream
+
+    def get_terminal(self, name: str) -> TerminalDef:
+        #--
+        return self._terminals_dict[name]
+
+    def parse_interactive(self, text: Optional[LarkInput]=None, start: Optional[str]=None) -> 'InteractiveParser':
+        #--
+        return self.parser.parse_interactive(text, start=start)
+
+    def parse(self, text: LarkInput, start: Optional[str]=None, on_error: 'Optional[Callable[[UnexpectedInput], bool]]'=None) -> 'ParseTree':
+        #--
+        if on_error is not None and self.options.parser != 'lalr':
+            raise NotImplementedError("The on_error option is only implemented for the LALR(1) parser.")
+        return self.parser.parse(text, start=start, on_error=on_error)
+
+
+
+
+class DedentError(LarkError):
+    pass
+
+class Indenter(PostLex, ABC):
+    #--
+    paren_level: int
+    indent_level: List[int]
+
+    def __init__(self) -> None:
+        self.paren_level = 0
+        self.indent_level = [0]
+        assert self.tab_len > 0
+
+    def handle_NL(self, token: Token) -> Iterator[Token]:
+        if self.paren_level > 0:
+            return
+
+        yield token
+
+        indent_str = token.rsplit('\n', 1)[1] ##
+
+        indent = indent_str.count(' ') + indent_str.count('\t') * self.tab_len
+
+        if indent > self.indent_level[-1]:
+            self.indent_level.append(indent)
+            yield Token.new_borrow_pos(self.INDENT_type, indent_str, token)
+        else:
+            while indent < self.indent_level[-1]:
+                self.indent_level.pop()
+                yield Token.new_borrow_pos(self.DEDENT_type, indent_str, token)
+
+            if indent != self.indent_level[-1]:
+                raise DedentError('Unexpected dedent to column %s. Expected dedent to %s' % (indent, self.indent_level[-1]))
+
+    def _process(self, stream):
+        token = None
+        for token in stream:
+            if token.type == self.NL_type:
+                yield from self.handle_NL(token)
+            else:
+                yield token
+
+            if token.type in self.OPEN_PAREN_types:
+                self.paren_level += 1
+            elif token.type in self.CLOSE_PAREN_types:
+                self.paren_level -= 1
+                assert self.paren_level >= 0
+
+        while len(self.indent_level) > 1:
+            self.indent_level.pop()
+            yield Token.new_borrow_pos(self.DEDENT_type, '', token) if token else Token(self.DEDENT_type, '', 0, 0, 0, 0, 0, 0)
+
+        assert self.indent_level == [0], self.indent_level
+
+    def process(self, stream):
+        self.paren_level = 0
+        self.indent_level = [0]
+        return self._process(stream)
+
+    ##
+
+    @property
+    def always_accept(self):
+        return (self.NL_type,)
+
+    @property
+    @abstractmethod
+    def NL_type(self) -> str:
+        #--
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def OPEN_PAREN_types(self) -> List[str]:
+        #--
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def CLOSE_PAREN_types(self) -> List[str]:
+        #--
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def INDENT_type(self) -> str:
+        #--
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def DEDENT_type(self) -> str:
+        #--
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def tab_len(self) -> int:
+        #--
+        raise NotImplementedError()
+
+
+class PythonIndenter(Indenter):
+    #--
+
+    NL_type = '_NEWLINE'
+    OPEN_PAREN_types = ['LPAR', 'LSQB', 'LBRACE']
+    CLOSE_PAREN_types = ['RPAR', 'RSQB', 'RBRACE']
+    INDENT_type = '_INDENT'
+    DEDENT_type = '_DEDENT'
+    tab_len = 8
+
+
+import pickle, zlib, base64
+DATA = (
+b'eJztXQd8FcXWz156b9LsXWz0qlLSEzabQEjoEEK4SW66yb2QQBrtUrJiuzR7RcWGqGDvDUXF3ih2X/2evvfs7ZuZM3vzP2kkEJCnht+P/5y5szNnzpw558zs7G5lq7UtQowQ+VcW6Ge3LkgtLHIXBmS6fY672F2Ykpafl67odl53Ya4nLzWnKDAr0K8sYBvjAmZIUVkgs61pELgIWhC0JGhF0JqgDUFbgnYE7Qk6EHQk6ETQmaALQVeCbgTdCXoQHEXQk6AXQW+CPgR9CY4mOIbgWILjCI4nOIHgRIKTCE4mOIXgVILTCE4nOIOgH8GZBGcRnE1wDsG5BP0JBhAMJBhEMJhgCMFQgmEEwwlGEIwkGEVwHsH5RW67tScjL7/QLYfMbhOeYFmR8UkBu31KSmx0fEJiZMqggNvulJFS6M5wF6ek56RmFIlBtdv5itwpc0u87qLAKkcRvCUFbnGl0Aevu9jrS80J2G1TVG5KSsBuFycLhUtl8dkdSI2qdadVoS/HrfVGMHYB8TeaYAzBWIJxBKEEYQThBBEEkQRRBNEEMQSxBOMJTII4AosgniCBYALBRIJEgkkESQTJBJMJphBMJZhGMJ1gBsFMglkEswlSCOYQpBLMJUgjmEfgJkgnyCDIJPAQZBFkE+QQ5BLkEeQTFBBcSFBIUETgJfARzCdYQFBMUEKwkGARQSlBGUE5QQVBJcFigiUESwmWESwn8BOsIFhJsIpgNUEVgU1wEcEagosJLiG4lOAygssJAgRrCdYRrCfYQLCR4AqCKwmuIria4BqCawmuI7ie4AaCGwluIriZYBPBLQS3EtxGsJngdoI7CO4kuIvgboItBPcQbCW4l+A+gvsJthFsJ3iA4EGChwgeJniE4FGCxwgeJ3iC4EmCpwieJniG4FmC5wieJ3iBYAfBiwQvEewkeJngFYJXCXYRvEbwOsEbBG8SvEXwNsE7BO8SvEfwPsEHBLsJ9hDsJdhH8CHBRwQfE3xC8CnBZwSfE3xB8BeCvxL8jeDvBP8g+CfB/xH8i+BLgq8I/k3wH4L/EnxN8A3BtwTfEXxP8APBjwQ/EfxM8AvBrwqsEPLFlqHRpbGFxpYaW2lsrbGNxrYa22lsr7GDxo4aO2nsrLGLxq4au2nsrrGHxqM09tTYS2NvjX009tV4tMZjNB6r8TiNx2s8QeOJGk/SeLLGUzSeqvE0jadrPENjP41najxL49kaz9F4rsb+GgdoHKhxkMbBGodoHKpxmMbhGkdoHKlxlMbzNJ6v8QKNozWO0ThW4ziNoRrDNIZrjNAYqTFKY7TGGI2xGsdr1DGeFafR0hivMUHjBI0TNSZqnKQxSWOyxskap2icqnGaxukaZ2icqXGWxtkaUzTO0Ziqca7GNI3zNLo1pmvM0Jip0aMxS2O2xhyNuRrzNOZrLNB4ocZCjUUavRp9GudrXKCxWGOJxoUaF2ks1VimsVxjhcZKjYs1LtG4VOMyjcs1+jWu0LhS4yqNqzVWabQ1XqRxjSGizFZF3tRCr4jvxCqhwFuQUpif7w2kBuNACh1b5qTmFAYy4+z2E1Q2BYuZhlp4ePOz3XlFMlgU4WfbxNCk2IT40LiAadgd0/MLc305qSnzUr2pAdNld8xw57kLU3NScjxF3oDZwm4fkRAXF5qYEpWQFDBbyqg0ND4hXoS2Ziu7ZdykiWEBs3X1VXIZEzDb2K3zfLlzxVrHbGt3iYidlBQbH56UkhA2PjJc1NKuujw12z7YSlJMVMDsAI0KsqPddnJoYmxoWFxkwOxkdwhNSrBiw1OmJCRGBMzO1ZdGibJd7K5O1em+vDSvJz8vYHa128TGJ0VGRyYGzG52y8RI2ffuwQvD48WFPezWRfm+wjR3wDzKbhkfaom2eoqyE0LFRb3sVjK6Dw2Yve3WiWGJoeHi1z7iV9X9vnZ3b2Z6yoW+1DyvJ92TlkqtHm13k9m+vNTCkhQt5oB5jN1V5hYUutM9xfRjwDyWis4TeXnueSmePPFbwDzO7urkiFhfKEGeGJDjqWhqQUEO1HqC3UXl5s2rzjtRDI/i/iTdZE6qJy8l1Zuf60kLmCfbnWVmcUFh/jxSIfMUyvLlCfZ11ql0aa5ozpOXoTNPo/5STdXtnU6X5xdWZ51Blzu9IOXoR5miGW91yTOrM6W4qKGz7K5JMYNSIiKjYuMjI1KSIhOtgHm23SYqWWhTgujZOTWuUvWfS7KY68mrrqm/3QMLBpsdYHcWGpcyMTk0Pik2KlYqyEC7I+d3EF2r68vLz0stKsoXEhxst5H5OW4xKkOCyhQXKRR8qFB6zXSQ12E0cEUlRV53bnAYhttdk+NDE6elhCfEx4vJETtZaNYI6oFSA0dFRtqdJ02blBRpVdc4isbB4dap8jy7i26kWmvOp6K6D8HuXxBkOzZJtDuaxKlL6W6OIb5z8jNwsMfavVDn3aB346iW9Px0mIKh1CXB0TyPzBELXDNM2DOR5/UV5IghCrfbVvMbYXdIzcvL96qpJBbNkXbLPF+OuCbK7hwaH8GkFW23mhwnZB0wY+wewjSFTpqUEM5KxNrdHDNX5M5xa5bG2x296ekp81MLPalzJQemEJLIkBozD7LjhACgnDaMlt1W9pBUJF42UN1dnZtgd5W5XJsm2L0wkyYl/TTR7ix/wqxEu5PMSi3M8OW687xCEpPs3ni9noRUOsnuIn/To095ydJ0xSXEB8zJdsekaRMiq/Vnit0xOLXEDwFzqhik9ODEppkzze6kdiGqx2a6mOfpxTRsutAMu2tsfFTs1BRRmZhLcbFJ0wLmTLszZVZnzbI7+vJIvrKRgDm7ukVZlbAxATNFtCjqF/NK1S76PKd6YFAUqXZbla36OVcoZHrdCplGl9e0V/NoXGsYXbfQ3vSacyCd2GQTMoMKckOeSZnctnl0J9E4Zwndd4QYMLOJw5ozOYc4rOFBcoU9Sq/DHuUJe0RyC5j51XxUG8YCOXDcQF9IddWyi4WS5WI+XYvszsIdM1vpJQZr2AYf9aamsZnP5a3UPGAuoNwaZrFY8lVcm68SLXTmyhZKhWGTZFEwTBkYMEvtjqETJsRNS5k0zQpLEJ6/zG45KUk6xnK75YS45EkBs8JuFZqYmDAlYFba7YX9iI2OV1t55mLyaeRtSdeXkCn15hcIUc935+jspTT3mIosszvM8xRlBY3gcrtNjscrg5OA6bePrmMeBzu6wu6LP1O1wV9X0q9MaNW/rrL7VNuRmj+utrsri1Iju4q3R9cGf7XtTtFCHtMj41O0nC6yO5CR1yXWEF3km0viuFjT7gt9bmk0LtEBCk70S+32cQlTIhN1JHeZGEZyEY71u9zuWtuYB6rNg+BWOoe1oi2dk5Mp6HXSsFeXCJjra8wGxeEGyuShzUYZDwxiOn4FTRExz7hhvFLmD0KDQ/lXaWNVQz+upsmH8dY19lE1ZKJ9y7V2x6iERCs5LjQlMUEGvddRCCJsDbcs19udMPAWfb9BTqfqvusKb7Q7pOXBaN1kd5yUHKa8gdT1gHmz3U37WzScm2TcHB6XHCFYuCXrFiMkxLxVSD9N2jJdOGDeZneSdUPOZrtFUrgIqW/Xzqv6lztoiCHnTrt7SkpwVZMiVzpyzt6lp3R1wbtFToEHc7aIZibEBsx7BMpVw1a7hVou3Gu38eSl5fjmCRHfZ7dXlXvyCnxCDveLonKVsM1uoYL+7XbLUyPjhe49YPeQrNayNw+SY69hgR8iH16Xr3mYfD4fpkfsdlGxcZEptKp41G6Xl5rrxBGPUXhVI7p4XBuZGqHIE3ZL8ptPEr+1fMBTFEKgiX+aDBPzPs+QEahpoZ+1W8fpxc1z1PEalv156h13ji/o4EdHWNql7bA7QG7AfJHooEF4KWiiBwfMnWLGUiitZ+zLpCgwyV+xO+UXkCuS1jA/YL4qJJdWi8VdIg5Iq3tsXhN2Ig1Yep0CwNx8oVJqQr4hCggdCxZ4kwxLkOe3JA1G7m2ig+XfIb1gktAD+q4TFNNPlPkemZZa0/p90n4V71DJD+wOviJ3us/p+25hOtLrMh17aDBqqNNePe+qPeQ+HdVzO/Fhtdgp9PKJVbGcbnrvQP0n/h3vD5iGwJkCXQJnC2whsEhgS4FLBLYSuEBga4HrBLYRWCiwrcBrBbYTeInA9gLvENhB4GaBHQVuF9hJ4A6BnQXuEthF4D6BXQVeI7CbwL8L7C7wW4E9BP7kD/hMo0ws4QUxzh8oMl2S5Z4yj3YbRcFejOqNlM9sIcs7JU5RJXoi5TNbiur76KxjZFaR2QobOY01chpd1JqqDbFiXFBjAv3YRv7YV/w40RA/Hi1Yv1DgMSJjvMw4VmTMF+gI/jjxwzaDJGXNlInjxS+vCDxBZPQ0SPbWPTJxovhltMCTREaWzDhZZFwh8BSB2wSeKn6YJX84TSSulYnTxS//EniGwAcEyhH/r8AzBd6sx/dXgWeJC+6QF5wtMu4TeI7IuF9mnCsSS2Wiv/jlbYEDRMZKmTFQZDwrcJDIWC0zBouM5wUOERlXyIyhIuGSiWEi0UEmhovEJYZWoLu0As0ROEL8MFD+MFJkXC1wlMh4SGacJzLcAs8XGZEG6MwFIuNdmTFaZPxF4BiBiwSOFfixwHGiwEhZIFRkfA1aFiYwU2C4QI8ctLbVamAGlBa002NshohyEQLPFhgpMAqG3KYhb1+z7IP1l+3A1IOpxeAG1aJ+LQgOtlS2aTDY+x/cWmMZHDpnLA9kCKWmxDY0lM4ICm20+rlwKJs+dB1xjp+npmsUo3oyqjejohkVg5TP7CRrjhXtTFYmIMQs0cNaWXtYO8uy4wXTl0qmTZHwOKO3RibiROJ2Q5bs8vtVADmcbV0HpAkHoQBd0Y9ZAlsLjBd4FHFvxglMEDhG4ASBJ5B4zXlaIBlUmzXUMT/TSeymV+BEgd0EJooC59fVaSm41dCTSQKfEJgk8HTgW/b4aMlvN1TYSUxFJzEVncSUeRJT2ElMYSeREnaXNSfrvEzmuTJZO5lUvocsP1l0LFR2bIpIDHA0brpMTBWJPEf1UrXqWWkyMU0kCmViukhUKMU+Cvs1kbVH1AxGzWRUDKOiGBXNqN5I+cyeslXJ31pHv7sLnCVwgxb6QM33I87wnqe1J1ngbPHDTfKHFJG4W/Wjl6xxjiAnOzKYUrd4gpJrlHh6o3hGsm6OZMIaybo5kolgJBPWSBJBH1mz7On/6Yn0T9lyqshYL3CuyPirzEgTiX8ZYGKkzveWGfNE4jtDT/4fZcIt57qcyeki0U4mMmRhmcgUieEukrXVRSY8InG2TGSJxDFaytbxMidbJMbJRI5IxMpErkiMlok8kRjk0tLLdGnpnW2Q2bKmyJx8kZjjoklmnSB/KhCJcplzoUgky0ShFLWrjolZJH4odekBq5IJr0icK2vxSQsmc+aLRIoTqWRicCGN3FSZsUAkKmWiWCQyDJjR0kRfJDNKRGK+GuS+cij08Jh/gZEjIgqJGUj0RGImEr2Q6AOEzzwaVcpiSmQxtbHY/LPY/LOYKlpM+Symbhap2zEQH5uTkMVJ6vdj61THP9VQTEjrVMeA1KOPCyXrh0IxjxMB7iJBFbhkcHs8Ks5qpjhEJTOqlFFljCpn1AxGVTBqJqOiGBXNqBhGVTKqD6N6I+UzT8B+jWf9Gs/Kj2c8jGc8jGc8jKeaT2w4alssFcPlP7DwTSz4rBx5sViUWbNlwonjgoFd4wM6EXFZ6bIOGYxVyMShifGXiMS9Da7XaoV2cnVaJDlqeox3EkY2GQdl6Xpxa3ayrFkGeYNg9JzocanAeIHLBKNP6dnIwsnlAkf4KawM9TchrKwvivQLXCNwhcBbBa4UuFbgKoFP0sCYi0G4qwVeJ7BK4J1+in/3+nkU+pG/jij0FJwqs5hEZ5FkThUmwxb8d1Im47QyWSDE6qGo0/HqZHZ1MptoyWyiJbOxSmYTLZlaPQNW4v9UK/F+zedPZEz0jP935lcOY3hzphwKZ0vL2cmquQnl2CrHNDlmx9lycqyOs5/k7HfJIf7MX72b41iJoHVyrIRjcS4SP8xDo+tsdjlWMriD5ux6rREZx8mMMSJxNLN4QcN2sUgMkYngflPQTIF5ss6TGbUdQtDcixWINU0mgmY+uDknFSFdJoJba0ETHdxKC9roWpY46BOknm82/OBrgi6mQiQelYmgnwj6B0d9gub6EpHYi6oRtNeXisSbatzPwul+MpvuJ9O0PVubh7sMOWXPwSV5bfakAJYx2chOLWmUo5MCzmmiN6s5dRrvsqTYqpgO7NdVnQsG7GJlwPqX0fbRRZIY8D8mGimB4gZl1HjRDKztxXvV6dMzSKkGyfKOL5/EfDnfNxnH/Mo4VvM45oHGMe80jnmgcdTqYNmqDnnNDFzfZOASLANiUyJ6IhGNRBkS5UhUIBGFRAwQPnOIvg2SInVo6MF4xI+YR5Tu7mWZqO0Jgw5Q+r0X6/Z7DXg56dPGMy8X9HvSW26SZZrg3JriyqTz/EtjfdowbbmKVWAzXFMTFTUCbwXNZko2mynZbFKdkag6eTjyeTjyeTjyeTjyeahHeahHeagTeah7eaiieaiieYqpUZIpeVfiXX8geJeinrsT5+EM9bAuetiM81D582V5W+dNZeWnsvJTqfwF6EjiWIk4Jt44FsfHsbkfx2Z0HJvRcWxGx1GroxsTtswQGOZvfPgSI7DcX3cYI+2kvBm1zN+EcGamwFX+2tGME7wEoxnHAdSOXYIhi1wm+Px1hy7KJjcQudQOWBoTpzgz+DKBxX4epkjrX7evUwvhRgQptZzO5SLjRjm2Y1CjkphGJTEdSmI6lMS0JolpVBLTxCSmUUmkUWOdO8CnumC+Xa5+G6fd/W3SgoSiBQlnFYcz9sYz9sazqRTO2AtnrIcz9sKJvbCyaityrYpBwiUfldKGusgKWKYBnF+hLotw9tLfYMuUoCOQRvMrJ/RUDkVoq7VDJtaKxOUysU4kfpAJ6TVOcclqI9EqetDcedDcedDcedDcedCSetCSetD2edCsetBEetAqelRfo0BE8UpE0ahJfdlmU1+mV33Z5lZftinWlwYgBoc9ig17FBv2KDbsUWzzLZ0pQRTVHIvCdGP33dhJN3bfjWJ2o5jdKFk3StaNwnTjoLlxaNyKqfEouhOYsE4gtk1kOxOry0TmMpG5TGwoEznNRE4zUQiZyHYmCiETxZOpmIqTTEkr1BXknMXYz2Jjl8XGLouNXRabpFlskmaxSZpFIrHUQiHEzJLKF48KM5c1OpepwVy6OEEbGVtePEETOZKYiJLOQUnnoKRzUNI5KOkclFoOij0HJZ2D8szBAcnBMchR7CY6kp7qDzR0x3G9SMyVCXnbbbbjLdS9tQ0yJJSJjSKRLRNXiESZTFwpEgtlotZtN/MqkchVcd6kGoc0rBD5ez1xUFK1dZBPX0q5JmNoxKdmOlOZdKpiMkWS5tPy4inyYnmv8XHZaM3tRhkynORvYNtR+tAYf/W2o7MNub/tR2fXMXj7s7m3H537rE3chvSZU6VA5GivdyKBqTi0wfG7WiSuZCpSe7ClHqwz6lSsoPZIfdqIauQzp+FESUfVTkfVTsfpkI5TKB2nUDpOlHScDuk4HdJxQqbjtEtXWjPdmSj/8DcYegetg4eZJA8zSR7mTjzMQHmYgfIwA6WD+xnaQO2UGjwTTXw5Y6icNVPOPGc5VTULrx7FGBnF6hrF2BrFujqKMTmKap6NNRezuooZJ8VUPkXbyoDs1BxQAfm0avUQaqqcUTMYVcGomYyKYlRPRkUzKoZRlYzqxag+jOqNlM9M3c9RjtpHFOSMmFen0fSZc2Vtjpa+hjr/Gur8a6i/r+EMeg1n0GuKwzQt+Muk4OfhqJlMSCYTkskEbzJRm0zUJhOLyYRrkpDcOOP9OGH9OGH90CQRFUjMRCIKiZ5IRCMRg0QlEr2Q6AOEz0yX7Mrt2RAdhaujLdcIPNdffbRFmuAqf+2TLcE9YDnikSoQz3CMy+ugXHWcDApKP5NJP5NJP5PN+kwm/Uw2MplsLPTZo0wcizIcizIcizIcizIcizIcizIcizIcizIcizIcizIcizIcizIcizLFrgfZLUV2S5HdUmS3FNktRXZLkd1SZLcU2S1FdkuR3VJktxTZLVXsZpVV/3ypCl+yf6M9EOsqqYN/boIc0k2QHDHc1wriZTnSuWhbT2Kz+ySae3mozKtRmVejMq9GZV6NyrwalXk1KvNqVObVqMyrUZlXozKvRmVejcq8WrGbj+zOx9bmY2vzsbX52Np8bG0+tjYfW5uPkpiPkpiPnZ+vmCrAk14fIFMfYAMfYAMfoEA/QHY/QIF+gOx+pVq7EB1y7biTRbEYUAaFk4x1JiOHychhsmqtEDWolGlQKbP6pSwwKSXtKiojn7NYbaF7sa5EVlci8y6JzLskMp+RyPxJIvNRiczzJBIPPnZcp65DOebEmrMwG6d9zZtt1wnM99dx002YDjPS36RTNsFbuo2/CycMiVnqP5Bj09I0m2DzHBvoWCRHQa5TcpuPelb7Pha7K4Y3qILVTEE9m4J6NgX1bIpqbQHeC20tOLdloOM8inS9yJghu7K/Z5IO8bNIPrNY3xQ6Tml0SRk1/bgkFuK+zRQWtU8hVVyk9wHyZPFSNGXZaDWyUYrZKPlsFHY2yjcbDVY2CjsbhZ2NpiwbTVm24rDM2Rnxw0X/UT+Vwy7pVSqOqIB7suYPaLZ+QAa+RQa+Rab/rSquhA2WItpgWdzQSay6zvHXteNR74Gr1eKHa+qaa43d+nC0A7Y4rOtlhfs9arUETeByZgKXMwO6nDRmKZZvy8q3ZeXbUvllWj1NpZ7L8eoT2dUnUnm/LNGY3f11ogdlfri5G9zlv0H8cpMfN/lXNOJZgo1siw+XpOZGf127dxvEL6fJ2lfqLl6gurgKtPIapTursdMxrNMxzMvEMC8Tw3xHDPMyMczLxDB/FEOCrCqTrjDEmqq4snUQ9pwkLtLEVZJYg0ZiDKt3DDMZYxgHYxh3YxgHY4iDi7VchikOLqEtyhBrhAsqnc/EMZ9p0Hyq5lIQn3kZTt3L1O+X6d7ska1cru1fZ0kE9C9/lcRa7OdY1s+xrJ9jWT/Hsn6OZf0cSwyuw/HNZR3KpRLrtZntKxnZQANjJkpiY2M1s5ZCBjcfhc6aW+rSUJ95hay9TPz+CNjv29Hg3Y528XYU7u2K8ysbcwK1pv27UWAL/0EcQJV9PPkgzOGBHkRdJvCduqzkVbQ/ZPUx5KBdrbcqrCVSlZ0tOg/bovOwLbq6NkIrGMW3RflGaEObq2xbNLhFV9fpiD6MuolRbBvWZ16DGr2K8bCKlSeqlFFljCpn1AxGVTBqJqOiGBXNqBhGVTKqD6N6I+Uzr8V+lbF+lbF+lbG6yujq69CCzGF8zWHynkPlr6/zJFStc0/B407yaNTQ/RxukueV/itzGjjlFDzcFHSjwaNMUmm/qCvQqP8EU/DgkrRJoS5/g+eVbkABd2AC7sBE2oFEdCM4y6uVs7wJTij+V+XcLOuUG4ZHu5R2hVhel1KsECtPefdNR8IzPXyY5GnnV9gwNekQNjt7rYYyePY6OKYHcgj7kJ29vgXH/Xg27sfTSN+KkyeMTZ4wNnnC2PQPY9M4jE3/MKr5Nu3lP5TKspnW9+ZuSdwu27xZUK+KqzYJ/ELgLQI/FXirYL677MVtIuOfAjcL/EHg7eKHFvKHO0TGdwLvlLogM+4SidNl4m6R6CQTW0SirUzcIwdTJraKRH+ZuFckWsvEfSLRWSbul7ogE9tEYqxMbNeKPlp15A7N+5mS9ztRXqFMXqFMXqFMXqFMXqFMXqEkr7vwvlI2M9nZzGRnM5OdzUx2NjPZ2YyHbDb+2Yz3bMZRNjPg2axf2cxeZLN+ZVNP7m4oOJHaf5YU8gMi0cblrw5THhQZr8tf9rdee0gUPNZZdNQZqMjZkih/EKGQNbihFdzDosBWWaBm7CIn/fmSvf2t6WQQ09vfhKdotpSRuVym4u97BPWI+KmTJLY6R8TUQSvHAl+B8R+duroXdxL/CiNJRBQSM5DoicRMJHoh0QcIn3mfE1i9KtlydDST6Wgm09G6bgJVMIrfEuK3fRq6scRuCQV1tK4H1/sw6iZGsVtQPvN+XMt8iQL4Uv2+Tf4uPJv5CYjwDgzY70AR3oE13KFq2I6WeBHr5SLG0SLG+yLi7wHcAloCYieiHIkZSFQgMROJKCR6IhGNRAwSlUj0QqIPED7zQb3CvFqF5Q/RkQCrQFEPw12mv6tA4pHm3nettd8qn2/cyW7DNOfTDvIJzH0Ht+Fa79MPjzZfDCUfE+4sDdrv6kG2xjwg3dxR1WNsL0wKJtmAvvrMx2UB+eTFlyL7UYE/y9wn0ATEMhMQy8xlLDOQsczFxjJzGcsMZCwzkLFkOp7EgGU0Kz+aGc3RrObRrNXRrObRVPNT6OalH30CNfEI9feHz80/TU/Pm3+TNu4ZvdN0rySeRWu+FK35UrTmS9GaL0VrvhSt+VK05kvRmi9Fa74UrflStOZL0ZovRWu+VI3zc/oQzi+S9+eR90rkvRJ5r0TeK5H3SuS9EnmvRN4rkfdK5L0Sea9E3iuR90rF+wuS3cfEGK+QY/y4NP/OyusyNVV3OKHNKtz+LGGzs4Q56BLmoEtoLryIc7sdu7odK9+Oyr/UfE9jHekPYUmfcoPRRDPcpKexdkJI8S8VUrys9wVPUiHHK6SzIeb7oGCzUY1moxrNRjWarYbrVVnDPTprjPz9fiS2ILENie1IbEZiKxKbgPCZu/TN8CLF/WvadPxHEq/j3c9D9t6qxr6uKlHgcH8Dr616A6eFi00LF5sWLpoWb8ry8D4ma5LUoCdEYrJLj/0Ql7/6HJvUpASXv9ZBNp/5lqxpP+9WG6AswNt4+7r2gw7ssQl8giFo+G5Fw3cr2rpb0aIlocIlocIlocIlKUG8I5mKlrPWALM0k0lwJsnsXa0fx0n9eO+PY1dqmxNpaQxX89mV9xt+f8v/8lv3DsfL9uTLZLq5/LCa+eCPrJ0HpZRStd/j2rkbw+8nRXbLusJv2b++hp/H4eaPAp8SGT1khozDz8A43PEjNePxp0XBfrJgMCAXUb/5ub/aszwjfhhRZ6T+rMiIdlQyUc8W5XTqDdmfEz/EOQrf0O3F5wVKmdcM3V8QeKq/6SH8DtHwBMfNCD9mviiwlcCXBJ4vZb9HxxeG8tB75UjMFORpktsZIvGAGqF96P0WMtu9kIWUC5kvXEh2/UPdRoRq4yN8rUEyWyDyV+lEsiVeJFviRbIlXiRb4kWyJV4k8fAxRvtZ6PSy0OllYRifhU4vC/1pFvrGLPSnWegbs9A3ZqFvzFJMfXJE7hfJXaBbmfE9hAf06t0v+lQozWdHxhMLzoZrBlN19gYP/czC5xSBCQvmUjWGWK1dqjZhulSI9oW+A3OPnAl/gQ0NcxoqzjSsehoqzjTVzl/1jDpHzai/QUwvvybnDwb1mtrCqG2M2s6ozYzayqhNSPnMv6NNqGIzt4oJqordwq9ie+1VbK+9im0eVbG99ipmKarY/K9ilqKKzf8qtrtexexTFbMbVdSvf/ymCxO5EBnmb8L7dP+JC7oIXNBF4IIuAhd0Ebigi8AFXQQu6CJwQRehhPN/eLfmc5w2n+Ps+hxn5Oc41T7HGfk5qvnnqOafq9b+5awdLnZBFTNxpszEKmZiFTNVFV/W2MC02higAF4a8q8a83TIwbzYS9rERj8EslP88BI6BGn/P5cZB/M4yOF7DKT+d3bJB2JaQRxd7eqc5cXLIuMXmXEAD4T4zH+jSWrDTFIbNvHb0Lj/B/1LFfqXKvQvVajNVehfqlCbq3AGVKHSV+FEqUL/UoW6XIW6XIW6XKXY/a/jXVY7TuV7Q1UcYnZRFjbE7CDLfY3dqsBuVWC3KrBbFditCuxWBXarArtVgd2qwG5VYLcqsFsV2K0K1a1vcF9/KDPlQ1nQN5QZ/aHMeA9lRn8oje+3evtpkXKT36GlHIeWchxaynFoKcehpRyHlnIcWspxaCnHqba/PwRnsw7bkSy5ctzNVnaNOZv1gxb3BUrcP8JulPyGMQzrMDZYw9hE7ceGvB8b5H40rD/JmiNFQ8tl+6+IRInhp4DoQgOq0m8z+FnftZ2k2PqlriMd9b2C4FWB4/2NfwOBPJd6lr86DHDCAicK2CUwV5u7Kf7qqGC2wOUCXxM4qo6ROlwvKHCOp4oltnm5H15Y8CualA1oUjagSdmAJmUDmpQNaFI2oEnZgCZlA5qUDWhSNqBJ2YAmZQOaFEXYQPisEEPfxJ8mj6mIle6f2w1m82437BDYzl8rOK212yDiHecmVZhs11kTZLE1QRZbE9T10pkKRjX0CpqGXmTDXkgTXCFkMfuTxcIGenWN1cJATxKOniQcPUk4epJw9CTh6EnC0ZOEoycJV821NNBBnsn4O5PZxzOJv1ZGI3cn5UGKGS5/PduUf/CX0TfzWQurNdOasag1Y1FrxqLWjEWtGYtaMxa1ZixqzVilBG0M+LaXTypGkdXW0B46SbpCq53iKHga1Tmm6pxnrX3Q1DnA6px0dc6vBk+rBo+8Bg+yBo+kBg+yytOq8YYfDqkGj7Y6Hb1A9aC9QQ+XUBd6s/ncmzS9g4F+aSH6pYXolxaiX1qIfmkh+qWF6JcWol9aiH5pIfqlheiXFqJfWoh+aaHit6NR99M4VwpB3uCv54Ul5go/vBtoqsh40V/X42Kvi1+WylY6MU2LRE2LRE2LRE2LRE2LRE2LRE2LRE2LVJ3qjM0JrYf2NLWFUdsYtZ1Rmxm1lVGbkPJZXQznwU3nlVa5ctrW/Uorq6vB9lqDy1e5Gj9GFuhm4OLxWKZtx1Id3Zlcw1CuYSjXMJRrGMo1DOUahnINQ7mGqeZ6GHr7w3wKeDmH2f9zmP0/h/g8ytAR7y41zXsazrrRjdsos1BxZ6HizkLFnaWq7KXqkLeavVJq9d+O9ompiXtEe3Hi7MX5tRfn5F6cbHtxTu5FzvYiZ3uxA3sVm31+d7GdvIOT0CxB3hsC2/ub795SvUFe38YNQlD2wdE4lIMgxfWl0eBo1DqCFxyeJp/Fqy/AFrKyPsZQwhG6MwhNFX5Q6EdjkGgm4KRJUFPjGFbgW5x8TXiO3Seki3ZyBIu5RzCrOYLZphEsAh/BIvARZLeOYyxOREYmqgLHG3Ut3msu2sWi3PIb/mZ4av63/kyJCHBRIt/goH2Pg/Y9yuobHLRvlOBONPQSuI9aAp9kHOoN7yZ9yeLQfMBCfh+ji0z8+SULU3/JwjpZ64F5i1SDU/4IavD7HH2h3OZrB6oFpzqRs3UaBoS/ot34VdmN0wy8GeoYWvnujzPrM7CH9JhmfXdBxVoTQ/NQDM1DMTQPxdA8FEPzUAzNQzE0D8XQPFTJ5QwDN7eHM9c2nLm24cwlnsGC9zOYgzyDnGA/J1o374YLz2UXnssuPJcuPBN9hRXBeIpgl0cwpx3BKotg3EdQ1WcZ9NIL6zO1oDjbaL5neeS+y4ky0VwPRv8xnocWSz0MheR9h0n++kOiZvtw25H23gyh/BghfY1x0Ndoz75Witzf0Btgw5UiD2CxbBe219uFTdwubN+5C9uv7kKTZKCBe1E+XOr6cHXrwxWxD7eSfLig9WFXfNgVH25z+XCby4c7Wz7F1SCnx+Gqx4NZj4cwQzCE9XgIMwtDmDkZwozEEOr/EDYSich+oiowlLUdxVpr6kcCejMqilExSPmsYc1srbJcf1qrplqr4Yb+gFOaVMIRzFOdznzT6Wx4T6chHMmm1iLU/0Wo/4twgbQIJ8MiXC0twrm5COfmIpybi3BuLsK5uQiVexHOzUWK31HOcstWk+48xb78mGQ03PX6DV/7i2/69VnnO4uCCySzFzhDlSCp0Qc1eX53B93l3E51+Q/wMQxrjIFbo7twKHbhWO7CsdyFY7kLlW2XGr6x2sKbQ+SAjXMopXmhhr7favaCOZbGHF0aM8RpzNGlMUeXRrMxjPXiJezFS9iLl7AXL2EvXsJevKQqDXfUboLkO8JRO+sbo2G9k5rzbE0F/LVu692A0Q5qYtB6B412UCWl3p3TZKP9pkjMrVtJa1vvt0RiQcPWW65I/S5QZPldjRLX4bDn0vutQo023xaJxUq1I5n3n4zWcjJqyGQc+slq6KOYPr2MpV9GfXoZ9ell1KeXsdKXVaXRLD4ObkK/IxLn4R3vuh7uPvR3AuRu9OkuPwTatTafncj74J8Dr++Ux4E+D27FsAF7EQfsRRywF3HAXsQBexEH7EU1YLFGnU9M1v+gpHyWspsjKXxi0hrPwgUvsuRFlrzIkhe9pBf114sd9CLnXvTgXvTgXnTaXtVB02B3IJ1tN/Yw3nzQzNoP4zk7a8ENsfqfzqu5iRfctQruOzm7bM72nrO55mzryQ/4bfVX78I523+196KC+1/ODmCtZ02C+2HOXmFwX+xAHvR7VyRGastc95N+wT2/WptgNTcjG/08ihXHgtZTWdB6KjlG6zCMsNzy3G4071Dv/4nNwz3Eh3Vk4w08v7CGnV9Yw84vrGHnF9aw8wtr2PmFNez8whp2fmENaUsCLofNaDRM0arABAOf534PC7yHlus9tFzvobF6D43Ve6rSiVxH/xiPAkuFH1mXOh38c2rCWdd8eczg/cUXf6SXx1iTDHjXeSGdQ0tygv3+kkrGiWAdx5Yjx9FcmewsqNPU/csphnMDYyzcwLCOosJT1a8ytA9zxrr+xWuUI1B+Gl/G3zFaY2lh0MDKVApvmCz8nkhMYKtOFpOPkT/VDsUbCMHrWENOU727SXTqTX/1+7d91nQmxa5sideVybQrW+J1ZUu8riTCGYY+QfSpWkbONOCZXXMd7kEogn1vkX0ukX0UsZFfYsRvJzbwWcZ6v8ToE+4PFyOb8dLNeOlmvHSzunS2utQRTkfm5lswMbZgIm5BgkthofGH2LcPUQQf4g7PhyiPD1G6HyK3HyK3H6rm5hjwwhhbza1UxUHwNfPOtwWDX5Ss/ZHB90XiMcfU1/ORQfkhyftkooGPDAY/SBn8yKBgoUzdxjRTJWtpRt2nH9m7yLNdfn78kb7XVvvd49Y8pvG92OD0YoPTiwbHrS5wVHI96tp6HIL1OGzrUcHXo4Kvx8FZj0q2HkdqPY77etTp9YqrdKMxd+Gb89tU8q58o7/PfYnAlf7D/4mqxtyaV19+O8g78w19tKo5jmXU99kqeULBvFgqQAaL815BTXwFNfEV1J1XUPleQX17RWlVpuE8adHK8Nd81oE/B8GfmOBPWvDnJ/iTFg0+I+Fh0e2byOCbqkCWgYv0YpxYxeg5itFSFuOcLUZLWYyzrBhlWIwyLEYZFuOcLUaBFiO/xYrfbEPfA++lXGIOsyXrkK912Po6bJ05y3XY5XXY+jrkax2ysg57uQ77sk4xmctMosGG0GDDZNAw5bFhehvbelsVyGfh7W8b1crttI7+Iyq6LWBavBGHdCNq8UbU4o2oLRtRizfi+G5EPdqIerQRR34jastG1KONOJyKsIHwWRcq5l0ytJTC+UAk4rT3VV+W0l+a8gnHi2rVmSlSZ6ZknVls2ZnFlp1J5YqMA97bl9vNlc626Z+b/Idnk99neQ29GohSqy+fAV9QeEMFnfNZ2Fv7237s44DsE4A9kWCfAKz3G4I+awFwYF1Aa8piNhOXY6vLsaHlyNxynEjLcSItRxaWIwvLcZIvx0m+HOf1csVpiQHfn7AUowvZZGrNpk9rNrVa04RZ1KAJbuATOVaiVIvfz1mfUia5VkxyrZjkWpHkytgFLdkFLdkFLemCcqZEq3CkV+FIr0I9XoXDvgr1eBVq4SrUwlWohatQC1ehFq5CLVyFWrhK8VvBOtiDdakH624PZph7MMPcgzpfySbxHuRwD3ZkD3Z+D/ZqD3Z+D/K+B3nfo5pbbNR8fmuU1MJ6nt9awuKttSjytcjCWmR7LcZba3E01yJza1Hka5HTtdjvtThMaxVXSw3caJiO9UzHFqZjpdPVpcuMw73sa9JLaJpzmSfvWQx0+f9AnyS2loPdFzG0Mvx+VBbhqUFTNdULKZ+1womU+P5lqsi433/Yvz90BD7GfRif3l5p6O/+vSCHchVbNm1DA7RNDd1qZhimomGYioZhKhqGqerSKuaDFqAFWoANLUBLtwBt0wJsbgE2twCbW4AGcQG6twVoXhcormyDXgJvXa5iwIuYr/gIWfkIOf4IfcVHyP5H6Cs+QiY/QiY/Uq2vUc3Jbxr2gIJvYcG3VMGLITI0L1TT7hKD3fH682vI9X4N2Wdd6vhk6zYDZPu6ku1lBh1jJBs1jVmsaSzYmEb263I5GJWishVqyyTA5sRNOOQ34UjepC5ea9Q4D6JeZCPXQSfhcRBpWh5xold5CmS3NAV6jUjHQdYZ+nzjvyUX6w3a4Fd70sGvF/msDSq/reYhv0gJFIghSJyNRCskuiIxHImzkGiJRAgSHZE4EYkBSIxEohsSQ4HwWRu10IUXdVVPd31jg93m8AkN1WfFI9QcvzJ46YUuLaoxSlRXaYFa/1HjerVjGh5U5DXMzaUyN5fKlCaVmr3WwLtLa9EusACu9vee2VedG/kpafz4cwPfle6FBH5K2mddZ+jl8Ceqv9dL0nlnbpF1g4G7uc8iM89ixc9ixc+qim8Mzr7nYfZZ55OYbjLgXs/flGm72dBfer1SUpuYU3oBZfICsvECtvwCCugFlMkLqtVbsFLhLnGaE5XMqD5I+axbDQzbtyIbW1HmW1E0W5HBraqe21Q9+3kLvk956s0G3SAlPtIZj0Q5ClWKClWKClWKbqsU1aYU1bMUZVyKnStFsZaiWEuxp6Wqc7c7CnWz0qA7DAwAliGTy5DJZcjkMmRyGTK5DJlchkwuQyaXIZPLcGyWIcfLcGyWKfbvZBO+P5vw/dmE788O9/cnFbnLMR9fq97fbeiPtERIaovx5/nzg3z7v4zrzblS0vfwSOjPE4iOsA/j8bR3BT7kP5CDRlvRsViDmCUexKbZIDbNBtE0u5d5h0KcxoWqwH1B7xPuAkN+NF1+v3bSIeY5ftodGCCztzFbVY62qhxtVTnaqnK0VeVoq8rRVpWjrSpHW1WOtqocbVU52qpy7GS56sZ2bV2sFirEecCo6/nmxj7WLDcwv/EfjsebHzTw8eYo2a/7kdiCxDYktiOxGYmtSGwCwid0Gke1BEe1BEe1BEe1BEe1BEe1BEe1BEe1BEe1BEe1BEe1BEe1BEe1RPH7MON3BfK7AvldgfyuQH5XIL8rkN8VyO8K5HcF8rsC+V2B/K5Aflcofh9R/Mq1zOPO8hEXOfWubYJLmkd14GdZSo0f0wGEGS2pxw293nlDUk8w7zyAeecBzGwMYGZjAM37J52WNijv/JSqLfg5H9nKKbLY08w4DWTGaSBrZSBrZSC18oy6vNZHzdT3zi5WUd2zhn6GznzM38Cba3zWc6y/k1nbk6m151UR2ciNshN7RGKBauQFo86HRv7Az4rI52U+QId2wHfKdzhxXT+pRy8auOar/wVEP+Dk+QHn5Q84L3/AefkDzktSipcMWDtdotZOOxUHzoy9FW3GrcgB+/LVrchOw1/L8lkv45wwn8N6nsMWnsNKn1OXvuK4qe5qfr9qHOoXtTTp3kBz3BPYKxJHSU1rnnsBTqx4cO9ikU+WuJy9o2a/O+CzdqFtMn9Bb/QLToFfUD1+Qc/yC+r2LzgffsEp8AuqlCJsIHzWa8xhrkTlX4lavRJZXIkqvhL5XYmMrERFX4lcrUTmV2K3VmKHVyLzKxW/rxu4CzGcHVvjb1gZztzLft/M4rPeMOpcYcpX4x7VhKUmv8tygygyQ+A6gWX+Az2UIlalZoW/cTddgqtTdir9t3p37lqRuFzmHNBtGLFyNQv8tZe0PutNJxrpqqKRtxyf0kdSbztUG0m9gypj/oQ69ROq60+orj+huv6E6vqTUpZ3Db1Daqn232Pz+QlU4iewwSfUxe8bGMTHYBAfg0F8DAbxMRjEx2AQH4NBfAwG8TGquQ8kr85EmEG3IHczl/QZdv0z7Ppn2PXPsF+fYb8+Uw3tYRHX2SziOptNx7Npyu1lYpuA1U9QBfapAo5F2oJsbkGzsQUv3YKcbVH1fGjg7uM9WM89WM89WM89WM89qp6PmC7tQPXZgZXuwEt3oEB3oEB3qEo/NnSYvlCOzCeOZucrzfqUGTw/M3F+ttHqJ5l+VjumvU5Nmc+PzNhhp8Cx/oOLIZy9lOYLIcL9zfA6t0NwrmCfyLDkaH5Rt7c64JfZHCut9Z8vs2nSUYC/MGvwPFqD59EaPI/W4Hm0Bs+jNXhezd+/Msu8E+vZiZfuxEt3ot3aic3tVJX+zcC79F9gPV8g219gmPcFtv0FhnlfYHNfYHNfqOb+zuz6HGxuDprbOVjPHKxnjqrnH4a+HzJLrX7+qZ2uuUlS/8cs4zJmGZexmz3LmJ1cRnbyXwYuPL/D7n2HItnPyybqf1sFfw3Fl46RnyV5/8ooq5bCV8oj/9vQdz/eV3b/PwYG5rnIUS5ylIsc5SJHuSjpXIzsc5HXXOQ1F2P+XAzzc1Uv/suU831k5H1k5H1k5H1s7n1s7n1V6dcsHDIxHDIxHDIxHDIxHDIxHDIxHDIxHDJVc98YeFuwrk85su/V1f+JOvaNu55IsE/h4UfyfNa3hj51YB3tgsvuxNrvRBndicN4p6rjOzYKDYcXwRYexRYexRYeVZV+b/wBnwcPOlr5YecznOMkzfRA+A8G7DX9n5rkPzoWrKekftI2QZgySf7skK8p8hdDb/2coshfmdrWdTebvUK//rfms9fuszfts7fz43v7fVaIyzmjmw6as0b9ZrjQ2j+NNT2NrT+NSve0utTlglPx1ysRtXD9T92bPJhXZsjjsG+jjh8xNyebruwtXUfO42GN3v2WL2l4WhY89M+HtXLpI3ApKpRp/b8orkMmJTkOdzoaqsTVxoXB3TC2z8c/EziMbSzs9/OCPqstM1cpaK5S0NemoO1KQduVoupp50Iv/C5a03ex0nfRmr6Llb6Llb6rKm3PmLsLS9+Fpe9CTu9Sl3Zglz6Olz6Olz6uSnd04YpgHzK8D73EPvQs+7CT+9DN7MPm9mFz+5DTfartTqrtF8SgPycHPfh1jeA3LDq7tCfsqCZLF5d+hNl8FIYzkw11JlORTPYEcyZTmEz2BHMm26XKZCsFoioZlcyom5DyWV1duF11N0rrbhTD3Situ1Fad6t6urkw+J+H9czDS+fhpfOwhXmqnu6u5tsk+KM8LyB3td864B3rBnYLejCT1p7pZHumd+1Jm45yZsHDKgDsya6vYNdXMN2sYLVVUG29nNrKVW29mfV6B1XsHTQG76D1egeV7x1UvndUG31cuKb+CQ0E22p/FZt7FZt7FZt7FZt7FZt7VTXXt7mcqPQ/e2TG78KbBp3o0TyUPoAHHkSUK1as/kYs3ERwa+1s4sJNRtvtZc8PxyMP9UauxzgT429qYhzrkO8o8jhmihdLJSxDohyJGUhUIDETiSgkeiIRjUQMEpVI9EKiDxA+YWMdX3lsdRWWh/lKD/OVHuYrPcyueJiv9DBf6WFWxsMskId5Rw9ZoBPQgJm3IO+3oCRuUaVPZAYqFQukokBSUSCpWGmqquckZ+VqrYHTjOY/1I8nqx+dPqxkfV9JXJ/igq26f6sl6qmu3+2dlMP3QGb9d07ksrjVITt8oW6htJUje9pvFR3JIwXT/xfCpEbc4V/70LAQ9dfs8dLpwYn7gvzBWeFNp2l5BlvtzECLMAMtwgy0CDPUpf2YSU9Dy5KGl6bhpWnYQpqq50zGwn146X2qwFku3NiOkwXuR2ILEtuQ2I7EZiS2IrEJCJ/QJLKYIeZQ6NJTyNdT2KWn1FXnuNgR1IN71XrwIz61Z4h8M8rJ+5kqh+69LEfCvUXnVG+TZsG5Ln2i92HpefozpzgXVXcuKuhcHPS5OOhz1aAP0LVaZWqBPdCJedwq5hnE9gY+xcDkU4xfPsWY51Nk5lOMeT5FZj5FZj5VzAxmC5vBLDgZzFzyYLbXM5gFNYPZXs9gshJDWNVuVpmbigxlUcl3yB67D/gd9u87lMl3GKx9pyodxkzD/SiA+1WB4VrEIeYHqo0Q8yVVY4j5nvx5hAsfRzAEzhToEjhbYAuBssrWYsSStArL9zMF39ck9bZQ6+21AtsJvERge4F3COwgcDOpsbldYCeBOwR2FrhLYBeB+0CFHf3sLvBbyd9I1r8rUWhXqv6NYoJfwgS/hIWKS1gYuYQG5TyXOrIUYl2mFPJ8ttD7bY9jH8j3Y4/AV/dfwEbwRtTQG3E4b1TjMZqVfgxLP4alH1Olx6jSDbzesxFv9VSvAL3UJasbq6qT9JS6qwu2VLveOaK/SXXV7xO+A63cbpzRu3Hi70YrtxutwG60crtRKLtRKLuVUEKZnfkRC/yIzf2ILfyIXP2IduZHVWnYkbkS+e1XIP8Lx8DV0feflS6Gq3Fsyrt6m/sVvfLlv2ZLyUuEC9+38KEMSZwb4/JZJOdtq3KKRcof5IdG5zjmDx5Oqn45qmzVo6ZyJKu7ZpX4htk6K3La9FlRLn1KsqNyENGqXvmy2DMdf/grjJLPimEOVVrJ1v6mP+dXr6VPFD/ky5ab7UG/WBbpNfxwftBcPIw26GE0MQ8rczGe7c/W/+Ho7/HS79E6fY/NfY9cfY9cfa+aM1lz67E59jLl2oeT2BGkRp57wpNKDRyCqvfck8+Kg9MIVh4dlLb4HmqtYzGLRcYJLn9D5xHqP34gDK2VIy+W+6yzZcI5KBM0QY0/MSN3YNNlHfIsS4XL36St2CUiEZCJ5jhfUMvQSbNcJDk6gG9ysEByMQskF7NAcjELJBdTIJnALq/jVcY+a4Kz+Bml1kIT2RXR7IpotuKIZhun0WyrNJqtVKLZmiaarVSiiYtEh4uFiotJjIt5jIt5dEUSK7KAFVnAZLGALkhmJqXhc6jBefYQzpmHcM48pCqdzCLDe7H0varAFFbgZwymfkaL8DNe+jNO25+RuZ/RIvyMffgZmVOEDYTPmvp7mMlynvpcjZrSR9pMnubSB1zPUho+HfXCCmEKG0IKO8OZE0vVFTOZwndnV3Rn6k9UBaPKkPJZs1xwOO8iZepnu9jRTOfHm1Gvbsa5cbOqKeUwHFiT4eyl/iPm4Nrv4LzaHJfzGovr/fQai+9ldiqzVs+gfXkGDdQzqBTPKD2YyxZ4D6KiPKgKpDH97cb0txvT325Mf7sx/e1G+jvPmRu3qADYvR/j9lud3pUWrH+z26t6j/E2423hdDactZ7q5g9/O5GsG0edHv7OcAaqpzJimY296RR87vSPdjanMY+VNve9Jo8aFbmSDdGyqnOBeo0o8I8Gl7rVK9QsZ9wXqXHPdsiZiszR96BCzPfBqtyGinUb6tJtSpdynUr+rSZ93kGf7zgkxzqafppDBk0fNvP8zcfF3ARazBWwG3LjpYDvR2ILEtuQ2I7EZiS2IrEJCJ91oQ4oiIdOzIx3IjNeyDYhP0F/8wlGup9g3PwJasYnGER/gj7qE9SmT1RzRcyobcICm7DSTaq099Drlxz5rq7DpmjNqF8+FincgIK/AeV6gxLlfNTGAtLGBWwwHkD5P6AuKmYBQzwLEeLZUjSeLUXj2VI0ni0+49nCNJ4tReNJJ0sYX9uRr+2qwELG11LG11K2Jl/KgpylVP8ipvO1D/k18pQgPwtY6tKvZX5LirbM2R7cogxluWpRvqxotAF1PolNP4l1PqnqrJC1SBvdQVZS6RjfeGXBF7MdxWbbSdzfBqIlLvwJHd5+dxKX/IHuEcgd9V7SnPzubhb4xCIYp83HOB8+xmnzMbqKj3EOfYyu4mNU/o9R+T9Wyr+suW7itVfcL1fVXS/ok3GPRd7CtmVGffe4D/utbb9iVL5LN9EvjzCKQFh1YIVzZOJJZVJWBk8nPWOA7AqU7FYx23Ck9VGNQoYKUldzDy9Xaye6/EfQ+vF/btlYxe55/Igzjt3m3YUTcxdO5l243bkLZ+kunKW7lKbZQTVcDqdbrRXMJ68gv3uRS78W5yupwGvYrbjGv1bdWfLsFniGrPbiQ7D1IBXx739YHbqEhZaPoAo8girwiBrWS13w0JHVh418Hxr5y4I27USoqwjrKlIFL2cLpFhcIMXiAikWF0ixuECKxQVSLC6QYnGBJAmfz+5Y5E0t9KaI/73uokBZIOsWIyTEvL3Ibu/Om1cz+9MiX2ac3WVCamGRJy8jqjA/zytKBXyZE2YF+qlaLyhSMJpgDMFYgnEEoQRhBOEEEQSRBFEE0QQxRZphvbBTYBLEEVgE8QQJBBMIJhIkEkwiSCJIJphMMIVgKsE0gukEMwhmEswimE2QQjCHIJVgLkEawTwCN0E6QQZBJoGHIIsgmyCHIJcgjyC/SHs6BRcSFBZpLVLgJfARzCdYQFBMUEKwkGARQSlBGUE5QQVBJcFigiUESwmWESwn8BOsIFhJsIpgNUEVgU1wEcEagosJLiG4lOAygssJAgRrCdYRrCfYQLCR4AqCKwmuIria4BqCawmuI7ie4AaCGwluIriZYBPBLQS3EtxGsJngdoI7CO4kuIvgboItBPcQbCW4l+A+gvsJthFsJ3iA4EGChwgeJniE4FGCxwgeJ3iC4EmCpwieJniG4FmC5wieJ3iBYAfBiwQvEewkeJngFYJXCXYRvEbwOsEbBG8SvEXwNsE7BO8SvEfwPsEHBLsJ9hDsJdhH8CHBRwQfE3xC8CnBZwSfE3xB8BeCvxL8jeDvBP8g+CfB/xH8i+BLgq8I/k3wH4L/EnxN8A3BtwTfEXxP8APBjwQ/EfxM8AvBrwrkPTmFhkaXxhYaW2pspbG1xjYa22psp7G9xg4aO2rspLGzxi4au2rsprG7xh4aj9LYU2Mvjb019tHYV+PRGo/ReKzG4zQer/EEjSdqPEnjyRpP0XiqxtM0nq7xDI39NJ6p8SyNZ2s8R+O5GvtrHKBxoMZBGgdrHKJxqMZhGodrHKFxpMZRGs/TeL7GCzSO1jhG41iN4zSGagzTGK4xQmOkxiiN0RpjNMZqHK/R1Bin0dIYrzFB4wSNEzUmapykMUljssbJGqdonKpxmsbpGmdonKlxlsbZGlM0ztGYqnGuxjSN8zS6NaZrzNCYqdGjMUtjtsYcjbka8zTmayzQeKHGQo1FGr0afRrna1ygsVhjicaFGhdpLNVYprFcY4XGSo2LNS7RuFTjMo3LNfo1rtC4UuMqjas1Vmm0NV6kcY1R5Lbb5Bd4Pfl5MgbsZ7ea557rywisslsXeQs9aV6R6pLtdhekpObkpHjzs92i3Cq7vbfQ7U5Jy0ktKgrE263SUtMy3SK7k0qkZBSm5uamFoqMNgX5Rd4cd3EgPtPIuk3El3YrQbkLA5mm3cFbmJpXlJ5fmCvo+Kybxa+zKAhNtdsWFHryCz3ekoDdOk+USM0J2O1Sc+d6Mnwqs2Wqz5sfsFsVujNE5avsHgWF+QWpGSKSTREteqg7gnPVWEqa4H1ualq27KHdPTe1ZK4olpOa5s7Mz5nnLiwKrLQ7u+d5vCled2GuJy81R3QqM8YMyYxdZXfMLxRF3CJOdntlwY6e3IJ8EU0XpHoziwKzAnaHonxfYZpbZQhZtBU1+zI8Spoykm4Zl1qYHfD1/38seYkT'
+)
+DATA = pickle.loads(zlib.decompress(base64.b64decode(DATA)))
+MEMO = (
+b'eJzVXQd8U0eax2DABbCBbNpudoNDiGwCxCGVBYKwZRD2kxxZQIikvBWyhOXIkiJLCQTDpm0SEu1e017vvfd+e7fX+93u9d57722v7L0m6c3MN/PezLwRXn6JbEnzzfy/Mt9837yZzy9t/vCGT2yw/l1rhWbNl2Z/ObuSbzWHdD16KhZPRPTJVnNrNVuv52vlltlg8/PZUsNoMZC6e3Db9qHM/lZzc6GUvbTayrSam2rZF1rNHYdSd6fr6UK6li5n9h9qNbfoLxQX60tGi9Bs31uDG5x/ffnmgK7Xr1Tzut5qDs7boyQirUZzoForVmrF+pXW7IalHc3hZL62UixnS9P5Qqsx22cAWdrY3DYTT2hn58J6Ij4XaS31m59uad6Tyh54MRN64ojxn/XrWip84Gnj9YEDjxuvemZ8fKK1NJBpLQ3FlrYRkJZ2LI00lkbNYZd2NmY32kPtSJ6e0Z88G44lozPRSKIz2H32OHuOr6WfSE+Mrxm/n0jvXzuRPrCWfsZ6u8f4ZnwcG3B2Iz7Ops44k9A4w65B0L42kn31O+JZOHsyeWE+oi8Yquz0tPHoUaeDZv/Y0aNjLUO8Q47oF+q1lqufzQ6mmTjI+0CbO5w5Qohb7I52x+Kx8MJCfEqfisdikalk9FxXbXcZvR09dnztaPq6wef11FpmzXx3zPg9vY/geRM+xFZ7iFFq/0OmORidEp0BeAeczs7GwokLUGd919sy3DR23RTh0oSLfNCRWzg2DRLv6xLvI4iHbOLtpyKx5NORmB5OJOLnO7SbDhw43qbePGa8IeiHbfohQxCG2jWjl67qjxzrqv7IMYJ0m2M3ltHMnI1NJeNdbb9qyu8+c16l0ulM6j7jZS2VfuiBA+mHHkk/bPyYPHzY+P9h45dHH8mMO/PPT9PxCaPfNR+zFlccY9pud1iZjsxEY5Fp3WSpw8q+1N4Mt5PYyBhth6PwaGwm+pQeMebKXDR5oavwY12Fk1IfcYzNJjbQ4uQb97jUtofsYNTuYOuntsZ2OjJcuLCQjGiE+Y2bOhNQ2ybGkLvsIUfaRoKPGbid7HZUbTr5jmVGElpnxNvN9cNaQMwVZI/pXdNPrJ045u3/brG7HjgXTkTDJ5Hl0AQc1HL4DnuYTcn5aNcn1avFrk8y3hAWemub6vSMi2qp4KJaKhBUt7WpZtxUBTdVgaS6vU015abKualyJNUdDpWx1HWpChUXlfGGoLrToZqKuahyZReV8Yageqfjoafjc3PhhB5NdpXVv7dYz7ept4yZ7wjyd6Hkc5Gki7yUr7vIjXcE+V0ouVsl/XtdOjHIIaW8GyOfQcgLCDmgnfeg5G5x9+91ydsghwR+N0rulnv/XpfgDXJI8nvw0ZPI6HVkdFJ0Y46jjcam5s5Od7W2tVjOlRqLHcUNjjkfED3c4yxL4fn5uQv6wgXtZHyuu0yc6C4TJwjSvTZpfyysdUf+qDOvb7KXN+Pc1P4DFohJ43Pzp/n9+ITRLmN/DXxOhMUMx3Ovzf5wOBnXolP6+Xhi+lN0odtnczI4E52L6Ig2UwqZ8L8q3udY+VRcQ6LHeWu8Q5nURCYdMn9/ZsJQpPHO/N369Zn0Ietd2hgSbGBQr6XuNd8f5BJZqL1QRxeSxuRL6vGTZ4ygugPtcGos4xLImEsgk+mHDgMCGcv4X7XHHa8xFz8fSaCWF2yuOWEPtPncnBEZdBcUI2vpLCiHjDeHWtTEZb/jJBaS4YSrgwl3BxOsDu53OpifO7vg6mC/u4P9rA4OODxgaUvquLuH46weDjoQEpFwxzc+FenbsKHrZByBAy4ldTBjvXV9THM+qUg+43SJk2DvqQ6MHM1quo7hjfv3A4eciDIRTkaNvL27TmW6igBHNX3EpC8mgaYcAB/oLMfJyCnXvsSjgquR/4k66Zjo3LxrmvWFust3iFi+H3TmhelVw12a+7s09xM0h9szARlmvEsyTpA85ChN18OxeEx/oEt2sEt2kCB7uINuLt7dKuo70qU5QtA80hbCwpMnuySpLkmKIHm0zRBCkumSZAiSx1CGJrtZcapD1z+WIgkfRwkf7BJevdYlvHqNIDxiE26ZO5kIT7l2ba52YV4liN7rECUwomtdInKko0aj5pZKrXipaO2tmlFBvVqv6rWKGYvuaA7HKuX2zmer0RzMX65my6vFSrmVcdrv0vUOhb5az9ZMle9Yvma4y0a2ublSW8zXWrMbmpuzpWJ2tRVrbq1U60YHq9Ze7siz+XxVz5ZKer3ybN748EZzqzXG4mTrxtJorDlSz69US9l6Xl+tNGq5vNHBduOT+hW9WF4s5vKrrXETZqJRysedfhvGB/3mB63G7DFjkOUX+6ztZZw5G+PydeM101p+xfgx27f8qvEjtvyaTbH8uvHzxvIb5qsBZvlN68sbxqsx6PJbJrnx823z5+xxdKQha6RiudoghrIb7MyWy5W6wdiiXqjUVhqlbFdsNpgN4mCe4ATTzR9QCBLyOIFCYLCLINlupHx6p22AIgmL4ikw8EjI56QonhwDz0ZxPFOCeIwkmY5nkzieaUE8RtZNx9Mvjiciqq9qkY5nszieGRQPZRwHS6i9JTUfbTWHCsVSPV/TK4Y3uGH4yoGug7eaLT9m0Cx/zHh50+jm42Y37szf+uYG8s3ycQoF+nyMh3LY5AeXrPOVw6bl7JGvlqfh3pbPEJ/npR3KKVQBIGDEFIbNqRK8rz+NGwLoQHFDOD0DqmN9qH6JlNO6Un0UFzm4RuAin1nPIi+sc5GfwUUOLoO4yKfWs8hz61zks5jI4ZUeE7m5n75uRQ454HUl8jlM5HAwg4ncfAaxbkVucrCuRa5hyziEChE4ldctToaKsrndTnezJSP/KlQ6X8oDj/kH7ui93CiVAsxg4ngABCzbaMprtihVLhVzCsKgeV40I1agVK+smOe/iuVLAUrmSV4sVovVxkXzJFqAOV1CDEf+uUa+XMdxSORyC/5xOE7N/agD8jfzlDl4q9n1c41suV4sFIHcLC+dByaxPJBu04hkd5vtGuViPVu7osD6z4qh2mmjYmCSmAXnxDDtMttdLLJASUyJ8xKCWswXimXDqAxHXrwc4PR4CsXEEgBpU07DsrHErK5WcgHa1AVBWKOuhiAmCZt6WhDTiKthwE42hUJiKgV1cqNtn0CJkMDTqoA3ZHQkH2akUfboykXkvcNsVqkp8HQZITz2Yl+m7rVLmOQzQoAsh5KtVksqnJyOQqIpg88anUMBvba/94nwQmslz4mEoWRRTqgmyacW/Ix3r/VzUYgrarMAmZJQVQ6IEuDJyqcs9Nhdr1W1KMgVo2FgbEkoKw84YHCoXgbkBSFQSuPxS+KQmJGvxEK1BMRO1Vr+pmuvKIpr1GlpiMnWY4D6WwZA0USAgPJKiuXl9awotF3tTRj6npCExEqisLqXGFBnJm/xK/yQnG1H2nYuI4W9RtlNzUunrGWUDS8LQ9eTXe7WOWvLEltQVK6CFSCFpIDBgkrsBia0L3WOpaTns7Vi9mIpr5eKq3VMSWmYENjokpdAFYgDYGzkXDWT58VO6wBdyHO8oELeqK4x9+sZQ8gHJTXAyigoUX5orodmDu7+K1W9lH8+X0K3OOQNZpWbGV9uVEK8dcBa4LiJb3mWEFJDDJKVCVlxVeABw/NAwAcyjyUxxKVjKKJnxkTyJvcCkFZCUqLkX9Y+X762gq8rxBVXZrJC9CLP12VgKlHiH8ByS9li2WkeoOVeEcS0y50awKgkrPdFQVTWxFu9slrPr1BASYRvV2XUZx0/aJRzSIwh//hgDZrmkKWgvjlXKa/Ws+RzPglDuiaEZNBaThpVMpyQsJ7rgKIopooqqt1IgXjeL4jJcn4GnsWifZIgQDG9JAhpq5V05AnpSEytl7mheCRG2x2xlYGVQElS9IqozbkbIljljy2/CkxJcCgE0TYWGokZ8JoQGrJaQdDh5AeA2A3e8+KLN/B6HL2ONl4H+IKXRtThOG0U+MA3AAsA10VU0J3SIjwH3eyj0LVLjZV8ue59xkxe3G+KMUeU/1DPpMRcuSHGJF5WRT2PEmvRW0D2AS3A2KElVz0NHvY8d/CYOxhKCFXMjrdRoRIhBCxMs7oIt60Y3VobFLit0OTRITKcPnEalf+eghLxNVHxUfjkOuIogeaDPGicQI22OXoLBtPf/qi8J/sQygMbRq8E+2kCoEIeqNh2zB5CXsyfTjEVdK6h8ae7TYDC/QweKB5Wu9NN3CuT/UyUAVhOwNN7hq9HCvVBASqjA3mv9llAhAoLtScG0uKFE2Lh8bMIg53LG8qHgSgNTDJ4H8dKCPezhTCpe4jwOZx4lD2IlYhUPxflAdhLcwtz+SIBQV6tn+cXgodDHXXFU73yp58PJjMAhN5dZPkCTkg+3TzVDdEHkBfvFwLrLbkjh57s8T70LC/jL+LHRdb1DdodfTE/KPb+kvye7JcIyMnjEZv8844vFQDl8UhTfp/1ywBQ5I4F9EwImHjyBv7lKBxqZoBFMY2y/VjfbIq5j5tz8uArRPigrtAeCZKK3bKvFFKEU7wu4BMgEo7gq1A2WIORNt6JqYCLNxK28dUymFayVSvXhTBJqPtrBDFZFxbsI9YBX0/6WlaQS8Wj+Hzt16GgaNxz3piRAPT1wDSFrovxGZIEoG8QAWTJ8XK1VlkM2q6/URiOYUSVctBG/U2AUYOKYD2uc7fzcrsMUvlF7ptvDjfgEPIr3rcAcxuwST5e7HqyvVbMt4qwQmslzYiETr4NYASYmJw6sUr09lon3y7CCq2VNCMSOvkOlBGwBITv8Bz7UzsQL/0IlbwivhPCj5WOQPEDO0NOtoT+qRkIPUArz8J38bJAzSxAUnVZxXfjwIHyXVjwVFC3Y/U9vGhGrIJpSkqvfC8vFqtF8KVXvk8Ax2UFpVe+H8XBsAMs/i+ojP9/QAzVThuVmuuRHxHDtMtsp6xcyQ9KCEpVuZIfwnNcugBIm1JXruSjgrBGXQ2DLlfywygmpgTw4KsQVG0QWkfy6+eP4IkLTZJYWlhQVBvkR4Xw2KuRktogP4YHqzDnfKpnlq9Qp+wfF+GF1kqeEwmt/ATKCVX/fGrxV7NCnX5+UograrMAmZJQ1U8BM9pPdQCl0ctPC4FSGrz8jDgkVbUdfhZY+3zWdlCqvZ8TxTXqtFRxVfPnAVA+azsUFNd2+AVRaLvaWZ6S2g6/KAprt5loeZiXhNl/jB+X57kiatDvscMgEeR/nGCDLjSe41oShvhLKCQvy8cCEexPSPMVbygEVbxBfRjwy0DG6KO4wzZ3uwC9x6/wwgmx8NhipR+opHYuH4n8KsoIjI/0f8rqZfwaNx51Byl/HUi9FRa7GHEtLAE/XfgNwFx91ZXwCA0kIP2mGCRLSGrqSvwWEGwGWFeCEY/JK/i3gSzJT10J1youUVeC1os8X78DTEF/hQkKyupK/K4gpl3utCTwuhK/J4jKmniq6kr8PjSlbkoNhz/gRCJ3QbfQ27urfwjo3s8NfSRRtqQRoMT/CHDw8Fg9q1Txx7yQgrnJ3GNr+BMxwY+YuRCjHIeEG/hTMURbTURANQ6J/O/PGEjYFRHYK6W/igjq1sk/B/i6uRUR/oIXUSAX6ns81f6SCLvgKRTUhXqPHRNaBjlgZS5ktRje9iruf/8VKkJizgd1fd7ulvP6vEPEc32+l7L7a1R2FCa5zqhIoPkbHjSed+cLN+Xu/N+iPLBh9EqwfycAKuSBim3E7CHkxfz3FFNh3p13tQlQuP/AA8Xz7ryLuFcm+48oA7CcUKsYbrcpLWFuzfPWPOne5N3YP6EcgOh6lt3/My+YQbNF0HX+/oWInmiG1ZNJ8q+8cEIsPGzfw+hcfrL8G8oIac29O17671xQmKXrJATyH1wo6LYukR3+JwqBnibxPoaVUM5/CWFSpaRPCKFRoqz/FoLi8YxGIqH/H048yh5KS1yy/l+UB0Bvyotd/J9fCB4REDMDVxH9fJII3zwvqJM+Tlp+2oY+HhwhGhDPfBTqVFqIWh+Gnpo1BHGvvqDuXr22UYgRxsV6ZvakYEdJ24RxwJIXnH/iT4/ljbtfFJP10LNcKbNwSchqM4aLORyZQKi54qxtEUZltJx0H/0JWFxbBYB5TBBmFx6TRDwI0QZITuiCw7aXzaLL6+XAlHW6ZaVSrgTsBgcx+cDj9Mp9DPGg8TA4+sRV55KH+aXpZyZL2P82DBEa9d4MHW/nReShZ+uCBe22uRIt76CFDkyXvd38SsHjM21ECM62Tjn5C/OBn4fTRoUwKfujc9pOTjztsNW6UC7yfLFzApD/IaN4iqvtEmLTO6jlXK/FE1xtt5Dh7OgkoaC32iyO5xYwoIX12isP+g5+TPgzHlihtGySNYC8O70VWhB8VX+hLRz294zqL+rOz2q3YdzQlic+XuhFUxSycrsQK8z1WIIRCQu7g2QEdBccG1fWbOB5bCehhzuhHSMSAHD0Hk685T3QO7kQhbwhsf0PpXt5w3gXxgdYCmMdl6DR7iIZIGto4DVoiA1bR8p+atAQtPI8vJubB0YRGoBUXSLwHgJ5zrMKTU7ZY0Ltbm446srQaHswMAzOseucObXXObUxQWTDuTIpTnlB3YPB8RLAOr7VB0pI3kHsxe3a+mNLzGlmtlA1ze7lhmO1oFQ2krCcfbgh07lGYwOzHbtgj4R47hNEZbVTVB1ACwmC2m2DUnRVWhvHMzmGZkhcyioJaROiuEZdDQMuJaTtx7fyWTLA0qu2GqVrCVE7kndz9+N5MFWW6N6H2UxFMSHtgBigEbOZkmpC2kE8kaPwzqd9VhEehfo+JMQMrZU8KxJ6eQDftaOZAJ9ifNXeUaihSTG2qM0C5EpCWQ9CayHzPjXX9WWVCjnMDd2lESVXwbWHIBvxvk89YDYTvkdNUsvL9mHI2/uoVeQjQpJA9YgYKqXB5KNQIOKvVpHZUmly+5gwNivGU1WsSHtcAJfXAUx6DH+NveUjEbEfwbN1D40GmK2bIwVag0eho34v5Kh9FOFRVjtJO8qNyFeFFurVBHr38iv4MSg981PB4Xazofs2jAIPdFwU3J1mQ7QWgQJH9IQovDusTRz3tWQFGwInMHTeCiNzQbt5wKeWwxgwP8oixYfc5FdgeycDRWlHccGb4BSG0odoyCgCbR+wtqdZCGGx+Atv/RQ/UBHcRiCG2JOZTCCc9gHLegbaBgC0qrrujXaKD4hU2RvL6fau+oJ2GkojwCtY/m9pSYg6KgbnNsCdBXt/TDuDIfMcsseeaRaKvxkj9qpgkDYnBiyQskG9nk0atOcBecceVZDRYpyAgigg02uhx/EzNzAAdJkgllJ5Wc9z4WDHA/QTP3Cn8lJ8EkNPAiP3kQqNcq5u/eWsYCWZ4MOirHqptgDlxjDXPUo3koKI6AupvJTOCmLyih0l0sVz0FEE9vGvna7TCqLHwBh9yIfq57l5oh8Hg0jVeeinQAMBxYTc0l4isMhPoAvcWBxZlimyvJXoANqDrCsQ69NQZMVA0ruTQCkxZCFPaOzF0WsYeZGn8TkIHexCjzgtFleXHV8YoIQzHEC8nAGEUJ0zeAZHDg2P1rAsFY3lgaymKSE+nQNEyEtMrMMFBHZ5Ab4Pw04Mwfv0SkKOWZ9YuB6UsyDLi+8il/i8HpBLxCg5PF+A70Gi+y6Me3fy2lzEEKGH8lEg4Gl/eQh5/xA8Ny0kjKSAwYDZVb7zeIkfhtdmgoRQlvC0jG2rlA1QeakU8U0NGstoTsbc05BHtYxvXVLNE9UXe4NLHtezuA15b6duKTdWLuZrARpyiR/EyHR0IRk1ZKLHT54xVovAk/sVDNOW1UqjlqPdCr+UL5urRND5fBlfBCpVu+6xuehUKJEcLf4dbqzmCw2MVD7xrHBhdPx2uVEiAjYJZVXxgA1iFdYYkgLIa+w5PH4olnOlxiLtWtxWw4Tnzk7zVakenInORfRYWIMDpJ3tHGc1X8r7i9vtz88Qn8tbR41MqGngfFkx9ZzPYDm70rOrpavcXKmx+zqGAxACOj5gNPI23/CNIkSHQSWVj+mfx5cX0FvD7mExWw8yI3qBB0qIhcU2bmrdI7BfeVFelhAl5GklEqQrNCiImNDdlnAyrkWn9PPxxHTgs+BFfjyj7SYFyhaQhKau8sNRV0dmjR8MJcqUqPJyjR+EvyhTom7LdX5M29prDeSaJEq2vB/PUKjGie180ScVO4zZ7vYdvh8FS8zQl3Bhg5JEuWv/OYzk6Rku5obrS+SOqzrWXpZhbYaXtQI3axKO7BUJ1mbinKxBd5I9WJNwi69KsDYV42QNegTgwZqEs31NSmt8f3qGdkpCRaGtD9AcNjXoVlFNWnudB4ZXYR6WH1ZQUVp7A98xgAH0ZIflTS4seETOczQH7lhemjfwjSoscEJ3XaOxZOQUcYVGXo5v8aAYSIST0XgsPBf4rt3bPDD6ExEaBAmn3sSfUSA5vwNAWt4fREdZftn4DWRyqF6tV/ViudoIcpvrQ97Dh8hv7E8+sq37ibT5Nw7+P69FqY0='
+)
+MEMO = pickle.loads(zlib.decompress(base64.b64decode(MEMO)))
+Shift = 0
+Reduce = 1
+def Lark_StandAlone(**kwargs):
+  return Lark._load_from_dict(DATA, MEMO, **kwargs)
+
+GRAMMAR_SHA256 = "c630f3bea03382264247f32bbb462d1f6f5163087722eb96bcd434c1fdf3ff4d"